@@ -0,0 +1,262 @@
+# benchmarks/loadtest.py
+"""
+Load-test harness: N concurrent analyses against local stand-ins for
+Screener, Yahoo Finance and Gemini, all on one box.
+
+    python benchmarks/loadtest.py --users 8 --analyses 3 --flow both \\
+        --screener-latency 0.8 --yahoo-latency 0.2 --gemini-latency 1.5 --error-rate 0.02
+
+Flows:
+  verdict  ultimate_stock_verdict tool + generate_professional_recommendation
+  agent    the build_graph LangGraph agent (Gemini function call → tool → answer)
+
+The Gemini client is the real ChatGoogleGenerativeAI pointed at the stand-in
+via GEMINI_BASE_URL. Prices come through `StandInTicker` (Yahoo v8 chart JSON
+over HTTP). Screener pages are fetched either by the real Selenium scraper
+(``--scraper selenium``, needs Chrome) or over plain HTTP and parsed with the
+offline static driver (``--scraper http``, default).
+
+Reports throughput, end-to-end and per-stage p50/p95/p99 (via src.metrics),
+error counts and peak RSS.
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+from urllib.parse import quote
+
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.standins import GeminiStandIn, ScreenerStandIn, YahooChartStandIn
+
+UNIVERSE = ["TCS", "INFY", "RELIANCE", "HDFCBANK", "ITC", "SBIN", "LT", "IRFC", "SJVN", "WIPRO"]
+
+
+class StandInTicker:
+    """`yf.Ticker` replacement that reads the Yahoo chart stand-in over HTTP."""
+
+    base_url = "http://127.0.0.1:0/"
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker.upper()
+
+    def history(self, period: str = "1mo", interval: str = "1d", **kwargs) -> pd.DataFrame:
+        url = f"{self.base_url}v8/finance/chart/{quote(self.ticker)}?range={period}&interval={interval}"
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            result = json.load(resp)["chart"]["result"][0]
+        quote_block = result["indicators"]["quote"][0]
+        index = pd.to_datetime(result["timestamp"], unit="s", utc=True).tz_convert("Asia/Kolkata")
+        return pd.DataFrame(
+            {
+                "Open": quote_block["open"],
+                "High": quote_block["high"],
+                "Low": quote_block["low"],
+                "Close": quote_block["close"],
+                "Volume": quote_block["volume"],
+            },
+            index=index.rename("Date"),
+        )
+
+
+def _http_scraper_class(base_url: str):
+    from benchmarks.offline import StaticPageDriver
+    from src.metrics import timed
+    from src.scraper.screener_scrapper import ScreenerScraper
+
+    class HttpPageScraper(ScreenerScraper):
+        """Same parsing code as ScreenerScraper; pages come over plain HTTP, no browser."""
+
+        def start(self):
+            self.driver = None
+
+        @timed("scraper.search_company")
+        def search_company(self, query: str):
+            self.query_used = query.strip()
+            started = time.perf_counter()
+            with urllib.request.urlopen(base_url, timeout=self.wait_timeout) as resp:
+                if b"home-search" not in resp.read():
+                    raise RuntimeError("Home page missing search box")
+            search_url = f"{base_url}company/search/?q={quote(self.query_used)}"
+            with urllib.request.urlopen(search_url, timeout=self.wait_timeout) as resp:
+                self.driver = StaticPageDriver(resp.read().decode("utf-8"), resp.geturl())
+            self.last_page_ready_s = time.perf_counter() - started
+
+        def quit(self):
+            self.driver = None
+
+    return HttpPageScraper
+
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is KiB on Linux
+    return {
+        "self_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))], 4)
+
+    return {"count": len(ordered), "p50_s": pick(0.50), "p95_s": pick(0.95), "p99_s": pick(0.99),
+            "mean_s": round(statistics.fmean(ordered), 4)}
+
+
+def run_load(args) -> Dict:
+    with ScreenerStandIn(latency_s=args.screener_latency, jitter_s=args.jitter, error_rate=args.error_rate,
+                         asset_delay_s=0.2, asset_bytes=200_000) as screener, \
+         YahooChartStandIn(latency_s=args.yahoo_latency, jitter_s=args.jitter, error_rate=args.error_rate) as yahoo, \
+         GeminiStandIn(latency_s=args.gemini_latency, jitter_s=args.jitter, error_rate=args.error_rate) as gemini:
+
+        # Config reads these at import time, so set them before importing src.*
+        os.environ["GEMINI_BASE_URL"] = gemini.url.rstrip("/")
+        os.environ["GOOGLE_API_KEY"] = "load-test"
+        os.environ["SCREENER_BASE_URL"] = screener.url
+        os.environ["FINQUANT_CACHE"] = "1" if args.cache else "0"
+        os.environ.setdefault("FINQUANT_CACHE_DIR", tempfile.mkdtemp(prefix="finquant-load-cache-"))
+
+        import src.tools as tools
+        from langchain_core.messages import HumanMessage
+        from src import metrics
+        from src.recommendation import generate_professional_recommendation
+        from src.workflow import build_graph
+
+        StandInTicker.base_url = yahoo.url
+        tools.yf.Ticker = StandInTicker
+        if args.scraper == "http":
+            tools.ScreenerScraper = _http_scraper_class(screener.url)
+
+        metrics.enable()
+        metrics.reset()
+        graph = build_graph() if args.flow in {"agent", "both"} else None
+
+        def verdict_flow(symbol: str):
+            payload = json.loads(tools.ultimate_stock_verdict.invoke(
+                {"screener_name": symbol, "yfinance_ticker": f"{symbol}.NS"}
+            ))
+            if "error" in payload:
+                raise RuntimeError(payload["error"])
+            answer = generate_professional_recommendation(payload, owns_stock=False)
+            if answer.startswith("Error"):
+                raise RuntimeError(answer)
+
+        def agent_flow(symbol: str):
+            result = graph.invoke({"messages": [HumanMessage(content=f"Analyze {symbol} stock and give a verdict")]})
+            last = result["messages"][-1]
+            if last.type != "ai" or not last.content:
+                raise RuntimeError(f"Agent ended without an answer: {str(last.content)[:120]}")
+
+        flows = {"verdict": [verdict_flow], "agent": [agent_flow], "both": [verdict_flow, agent_flow]}[args.flow]
+        jobs = [
+            (flow, UNIVERSE[(user * args.analyses + i) % len(UNIVERSE)])
+            for user in range(args.users) for i in range(args.analyses) for flow in flows
+        ]
+
+        latencies: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        lock = threading.Lock()
+
+        def run_one(flow, symbol):
+            start = time.perf_counter()
+            ok = True
+            try:
+                flow(symbol)
+            except Exception as exc:
+                ok = False
+                with lock:
+                    errors[f"{flow.__name__}: {type(exc).__name__}"] = errors.get(f"{flow.__name__}: {type(exc).__name__}", 0) + 1
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.setdefault(flow.__name__ + ("" if ok else ".failed"), []).append(elapsed)
+
+        workdir = tempfile.mkdtemp(prefix="finquant-load-")
+        previous_cwd = os.getcwd()
+        os.chdir(workdir)  # save_data/_save_report write relative paths
+        wall_start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=args.users) as pool:
+                futures = [pool.submit(run_one, flow, symbol) for flow, symbol in jobs]
+                for future in as_completed(futures):
+                    future.result()
+        finally:
+            os.chdir(previous_cwd)
+        wall = time.perf_counter() - wall_start
+
+        completed = sum(len(v) for k, v in latencies.items() if not k.endswith(".failed"))
+        return {
+            "config": vars(args),
+            "wall_s": round(wall, 3),
+            "analyses": len(jobs),
+            "completed": completed,
+            "throughput_per_min": round(60 * completed / wall, 2) if wall else 0.0,
+            "end_to_end": {name: _percentiles(v) for name, v in sorted(latencies.items())},
+            "stages": metrics.snapshot()["stages"],
+            "errors": errors,
+            "standin_requests": {
+                "screener": {"requests": screener.requests, "injected_errors": screener.errors},
+                "yahoo": {"requests": yahoo.requests, "injected_errors": yahoo.errors},
+                "gemini": {"requests": gemini.requests, "injected_errors": gemini.errors},
+            },
+            "peak_rss": _peak_rss_mb(),
+            "workdir": workdir,
+        }
+
+
+def print_report(report: Dict):
+    print(f"\nAnalyses: {report['completed']}/{report['analyses']} ok in {report['wall_s']:.1f}s "
+          f"→ {report['throughput_per_min']:.1f}/min")
+    print(f"Peak RSS: {report['peak_rss']['self_mb']} MB (children {report['peak_rss']['children_mb']} MB)")
+    print("\nEnd-to-end latency:")
+    for name, stats in report["end_to_end"].items():
+        print(f"  {name:24s} n={stats['count']:<4d} p50 {stats['p50_s']:.3f}s  p95 {stats['p95_s']:.3f}s  p99 {stats['p99_s']:.3f}s")
+    print("\nPer stage:")
+    for name, stats in report["stages"].items():
+        print(f"  {name:28s} n={stats['count']:<4d} p50 {stats['p50_s']:.3f}s  p95 {stats['p95_s']:.3f}s  p99 {stats['p99_s']:.3f}s")
+    if report["errors"]:
+        print("\nErrors:")
+        for name, count in sorted(report["errors"].items()):
+            print(f"  {name}: {count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent analyses")
+    parser.add_argument("--analyses", type=int, default=3, help="analyses per user (per flow)")
+    parser.add_argument("--flow", choices=["verdict", "agent", "both"], default="both")
+    parser.add_argument("--scraper", choices=["http", "selenium"], default="http")
+    parser.add_argument("--screener-latency", type=float, default=0.8)
+    parser.add_argument("--yahoo-latency", type=float, default=0.2)
+    parser.add_argument("--gemini-latency", type=float, default=1.5)
+    parser.add_argument("--jitter", type=float, default=0.2, help="uniform extra latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stand-in requests failing with 503")
+    parser.add_argument("--cache", action="store_true", help="keep the shared result caches on (off by default)")
+    parser.add_argument("--json", help="write the full report here")
+    args = parser.parse_args(argv)
+
+    report = run_load(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+# benchmarks/offline.py
+"""
+Offline stand-ins so the whole analysis pipeline runs without Screener,
+Yahoo Finance or Gemini:
+
+- `StaticPageDriver`: just enough of the Selenium WebDriver API
+  (find_element(s) by CSS/tag/id/class, ``.text``) over recorded HTML, so the
+  real `ScreenerScraper` parsing code runs unchanged.
+- `OfflineScraper`: `ScreenerScraper` that "navigates" to a recorded page.
+- `FakeTicker`: deterministic `yf.Ticker` replacement (seeded random walk).
+- `FakeChatModel`: deterministic chat model covering the (batched) resolver, the
+  recommendation prompt and the tool-calling agent loop.
+
+`offline_environment()` patches all of them into `src.tools` / `src.nodes`
+and runs inside a temporary working directory.
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from langchain_core.messages import AIMessage, ToolMessage
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from benchmarks.standins import load_fixture
+from src.scraper.screener_scrapper import ScreenerScraper
+
+# --------------------------------------------------------------------------- #
+# Static HTML driver
+# --------------------------------------------------------------------------- #
+
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+_SKIP_TEXT = {"script", "style", "head", "title"}
+
+
+class StaticElement:
+    __slots__ = ("tag", "attrs", "children", "parent", "_text_parts")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["StaticElement"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List["StaticElement"] = []
+        self.parent = parent
+        self._text_parts: List = []  # str or StaticElement, in document order
+
+    @property
+    def text(self) -> str:
+        parts = []
+        for part in self._text_parts:
+            if isinstance(part, StaticElement):
+                if part.tag not in _SKIP_TEXT:
+                    parts.append(part.text)
+            else:
+                parts.append(part)
+        return " ".join("".join(parts).replace("\xa0", " ").split())
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self.attrs.get(name)
+
+    def iter_descendants(self):
+        for child in self.children:
+            yield child
+            yield from child.iter_descendants()
+
+    def find_elements(self, by: str, value: str) -> List["StaticElement"]:
+        return _find(self, by, value)
+
+    def find_element(self, by: str, value: str) -> "StaticElement":
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"{by}={value}")
+        return found[0]
+
+    def send_keys(self, *keys):
+        pass
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = StaticElement("#document", {}, None)
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        element = StaticElement(tag, {k: (v or "") for k, v in attrs}, self.current)
+        self.current.children.append(element)
+        self.current._text_parts.append(element)
+        if tag not in _VOID_TAGS:
+            self.current = element
+
+    def handle_startendtag(self, tag, attrs):
+        element = StaticElement(tag, {k: (v or "") for k, v in attrs}, self.current)
+        self.current.children.append(element)
+        self.current._text_parts.append(element)
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current._text_parts.append(data)
+
+
+_COMPOUND = re.compile(
+    r"^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:[#.][\w-]+|\[[^\]]+\])*)$"
+)
+_PIECE = re.compile(r"#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)|\[(?P<attr>[\w-]+)\s*=\s*['\"]?(?P<val>[^'\"\]]*)['\"]?\]")
+
+
+def _parse_compound(selector: str):
+    match = _COMPOUND.match(selector)
+    if not match:
+        raise ValueError(f"Unsupported selector: {selector}")
+    tag = match.group("tag")
+    ids, classes, attrs = [], [], []
+    for piece in _PIECE.finditer(match.group("rest") or ""):
+        if piece.group("id"):
+            ids.append(piece.group("id"))
+        elif piece.group("cls"):
+            classes.append(piece.group("cls"))
+        else:
+            attrs.append((piece.group("attr"), piece.group("val")))
+    return tag if tag and tag != "*" else None, ids, classes, attrs
+
+
+def _matches(element: StaticElement, compound) -> bool:
+    tag, ids, classes, attrs = compound
+    if tag and element.tag != tag:
+        return False
+    if any(element.attrs.get("id") != i for i in ids):
+        return False
+    element_classes = element.attrs.get("class", "").split()
+    if any(c not in element_classes for c in classes):
+        return False
+    return all(element.attrs.get(k) == v for k, v in attrs)
+
+
+def _select(scope: StaticElement, selector: str) -> List[StaticElement]:
+    compounds = [_parse_compound(part) for part in selector.split()]
+    *ancestors, last = compounds
+    results = []
+    for element in scope.iter_descendants():
+        if not _matches(element, last):
+            continue
+        node, pending = element.parent, list(ancestors)
+        while pending and node is not None:
+            if _matches(node, pending[-1]):
+                pending.pop()
+            node = node.parent
+        if not pending:
+            results.append(element)
+    return results
+
+
+def _find(scope: StaticElement, by: str, value: str) -> List[StaticElement]:
+    if by == By.CSS_SELECTOR:
+        return _select(scope, value)
+    if by == By.TAG_NAME:
+        return [e for e in scope.iter_descendants() if e.tag == value]
+    if by == By.ID:
+        return [e for e in scope.iter_descendants() if e.attrs.get("id") == value]
+    if by == By.CLASS_NAME:
+        return [e for e in scope.iter_descendants() if value in e.attrs.get("class", "").split()]
+    raise ValueError(f"Unsupported locator: {by}")
+
+
+class StaticPageDriver:
+    """The subset of selenium WebDriver that ScreenerScraper uses, over static HTML."""
+
+    def __init__(self, html: str, url: str = "https://www.screener.in/company/SAMPLE/"):
+        builder = _TreeBuilder()
+        builder.feed(html)
+        self.document = builder.root
+        self.current_url = url
+
+    def find_elements(self, by: str, value: str):
+        return _find(self.document, by, value)
+
+    def find_element(self, by: str, value: str):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(f"{by}={value}")
+        return found[0]
+
+    def execute_script(self, *args):
+        return None
+
+    def quit(self):
+        pass
+
+
+class OfflineScraper(ScreenerScraper):
+    """ScreenerScraper whose browser is a recorded company page."""
+
+    fixture = "screener_company.html"
+
+    def start(self):
+        self.driver = StaticPageDriver(load_fixture(self.fixture))
+
+    def search_company(self, query: str):
+        self.query_used = query.strip()
+        slug = re.sub(r"\W+", "-", self.query_used.upper())
+        self.driver.current_url = f"https://www.screener.in/company/{slug}/"
+
+
+# --------------------------------------------------------------------------- #
+# Fake market data
+# --------------------------------------------------------------------------- #
+
+def _seed(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class FakeTicker:
+    """Deterministic stand-in for `yf.Ticker` (history, statements, major holders)."""
+
+    _PERIOD_DAYS = {"5d": 5, "1mo": 22, "3mo": 66, "6mo": 130, "1y": 250, "2y": 500, "5y": 1250, "10y": 2500}
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker.upper()
+
+    def history(self, period: str = "1mo", interval: str = "1d", **kwargs) -> pd.DataFrame:
+        days = self._PERIOD_DAYS.get(period, 22)
+        rng = np.random.default_rng(_seed(self.ticker))
+        start_price = 100 + (_seed(self.ticker) % 3000)
+        returns = rng.normal(0.0004, 0.016, days)
+        close = start_price * np.exp(np.cumsum(returns))
+        open_ = close * (1 + rng.normal(0, 0.004, days))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, days)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, days)))
+        volume = rng.integers(200_000, 5_000_000, days)
+        index = pd.bdate_range(end="2024-11-29", periods=days, tz="Asia/Kolkata", name="Date")
+        return pd.DataFrame(
+            {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+            index=index,
+        )
+
+    def _statement(self, periods: int, freq: str, rows: Dict[str, float]) -> pd.DataFrame:
+        # yfinance layout: one row per line item, newest period first
+        columns = pd.date_range(end="2024-09-30", periods=periods, freq=freq)[::-1]
+        growth = 1.02 ** np.arange(periods)[::-1]
+        return pd.DataFrame({col: {k: v * g for k, v in rows.items()} for col, g in zip(columns, growth)})
+
+    def _income(self, scale: float) -> Dict[str, float]:
+        sales = (1 + _seed(self.ticker) % 50) * 1e10 * scale
+        return {"Total Revenue": sales, "EBITDA": 0.22 * sales, "Interest Expense": 0.01 * sales,
+                "Reconciled Depreciation": 0.03 * sales, "Pretax Income": 0.18 * sales,
+                "Tax Provision": 0.045 * sales, "Net Income": 0.135 * sales, "Diluted EPS": 12.5 * scale}
+
+    @property
+    def quarterly_income_stmt(self) -> pd.DataFrame:
+        return self._statement(5, "QE", self._income(0.25))
+
+    @property
+    def income_stmt(self) -> pd.DataFrame:
+        return self._statement(4, "YE-MAR", self._income(1.0))
+
+    @property
+    def balance_sheet(self) -> pd.DataFrame:
+        assets = (1 + _seed(self.ticker) % 50) * 2e10
+        return self._statement(4, "YE-MAR", {
+            "Common Stock": 0.02 * assets, "Stockholders Equity": 0.55 * assets, "Total Debt": 0.15 * assets,
+            "Total Liabilities Net Minority Interest": 0.45 * assets, "Net PPE": 0.35 * assets,
+            "Investments And Advances": 0.2 * assets, "Total Assets": assets,
+        })
+
+    @property
+    def major_holders(self) -> pd.DataFrame:
+        return pd.DataFrame({"Value": {"insidersPercentHeld": 0.5, "institutionsPercentHeld": 0.3,
+                                       "institutionsFloatPercentHeld": 0.6, "institutionsCount": 400}})
+
+
+# --------------------------------------------------------------------------- #
+# Fake LLM
+# --------------------------------------------------------------------------- #
+
+CANNED_VERDICT = """**ENTRY DECISION** → BUY
+
+**CONFIDENCE** → Medium (60-80%)
+
+**ENTRY STRATEGY**:
+- Buy Zone: ₹100 - ₹105
+- Stop Loss: ₹92 (8% risk)
+- Target: ₹125 (20% upside)
+- Position Size: Half
+- Time Horizon: 3-6 months
+
+**QUANTITATIVE RATIONALE**:
+1. Price holding above 30-day average
+2. Sales growing, OPM stable
+3. Reward/risk about 2.5x
+
+**RISK RATING** → Medium
+
+**PRIORITY** → Medium Priority"""
+
+
+class FakeChatModel:
+    """Deterministic chat model: resolver JSON, canned verdicts, one tool call for the agent."""
+
+    def __init__(self, latency_s: float = 0.0, tools_bound: bool = False):
+        self.latency_s = latency_s
+        self.tools_bound = tools_bound
+        self.calls = 0
+
+    def bind_tools(self, tools):
+        return FakeChatModel(self.latency_s, tools_bound=True)
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        last = messages[-1]
+        text = last.content if isinstance(last.content, str) else str(last.content)
+        usage = {"input_tokens": sum(len(str(m.content)) // 4 for m in messages), "output_tokens": 120, "total_tokens": 0}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        if self.tools_bound:
+            if isinstance(last, ToolMessage):
+                return AIMessage(content=CANNED_VERDICT, usage_metadata=usage)
+            name = re.search(r"\b([A-Z]{2,})\b", text)
+            symbol = name.group(1) if name else "SAMPLE"
+            return AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": "ultimate_stock_verdict",
+                    "args": {"screener_name": symbol, "yfinance_ticker": f"{symbol}.NS"},
+                    "id": f"call_{self.calls}",
+                }],
+                usage_metadata=usage,
+            )
+
+        batch = re.findall(r'^(\d+)\. "([^"]*)"$', text.split("Inputs:")[-1], re.M) if "Inputs:" in text else []
+        if batch:
+            answers = []
+            for number, name in batch:
+                symbol = re.sub(r"\W+", "", name).upper() or "SAMPLE"
+                answers.append({"id": int(number), "screener_name": symbol, "yfinance_ticker": f"{symbol}.NS"})
+            return AIMessage(content=json.dumps(answers), usage_metadata=usage)
+        user_input = re.search(r'User input:\s*"([^"]*)"', text)
+        if user_input:
+            symbol = re.sub(r"\W+", "", user_input.group(1)).upper() or "SAMPLE"
+            return AIMessage(
+                content=json.dumps({"screener_name": symbol, "yfinance_ticker": f"{symbol}.NS"}),
+                usage_metadata=usage,
+            )
+        return AIMessage(content=CANNED_VERDICT, usage_metadata=usage)
+
+
+# --------------------------------------------------------------------------- #
+# Wiring
+# --------------------------------------------------------------------------- #
+
+@contextmanager
+def offline_environment(llm_latency_s: float = 0.0, workdir: Optional[str] = None):
+    """
+    Patch the pipeline onto the offline stand-ins and chdir into a scratch dir
+    (save_data/_save_report write relative paths). Yields a dict of the fakes.
+    """
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    import src.tools as tools
+    import src.nodes as nodes
+    from src import cache
+
+    saved = {
+        "scraper": tools.ScreenerScraper,
+        "ticker": tools.yf.Ticker,
+        "resolver": tools.resolver_model,
+        "agent": nodes.llm_with_tools,
+    }
+    fake_llm = FakeChatModel(latency_s=llm_latency_s)
+    tools.ScreenerScraper = OfflineScraper
+    tools.yf.Ticker = FakeTicker
+    tools.resolver_model = fake_llm
+    nodes.llm_with_tools = fake_llm.bind_tools([])
+    cache_states = cache.set_enabled(False)  # time the work, not cache hits
+
+    previous_cwd = os.getcwd()
+    scratch = tempfile.TemporaryDirectory() if workdir is None else None
+    os.chdir(workdir or scratch.name)
+    try:
+        yield {"llm": fake_llm, "agent_llm": nodes.llm_with_tools}
+    finally:
+        os.chdir(previous_cwd)
+        if scratch is not None:
+            scratch.cleanup()
+        tools.ScreenerScraper = saved["scraper"]
+        tools.yf.Ticker = saved["ticker"]
+        tools.resolver_model = saved["resolver"]
+        nodes.llm_with_tools = saved["agent"]
+        for name, enabled in cache_states.items():
+            cache.CACHES[name].enabled = enabled
@@ -0,0 +1,73 @@
+# benchmarks/page_load_bench.py
+"""
+Page-ready time of ScreenerScraper: full-load profile vs fast-load profile.
+
+Runs both profiles against `ScreenerStandIn` (recorded pages + slow, heavy
+dummy assets) and prints median / p90 of ``search_company`` page-ready time.
+Needs Chrome + chromedriver (CHROMEDRIVER_PATH), nothing from the internet.
+
+    python benchmarks/page_load_bench.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.standins import ScreenerStandIn
+from src.scraper.screener_scrapper import ScreenerScraper
+
+
+def measure(base_url: str, fast_load: bool, runs: int, cache_dir: str) -> list:
+    scraper = ScreenerScraper(headless=True, fast_load=fast_load, base_url=base_url, cache_dir=cache_dir)
+    timings = []
+    try:
+        scraper.start()
+        for _ in range(runs):
+            scraper.search_company("SAMPLE")
+            data = scraper.extract_all()
+            if not data["profit_loss"]:
+                raise RuntimeError("Stand-in page parsed to an empty profit_loss table")
+            timings.append(scraper.last_page_ready_s)
+    finally:
+        scraper.quit()
+    return timings
+
+
+def summarize(timings: list) -> dict:
+    ordered = sorted(timings)
+    p90 = ordered[min(len(ordered) - 1, int(round(0.9 * (len(ordered) - 1))))]
+    return {"runs": len(ordered), "median_s": round(statistics.median(ordered), 3), "p90_s": round(p90, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--asset-delay", type=float, default=0.4, help="seconds per dummy asset")
+    parser.add_argument("--asset-bytes", type=int, default=2_000_000, help="size of each dummy asset")
+    parser.add_argument("--json", help="optional path to write results")
+    args = parser.parse_args()
+
+    results = {}
+    with ScreenerStandIn(asset_delay_s=args.asset_delay, asset_bytes=args.asset_bytes) as standin:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for label, fast in (("full_load", False), ("fast_load", True)):
+                results[label] = summarize(measure(standin.url, fast, args.runs, cache_dir))
+                print(f"{label:10s} median {results[label]['median_s']:.3f}s | p90 {results[label]['p90_s']:.3f}s")
+
+    speedup = results["full_load"]["median_s"] / max(results["fast_load"]["median_s"], 1e-9)
+    results["speedup"] = round(speedup, 2)
+    print(f"Speed-up (median): {speedup:.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline benchmark suite for the analysis pipeline.
+
+Everything runs against recorded Screener HTML, a fake yfinance provider and
+a deterministic fake LLM (see benchmarks/offline.py) — no network, no API key.
+
+    python benchmarks/run_benchmarks.py                  # compare to baseline
+    python benchmarks/run_benchmarks.py --save-baseline  # record a new baseline
+    python benchmarks/run_benchmarks.py --only parse     # subset by name prefix
+
+Exit code 1 when any case's median is slower than the baseline by more than
+``--threshold`` (default 25%) and by more than ``--min-delta-ms``.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from benchmarks.offline import OfflineScraper, offline_environment
+
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, "benchmarks", "baseline.json")
+
+
+def _build_cases(env: Dict) -> List[Tuple[str, int, Callable[[], object]]]:
+    """(name, inner loop count, callable) for every benchmark case."""
+    from langchain_core.messages import HumanMessage
+
+    import src.tools as tools
+    from src.recommendation import build_recommendation_prompt
+    from src.screening import company_metrics, run_screen, table_from_rows
+    from src.scraper.normalize import normalize_all
+    from src.scraper.screener_scrapper import extract_numeric_value
+    from src.workflow import build_graph
+
+    scraper = OfflineScraper()
+    scraper.start()
+    scraper.search_company("SAMPLE")
+    raw = scraper.extract_all()
+    cells = [td.text for td in scraper.driver.find_elements("css selector", "td")]
+    price_data = tools._fetch_market_data_raw("SAMPLE.NS")
+    payload = tools.build_stock_verdict_payload("SAMPLE", "SAMPLE.NS")
+    graph = build_graph()
+
+    # 5,000-company universe: the sample's metrics with per-company jitter
+    rng = np.random.default_rng(0)
+    base = company_metrics(raw)
+    universe = table_from_rows(
+        {"company": f"CO{i:04d}", "scraped_at": "", "metrics": {k: v * rng.uniform(0.5, 1.5) for k, v in base.items()}}
+        for i in range(5000)
+    )
+    screen_query = "roce > 20, debt/equity < 0.5, sales growth > 0 or promoter holding up 2 quarters"
+
+    def run_graph():
+        return graph.invoke({"messages": [HumanMessage(content="Analyze SAMPLE stock and give a verdict")]})
+
+    return [
+        ("parse.extract_numeric_value", 200, lambda: [extract_numeric_value(c) for c in cells]),
+        ("parse.extract_table", 20, lambda: [scraper._extract_table(s) for s in ("quarters", "profit-loss", "balance-sheet")]),
+        ("parse.extract_all", 10, scraper.extract_all),
+        ("parse.normalize_all", 50, lambda: normalize_all(raw)),
+        ("indicators.volatility_report", 200, lambda: tools._calculate_volatility_report(price_data)),
+        ("market.fetch_fake", 50, lambda: tools._fetch_market_data_raw("SAMPLE.NS")),
+        ("payload.build", 5, lambda: tools.build_stock_verdict_payload("SAMPLE", "SAMPLE.NS")),
+        ("prompt.build_new_entry", 500, lambda: build_recommendation_prompt(payload, False)),
+        ("prompt.build_holding", 500, lambda: build_recommendation_prompt(payload, True, 1500.0)),
+        ("screen.company_metrics", 50, lambda: company_metrics(raw)),
+        ("screen.query_5000", 20, lambda: run_screen(universe, screen_query, sort="-roce", limit=50)),
+        ("graph.full_run", 3, run_graph),
+    ]
+
+
+def _time_case(func: Callable, number: int, repeat: int) -> Dict[str, float]:
+    func()  # warm-up (imports, caches, first-call allocations)
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        per_call.append((time.perf_counter() - start) / number)
+    return {
+        "median_ms": round(statistics.median(per_call) * 1000, 4),
+        "min_ms": round(min(per_call) * 1000, 4),
+        "max_ms": round(max(per_call) * 1000, 4),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(only: str = "", repeat: int = 7) -> Dict[str, Dict[str, float]]:
+    results = {}
+    with offline_environment() as env:
+        for name, number, func in _build_cases(env):
+            if only and not name.startswith(only):
+                continue
+            results[name] = _time_case(func, number, repeat)
+            print(f"{name:32s} {results[name]['median_ms']:>11.4f} ms  (min {results[name]['min_ms']:.4f})")
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float, min_delta_ms: float) -> List[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        before, after = previous["median_ms"], current["median_ms"]
+        if after > before * (1 + threshold) and after - before > min_delta_ms:
+            regressions.append(f"{name}: {before:.4f} → {after:.4f} ms ({(after / before - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore regressions smaller than this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--only", default="", help="run cases whose name starts with this prefix")
+    parser.add_argument("--json", help="also write this run's results here")
+    args = parser.parse_args(argv)
+
+    results = run(args.only, args.repeat)
+    document = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        print(f"Baseline written → {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print("\nREGRESSIONS (vs baseline):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions vs baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
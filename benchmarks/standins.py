@@ -0,0 +1,324 @@
+# benchmarks/standins.py
+"""
+Local stand-in servers for the external services FinQuant talks to.
+
+- `ScreenerStandIn` serves the recorded pages in `benchmarks/fixtures/` plus
+  deliberately heavy, slow dummy assets (images, fonts, analytics and ad
+  scripts) so page-load behaviour can be measured without touching
+  screener.in. Analytics/ad assets are served from ``*.localhost`` hostnames
+  that Chrome resolves to 127.0.0.1, so the scraper's block-list applies.
+- `YahooChartStandIn` serves Yahoo v8 chart JSON built from deterministic,
+  per-ticker seeded price paths.
+- `GeminiStandIn` speaks enough of the ``generateContent`` REST API for
+  ChatGoogleGenerativeAI (``base_url=...``): resolver JSON, one function call
+  for the agent, a schema-valid JSON verdict for structured prompts (and just
+  the asked-for keys for repair prompts), canned markdown verdicts otherwise.
+
+Every stand-in takes ``latency_s`` (+ ``jitter_s``) and ``error_rate``
+(fraction of requests answered with HTTP 503).
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+CONTENT_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".woff2": "font/woff2",
+    ".js": "application/javascript",
+}
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class _StandInServer:
+    """Threaded HTTP server running on a daemon thread; use as a context manager."""
+
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_s: float = 0.0,
+                 jitter_s: float = 0.0, error_rate: float = 0.0, seed: int = 7):
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 128
+        self.httpd.standin = self
+        self.thread = None
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def simulate(self) -> bool:
+        """Sleep the configured latency; returns False if this request should fail."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_s + (self._rng.uniform(0, self.jitter_s) if self.jitter_s else 0.0)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        return not fail
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):  # keep benchmark output clean
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _simulate_or_fail(self) -> bool:
+        if self.server.standin.simulate():
+            return True
+        self._send_json(503, {"error": {"code": 503, "message": "stand-in injected failure", "status": "UNAVAILABLE"}})
+        return False
+
+
+class _ScreenerHandler(_Handler):
+    def do_GET(self):
+        standin = self.server.standin
+        parsed = urlparse(self.path)
+        path = parsed.path
+
+        if path.startswith(("/static/", "/gtag/", "/pagead/")):
+            time.sleep(standin.asset_delay_s)
+            ext = os.path.splitext(path)[1] or ".js"
+            body = b"\0" * standin.asset_bytes
+            return self._send(200, body, CONTENT_TYPES.get(ext, "application/octet-stream"))
+        if not self._simulate_or_fail():
+            return
+        if path == "/":
+            return self._send(200, standin.render("screener_home.html"))
+        if path.startswith("/company/search"):
+            query = parse_qs(parsed.query).get("q", ["SAMPLE"])[0] or "SAMPLE"
+            slug = quote(query.strip().upper().replace(" ", "-"))
+            return self._send(302, b"", headers={"Location": f"/company/{slug}/"})
+        if path.startswith("/company/"):
+            return self._send(200, standin.render("screener_company.html"))
+        self._send(404, b"not found", "text/plain")
+
+
+class ScreenerStandIn(_StandInServer):
+    """Serves recorded Screener home/company pages plus heavy dummy assets."""
+
+    handler_class = _ScreenerHandler
+
+    def __init__(self, asset_delay_s: float = 0.4, asset_bytes: int = 2_000_000, **kwargs):
+        super().__init__(**kwargs)
+        self.asset_delay_s = asset_delay_s
+        self.asset_bytes = asset_bytes
+
+    def render(self, fixture: str) -> bytes:
+        html = load_fixture(fixture)
+        html = html.replace("{{ASSET_BASE}}", f"http://127.0.0.1:{self.port}")
+        html = html.replace("{{ANALYTICS_BASE}}", f"http://www.google-analytics.com.localhost:{self.port}")
+        html = html.replace("{{ADS_BASE}}", f"http://pagead2.googlesyndication.com.localhost:{self.port}")
+        return html.encode("utf-8")
+
+
+# --------------------------------------------------------------------------- #
+# Yahoo Finance chart API
+# --------------------------------------------------------------------------- #
+
+def synthetic_ohlcv(ticker: str, days: int, end_ts: int = 1732838400):
+    """Deterministic daily OHLCV for ``ticker`` (seeded by its name)."""
+    seed = zlib.crc32(ticker.upper().encode("utf-8"))
+    rng = random.Random(seed)
+    price = 100.0 + seed % 3000
+    rows = []
+    for i in range(days):
+        open_ = price * (1 + rng.gauss(0, 0.004))
+        close = price * (1 + rng.gauss(0.0004, 0.016))
+        high = max(open_, close) * (1 + abs(rng.gauss(0, 0.006)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, 0.006)))
+        rows.append((end_ts - (days - 1 - i) * 86400, open_, high, low, close, rng.randint(200_000, 5_000_000)))
+        price = close
+    return rows
+
+
+_RANGE_DAYS = {"5d": 5, "1mo": 22, "3mo": 66, "6mo": 130, "1y": 250, "2y": 500, "5y": 1250}
+
+
+class _YahooHandler(_Handler):
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        match = re.match(r"^/v8/finance/chart/([^/]+)$", parsed.path)
+        if not match:
+            return self._send(404, b"not found", "text/plain")
+        if not self._simulate_or_fail():
+            return
+        ticker = match.group(1).upper()
+        period = parse_qs(parsed.query).get("range", ["1mo"])[0]
+        rows = synthetic_ohlcv(ticker, _RANGE_DAYS.get(period, 22))
+        self._send_json(200, {
+            "chart": {
+                "result": [{
+                    "meta": {"symbol": ticker, "currency": "INR", "exchangeTimezoneName": "Asia/Kolkata"},
+                    "timestamp": [r[0] for r in rows],
+                    "indicators": {"quote": [{
+                        "open": [round(r[1], 2) for r in rows],
+                        "high": [round(r[2], 2) for r in rows],
+                        "low": [round(r[3], 2) for r in rows],
+                        "close": [round(r[4], 2) for r in rows],
+                        "volume": [r[5] for r in rows],
+                    }]},
+                }],
+                "error": None,
+            }
+        })
+
+
+class YahooChartStandIn(_StandInServer):
+    """Serves ``/v8/finance/chart/<ticker>?range=1mo&interval=1d``."""
+
+    handler_class = _YahooHandler
+
+
+# --------------------------------------------------------------------------- #
+# Gemini generateContent
+# --------------------------------------------------------------------------- #
+
+STANDIN_VERDICT = """**ENTRY DECISION** → BUY
+
+**CONFIDENCE** → Medium (60-80%)
+
+**ENTRY STRATEGY**:
+- Buy Zone: ₹100 - ₹105
+- Stop Loss: ₹92 (8% risk)
+- Target: ₹125 (20% upside)
+- Position Size: Half
+- Time Horizon: 3-6 months
+
+**QUANTITATIVE RATIONALE**:
+1. Price 4% above the 30-day average on rising volume
+2. Sales +12% YoY with stable 18% OPM
+3. 2.5:1 reward to risk from the buy zone
+
+**RISK RATING** → Medium
+
+**PRIORITY** → Medium Priority"""
+
+# Structured verdicts (src/verdict.py schema): new entry and holding variants
+STANDIN_VERDICT_JSON = {
+    "decision": "BUY", "confidence": "Medium", "confidence_pct": 70,
+    "buy_zone": {"low": 100, "high": 105}, "stop_loss": 92, "target": 125,
+    "position_size": "Half", "horizon": "3-6 months",
+    "rationale": ["Price 4% above the 30-day average on rising volume",
+                  "Sales +12% YoY with stable 18% OPM",
+                  "2.5:1 reward to risk from the buy zone"],
+    "risk_rating": "Medium", "priority": "Medium",
+}
+STANDIN_HOLDING_JSON = {
+    **{k: v for k, v in STANDIN_VERDICT_JSON.items() if k not in ("buy_zone", "position_size")},
+    "decision": "HOLD", "immediate_action": "HOLD",
+}
+_REPAIR_KEYS = re.compile(r"containing only these keys \(([^)]*)\)")
+
+
+def standin_verdict(prompt: str) -> str:
+    """Canned answer to a recommendation prompt: JSON when the prompt asks for it, else markdown."""
+    repair = _REPAIR_KEYS.search(prompt)
+    if repair:
+        keys = re.findall(r'"(\w+)"', repair.group(1))
+        holding = "immediate_action" in keys or '"BOOK PROFIT"' in prompt
+        verdict = STANDIN_HOLDING_JSON if holding else STANDIN_VERDICT_JSON
+        return json.dumps({k: verdict[k] for k in keys if k in verdict})
+    if "reply with ONE JSON object" in prompt:
+        return json.dumps(STANDIN_HOLDING_JSON if '"immediate_action"' in prompt else STANDIN_VERDICT_JSON)
+    return STANDIN_VERDICT
+
+
+class _GeminiHandler(_Handler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if ":generateContent" not in self.path and ":streamGenerateContent" not in self.path:
+            return self._send(404, b"not found", "text/plain")
+        if not self._simulate_or_fail():
+            return
+
+        contents = body.get("contents") or [{}]
+        last_parts = contents[-1].get("parts") or [{}]
+        text = " ".join(p.get("text", "") for p in last_parts)
+        has_function_response = any("functionResponse" in p for p in last_parts)
+        prompt_chars = sum(len(json.dumps(c)) for c in contents)
+
+        if body.get("tools") and not has_function_response:
+            symbol = (re.findall(r"\b([A-Z]{2,})\b", text) or ["SAMPLE"])[0]
+            part = {"functionCall": {
+                "name": "ultimate_stock_verdict",
+                "args": {"screener_name": symbol, "yfinance_ticker": f"{symbol}.NS"},
+            }}
+        else:
+            user_input = re.search(r'User input:\s*"([^"]*)"', text)
+            if user_input:
+                symbol = re.sub(r"\W+", "", user_input.group(1)).upper() or "SAMPLE"
+                part = {"text": json.dumps({"screener_name": symbol, "yfinance_ticker": f"{symbol}.NS"})}
+            else:
+                part = {"text": standin_verdict(text)}
+
+        self._send_json(200, {
+            "candidates": [{"content": {"parts": [part], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_chars // 4,
+                "candidatesTokenCount": 120,
+                "totalTokenCount": prompt_chars // 4 + 120,
+            },
+            "modelVersion": "standin",
+        })
+
+
+class GeminiStandIn(_StandInServer):
+    """Gemini-compatible ``/v1beta/models/<model>:generateContent`` endpoint."""
+
+    handler_class = _GeminiHandler
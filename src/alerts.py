@@ -0,0 +1,371 @@
+# src/alerts.py
+"""
+Price alerts on the Stop Loss / Target levels of saved verdicts.
+
+    python main.py alerts import outputs/*.md recs.ndjson     # stops, targets, buy zones
+    python main.py alerts add TCS.NS 3900 --below --expires 2025-03-31
+    python main.py alerts check                               # latest daily bars
+    python main.py alerts watch --interval 5m --poll 60       # intraday bars
+
+A rule is ``{"id", "ticker", "level", "direction": "above" | "below",
+"expires", "kind", "source", "note"}`` and lives in
+``FINQUANT_ALERTS_DIR/rules.json``. `AlertEngine` keeps, per ticker and
+direction, the rule levels in one sorted array; a bar from ``prev`` (the
+last price seen) to ``high`` / ``low`` crosses exactly the levels in
+
+    above   (prev, high]     →  searchsorted(levels, prev, "right") : searchsorted(levels, high, "right")
+    below   [low, prev)      →  searchsorted(levels, low, "left")   : searchsorted(levels, prev, "left")
+
+so each bar costs two binary searches per direction however many rules
+the ticker has. The first price seen for a ticker only sets ``prev``.
+
+Alerts for the same ticker / direction / level (e.g. the same stop in two
+verdicts) are merged, and a level does not fire again within
+FINQUANT_ALERT_COOLDOWN seconds. Every alert goes to the sinks:
+``alerts.ndjson`` in the alerts folder, optionally a webhook
+(FINQUANT_ALERT_WEBHOOK), and the CLI's NDJSON stream.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from src.config import Config
+from src.metrics import incr, timed
+
+logger = project_logger.getChild("alerts")
+
+RULES_PATH = os.path.join(Config.ALERTS_DIR, "rules.json")
+STATE_PATH = os.path.join(Config.ALERTS_DIR, "state.json")
+SINK_PATH = os.path.join(Config.ALERTS_DIR, "alerts.ndjson")
+DIRECTIONS = ("above", "below")
+NO_ENTRY_VERDICTS = {"AVOID", "STRONG SELL", "CUT LOSS", "BOOK PROFIT"}
+
+
+# --------------------------------------------------------------------------- #
+# Rules
+# --------------------------------------------------------------------------- #
+
+def make_rule(ticker: str, level: float, direction: str, expires: Optional[str] = None, kind: str = "manual",
+              source: str = "user", note: str = "") -> Dict:
+    """Rule dict with a stable id (same ticker / level / direction / kind / source → same id)."""
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be 'above' or 'below', not {direction!r}")
+    level = float(level)
+    if not np.isfinite(level) or level <= 0:
+        raise ValueError(f"Invalid alert level {level}")
+    digest = hashlib.sha1(f"{ticker}|{level:.4f}|{direction}|{kind}|{source}".encode()).hexdigest()[:12]
+    return {"id": digest, "ticker": ticker, "level": round(level, 4), "direction": direction,
+            "expires": expires, "kind": kind, "source": source, "note": note}
+
+
+def rules_from_verdicts(paths: Iterable[str]) -> List[Dict]:
+    """
+    Stop (below), target (above) and, for verdicts that may be entered, the
+    top of the buy zone (below) of every verdict; each rule expires at the
+    end of the verdict's horizon.
+    """
+    from src.backtest import load_verdicts
+
+    rules = []
+    for v in load_verdicts(paths).itertuples(index=False):
+        expires = (v.date + timedelta(days=int(v.horizon_days))).date().isoformat()
+        note = f"{v.verdict} ({v.confidence}) on {v.date.date().isoformat()}"
+        levels = [("stop", v.stop, "below"), ("target", v.target, "above")]
+        if v.verdict not in NO_ENTRY_VERDICTS:
+            levels.append(("entry", v.entry_high, "below"))
+        for kind, level, direction in levels:
+            if level == level and level > 0:  # NaN when the verdict had no such level
+                rules.append(make_rule(v.ticker, level, direction, expires, kind, str(v.source), note))
+    return rules
+
+
+def load_rules(path: str = RULES_PATH) -> List[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _write_json(obj, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def save_rules(rules: List[Dict], path: str = RULES_PATH, today: Optional[str] = None) -> List[Dict]:
+    """Write rules (deduplicated by id, expired ones pruned); returns the rules kept."""
+    today = today or datetime.now().date().isoformat()
+    kept = list({r["id"]: r for r in rules if not r.get("expires") or r["expires"] >= today}.values())
+    _write_json(kept, path)
+    return kept
+
+
+def load_state(path: str = STATE_PATH) -> Dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"last": {}, "fired": {}}
+
+
+def save_state(state: Dict, path: str = STATE_PATH):
+    _write_json(state, path)
+
+
+# --------------------------------------------------------------------------- #
+# Sinks
+# --------------------------------------------------------------------------- #
+
+def ndjson_sink(path: str = SINK_PATH) -> Callable[[Dict], None]:
+    lock = threading.Lock()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(alert: Dict):
+        with lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+    return write
+
+
+def webhook_sink(url: str, timeout_s: float = 5.0) -> Callable[[Dict], None]:
+    """POST each alert as JSON; failures are logged, never raised into the engine."""
+    import urllib.request
+
+    def post(alert: Dict):
+        request = urllib.request.Request(url, data=json.dumps(alert).encode(), method="POST",
+                                         headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=timeout_s).close()
+        except Exception as exc:
+            logger.warning(f"Alert webhook {url} failed: {exc}")
+    return post
+
+
+def default_sinks() -> List[Callable[[Dict], None]]:
+    sinks = [ndjson_sink()]
+    if Config.ALERT_WEBHOOK:
+        sinks.append(webhook_sink(Config.ALERT_WEBHOOK))
+    return sinks
+
+
+# --------------------------------------------------------------------------- #
+# Engine
+# --------------------------------------------------------------------------- #
+
+class AlertEngine:
+    """Per-ticker sorted level indexes; `on_bar` / `on_price` return (and sink) the alerts fired."""
+
+    def __init__(self, rules: List[Dict], state: Optional[Dict] = None,
+                 sinks: Iterable[Callable[[Dict], None]] = (), cooldown_s: float = Config.ALERT_COOLDOWN_S):
+        self.rules = rules
+        self.state = state if state is not None else {"last": {}, "fired": {}}
+        self.sinks = list(sinks)
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._build_index()
+
+    @timed("alerts.index")
+    def _build_index(self):
+        by_ticker: Dict[str, Dict[str, List[int]]] = {}
+        for i, rule in enumerate(self.rules):
+            by_ticker.setdefault(rule["ticker"], {"above": [], "below": []})[rule["direction"]].append(i)
+        self.index: Dict[str, Dict[str, tuple]] = {}
+        for ticker, sides in by_ticker.items():
+            self.index[ticker] = {}
+            for direction, ids in sides.items():
+                ids = np.asarray(ids, dtype=np.int64)
+                levels = np.asarray([self.rules[i]["level"] for i in ids], dtype="float64")
+                order = np.argsort(levels, kind="stable")
+                self.index[ticker][direction] = (levels[order], ids[order])
+
+    @property
+    def tickers(self) -> List[str]:
+        return list(self.index)
+
+    def _crossed(self, ticker: str, prev: float, high: float, low: float) -> List[tuple]:
+        sides = self.index.get(ticker)
+        if not sides:
+            return []
+        hits = []
+        levels, ids = sides["above"]
+        if levels.size and high > prev:
+            lo, hi = np.searchsorted(levels, [prev, high], side="right")
+            hits += [("above", i) for i in ids[lo:hi]]
+        levels, ids = sides["below"]
+        if levels.size and low < prev:
+            lo, hi = np.searchsorted(levels, [low, prev], side="left")
+            hits += [("below", i) for i in ids[lo:hi]]
+        return hits
+
+    def on_bar(self, ticker: str, ts, open_: float, high: float, low: float, close: float) -> List[Dict]:
+        """Alerts for one bar; bars at or before the last one seen for ``ticker`` are ignored."""
+        ts = ts.isoformat() if hasattr(ts, "isoformat") else str(ts)
+        with self._lock:
+            last = self.state["last"].get(ticker)
+            if last and ts <= last[0]:
+                return []
+            prev = last[1] if last else None
+            self.state["last"][ticker] = [ts, float(close)]
+            if prev is None:
+                return []  # first sighting only sets the reference price
+            alerts = self._fire(ticker, ts, self._crossed(ticker, prev, max(high, open_), min(low, open_)),
+                                high=high, low=low, close=close)
+        for alert in alerts:
+            for sink in self.sinks:
+                sink(alert)
+        return alerts
+
+    def on_price(self, ticker: str, ts, price: float) -> List[Dict]:
+        """A single tick is a bar with open = high = low = close."""
+        return self.on_bar(ticker, ts, price, price, price, price)
+
+    def _fire(self, ticker: str, ts: str, hits: List[tuple], **prices) -> List[Dict]:
+        day = ts[:10]
+        merged: Dict[str, Dict] = {}
+        for direction, i in hits:
+            rule = self.rules[i]
+            if rule.get("expires") and rule["expires"] < day:
+                continue
+            key = f"{ticker}|{direction}|{rule['level']:.2f}"
+            if key not in merged:
+                fired_at = self.state["fired"].get(key)
+                if fired_at and _seconds_between(fired_at, ts) < self.cooldown_s:
+                    incr("alerts_suppressed")
+                    continue
+                merged[key] = {
+                    "ticker": ticker, "direction": direction, "level": rule["level"], "at": ts,
+                    "price": prices["high"] if direction == "above" else prices["low"],
+                    "close": prices["close"], "kinds": [], "rule_ids": [], "notes": [],
+                }
+            alert = merged[key]
+            alert["rule_ids"].append(rule["id"])
+            if rule["kind"] not in alert["kinds"]:
+                alert["kinds"].append(rule["kind"])
+            if rule.get("note") and rule["note"] not in alert["notes"]:
+                alert["notes"].append(rule["note"])
+        for key, alert in merged.items():
+            self.state["fired"][key] = ts
+            alert["id"] = hashlib.sha1(f"{key}|{ts}".encode()).hexdigest()[:12]
+        incr("alerts_fired", len(merged))
+        return list(merged.values())
+
+
+def _seconds_between(earlier: str, later: str) -> float:
+    try:
+        a, b = datetime.fromisoformat(earlier), datetime.fromisoformat(later)
+        if (a.tzinfo is None) != (b.tzinfo is None):
+            a, b = a.replace(tzinfo=None), b.replace(tzinfo=None)
+        return (b - a).total_seconds()
+    except ValueError:
+        return float("inf")
+
+
+# --------------------------------------------------------------------------- #
+# Feeds
+# --------------------------------------------------------------------------- #
+
+def _daily_bars(ticker: str, archive) -> List[tuple]:
+    if archive is not None and ticker in archive.index:
+        bars = archive.bars(ticker)
+        n = min(5, bars["date"].size)
+        return [(str(bars["date"][-n + k]), *(float(bars[f][-n + k]) for f in ("open", "high", "low", "close")))
+                for k in range(n)]
+    from src.backtest import fetch_ohlcv
+
+    raw = fetch_ohlcv(ticker, "5d", use_cache=False)
+    return list(zip(raw["date"], raw["open"], raw["high"], raw["low"], raw["close"]))
+
+
+@timed("alerts.check_daily")
+def check_daily(engine: AlertEngine, workers: int = 8, on_error: Optional[Callable[[str, Exception], None]] = None) -> List[Dict]:
+    """Feed the latest daily bars (price archive if it holds the ticker, else yfinance) of every ruled ticker."""
+    from src.archive import open_archive
+
+    archive = open_archive()
+
+    def one(ticker):
+        try:
+            return ticker, _daily_bars(ticker, archive)
+        except Exception as exc:
+            return ticker, exc
+
+    alerts = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(engine.tickers) or 1)),
+                            thread_name_prefix="finquant-alerts") as pool:
+        for ticker, bars in pool.map(one, engine.tickers):
+            if isinstance(bars, Exception):
+                if on_error:
+                    on_error(ticker, bars)
+                continue
+            for bar in bars:
+                alerts += engine.on_bar(ticker, *bar)
+    return alerts
+
+
+def watch(engine: AlertEngine, interval: str = "5m", poll_s: float = 60.0, workers: int = 4,
+          stop: Optional[threading.Event] = None, max_polls: Optional[int] = None,
+          on_error: Optional[Callable[[str, Exception], None]] = None, on_poll: Optional[Callable[[], None]] = None):
+    """Poll completed intraday bars of every ruled ticker and feed them to the engine."""
+    from src.intraday import INTERVALS, fetch_intraday_bars
+
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval {interval!r}; use one of {', '.join(INTERVALS)}")
+    stop = stop or threading.Event()
+
+    def one(ticker):
+        try:
+            for ts, o, h, l, c, _ in fetch_intraday_bars(ticker, interval)[:-1]:  # newest bar is still forming
+                engine.on_bar(ticker, ts, o, h, l, c)
+        except Exception as exc:
+            if on_error:
+                on_error(ticker, exc)
+
+    polls = 0
+    while not stop.is_set() and (max_polls is None or polls < max_polls):
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(engine.tickers) or 1)),
+                                thread_name_prefix="finquant-alerts") as pool:
+            list(pool.map(one, engine.tickers))
+        if on_poll:
+            on_poll()
+        polls += 1
+        if max_polls is None or polls < max_polls:
+            stop.wait(poll_s)
+
+
+if __name__ == "__main__":
+    # 50,000 synthetic rules over 2,000 tickers: index build + one day of ticks
+    import time
+
+    rng = np.random.default_rng(11)
+    tickers = [f"T{i:04d}.NS" for i in range(2000)]
+    base = dict(zip(tickers, rng.uniform(50, 5000, len(tickers))))
+    rules = [make_rule(t, base[t] * (1 + rng.uniform(-0.2, 0.2)), rng.choice(DIRECTIONS), "2099-12-31", "stop", "demo")
+             for t in rng.choice(tickers, 50_000)]
+    began = time.perf_counter()
+    engine = AlertEngine(rules, cooldown_s=3600)
+    print(f"indexed {len(rules):,} rules in {(time.perf_counter() - began) * 1000:.1f} ms")
+
+    fired = 0
+    began = time.perf_counter()
+    for minute in range(375):
+        ts = datetime(2024, 11, 29, 9, 15) + timedelta(minutes=minute)
+        for t in tickers:
+            base[t] *= 1 + rng.normal(0, 0.002)
+            fired += len(engine.on_price(t, ts, base[t]))
+    ticks = 375 * len(tickers)
+    print(f"{ticks:,} ticks, {fired} alerts in {time.perf_counter() - began:.2f}s "
+          f"({(time.perf_counter() - began) / ticks * 1e6:.1f} µs/tick)")
@@ -0,0 +1,382 @@
+# src/archive.py
+"""
+Memory-mapped daily OHLCV archive for the whole universe.
+
+    python main.py archive build universe.txt --period 10y
+    python main.py archive update                      # after the close
+    python main.py archive info
+
+Layout under FINQUANT_ARCHIVE_DIR (one writer, any number of readers):
+
+    meta.json       tickers (column order), fields, rows used, capacities
+    dates.i32       (date_capacity,) int32 days since 1970-01-01
+    <field>.f32     (date_capacity, ticker_capacity) float32, row-major,
+                    NaN where a ticker has no bar (not listed yet, suspended)
+
+Rows are trading dates in ascending order, so a cross-section (one date,
+every ticker) is one contiguous row and a ticker's history is a strided
+column; both come back as NumPy views of the mapped file, nothing is
+copied until the caller computes on them. Capacities are over-allocated
+so an end-of-day append writes one row in place; only outgrowing the
+ticker capacity rewrites the files.
+
+    archive = PriceArchive()
+    closes = archive.field("close")              # (rows, tickers) view
+    tcs = archive.series("TCS.NS")               # strided view of one column
+    today = archive.cross_section(archive.dates[-1])
+"""
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from src.config import Config
+from src.metrics import timed
+
+logger = project_logger.getChild("archive")
+
+FIELDS = ("open", "high", "low", "close", "volume")
+VERSION = 1
+DATE_GROWTH = 512  # rows added whenever the date capacity runs out
+TICKER_GROWTH = 256
+
+
+def _days(dates) -> np.ndarray:
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64).astype(np.int32)
+
+
+class PriceArchive:
+    """Dense date x ticker float32 matrices per field, memory-mapped from ``root``."""
+
+    def __init__(self, root: str = Config.ARCHIVE_DIR, writable: bool = False):
+        self.root = root
+        self.writable = writable
+        with open(os.path.join(root, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != VERSION:
+            raise ValueError(f"Unsupported archive version {self.meta.get('version')} in {root}")
+        self._open_maps()
+
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def create(cls, tickers: Iterable[str], root: str = Config.ARCHIVE_DIR, date_capacity: int = 4096,
+               ticker_capacity: Optional[int] = None) -> "PriceArchive":
+        """Empty archive for ``tickers`` (replaces any archive in ``root``)."""
+        tickers = list(dict.fromkeys(tickers))
+        ticker_capacity = ticker_capacity or max(TICKER_GROWTH, -(-len(tickers) // TICKER_GROWTH) * TICKER_GROWTH)
+        os.makedirs(root, exist_ok=True)
+        np.memmap(os.path.join(root, "dates.i32"), dtype=np.int32, mode="w+", shape=(date_capacity,)).flush()
+        for field in FIELDS:
+            data = np.memmap(os.path.join(root, f"{field}.f32"), dtype=np.float32, mode="w+",
+                             shape=(date_capacity, ticker_capacity))
+            data[:] = np.nan
+            data.flush()
+            del data
+        _write_meta(root, {
+            "version": VERSION, "fields": list(FIELDS), "dtype": "float32", "tickers": tickers, "rows": 0,
+            "date_capacity": date_capacity, "ticker_capacity": ticker_capacity,
+        })
+        return cls(root, writable=True)
+
+    def _open_maps(self):
+        mode = "r+" if self.writable else "r"
+        shape = (self.meta["date_capacity"], self.meta["ticker_capacity"])
+        self._dates = np.memmap(os.path.join(self.root, "dates.i32"), dtype=np.int32, mode=mode,
+                                shape=(shape[0],))
+        self._data = {f: np.memmap(os.path.join(self.root, f"{f}.f32"), dtype=np.float32, mode=mode, shape=shape)
+                      for f in self.meta["fields"]}
+        self.tickers: List[str] = self.meta["tickers"]
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+
+    def reload(self):
+        """Pick up rows / tickers appended by the writer since this reader opened."""
+        with open(os.path.join(self.root, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._open_maps()
+
+    # ------------------------------------------------------------------ #
+    # Zero-copy reads
+    # ------------------------------------------------------------------ #
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"]
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates[:self.rows].astype(np.int64).astype("datetime64[D]")
+
+    def field(self, name: str = "close") -> np.ndarray:
+        """(rows, tickers) view of one field."""
+        return self._data[name][:self.rows, :len(self.tickers)]
+
+    def row_range(self, start=None, end=None) -> slice:
+        """Row slice for dates in [start, end] (inclusive, any datetime-like)."""
+        days = self._dates[:self.rows]
+        lo = 0 if start is None else int(np.searchsorted(days, _days([start])[0], side="left"))
+        hi = self.rows if end is None else int(np.searchsorted(days, _days([end])[0], side="right"))
+        return slice(lo, hi)
+
+    def series(self, ticker: str, field: str = "close", start=None, end=None) -> np.ndarray:
+        """Strided view of one ticker's column (NaN where it had no bar)."""
+        return self._data[field][self.row_range(start, end), self.index[ticker]]
+
+    def cross_section(self, date, field: str = "close") -> np.ndarray:
+        """Contiguous view of every ticker on ``date`` (KeyError if not archived)."""
+        day = _days([date])[0]
+        row = int(np.searchsorted(self._dates[:self.rows], day))
+        if row >= self.rows or self._dates[row] != day:
+            raise KeyError(f"{np.datetime64(int(day), 'D')} is not in the archive")
+        return self._data[field][row, :len(self.tickers)]
+
+    def bars(self, ticker: str) -> Dict[str, np.ndarray]:
+        """Dense bars of one ticker (rows without a close dropped), as `backtest.run_backtest` expects."""
+        j = self.index[ticker]
+        close = self._data["close"][:self.rows, j]
+        keep = np.flatnonzero(~np.isnan(close))
+        bars = {f: self._data[f][keep, j].astype("float64") for f in ("open", "high", "low", "close")}
+        bars["date"] = self._dates[keep].astype(np.int64).astype("datetime64[D]")
+        return bars
+
+    # ------------------------------------------------------------------ #
+    # Writes (single writer)
+    # ------------------------------------------------------------------ #
+    def _require_writable(self):
+        if not self.writable:
+            raise PermissionError("Archive opened read-only; use PriceArchive(root, writable=True)")
+
+    def add_tickers(self, tickers: Iterable[str]) -> List[str]:
+        """Append new ticker columns; rewrites the files only if the ticker capacity is exceeded."""
+        self._require_writable()
+        new = [t for t in dict.fromkeys(tickers) if t not in self.index]
+        if not new:
+            return []
+        needed = len(self.tickers) + len(new)
+        if needed > self.meta["ticker_capacity"]:
+            self._relayout(ticker_capacity=-(-needed // TICKER_GROWTH) * TICKER_GROWTH)
+        self.meta["tickers"] = self.tickers + new
+        _write_meta(self.root, self.meta)
+        self._open_maps()
+        return new
+
+    def _relayout(self, ticker_capacity: Optional[int] = None, date_capacity: Optional[int] = None):
+        old_shape = (self.meta["date_capacity"], self.meta["ticker_capacity"])
+        shape = (date_capacity or old_shape[0], ticker_capacity or old_shape[1])
+        logger.info(f"Archive relayout {old_shape} → {shape}")
+        for field in self.meta["fields"]:
+            path = os.path.join(self.root, f"{field}.f32")
+            tmp_path = f"{path}.tmp"
+            fresh = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=shape)
+            fresh[:] = np.nan
+            for start in range(0, self.rows, 1024):  # chunked: never the whole field in RAM
+                stop = min(start + 1024, self.rows)
+                fresh[start:stop, :old_shape[1]] = self._data[field][start:stop]
+            fresh.flush()
+            del fresh
+            self._data[field]._mmap.close()
+            os.replace(tmp_path, path)
+        if shape[0] != old_shape[0]:
+            dates = np.memmap(os.path.join(self.root, "dates.i32"), dtype=np.int32, mode="r+", shape=(old_shape[0],))
+            head = np.array(dates[:self.rows])
+            del dates
+            with open(os.path.join(self.root, "dates.i32"), "r+b") as f:
+                f.truncate(shape[0] * 4)
+            grown = np.memmap(os.path.join(self.root, "dates.i32"), dtype=np.int32, mode="r+", shape=(shape[0],))
+            grown[:self.rows] = head
+            grown.flush()
+            del grown
+        self.meta["date_capacity"], self.meta["ticker_capacity"] = shape
+        _write_meta(self.root, self.meta)
+        self._open_maps()
+
+    def append_day(self, date, values: Dict[str, Dict[str, float]]) -> bool:
+        """
+        Write one trading day in place: ``values[field][ticker]``. The date
+        must be after the last archived one (same date → overwrite that row).
+        """
+        self._require_writable()
+        day = _days([date])[0]
+        if self.rows and day < self._dates[self.rows - 1]:
+            raise ValueError(f"{np.datetime64(int(day), 'D')} is before the last archived date")
+        if self.rows and day == self._dates[self.rows - 1]:
+            row = self.rows - 1
+        else:
+            if self.rows == self.meta["date_capacity"]:
+                self._relayout(date_capacity=self.meta["date_capacity"] + DATE_GROWTH)
+            row = self.rows
+        for field, by_ticker in values.items():
+            cols = [self.index[t] for t in by_ticker if t in self.index]
+            self._data[field][row, cols] = np.asarray([by_ticker[t] for t in by_ticker if t in self.index],
+                                                      dtype=np.float32)
+        self._dates[row] = day
+        self.flush()
+        if row == self.rows:
+            self.meta["rows"] = row + 1
+            _write_meta(self.root, self.meta)  # readers see the row only once it is fully written
+        return True
+
+    def write_history(self, ticker: str, history: Dict[str, list]):
+        """Backfill one ticker from ``{"date": [...], field: [...]}`` onto the archived date rows."""
+        self._require_writable()
+        j = self.index[ticker]
+        days = _days(history["date"])
+        rows = np.searchsorted(self._dates[:self.rows], days)
+        ok = (rows < self.rows) & (self._dates[np.minimum(rows, max(self.rows - 1, 0))] == days) if self.rows else \
+            np.zeros(len(days), dtype=bool)
+        for field in self.meta["fields"]:
+            if field in history:
+                self._data[field][rows[ok], j] = np.asarray(history[field], dtype=np.float32)[ok]
+        return int(ok.sum())
+
+    def set_dates(self, dates):
+        """Initial date rows of an empty archive (sorted, unique)."""
+        self._require_writable()
+        if self.rows:
+            raise ValueError("Archive already has dates; use append_day")
+        days = np.unique(_days(dates))
+        if len(days) > self.meta["date_capacity"]:
+            self._relayout(date_capacity=-(-len(days) // DATE_GROWTH) * DATE_GROWTH + DATE_GROWTH)
+        self._dates[:len(days)] = days
+        self.meta["rows"] = int(len(days))
+        self.flush()
+        _write_meta(self.root, self.meta)
+
+    def flush(self):
+        self._dates.flush()
+        for data in self._data.values():
+            data.flush()
+
+    def info(self) -> Dict[str, object]:
+        dates = self._dates[:self.rows]
+        size = sum(os.path.getsize(os.path.join(self.root, f"{f}.f32")) for f in self.meta["fields"])
+        return {
+            "root": os.path.abspath(self.root),
+            "tickers": len(self.tickers),
+            "rows": self.rows,
+            "first_date": str(np.datetime64(int(dates[0]), "D")) if self.rows else None,
+            "last_date": str(np.datetime64(int(dates[-1]), "D")) if self.rows else None,
+            "capacity": [self.meta["date_capacity"], self.meta["ticker_capacity"]],
+            "size_mb": round(size / 2 ** 20, 1),
+        }
+
+
+def _write_meta(root: str, meta: Dict):
+    path = os.path.join(root, "meta.json")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+def open_archive(root: str = Config.ARCHIVE_DIR) -> Optional[PriceArchive]:
+    """Read-only archive, or None when none has been built."""
+    if not os.path.exists(os.path.join(root, "meta.json")):
+        return None
+    try:
+        return PriceArchive(root)
+    except Exception as exc:
+        logger.warning(f"Ignoring unreadable price archive {root}: {exc}")
+        return None
+
+
+# --------------------------------------------------------------------------- #
+# Build / end-of-day update from yfinance
+# --------------------------------------------------------------------------- #
+
+def _fetch_all(tickers: List[str], period: str, workers: int) -> Dict[str, object]:
+    from src.backtest import fetch_ohlcv
+
+    def one(ticker):
+        try:
+            return ticker, fetch_ohlcv(ticker, period, use_cache=False)
+        except Exception as exc:
+            return ticker, exc
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers) or 1)), thread_name_prefix="finquant-archive") as pool:
+        return dict(pool.map(one, tickers))
+
+
+@timed("archive.build")
+def build(tickers: Iterable[str], period: str = "10y", root: str = Config.ARCHIVE_DIR, workers: int = 8) -> Dict:
+    """Fresh archive for ``tickers`` from yfinance daily history; returns info + per-ticker errors."""
+    from src.tools import _ensure_suffix
+
+    tickers = list(dict.fromkeys(_ensure_suffix(t.strip()) for t in tickers if t.strip()))
+    histories = _fetch_all(tickers, period, workers)
+    good = {t: h for t, h in histories.items() if not isinstance(h, Exception)}
+    archive = PriceArchive.create(list(good), root)
+    archive.set_dates(np.concatenate([np.asarray(h["date"], dtype="datetime64[D]") for h in good.values()])
+                      if good else [])
+    for ticker, history in good.items():
+        archive.write_history(ticker, history)
+    archive.flush()
+    return {**archive.info(), "errors": {t: str(h) for t, h in histories.items() if isinstance(h, Exception)}}
+
+
+@timed("archive.update")
+def update(root: str = Config.ARCHIVE_DIR, tickers: Iterable[str] = (), workers: int = 8) -> Dict:
+    """End-of-day append: new dates for every archived ticker (plus any new ``tickers``, backfilled)."""
+    from src.tools import _ensure_suffix
+
+    archive = PriceArchive(root, writable=True)
+    added = archive.add_tickers(_ensure_suffix(t.strip()) for t in tickers if t.strip())
+    last = archive._dates[archive.rows - 1] if archive.rows else None
+
+    recent = _fetch_all(archive.tickers, "5d", workers)
+    by_date: Dict[int, Dict[str, Dict[str, float]]] = {}
+    for ticker, history in recent.items():
+        if isinstance(history, Exception):
+            continue
+        for i, day in enumerate(_days(history["date"])):
+            if last is None or day >= last:
+                fields = by_date.setdefault(int(day), {f: {} for f in archive.meta["fields"]})
+                for field in archive.meta["fields"]:
+                    if field in history:
+                        fields[field][ticker] = history[field][i]
+    for day in sorted(by_date):
+        archive.append_day(np.datetime64(day, "D"), by_date[day])
+
+    if added:  # backfill the new columns over the archived dates
+        for ticker, history in _fetch_all(added, "10y", workers).items():
+            if not isinstance(history, Exception):
+                archive.write_history(ticker, history)
+        archive.flush()
+    return {**archive.info(), "appended_days": len(by_date), "added_tickers": added,
+            "errors": {t: str(h) for t, h in recent.items() if isinstance(h, Exception)}}
+
+
+if __name__ == "__main__":
+    # Synthetic 2,000 tickers x 10 years: build, append one day, universe-wide pass on views
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(5)
+    days = np.arange(np.datetime64("2014-01-01"), np.datetime64("2024-01-01"))
+    days = days[np.is_busday(days)]
+    universe = [f"T{i:04d}.NS" for i in range(2000)]
+    with tempfile.TemporaryDirectory() as scratch:
+        began = time.perf_counter()
+        archive = PriceArchive.create(universe, scratch)
+        archive.set_dates(days)
+        for k in range(0, len(universe), 250):  # column blocks keep peak RAM small
+            block = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (len(days), 250)), axis=0)).astype(np.float32)
+            archive._data["close"][:len(days), k:k + 250] = block
+        archive.flush()
+        print(f"built {archive.info()} in {time.perf_counter() - began:.1f}s")
+
+        archive.append_day("2024-01-01", {"close": {t: 1.0 for t in universe}})
+        reader = PriceArchive(scratch)
+        closes = reader.field("close")
+        began = time.perf_counter()
+        momentum = closes[-1] / closes[-253] - 1  # 12-month return, every ticker
+        high_52w = np.nanmax(closes[-252:], axis=0)
+        print(f"cross-sectional pass over {closes.shape} in {(time.perf_counter() - began) * 1000:.1f} ms; "
+              f"view shares memory with the file: {np.shares_memory(closes, reader._data['close'])}")
+        print(f"T0001 series view: {reader.series('T0001.NS').shape}, last {reader.series('T0001.NS')[-1]}")
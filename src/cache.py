@@ -0,0 +1,202 @@
+# src/cache.py
+"""
+Shared TTL caches for the expensive lookups (Screener scrapes, price history,
+LLM answers).
+
+    from src.cache import price_cache
+    data = price_cache.get_or_compute(ticker, lambda: fetch(ticker))
+
+Values must be JSON-serialisable. They are kept serialised in memory (LRU
+bounded), so callers always get a private copy and can mutate it freely, and
+optionally mirrored to ``<FINQUANT_CACHE_DIR>/<name>/`` so the CLI, the HTTP
+service and the scrape farm share results across processes.
+
+Concurrent callers missing the same key wait for one computation instead of
+all hitting Screener/Yahoo/Gemini at once (single-flight).
+
+Caching is off when FINQUANT_CACHE=0 and while record/replay is active, so
+cassettes always see every call.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from src.config import Config
+from src.metrics import incr
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl_s: float, max_entries: int = 256,
+                 persist: bool = False, root: str = Config.CACHE_DIR, enabled: bool = True):
+        self.name = name
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.folder = os.path.join(root, name) if persist else None
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key → (stored_at, json text, ttl_s or None)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Lock] = {}
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.folder, f"{digest}.json")
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        return entry["stored_at"], json.dumps(entry["value"], ensure_ascii=False), entry.get("ttl_s")
+
+    def _write_disk(self, key: str, stored_at: float, text: str, ttl_s: Optional[float] = None):
+        path = self._path(key)
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write('{"key": %s, "stored_at": %r, "ttl_s": %s, "value": %s}'
+                        % (json.dumps(key), stored_at, json.dumps(ttl_s), text))
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # a read-only cache dir only costs us the cross-process hit
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.folder:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None or not self._fresh(entry):
+            incr("cache_misses", cache=self.name)
+            return default
+        incr("cache_hits", cache=self.name)
+        return json.loads(entry[1])
+
+    def has(self, key: str) -> bool:
+        """True if ``key`` holds a fresh value (no decoding, no hit/miss counting)."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.folder:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+        return entry is not None and self._fresh(entry)
+
+    def get_stale(self, key: str) -> tuple:
+        """(value, age in seconds) ignoring the TTL — the fallback when recomputing fails; (None, inf) if absent."""
+        if not self.enabled:
+            return None, float("inf")
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.folder:
+            entry = self._read_disk(key)
+        if entry is None:
+            return None, float("inf")
+        return json.loads(entry[1]), time.time() - entry[0]
+
+    def _fresh(self, entry: tuple) -> bool:
+        ttl_s = entry[2] if entry[2] is not None else self.ttl_s
+        return time.time() - entry[0] <= ttl_s
+
+    def _remember(self, key: str, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set(self, key: str, value: Any, ttl_s: Optional[float] = None):
+        """Store ``value``; ``ttl_s`` overrides the cache's TTL for this entry only."""
+        if not self.enabled:
+            return
+        entry = (time.time(), json.dumps(value, ensure_ascii=False, default=str), ttl_s)
+        self._remember(key, entry)
+        if self.folder:
+            self._write_disk(key, *entry)
+
+    def extend(self, key: str, ttl_s: float) -> bool:
+        """Keep a fresh entry for ``ttl_s`` from now (e.g. post-close prices until the next open)."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return False
+        self.set(key, value, ttl_s)
+        return True
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.folder:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], store: bool = True) -> Any:
+        """Cached value for ``key``, computing it once even under concurrent callers
+        (``store=False``: ``compute`` writes the entry itself)."""
+        if not self.enabled:
+            return compute()
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                value = self.get(key, _MISSING)  # another caller may have filled it meanwhile
+                if value is not _MISSING:
+                    return value
+                value = compute()
+                if store:
+                    self.set(key, value)
+                return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is key_lock and not key_lock.locked():
+                    del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"name": self.name, "entries": len(self._entries), "ttl_s": self.ttl_s,
+                    "enabled": self.enabled, "persist_dir": self.folder}
+
+
+_ACTIVE = Config.CACHE_ENABLED and Config.REPLAY_MODE == "off"
+
+resolver_cache = TTLCache("resolver", Config.RESOLVER_CACHE_TTL, max_entries=2048, persist=True, enabled=_ACTIVE)
+fundamentals_cache = TTLCache("fundamentals", Config.FUNDAMENTALS_CACHE_TTL, max_entries=128, persist=True, enabled=_ACTIVE)
+price_cache = TTLCache("prices", Config.PRICE_CACHE_TTL, max_entries=512, persist=True, enabled=_ACTIVE)
+ohlcv_cache = TTLCache("ohlcv", Config.OHLCV_CACHE_TTL, max_entries=256, persist=True, enabled=_ACTIVE)
+recommendation_cache = TTLCache("recommendations", Config.RECOMMENDATION_CACHE_TTL, max_entries=256, enabled=_ACTIVE)
+peers_cache = TTLCache("peers", Config.PEERS_CACHE_TTL, max_entries=2048, persist=True, enabled=_ACTIVE)
+
+CACHES = {c.name: c for c in (resolver_cache, fundamentals_cache, price_cache, ohlcv_cache, recommendation_cache,
+                               peers_cache)}
+
+
+def set_enabled(enabled: bool) -> Dict[str, bool]:
+    """Switch every shared cache on/off; returns the previous states."""
+    previous = {name: c.enabled for name, c in CACHES.items()}
+    for c in CACHES.values():
+        c.enabled = enabled
+    return previous
@@ -0,0 +1,807 @@
+# src/cli.py
+"""
+Non-interactive FinQuant: no prompts, NDJSON on stdout, logs on stderr.
+
+    python main.py analyze RELIANCE --owns --buy-price 2450
+    python main.py resolve "hdfc bank" irfc
+    python main.py fetch TCS INFY ITC --out-dir payloads/       # bulk, once
+    python main.py recommend --from-payload payloads/*.json --workers 4
+    python main.py fetch TCS | python main.py recommend --from-payload -
+    python main.py portfolio holdings.csv --loss-pct 8 --workers 2
+    python main.py portfolio holdings.csv --triage-only --risk --risk-method t
+    python main.py backtest verdicts.csv outputs/*.md --by verdict,confidence
+    python main.py intraday TCS.NS INFY.NS --interval 5m --poll 60
+    python main.py prewarm daemon          # refresh watchlist caches after every close
+    python main.py archive build universe.txt --period 10y   # then `archive update` after each close
+    python main.py alerts import outputs/*.md && python main.py alerts watch --interval 5m
+    python main.py screen "roce > 20, debt/equity < 0.5, promoter holding up 2 quarters" --sort=-roce
+
+Every input produces one JSON line on success (``{"type": "identity" |
+"payload" | "recommendation" | "position" | "portfolio" | "match" |
+"screen" | "trade" | "backtest" | "prewarm_item" | "prewarm_run" |
+"prewarm_status" | "tick" | "archive" | "alert" | "alert_rule" | "alerts" |
+"risk",
+...}``) or
+``{"type": "error", "stage", "input", "error"}`` on failure. ``--format
+text`` prints human-readable output instead.
+
+Exit codes: 0 all ok, 1 everything failed, 2 usage error, 3 configuration
+error (e.g. no GOOGLE_API_KEY), 4 partial failure.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+os.environ.setdefault("FINQUANT_LOG_STREAM", "stderr")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger, set_log_context
+from src.config import Config
+from src.metrics import start_run
+from src.portfolio import DEFAULT_STOP_PCT, DEFAULT_TRIGGERS
+from src.screening import DEFAULT_FARM_DB
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_CONFIG = 3
+EXIT_PARTIAL = 4
+
+
+class _Emitter:
+    """Thread-safe writer of one record per line."""
+
+    def __init__(self, fmt: str, stream=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.ok = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def emit(self, record: Dict):
+        with self._lock:
+            if record.get("type") == "error":
+                self.failed += 1
+            else:
+                self.ok += 1
+            if self.fmt == "json":
+                self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            else:
+                self.stream.write(_as_text(record) + "\n")
+            self.stream.flush()
+
+    def exit_code(self) -> int:
+        if self.failed and self.ok:
+            return EXIT_PARTIAL
+        return EXIT_FAILED if self.failed else EXIT_OK
+
+
+def _as_text(record: Dict) -> str:
+    kind = record.get("type")
+    if kind == "identity":
+        return f"{record['input']} → {record['screener_name']} | {record['yfinance_ticker']}"
+    if kind == "payload":
+        where = record.get("path") or "(inline)"
+        return f"{record['screener_name']} | {record['yfinance_ticker']} → payload {where}"
+    if kind == "recommendation":
+        bar = "═" * 80
+        header = f"{record['screener_name']} | {record['yfinance_ticker']}"
+        if record.get("source") == "rules":
+            header += " [rule-based]"
+        elif record.get("source") == "snapshot":
+            header += " [unchanged]"
+        if record.get("stale"):
+            header += " [stale: " + ", ".join(m["stage"] for m in record["stale"]) + "]"
+        if record.get("report_path"):
+            header += f" → {record['report_path']}"
+        return f"{bar}\n{header}\n{bar}\n{record['recommendation']}\n"
+    if kind == "risk":
+        from src.risk import render_risk
+
+        lines = [render_risk(record)]
+        for ticker, weight in record["portfolio"]["weights"].items():
+            share = record["assets"][ticker].get("cvar_99_share_pct", {})
+            lines.append(f"  {ticker:14s} weight {weight * 100:5.1f}%  share of 10-day CVaR99 {share.get('10d', 0):5.1f}%")
+        return "\n".join(lines)
+    if kind == "position":
+        def pct(field):
+            return "    n/a" if record[field] is None else f"{record[field]:+6.2f}%"
+        return (f"{record['ticker']:14s} P&L {pct('pnl_pct')}  DD {pct('drawdown_pct')}  "
+                f"stop {pct('stop_distance_pct')}  wt {pct('weight_pct')}  {','.join(record['triggers']) or '-'}")
+    if kind == "portfolio":
+        return (f"Portfolio: {record['positions']} positions, {record['flagged']} flagged | "
+                f"value ₹{record['value']:,.2f} | P&L ₹{record['pnl']:,.2f} ({record['pnl_pct']:+.2f}%)")
+    if kind == "match":
+        values = "  ".join(f"{k} {'n/a' if v is None else f'{v:,.2f}'}" for k, v in record["metrics"].items())
+        return f"{record['company']:14s} {values}"
+    if kind == "trade":
+        ret = "n/a" if record["return_pct"] is None else f"{record['return_pct']:+.2f}%"
+        return f"{record['ticker']:14s} {record['date']} {record['verdict']:12s} {record['outcome']:8s} {ret}"
+    if kind == "backtest":
+        group = " / ".join(str(v) for v in record["group"].values())
+        hit = "n/a" if record["hit_rate_pct"] is None else f"{record['hit_rate_pct']:.1f}%"
+        avg = "n/a" if record["avg_return_pct"] is None else f"{record['avg_return_pct']:+.2f}%"
+        mae = "n/a" if record["avg_mae_pct"] is None else f"{record['avg_mae_pct']:+.2f}%"
+        return (f"{group:28s} n={record['verdicts']:<5d} filled {record['filled']:<5d} hit {hit:>6s}  "
+                f"avg {avg:>8s}  MAE {mae:>8s}")
+    if kind == "tick":
+        from src.tools import _calculate_volatility_report
+        return _calculate_volatility_report(record) + "\n"
+    if kind == "prewarm_item":
+        detail = record.get("error") or ("scraped" if record.get("scraped") else "prices refreshed")
+        return f"{record['name']:24s} {record['status']:6s} {record.get('duration_s', 0):6.1f}s  {detail}"
+    if kind == "prewarm_run":
+        return (f"Pre-warm ({record['reason']}): {record['ok']} ok, {record['failed']} failed, "
+                f"{record['scraped']} scraped | {record['started_at'][:16]} → {record['finished_at'][11:16]}")
+    if kind == "prewarm_status":
+        last = record["last_run"]
+        last_text = f"{last['reason']} {last['started_at'][:16]} ({last['ok']} ok, {last['failed']} failed)" if last else "never"
+        lines = [f"Pre-warm: {record['warm']}/{record['names']} warm | last run {last_text} | next {record['next_run']}"]
+        if record["results_due"]:
+            lines.append(f"Results re-scrape due: {', '.join(record['results_due'])}")
+        lines += [f"  {i['name']:24s} {i['status']:6s} {'warm' if i['warm'] else 'cold':4s}  {i['last_at'] or '-'}"
+                  f"{'  ' + i['error'] if i['error'] else ''}" for i in record["items"]]
+        return "\n".join(lines)
+    if kind == "archive":
+        return (f"Archive {record['root']}: {record['tickers']} tickers x {record['rows']} days "
+                f"({record['first_date']} → {record['last_date']}), {record['size_mb']} MB")
+    if kind == "alert":
+        arrow = "↑" if record["direction"] == "above" else "↓"
+        return (f"{record['at'][:16]} {record['ticker']:14s} {arrow} {'/'.join(record['kinds']):12s} "
+                f"₹{record['level']:,.2f} (traded ₹{record['price']:,.2f}, close ₹{record['close']:,.2f})")
+    if kind == "alert_rule":
+        return (f"{record['ticker']:14s} {record['direction']:5s} ₹{record['level']:>10,.2f} {record['kind']:8s} "
+                f"until {record.get('expires') or '-':10s} {record.get('note') or ''}")
+    if kind == "alerts":
+        return f"Alerts: {record['rules']} rule(s) on {record['tickers']} ticker(s)" + \
+            (f", {record['fired']} fired" if "fired" in record else "") + \
+            (f", {record['added']} added" if "added" in record else "")
+    if kind == "screen":
+        return f"Screen: {record['matches']} of {record['universe']} companies match {record['query']!r}"
+    return f"ERROR [{record.get('stage')}] {record.get('input')}: {record.get('error')}"
+
+
+def _error(stage: str, item: str, exc: Exception) -> Dict:
+    return {"type": "error", "stage": stage, "input": item, "error": str(exc) or type(exc).__name__}
+
+
+def _fan_out(items: List, worker: Callable[[object], Dict], workers: int, out: _Emitter,
+             timeout: Optional[float] = None):
+    """Run ``worker`` per item (bounded concurrency, each within ``timeout`` seconds) and emit as each finishes."""
+    from src.resilience import deadline
+
+    def run(item):
+        set_log_context(run_id=start_run(), ticker=None)
+        with deadline(timeout):
+            record = worker(item)
+        out.emit(record)
+
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            run(item)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finquant-cli") as pool:
+        for future in [pool.submit(run, item) for item in items]:
+            future.result()
+
+
+# --------------------------------------------------------------------------- #
+# Stages
+# --------------------------------------------------------------------------- #
+
+def _identity(query: str, ticker: str = None) -> Dict[str, str]:
+    from src.tools import resolve_stock_identity_local
+
+    if ticker:
+        return {"screener_name": query.strip(), "yfinance_ticker": ticker.strip().upper()}
+    return resolve_stock_identity_local(query)
+
+
+def _identities(queries: List[str], ticker: str = None) -> Dict[str, object]:
+    """query → identity or the Exception; every name needing Gemini is resolved in batched prompts."""
+    from src.tools import resolve_stock_identities
+
+    if ticker:
+        return {query: _identity(query, ticker) for query in queries}
+    return dict(zip(queries, resolve_stock_identities(queries)))
+
+
+def _resolved(identities: Dict[str, object], query: str) -> Dict[str, str]:
+    identity = identities[query]
+    if isinstance(identity, Exception):
+        raise identity
+    return identity
+
+
+def _fetch(identity: Dict[str, str]) -> Dict:
+    from src.tools import build_stock_verdict_payload
+
+    set_log_context(ticker=identity["yfinance_ticker"])
+    return build_stock_verdict_payload(identity["screener_name"], identity["yfinance_ticker"])
+
+
+def _recommend(payload: Dict, owns: bool, buy_price: float, args) -> Tuple[str, str]:
+    """(source, text) — "snapshot" when nothing material changed (--incremental),
+    "rules" when the pre-score is confident enough, else "llm"."""
+    from src.recommendation import incremental_recommendation, prescored_recommendation
+
+    threshold = float("inf") if args.no_prescore else args.prescore_threshold
+    recommend = incremental_recommendation if args.incremental else prescored_recommendation
+    source, text = recommend(payload, owns, buy_price, threshold, args.escalate)
+    if text.startswith("Error"):
+        raise RuntimeError(text)
+    return source, text
+
+
+def _recommendation_record(item: str, payload: Dict, recommended: Tuple[str, str], owns: bool,
+                           buy_price: float) -> Dict:
+    source, text = recommended
+    scorecard = payload.get("scorecard") or {}
+    return {
+        "type": "recommendation",
+        "input": item,
+        "screener_name": payload.get("screener_name"),
+        "yfinance_ticker": payload.get("yfinance_ticker"),
+        "owns_stock": owns,
+        "buy_price": buy_price,
+        "source": source,
+        "prescore": {k: scorecard.get(k) for k in ("verdict", "confidence", "composite")} if scorecard else None,
+        "recommendation": text,
+        "stale": payload.get("stale") or None,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def _read_payloads(sources: Iterable[str]) -> Iterator[Tuple[str, object]]:
+    """(label, payload dict or Exception) from .json files, NDJSON files or '-' (stdin)."""
+    for source in sources:
+        try:
+            if source == "-":
+                text = sys.stdin.read()
+            else:
+                with open(source, encoding="utf-8") as f:
+                    text = f.read()
+        except OSError as exc:
+            yield source, exc
+            continue
+
+        stripped = text.strip()
+        if not stripped:
+            continue
+        try:
+            documents = [json.loads(stripped)]
+        except ValueError:
+            documents = []
+            for lineno, line in enumerate(stripped.splitlines(), 1):
+                if not line.strip():
+                    continue
+                try:
+                    documents.append(json.loads(line))
+                except ValueError as exc:
+                    yield f"{source}:{lineno}", exc
+        for doc in documents:
+            if not isinstance(doc, dict):
+                yield source, ValueError("payload must be a JSON object")
+            elif doc.get("type") == "error":
+                continue  # failed fetches upstream were already reported there
+            elif doc.get("type") == "payload":
+                if "payload" in doc:
+                    yield doc.get("input", source), doc["payload"]
+                else:
+                    yield from _read_payloads([doc["path"]])
+            else:
+                yield source, doc
+
+
+# --------------------------------------------------------------------------- #
+# Commands
+# --------------------------------------------------------------------------- #
+
+def cmd_resolve(args, out: _Emitter):
+    for query, identity in _identities(args.queries).items():
+        if isinstance(identity, Exception):
+            out.emit(_error("resolve", query, identity))
+        else:
+            out.emit({"type": "identity", "input": query, **identity})
+
+
+def cmd_fetch(args, out: _Emitter):
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    identities = _identities(args.queries, args.ticker)
+
+    def work(query):
+        stage = "resolve"
+        try:
+            identity = _resolved(identities, query)
+            stage = "fetch"
+            payload = _fetch(identity)
+        except Exception as exc:
+            return _error(stage, query, exc)
+        record = {"type": "payload", "input": query, **identity}
+        if args.out_dir:
+            safe = "".join(c if c.isalnum() else "_" for c in identity["yfinance_ticker"])
+            record["path"] = os.path.join(args.out_dir, f"{safe}.json")
+            with open(record["path"], "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2)
+        else:
+            record["payload"] = payload
+        return record
+
+    _fan_out(args.queries, work, args.workers, out, args.timeout)
+
+
+def cmd_recommend(args, out: _Emitter):
+    def work(entry):
+        label, payload = entry
+        if isinstance(payload, Exception):
+            return _error("load", label, payload)
+        try:
+            recommended = _recommend(payload, args.owns, args.buy_price, args)
+        except Exception as exc:
+            return _error("recommend", label, exc)
+        record = _recommendation_record(label, payload, recommended, args.owns, args.buy_price)
+        if args.save_report:
+            from src.recommendation import save_recommendation_report
+            record["report_path"] = save_recommendation_report(
+                payload.get("screener_name") or label, recommended[1], args.owns, args.buy_price
+            )
+        return record
+
+    _fan_out(list(_read_payloads(args.from_payload)), work, args.workers, out, args.timeout)
+
+
+def cmd_analyze(args, out: _Emitter):
+    identities = _identities(args.queries, args.ticker)
+
+    def work(query):
+        stage = "resolve"
+        try:
+            identity = _resolved(identities, query)
+            stage = "fetch"
+            payload = _fetch(identity)
+            stage = "recommend"
+            recommended = _recommend(payload, args.owns, args.buy_price, args)
+        except Exception as exc:
+            return _error(stage, query, exc)
+        record = _recommendation_record(query, payload, recommended, args.owns, args.buy_price)
+        if args.save_report:
+            from src.recommendation import save_recommendation_report
+            record["report_path"] = save_recommendation_report(query, recommended[1], args.owns, args.buy_price)
+        return record
+
+    _fan_out(args.queries, work, args.workers, out, args.timeout)
+
+
+def cmd_portfolio(args, out: _Emitter):
+    from src.portfolio import (
+        fetch_closes, fetch_peaks, load_holdings, portfolio_risk, position_record, review_flagged, summarize, triage,
+    )
+
+    try:
+        holdings = load_holdings(args.holdings)
+    except (OSError, ValueError) as exc:
+        out.emit(_error("load", args.holdings, exc))
+        return
+    triggers = {
+        "loss_pct": args.loss_pct,
+        "gain_pct": args.gain_pct,
+        "drawdown_pct": args.drawdown_pct,
+        "stop_buffer_pct": args.stop_buffer_pct,
+        "max_weight_pct": args.max_weight_pct,
+    }
+    peaks = fetch_peaks(holdings)
+    for ticker, peak in peaks.items():
+        if isinstance(peak, Exception):  # drawdown falls back to the last month's peak
+            out.emit(_error("peaks", ticker, peak))
+    positions = triage(holdings, fetch_closes(holdings["ticker"].tolist()), triggers, args.stop_pct, peaks)
+    for _, row in positions.iterrows():
+        record = {"type": "position", **position_record(row)}
+        if "error" in record:
+            out.emit(_error("prices", row["ticker"], RuntimeError(record["error"])))
+        elif args.all or record["flagged"]:
+            out.emit(record)
+    out.emit({"type": "portfolio", **summarize(positions)})
+    if args.risk:
+        try:
+            report = portfolio_risk(positions, args.risk_paths, args.risk_method)
+        except Exception as exc:
+            out.emit(_error("risk", args.holdings, exc))
+        else:
+            for ticker, reason in report.pop("errors").items():
+                out.emit(_error("risk", ticker, RuntimeError(reason)))
+            out.emit({"type": "risk", **report})
+    if args.triage_only:
+        return
+
+    def review(payload, avg_price):
+        return _recommend(payload, True, avg_price, args)
+
+    def emit_review(row, result):
+        set_log_context(ticker=row["ticker"])
+        if isinstance(result, Exception):
+            out.emit(_error("recommend", row["ticker"], result))
+            return
+        payload, recommended = result
+        record = _recommendation_record(row["ticker"], payload, recommended, True, round(float(row["avg_price"]), 2))
+        record["triggers"] = list(row["triggers"])
+        if args.save_report:
+            from src.recommendation import save_recommendation_report
+            record["report_path"] = save_recommendation_report(
+                row["screener_name"], recommended[1], True, float(row["avg_price"])
+            )
+        out.emit(record)
+
+    review_flagged(positions, review, args.workers, emit_review)
+
+
+def cmd_screen(args, out: _Emitter):
+    import pandas as pd
+    from src.screening import ALIASES, ScreenQueryError, build_table, compile_query, run_screen
+
+    table = build_table(args.info_dir, args.farm_db, rebuild=args.rebuild)
+    try:
+        used = compile_query(args.query).columns
+        matches = run_screen(table, args.query, sort=args.sort, limit=args.limit)
+    except ScreenQueryError as exc:
+        out.emit(_error("query", args.query, exc))
+        return
+    sort_columns = [ALIASES.get(k.strip().lstrip("-+").lower(), k.strip().lstrip("-+").lower())
+                    for k in (args.sort or "").split(",") if k.strip()]
+    extra = [ALIASES.get(c.strip().lower(), c.strip().lower()) for c in (args.columns or "").split(",") if c.strip()]
+    shown = [c for c in dict.fromkeys(used + sort_columns + extra) if c in table.columns]
+    for _, row in matches.iterrows():
+        out.emit({
+            "type": "match",
+            "company": row["company"],
+            "name": row["name"],
+            "scraped_at": row["scraped_at"],
+            "metrics": {c: None if pd.isna(row[c]) else round(float(row[c]), 2) for c in shown},
+        })
+    out.emit({"type": "screen", "query": args.query, "universe": int(len(table)), "matches": int(len(matches))})
+
+
+def cmd_backtest(args, out: _Emitter):
+    import numpy as np
+    import pandas as pd
+    from src.backtest import load_bars, load_verdicts, run_backtest, summarize
+
+    try:
+        verdicts = load_verdicts(args.verdicts)
+    except (OSError, ValueError) as exc:
+        out.emit(_error("load", ", ".join(args.verdicts), exc))
+        return
+    if args.horizon_days:
+        verdicts["horizon_days"] = args.horizon_days
+    bars = load_bars(verdicts, max(args.workers, 4))
+    for ticker, result in bars.items():
+        if isinstance(result, Exception):
+            out.emit(_error("prices", ticker, result))
+    results = run_backtest(verdicts, bars)
+
+    def clean(value):
+        if isinstance(value, (pd.Timestamp, np.datetime64)):
+            return None if pd.isna(value) else str(value)[:10]
+        if isinstance(value, (float, np.floating)):
+            return None if np.isnan(value) else round(float(value), 2)
+        return value.item() if isinstance(value, np.generic) else value
+
+    if args.details:
+        for row in results.to_dict("records"):
+            out.emit({"type": "trade", **{k: clean(v) for k, v in row.items()}})
+    by = [c.strip() for c in args.by.split(",") if c.strip()]
+    for row in summarize(results, by).to_dict("records"):
+        group = {k: row.pop(k) for k in by}
+        out.emit({"type": "backtest", "group": group, **{k: clean(v) for k, v in row.items()}})
+
+
+def cmd_intraday(args, out: _Emitter):
+    from src.intraday import IntradayStream
+
+    try:
+        stream = IntradayStream(args.tickers, args.interval, args.window, max(args.workers, 4))
+    except ValueError as exc:
+        out.emit(_error("intraday", " ".join(args.tickers), exc))
+        return
+
+    def emit(snapshot):
+        if "error" in snapshot:
+            out.emit(_error("intraday", snapshot["ticker"], RuntimeError(snapshot["error"])))
+        else:
+            out.emit({"type": "tick", **snapshot})
+
+    stream.run(emit, args.poll, max_polls=args.polls or None)
+
+
+def cmd_prewarm(args, out: _Emitter):
+    from src.prewarm import load_results_calendar, load_watchlists, run_daemon, run_once, status
+
+    try:
+        entries = load_watchlists(args.watchlist)
+    except (OSError, ValueError) as exc:
+        out.emit(_error("load", ", ".join(args.watchlist or []) or Config.WATCHLIST_DIR, exc))
+        return
+    if args.action == "status":
+        out.emit({"type": "prewarm_status", **status(entries, load_results_calendar(args.calendar))})
+        return
+    if not entries:
+        out.emit(_error("load", Config.WATCHLIST_DIR, ValueError("no watchlist entries found")))
+        return
+
+    def item(record):
+        if record["status"] == "ok":
+            out.emit({"type": "prewarm_item", **record})
+        else:
+            out.emit(_error("prewarm", record["name"], RuntimeError(record["error"])))
+
+    def finished(run):
+        out.emit({"type": "prewarm_run", **run})
+
+    workers = args.workers or Config.PREWARM_WORKERS
+    if args.action == "run":
+        finished(run_once(entries, "manual", force_all=args.force, workers=workers, jitter_s=args.jitter, on_item=item))
+    else:
+        run_daemon(args.watchlist, args.calendar, workers, args.jitter, on_item=item, on_run=finished)
+
+
+def _universe(items):
+    """Tickers from arguments; an existing file contributes its first column, one per line."""
+    tickers = []
+    for item in items or []:
+        if not os.path.isfile(item):
+            tickers.append(item)
+            continue
+        with open(item, encoding="utf-8") as f:
+            for line in f:
+                value = line.split(",")[0].strip()
+                if value and not value.startswith("#") and value.lower() not in ("ticker", "symbol"):
+                    tickers.append(value)
+    return tickers
+
+
+def cmd_archive(args, out: _Emitter):
+    from src.archive import build, open_archive, update
+
+    try:
+        if args.action == "build":
+            tickers = _universe(args.universe)
+            if not tickers:
+                raise ValueError("no tickers given")
+            record = build(tickers, args.period, args.root, max(args.workers, 8))
+        elif args.action == "update":
+            record = update(args.root, _universe(args.universe), max(args.workers, 8))
+        else:
+            archive = open_archive(args.root)
+            if archive is None:
+                raise FileNotFoundError(f"no price archive in {args.root}")
+            record = archive.info()
+    except (OSError, ValueError) as exc:
+        out.emit(_error("archive", args.root, exc))
+        return
+    for ticker, error in record.pop("errors", {}).items():
+        out.emit(_error("archive", ticker, RuntimeError(error)))
+    out.emit({"type": "archive", **record})
+
+
+def cmd_alerts(args, out: _Emitter):
+    from src import alerts
+
+    rules = alerts.load_rules()
+    if args.action in ("import", "add"):
+        try:
+            if args.action == "import":
+                new = alerts.rules_from_verdicts(args.items)
+            else:
+                if len(args.items) != 2:
+                    raise ValueError("add needs TICKER LEVEL")
+                from src.tools import _ensure_suffix
+                new = [alerts.make_rule(_ensure_suffix(args.items[0].strip().upper()), float(args.items[1]),
+                                        "above" if args.above else "below", args.expires, note=args.note or "")]
+        except (OSError, ValueError) as exc:
+            out.emit(_error("alerts", " ".join(args.items), exc))
+            return
+        known = {r["id"] for r in rules}
+        kept = alerts.save_rules(rules + new)
+        expired = len({r["id"] for r in new} - {r["id"] for r in kept})
+        if expired:
+            logger.warning(f"{expired} rule(s) already past their horizon were not added")
+        out.emit({"type": "alerts", "rules": len(kept), "tickers": len({r["ticker"] for r in kept}),
+                  "added": len({r["id"] for r in kept} - known)})
+        return
+    if args.action == "list":
+        for rule in rules:
+            out.emit({"type": "alert_rule", **rule})
+        out.emit({"type": "alerts", "rules": len(rules), "tickers": len({r["ticker"] for r in rules})})
+        return
+
+    def failed(ticker, exc):
+        out.emit(_error("alerts", ticker, exc))
+
+    def emit(alert):
+        out.emit({"type": "alert", **alert})
+
+    state = alerts.load_state()
+    engine = alerts.AlertEngine(rules, state, alerts.default_sinks() + [emit])
+    fired = 0
+    if args.action == "check":
+        fired = len(alerts.check_daily(engine, max(args.workers, 8), on_error=failed))
+        alerts.save_state(state)
+    else:
+        try:
+            alerts.watch(engine, args.interval, args.poll, max(args.workers, 4), max_polls=args.polls or None,
+                         on_error=failed, on_poll=lambda: alerts.save_state(state))
+        except ValueError as exc:
+            out.emit(_error("alerts", args.interval, exc))
+            return
+    summary = {"type": "alerts", "rules": len(rules), "tickers": len(engine.tickers)}
+    out.emit({**summary, "fired": fired} if args.action == "check" else summary)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="main.py", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--format", choices=["json", "text"], default="json", help="NDJSON (default) or text")
+    common.add_argument("--workers", type=int, default=1, help="items processed concurrently")
+    common.add_argument("--timeout", type=float, default=None,
+                        help="per-item deadline in seconds across scrape, prices and LLM (default: none)")
+
+    position = argparse.ArgumentParser(add_help=False)
+    position.add_argument("--owns", action="store_true", help="analyse as an existing holding")
+    position.add_argument("--buy-price", type=float, default=0.0, help="average buy price (₹), with --owns")
+    position.add_argument("--save-report", action="store_true", help="also write outputs/<NAME>_*.md")
+
+    prescore = argparse.ArgumentParser(add_help=False)
+    prescore.add_argument("--prescore-threshold", type=float, default=Config.PRESCORE_CONFIDENCE,
+                          help="answer with the rule-based verdict at or above this confidence (0-1)")
+    prescore.add_argument("--no-prescore", action="store_true", help="always ask the LLM")
+    prescore.add_argument("--escalate", action="store_true",
+                          help="always ask the LLM, with the pre-score in the prompt for commentary")
+    prescore.add_argument("--incremental", action="store_true", default=Config.INCREMENTAL,
+                          help="reuse the last verdict unless results, holdings, price or pros/cons moved materially")
+
+    ticker = argparse.ArgumentParser(add_help=False)
+    ticker.add_argument("--ticker", help="yfinance ticker; skips LLM resolution (single stock)")
+
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("analyze", parents=[common, position, prescore, ticker], help="resolve + fetch + recommend")
+    p.add_argument("queries", nargs="+", metavar="STOCK")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("resolve", parents=[common], help="stock name → Screener name + yfinance ticker")
+    p.add_argument("queries", nargs="+", metavar="STOCK")
+    p.set_defaults(func=cmd_resolve)
+
+    p = sub.add_parser("fetch", parents=[common, ticker], help="build verdict payloads (scrape + prices)")
+    p.add_argument("queries", nargs="+", metavar="STOCK")
+    p.add_argument("--out-dir", help="write one <TICKER>.json per stock instead of inlining payloads")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("recommend", parents=[common, position, prescore], help="recommendations from saved payloads")
+    p.add_argument("--from-payload", nargs="+", required=True, metavar="FILE",
+                   help="payload .json, NDJSON from `fetch`, or - for stdin")
+    p.set_defaults(func=cmd_recommend)
+
+    p = sub.add_parser("portfolio", parents=[common, prescore], help="triage all holdings, recommend only flagged ones")
+    p.add_argument("holdings", help="CSV/JSON with ticker, qty, avg_price[, screener_name, stop]")
+    p.add_argument("--loss-pct", type=float, default=DEFAULT_TRIGGERS["loss_pct"])
+    p.add_argument("--gain-pct", type=float, default=DEFAULT_TRIGGERS["gain_pct"])
+    p.add_argument("--drawdown-pct", type=float, default=DEFAULT_TRIGGERS["drawdown_pct"])
+    p.add_argument("--stop-buffer-pct", type=float, default=DEFAULT_TRIGGERS["stop_buffer_pct"])
+    p.add_argument("--max-weight-pct", type=float, default=DEFAULT_TRIGGERS["max_weight_pct"])
+    p.add_argument("--stop-pct", type=float, default=DEFAULT_STOP_PCT,
+                   help="implied stop below avg price when the file has no stop column")
+    p.add_argument("--triage-only", action="store_true", help="metrics and triggers only, no LLM calls")
+    p.add_argument("--risk", action="store_true", help="also emit portfolio VaR / CVaR (historical + Monte Carlo)")
+    p.add_argument("--risk-method", choices=["bootstrap", "normal", "t"], default=Config.RISK_METHOD,
+                   help="Monte Carlo model for --risk")
+    p.add_argument("--risk-paths", type=int, default=Config.RISK_PATHS, help="simulated paths for --risk")
+    p.add_argument("--all", action="store_true", help="emit every position, not just flagged ones")
+    p.add_argument("--save-report", action="store_true", help="also write outputs/<NAME>_HOLDING_*.md")
+    p.set_defaults(func=cmd_portfolio)
+
+    p = sub.add_parser("backtest", parents=[common], help="replay verdicts' buy zone / stop / target on daily bars")
+    p.add_argument("verdicts", nargs="+", metavar="FILE",
+                   help="CSV/JSON/NDJSON verdict rows, `recommend` NDJSON output or outputs/*.md reports")
+    p.add_argument("--by", default="verdict,confidence", help="comma-separated grouping columns for the report")
+    p.add_argument("--horizon-days", type=int, help="override every verdict's horizon (calendar days)")
+    p.add_argument("--details", action="store_true", help="also emit one trade record per verdict")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser("intraday", parents=[common], help="poll intraday bars, emit incremental indicator snapshots")
+    p.add_argument("tickers", nargs="+", metavar="TICKER", help="yfinance tickers (.NS added when missing)")
+    p.add_argument("--interval", default="5m", help="bar size: 1m, 2m, 5m or 15m")
+    p.add_argument("--poll", type=float, default=60.0, help="seconds between polls")
+    p.add_argument("--polls", type=int, default=0, help="stop after this many polls (default: run until Ctrl+C)")
+    p.add_argument("--window", type=int, default=30, help="bars in the rolling mean / std / high / low window")
+    p.set_defaults(func=cmd_intraday)
+
+    p = sub.add_parser("prewarm", help="refresh resolver / price / fundamentals caches for watchlists")
+    p.add_argument("action", choices=["run", "daemon", "status"], help="run once now, schedule after every close, or report")
+    p.add_argument("--watchlist", nargs="+", metavar="FILE", help=f"default: {Config.WATCHLIST_DIR}/*.txt|csv|json")
+    p.add_argument("--calendar", help=f"results calendar CSV (default: {Config.WATCHLIST_DIR}/results_calendar.csv)")
+    p.add_argument("--workers", type=int, default=0, help=f"concurrent names (default {Config.PREWARM_WORKERS})")
+    p.add_argument("--jitter", type=float, default=Config.PREWARM_JITTER_S, help="max random delay (s) before each name")
+    p.add_argument("--force", action="store_true", help="re-scrape fundamentals even if cached (run)")
+    p.add_argument("--format", choices=["json", "text"], default="json", help="NDJSON (default) or text")
+    p.set_defaults(func=cmd_prewarm)
+
+    p = sub.add_parser("archive", parents=[common], help="memory-mapped daily OHLCV archive for the universe")
+    p.add_argument("action", choices=["build", "update", "info"], help="build from scratch, append new days, or report")
+    p.add_argument("universe", nargs="*", metavar="TICKER_OR_FILE",
+                   help="tickers or files with one per line (build; update adds them as new columns)")
+    p.add_argument("--period", default="10y", help="history to load on build (yfinance period)")
+    p.add_argument("--root", default=Config.ARCHIVE_DIR, help="archive folder")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("alerts", parents=[common], help="price alerts on verdict stop / target / buy-zone levels")
+    p.add_argument("action", choices=["import", "add", "list", "check", "watch"],
+                   help="rules from verdict files, one manual rule, list rules, check daily bars, or poll intraday")
+    p.add_argument("items", nargs="*", metavar="ARG", help="import: verdict files (as for backtest); add: TICKER LEVEL")
+    direction = p.add_mutually_exclusive_group()
+    direction.add_argument("--above", action="store_true", help="add: alert when price rises to LEVEL")
+    direction.add_argument("--below", action="store_true", help="add: alert when price falls to LEVEL (default)")
+    p.add_argument("--expires", help="add: last day the rule is active (YYYY-MM-DD)")
+    p.add_argument("--note", help="add: free text carried on the alert")
+    p.add_argument("--interval", default="5m", help="watch: bar size (1m, 2m, 5m, 15m)")
+    p.add_argument("--poll", type=float, default=60.0, help="watch: seconds between polls")
+    p.add_argument("--polls", type=int, default=0, help="watch: stop after this many polls")
+    p.set_defaults(func=cmd_alerts)
+
+    p = sub.add_parser("screen", parents=[common], help="filter every locally stored company by a metrics query")
+    p.add_argument("query", help='e.g. "roce > 20, debt/equity < 0.5, promoter holding up 2 quarters"')
+    p.add_argument("--sort", help="comma-separated columns, - prefix for descending (e.g. --sort=-roce,debt_equity)")
+    p.add_argument("--limit", type=int, help="emit at most this many matches")
+    p.add_argument("--columns", help="extra metrics to include in every match")
+    p.add_argument("--info-dir", default="info_json", help="folder with *_FULL.json scrapes")
+    p.add_argument("--farm-db", default=DEFAULT_FARM_DB, help="scrape farm SQLite db (if present)")
+    p.add_argument("--rebuild", action="store_true", help="recompute every company's metrics")
+    p.set_defaults(func=cmd_screen)
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as exc:
+        return EXIT_OK if exc.code in (0, None) else EXIT_USAGE
+
+    if getattr(args, "ticker", None) and len(args.queries) > 1:
+        print(f"{parser.prog} {args.command}: error: --ticker needs exactly one STOCK", file=sys.stderr)
+        return EXIT_USAGE
+    if getattr(args, "buy_price", 0) and not args.owns:
+        logger.warning("--buy-price ignored without --owns")
+        args.buy_price = 0.0
+
+    needs_llm = not (args.command == "fetch" and args.ticker) and not (args.command == "portfolio" and args.triage_only) \
+        and args.command not in ("screen", "backtest", "intraday", "archive", "alerts") \
+        and not (args.command == "prewarm" and args.action == "status")
+    if needs_llm:
+        try:
+            Config.require_api_key()
+        except EnvironmentError as exc:
+            print(f"{parser.prog} {args.command}: {exc}", file=sys.stderr)
+            return EXIT_CONFIG
+
+    Config.ensure_dirs()
+    out = _Emitter(args.format)
+    try:
+        args.func(args, out)
+    except KeyboardInterrupt:
+        return 130
+    return out.exit_code()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,8 +8,101 @@ load_dotenv()
 class Config:
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     MODEL_NAME = "gemini-2.0-flash"
+    # Point the Gemini client elsewhere (e.g. a local stand-in for load tests)
+    GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None
     OUTPUT_DIR = "outputs"
 
+    # Record/replay of external calls: "off" | "record" | "replay"
+    REPLAY_MODE = os.getenv("FINQUANT_REPLAY", "off").lower()
+    CASSETTE_DIR = os.getenv("FINQUANT_CASSETTE_DIR", "cassettes")
+    # Replay sleeps recorded latency x this factor (0 = instant, 1 = as recorded)
+    REPLAY_LATENCY_SCALE = float(os.getenv("FINQUANT_REPLAY_LATENCY", "0"))
+    if REPLAY_MODE == "replay" and not GOOGLE_API_KEY:
+        GOOGLE_API_KEY = "replay-mode"  # never sent: every LLM call is served from cassettes
+
+    # Shared result caches (src/cache.py); TTLs in seconds
+    CACHE_ENABLED = os.getenv("FINQUANT_CACHE", "1") != "0"
+    CACHE_DIR = os.getenv("FINQUANT_CACHE_DIR", os.path.join(".cache", "finquant"))
+    RESOLVER_CACHE_TTL = float(os.getenv("FINQUANT_RESOLVER_TTL", 7 * 86400))
+    FUNDAMENTALS_CACHE_TTL = float(os.getenv("FINQUANT_FUNDAMENTALS_TTL", 6 * 3600))
+    PRICE_CACHE_TTL = float(os.getenv("FINQUANT_PRICE_TTL", 15 * 60))
+    OHLCV_CACHE_TTL = float(os.getenv("FINQUANT_OHLCV_TTL", 12 * 3600))  # multi-year daily bars (backtests)
+    RECOMMENDATION_CACHE_TTL = float(os.getenv("FINQUANT_RECOMMENDATION_TTL", 3600))
+    PEERS_CACHE_TTL = float(os.getenv("FINQUANT_PEERS_TTL", 86400))  # peer table per industry group
+
+    # Structured JSON verdicts (src/verdict.py): validated, repaired field-by-field, stored as NDJSON
+    STRUCTURED_VERDICTS = os.getenv("FINQUANT_STRUCTURED_VERDICTS", "1") != "0"
+    VERDICT_REPAIR_ATTEMPTS = int(os.getenv("FINQUANT_VERDICT_REPAIRS", "2"))
+    VERDICT_DIR = os.getenv("FINQUANT_VERDICT_DIR", "verdicts")
+
+    # Batched identity resolution (src/tools.py): names per Gemini prompt, re-asks for failed entries,
+    # and an optional local symbol list (NSE EQUITY_L.csv or ticker,name[,screener_name]) checked first
+    RESOLVER_BATCH_SIZE = int(os.getenv("FINQUANT_RESOLVER_BATCH", "25"))
+    RESOLVER_RETRIES = int(os.getenv("FINQUANT_RESOLVER_RETRIES", "2"))
+    SYMBOLS_FILE = os.getenv("FINQUANT_SYMBOLS_FILE", "symbols.csv")
+
+    # Rule-based pre-score (src/scoring.py): at or above this confidence the CLI skips Gemini
+    PRESCORE_CONFIDENCE = float(os.getenv("FINQUANT_PRESCORE_CONFIDENCE", "0.8"))
+
+    # Change detection (src/snapshots.py): reuse the last verdict unless something material moved
+    INCREMENTAL = os.getenv("FINQUANT_INCREMENTAL", "0") == "1"
+    SNAPSHOT_DIR = os.getenv("FINQUANT_SNAPSHOT_DIR", "snapshots")
+    SNAPSHOT_ATR_MULT = float(os.getenv("FINQUANT_SNAPSHOT_ATR_MULT", "1.5"))  # price move, in ATRs
+    SNAPSHOT_HOLDING_PP = float(os.getenv("FINQUANT_SNAPSHOT_HOLDING_PP", "1.0"))  # shareholding, % points
+    SNAPSHOT_MAX_AGE_DAYS = int(os.getenv("FINQUANT_SNAPSHOT_MAX_AGE_DAYS", "30"))
+
+    # Post-close cache pre-warming for watchlists (src/prewarm.py)
+    MARKET_TZ = os.getenv("FINQUANT_MARKET_TZ", "Asia/Kolkata")
+    MARKET_OPEN = os.getenv("FINQUANT_MARKET_OPEN", "09:15")
+    MARKET_CLOSE = os.getenv("FINQUANT_MARKET_CLOSE", "15:30")
+    PREWARM_AT = os.getenv("FINQUANT_PREWARM_AT", "16:15")
+    WATCHLIST_DIR = os.getenv("FINQUANT_WATCHLIST_DIR", "watchlists")
+    PREWARM_WORKERS = int(os.getenv("FINQUANT_PREWARM_WORKERS", "2"))  # one Chrome each on a cold scrape
+    PREWARM_JITTER_S = float(os.getenv("FINQUANT_PREWARM_JITTER", "20"))  # random delay before each name
+    PREWARM_POLL_S = float(os.getenv("FINQUANT_PREWARM_POLL", "900"))  # results-calendar check interval
+    PREWARM_RESULTS_DELAY_MIN = float(os.getenv("FINQUANT_PREWARM_RESULTS_DELAY", "60"))  # let Screener update
+
+    # Memory-mapped daily OHLCV archive for the universe (src/archive.py)
+    ARCHIVE_DIR = os.getenv("FINQUANT_ARCHIVE_DIR", "price_archive")
+
+    # Price alerts on verdict stop / target levels (src/alerts.py)
+    ALERTS_DIR = os.getenv("FINQUANT_ALERTS_DIR", "alerts")
+    ALERT_COOLDOWN_S = float(os.getenv("FINQUANT_ALERT_COOLDOWN", 24 * 3600))  # per ticker / direction / level
+    ALERT_WEBHOOK = os.getenv("FINQUANT_ALERT_WEBHOOK", "")  # optional URL each alert is POSTed to
+
+    # Peer comparison (src/peers.py)
+    PEER_WORKERS = int(os.getenv("FINQUANT_PEER_WORKERS", "8"))  # concurrent peer price fetches
+    PEERS_IN_PROMPT = int(os.getenv("FINQUANT_PEERS_IN_PROMPT", "6"))  # largest peers listed by name
+
+    # VaR / CVaR risk engine (src/risk.py)
+    RISK_PERIOD = os.getenv("FINQUANT_RISK_PERIOD", "2y")  # yfinance history fetched per ticker
+    RISK_LOOKBACK = int(os.getenv("FINQUANT_RISK_LOOKBACK", "500"))  # trading days of returns used
+    RISK_PATHS = int(os.getenv("FINQUANT_RISK_PATHS", "100000"))
+    RISK_METHOD = os.getenv("FINQUANT_RISK_METHOD", "bootstrap")  # bootstrap | normal | t
+    RISK_T_DOF = float(os.getenv("FINQUANT_RISK_T_DOF", "5"))
+    RISK_SEED = int(os.getenv("FINQUANT_RISK_SEED", "42"))
+
+    # Portfolio triage (src/portfolio.py): drawdown from the highest close since buy_date, looking back at most
+    # this yfinance period (defaults to RISK_PERIOD, so the risk engine reuses the same OHLCV cache entry)
+    PORTFOLIO_PEAK_PERIOD = os.getenv("FINQUANT_PORTFOLIO_PEAK_PERIOD", RISK_PERIOD)
+
+    # Resilience (src/resilience.py): per-dependency circuit breakers, timeouts, stale-cache fallback
+    BREAKER_FAILURES = int(os.getenv("FINQUANT_BREAKER_FAILURES", "5"))  # consecutive failures → open
+    BREAKER_RESET_S = float(os.getenv("FINQUANT_BREAKER_RESET", "60"))  # open → half-open probe after
+    STALE_MAX_AGE_S = float(os.getenv("FINQUANT_STALE_MAX_AGE", 7 * 86400))  # oldest cached value served on failure
+    YAHOO_TIMEOUT_S = float(os.getenv("FINQUANT_YAHOO_TIMEOUT", "10"))
+    LLM_TIMEOUT_S = float(os.getenv("FINQUANT_LLM_TIMEOUT", "60"))  # per Gemini attempt
+    # Seconds the Screener scrape gets before yfinance fundamentals are raced against it (0 = never)
+    FUNDAMENTALS_HEDGE_S = float(os.getenv("FINQUANT_FUNDAMENTALS_HEDGE", "8"))
+
+    # HTTP service (src/service.py)
+    SERVICE_HOST = os.getenv("FINQUANT_HOST", "127.0.0.1")
+    SERVICE_PORT = int(os.getenv("FINQUANT_PORT", "8000"))
+    SCRAPE_WORKERS = int(os.getenv("FINQUANT_SCRAPE_WORKERS", "2"))  # one Chrome each
+    IO_WORKERS = int(os.getenv("FINQUANT_IO_WORKERS", "8"))  # yfinance + Gemini calls
+    MAX_QUEUED = int(os.getenv("FINQUANT_MAX_QUEUED", "16"))  # per pool, beyond busy workers
+    REQUEST_TIMEOUT_S = float(os.getenv("FINQUANT_REQUEST_TIMEOUT", "120"))
+
     @staticmethod
     def ensure_dirs():
         if not os.path.exists(Config.OUTPUT_DIR):
@@ -0,0 +1,315 @@
+# src/intraday.py
+"""
+Intraday streaming mode: poll 1m/5m bars and keep indicators up to date in
+O(1) per bar.
+
+    python main.py intraday TCS.NS INFY.NS --interval 5m --poll 60
+
+Per ticker, `RollingIndicators` holds:
+
+    mean / std      windowed Welford over the last ``window`` closes (add + remove)
+    high / low      rolling extremes over the same window (monotonic deques)
+    ema_fast/slow   exponential moving averages of the close
+    rsi             Wilder RSI
+    atr             Wilder ATR of the true range
+    vwap            session VWAP (resets when the trading date changes)
+
+Every update touches a fixed number of values, so a snapshot never
+re-scans history. `snapshot()` returns the same keys the daily technical
+report reads (ticker, today_date, today_open, stats), so
+`tools._calculate_volatility_report` can render straight from the state.
+
+`IntradayStream` polls yfinance (through the cassettes) and only feeds
+completed bars: the newest bar of each poll is still forming and is picked
+up on the next poll.
+"""
+import math
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from src.config import Config
+from src.metrics import incr, timed
+
+logger = project_logger.getChild("intraday")
+
+INTERVALS = {"1m": "1d", "2m": "1d", "5m": "5d", "15m": "5d"}  # bar size → yfinance period per poll
+DEFAULT_WINDOW = 30
+EMA_FAST, EMA_SLOW = 12, 26
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+
+
+class RollingIndicators:
+    """Constant-time indicator state for one ticker's bar stream."""
+
+    def __init__(self, ticker: str, window: int = DEFAULT_WINDOW):
+        self.ticker = ticker
+        self.window = window
+        self.bars = 0
+        self.last_ts = None
+        self.last_close = None
+        self.session = None
+        self.session_open = None
+        self.session_high = -math.inf
+        self.session_low = math.inf
+
+        # windowed Welford
+        self._closes: deque = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        # rolling extremes: (index, value), values monotonic
+        self._max_q: deque = deque()
+        self._min_q: deque = deque()
+
+        self.ema_fast = None
+        self.ema_slow = None
+        self._avg_gain = self._avg_loss = None
+        self._seed_gain = self._seed_loss = 0.0
+        self.atr = None
+        self._seed_tr = 0.0
+        self._pv = 0.0
+        self._volume = 0.0
+
+    # ------------------------------------------------------------------ #
+    def update(self, ts, open_: float, high: float, low: float, close: float, volume: float = 0.0) -> bool:
+        """Consume one completed bar; returns False for a duplicate / out-of-order bar."""
+        if self.last_ts is not None and ts <= self.last_ts:
+            return False
+        session = ts.date() if hasattr(ts, "date") else ts
+        if session != self.session:
+            self.session = session
+            self.session_open = open_
+            self.session_high, self.session_low = high, low
+            self._pv = self._volume = 0.0
+        else:
+            self.session_high = max(self.session_high, high)
+            self.session_low = min(self.session_low, low)
+
+        self._push_close(close)
+        self._push_extremes(high, low)
+        self._update_ema(close)
+        prev_close = self.last_close
+        if prev_close is not None:
+            self._update_rsi(close - prev_close)
+        self._update_atr(high, low, prev_close)
+
+        typical = (high + low + close) / 3
+        self._pv += typical * volume
+        self._volume += volume
+
+        self.bars += 1
+        self.last_ts = ts
+        self.last_close = close
+        return True
+
+    def _push_close(self, close: float):
+        self._closes.append(close)
+        n = len(self._closes)
+        delta = close - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (close - self._mean)
+        if n > self.window:
+            old = self._closes.popleft()
+            n -= 1
+            delta = old - self._mean
+            self._mean -= delta / n
+            self._m2 -= delta * (old - self._mean)
+            self._m2 = max(self._m2, 0.0)  # rounding drift
+
+    def _push_extremes(self, high: float, low: float):
+        i = self.bars
+        while self._max_q and self._max_q[-1][1] <= high:
+            self._max_q.pop()
+        self._max_q.append((i, high))
+        while self._min_q and self._min_q[-1][1] >= low:
+            self._min_q.pop()
+        self._min_q.append((i, low))
+        for q in (self._max_q, self._min_q):
+            if q[0][0] <= i - self.window:
+                q.popleft()
+
+    def _update_ema(self, close: float):
+        for name, span in (("ema_fast", EMA_FAST), ("ema_slow", EMA_SLOW)):
+            previous = getattr(self, name)
+            alpha = 2 / (span + 1)
+            setattr(self, name, close if previous is None else previous + alpha * (close - previous))
+
+    def _update_rsi(self, change: float):
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self._avg_gain is None:
+            self._seed_gain += gain
+            self._seed_loss += loss
+            if self.bars == RSI_PERIOD:  # first RSI_PERIOD changes seed a simple average
+                self._avg_gain = self._seed_gain / RSI_PERIOD
+                self._avg_loss = self._seed_loss / RSI_PERIOD
+            return
+        self._avg_gain = (self._avg_gain * (RSI_PERIOD - 1) + gain) / RSI_PERIOD
+        self._avg_loss = (self._avg_loss * (RSI_PERIOD - 1) + loss) / RSI_PERIOD
+
+    def _update_atr(self, high: float, low: float, prev_close: Optional[float]):
+        tr = high - low if prev_close is None else max(high - low, abs(high - prev_close), abs(low - prev_close))
+        if self.atr is None:
+            self._seed_tr += tr
+            if self.bars + 1 == ATR_PERIOD:
+                self.atr = self._seed_tr / ATR_PERIOD
+            return
+        self.atr = (self.atr * (ATR_PERIOD - 1) + tr) / ATR_PERIOD
+
+    # ------------------------------------------------------------------ #
+    @property
+    def rsi(self) -> Optional[float]:
+        if self._avg_gain is None:
+            return None
+        if self._avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self._avg_gain / self._avg_loss)
+
+    @property
+    def std(self) -> Optional[float]:
+        n = len(self._closes)
+        return math.sqrt(self._m2 / (n - 1)) if n > 1 else None
+
+    def snapshot(self) -> Dict[str, object]:
+        """Current state in the shape `_calculate_volatility_report` understands."""
+        def r(value):
+            return None if value is None else round(value, 4)
+
+        ts = self.last_ts
+        return {
+            "ticker": self.ticker,
+            "as_of": ts.isoformat() if hasattr(ts, "isoformat") else ts,
+            "today_date": ts.strftime("%d-%m-%Y") if hasattr(ts, "strftime") else str(ts),
+            "today_open": r(self.session_open),
+            "last": r(self.last_close),
+            "bars": self.bars,
+            "stats": {
+                "window": len(self._closes),
+                "mean": r(self._mean if self._closes else None),
+                "std": r(self.std),
+                "high": r(self._max_q[0][1] if self._max_q else None),
+                "low": r(self._min_q[0][1] if self._min_q else None),
+            },
+            "indicators": {
+                "ema_fast": r(self.ema_fast),
+                "ema_slow": r(self.ema_slow),
+                "rsi": r(self.rsi),
+                "atr": r(self.atr),
+                "vwap": r(self._pv / self._volume if self._volume else None),
+                "session_high": r(self.session_high if self.session is not None else None),
+                "session_low": r(self.session_low if self.session is not None else None),
+            },
+            "currency": "INR",
+        }
+
+
+class IntradayStream:
+    """Polls intraday bars for several tickers and feeds new, completed bars to their state."""
+
+    def __init__(self, tickers: Iterable[str], interval: str = "5m", window: int = DEFAULT_WINDOW,
+                 workers: int = 4, fetch: Optional[Callable[[str, str], List[tuple]]] = None):
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval {interval!r}; use one of {', '.join(INTERVALS)}")
+        from src.tools import _ensure_suffix
+
+        self.interval = interval
+        self.states = {t: RollingIndicators(t, window) for t in (_ensure_suffix(t.strip()) for t in tickers)}
+        self.workers = workers
+        self.fetch = fetch or fetch_intraday_bars
+
+    def feed(self, ticker: str, bars: List[tuple]) -> int:
+        """Feed ``(ts, open, high, low, close, volume)`` rows (oldest first); returns how many were new."""
+        state = self.states[ticker]
+        return sum(state.update(*bar) for bar in bars)
+
+    @timed("intraday.poll")
+    def poll_once(self) -> List[Dict[str, object]]:
+        """One poll of every ticker; snapshots of those that received new bars (errors as dicts)."""
+        def one(ticker):
+            try:
+                bars = self.fetch(ticker, self.interval)[:-1]  # newest bar is still forming
+                fresh = self.feed(ticker, bars)
+                incr("intraday_bars", fresh)
+                return self.states[ticker].snapshot() if fresh else None
+            except Exception as exc:
+                return {"ticker": ticker, "error": str(exc) or type(exc).__name__}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(self.states))),
+                                thread_name_prefix="finquant-intraday") as pool:
+            return [s for s in pool.map(one, list(self.states)) if s]
+
+    def run(self, on_snapshot: Callable[[Dict[str, object]], None], poll_s: float = 60.0,
+            stop: Optional[threading.Event] = None, max_polls: Optional[int] = None):
+        stop = stop or threading.Event()
+        polls = 0
+        while not stop.is_set() and (max_polls is None or polls < max_polls):
+            for snap in self.poll_once():
+                on_snapshot(snap)
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                stop.wait(poll_s)
+
+
+def fetch_intraday_bars(ticker: str, interval: str = "5m") -> List[tuple]:
+    """Recent ``(ts, open, high, low, close, volume)`` bars, oldest first (via cassettes)."""
+    import pandas as pd
+    import yfinance as yf
+    from src import resilience
+    from src.replay import cassettes
+
+    def live():
+        hist = yf.Ticker(ticker).history(period=INTERVALS[interval], interval=interval,
+                                         timeout=resilience.budget(Config.YAHOO_TIMEOUT_S))
+        return [[ts.isoformat(), *map(float, row)] for ts, row in
+                zip(hist.index, hist[["Open", "High", "Low", "Close", "Volume"]].itertuples(index=False))]
+
+    rows = cassettes.call("yahoo", {"ticker": ticker, "period": INTERVALS[interval], "interval": interval},
+                           lambda: resilience.call("yahoo", live))
+    return [(pd.Timestamp(ts), *values) for ts, *values in rows]
+
+
+if __name__ == "__main__":
+    # Synthetic stream: incremental state must match a from-scratch pandas computation
+    import time
+
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(3)
+    n = 2000
+    index = pd.date_range("2024-11-25 09:15", periods=n, freq="5min", tz="Asia/Kolkata")
+    close = 500 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.001, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.001, n)))
+    volume = rng.integers(1_000, 50_000, n).astype(float)
+
+    state = RollingIndicators("SYNTH.NS")
+    began = time.perf_counter()
+    for bar in zip(index, open_, high, low, close, volume):
+        state.update(*bar)
+    per_bar_us = (time.perf_counter() - began) / n * 1e6
+    snap = state.snapshot()
+
+    frame = pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=index)
+    tail = frame["close"].iloc[-DEFAULT_WINDOW:]
+    session = frame[frame.index.date == index[-1].date()]
+    typical = (session["high"] + session["low"] + session["close"]) / 3
+    expected = {
+        "mean": tail.mean(), "std": tail.std(), "high": frame["high"].iloc[-DEFAULT_WINDOW:].max(),
+        "low": frame["low"].iloc[-DEFAULT_WINDOW:].min(),
+        "ema_fast": frame["close"].ewm(span=EMA_FAST, adjust=False).mean().iloc[-1],
+        "vwap": (typical * session["volume"]).sum() / session["volume"].sum(),
+    }
+    got = {**snap["stats"], **snap["indicators"]}
+    for key, value in expected.items():
+        print(f"{key:9s} incremental {got[key]:12.4f}  batch {value:12.4f}")
+    print(f"rsi {got['rsi']:.2f}  atr {got['atr']:.4f}  | {per_bar_us:.1f} µs per bar")
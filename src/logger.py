@@ -1,17 +1,126 @@
 # src/logger.py
+import atexit
+import copy
+import itertools
+import json
 import logging
+import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 # --------------------------------------------------------------------------- #
 # Centralized Logger Configuration (used across the entire project)
+#
+# Hot-path calls only enqueue the record (QueueHandler); a background
+# QueueListener thread does the console/file I/O. Context fields such as
+# run_id / ticker are captured at the call site and travel with the record.
 # --------------------------------------------------------------------------- #
 
+_log_context: ContextVar[dict] = ContextVar("finquant_log_context", default={})
+_listeners: list = []
+
+
+def set_log_context(**fields) -> None:
+    """Attach fields (run_id, ticker, worker, ...) to every later log line in this context.
+
+    Passing ``None`` for a field removes it.
+    """
+    merged = dict(_log_context.get())
+    for key, value in fields.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    _log_context.set(merged)
+
+
+def get_log_context() -> dict:
+    return dict(_log_context.get())
+
+
+class _ContextFilter(logging.Filter):
+    """Copies the caller's context onto the record before it leaves the thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        record.context = context
+        record.context_text = (" | " + " ".join(f"{k}={v}" for k, v in context.items())) if context else ""
+        return True
+
+
+class _DebugSampler(logging.Filter):
+    """Keep 1 in ``every`` DEBUG records per call site; other levels always pass."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counters: dict = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = itertools.count()
+        return next(counter) % self.every == 0
+
+
+class _RecordQueueHandler(QueueHandler):
+    """QueueHandler that keeps the traceback out of the message.
+
+    The stock ``prepare`` formats the traceback into ``msg`` and clears
+    ``exc_info`` / ``exc_text``; here it is rendered into ``exc_text`` instead
+    (frames stay behind), so text sinks still print it after the message and
+    JSON lines keep a separate ``exc`` field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, location, message + context fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": f"{record.filename}:{record.lineno}",
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _stop_listeners():
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(_stop_listeners)
+
+
 def get_logger(
     name: str | None = None,
     log_level: str = "INFO",
     log_file: str | Path | None = None,
+    log_format: str | None = None,
+    debug_sample_every: int | None = None,
 ) -> logging.Logger:
     """
     Returns a configured logger that logs to both console and file (optional).
@@ -20,29 +129,40 @@ def get_logger(
         name (str, optional): Name of the logger (usually __name__). Defaults to root.
         log_level (str): Logging level: DEBUG, INFO, WARNING, ERROR, CRITICAL
         log_file (str | Path | None): Path to log file. If None, logs only to console.
+        log_format (str | None): "text" or "json" (JSON lines). Defaults to $FINQUANT_LOG_FORMAT or "text".
+        debug_sample_every (int | None): Keep 1 in N DEBUG lines per call site.
+            Defaults to $FINQUANT_LOG_DEBUG_SAMPLE or 1 (no sampling).
 
     Returns:
         logging.Logger: Configured logger instance
     """
     logger = logging.getLogger(name or "GeminiRetailAgent")
-    
+
     # Prevent adding handlers multiple times (important when importing in many modules)
     if logger.handlers:
         return logger
 
-    logger.setLevel(getattr(logging, log_level.upper()))
+    level = getattr(logging, log_level.upper())
+    logger.setLevel(level)
+    log_format = (log_format or os.getenv("FINQUANT_LOG_FORMAT", "text")).lower()
+    if debug_sample_every is None:
+        debug_sample_every = int(os.getenv("FINQUANT_LOG_DEBUG_SAMPLE", "1"))
 
     # Formatter (professional look)
-    formatter = logging.Formatter(
-        fmt="%(asctime)s | %(name)s | %(levelname)8s | %(filename)s:%(lineno)d | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-
-    # Console Handler (with colors on Windows/macOS/Linux)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, log_level.upper()))
+    if log_format == "json":
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter(
+            fmt="%(asctime)s | %(name)s | %(levelname)8s | %(filename)s:%(lineno)d | %(message)s%(context_text)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
+
+    # Console Handler (FINQUANT_LOG_STREAM=stderr when stdout carries data, e.g. NDJSON)
+    console_stream = sys.stderr if os.getenv("FINQUANT_LOG_STREAM", "stdout").lower() == "stderr" else sys.stdout
+    console_handler = logging.StreamHandler(console_stream)
+    console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    sinks = [console_handler]
 
     # Optional File Handler with rotation (max 5MB, keep 5 backups)
     if log_file:
@@ -55,15 +175,29 @@ def get_logger(
             backupCount=5,
             encoding="utf-8"
         )
-        file_handler.setLevel(getattr(logging, log_level.upper()))
+        file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        sinks.append(file_handler)
+
+    # Non-blocking front: callers only enqueue, the listener thread writes
+    record_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _RecordQueueHandler(record_queue)
+    queue_handler.setLevel(level)
+    queue_handler.addFilter(_DebugSampler(debug_sample_every))
+    queue_handler.addFilter(_ContextFilter())
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    listener = QueueListener(record_queue, *sinks, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
 
     return logger
 
 
 # --------------------------------------------------------------------------- #
 # Default project logger (most modules will just do: from logger import logger)
+# Sub-components log through children, e.g. logger.getChild("scraper").
 # --------------------------------------------------------------------------- #
 
 # This is the logger you'll import everywhere
@@ -72,6 +206,3 @@ logger = get_logger(
     log_level="INFO",
     log_file="logs/app.log"   # Creates logs/app.log automatically
 )
-
-# Create logs directory on import
-Path("logs").mkdir(exist_ok=True)
\ No newline at end of file
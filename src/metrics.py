@@ -0,0 +1,299 @@
+# src/metrics.py
+"""
+Lightweight stage timing + counters for FinQuant.
+
+    from src.metrics import span, timed, incr
+
+    @timed("market.fetch")
+    def _fetch_market_data_raw(...): ...
+
+    with span("llm.recommendation", ticker=ticker):
+        response = llm.invoke(...)
+    incr("llm.tokens", 812, kind="output")
+
+Disabled by default (set FINQUANT_METRICS=1 or call `enable()`). When disabled
+`span` returns a shared no-op context manager and `timed` adds one attribute
+check per call, so instrumented code pays close to nothing.
+
+When enabled every span lands in a per-run trace (Chrome trace-event JSON,
+viewable in chrome://tracing or Perfetto) and in a per-stage duration
+histogram; both export as JSON / Prometheus text. The trace keeps the most
+recent FINQUANT_METRICS_TRACE_EVENTS spans, so a long-lived process (the
+HTTP service) stays bounded even if it never calls `start_run`.
+"""
+import functools
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+DEFAULT_METRICS_DIR = os.getenv("FINQUANT_METRICS_DIR", "metrics")
+
+# Prometheus-style upper bounds (seconds); scrapes/LLM calls sit in the 1-60s range
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+# Recent raw durations kept per stage for exact percentiles
+SAMPLE_WINDOW = 10_000
+# Most recent spans kept in the trace; older ones are dropped
+TRACE_EVENTS = int(os.getenv("FINQUANT_METRICS_TRACE_EVENTS", "50000"))
+
+_NOOP = nullcontext()
+_current_span: ContextVar[Optional["_Span"]] = ContextVar("finquant_span", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count", "min", "max", "samples")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self.min = float("inf")
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        """Nearest-rank quantile over the most recent `SAMPLE_WINDOW` observations."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum_s": round(self.total, 6),
+            "mean_s": round(self.total / self.count, 6) if self.count else 0.0,
+            "min_s": round(self.min, 6) if self.count else 0.0,
+            "max_s": round(self.max, 6),
+            "p50_s": round(self.quantile(0.50), 6),
+            "p95_s": round(self.quantile(0.95), 6),
+            "p99_s": round(self.quantile(0.99), 6),
+        }
+
+
+class _Registry:
+    def __init__(self):
+        self.enabled = os.getenv("FINQUANT_METRICS", "0").lower() in {"1", "true", "yes", "on"}
+        self.lock = threading.Lock()
+        self.run_id = uuid.uuid4().hex[:12]
+        self.histograms: Dict[str, _Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.events: deque = deque(maxlen=TRACE_EVENTS)
+        self.epoch = time.perf_counter()
+
+    def record_span(self, name: str, start: float, duration: float, attrs: Dict, parent: Optional[str], span_id: str):
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = _Histogram()
+            hist.observe(duration)
+            self.events.append({
+                "name": name,
+                "ph": "X",
+                "ts": round((start - self.epoch) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {**attrs, "span_id": span_id, "parent_id": parent, "run_id": self.run_id},
+            })
+
+
+_registry = _Registry()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "span_id", "parent", "start", "_token")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.name = name
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent = None
+        self.start = 0.0
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent = parent.span_id if parent else None
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _registry.record_span(self.name, self.start, duration, self.attrs, self.parent, self.span_id)
+        return False
+
+
+# --------------------------------------------------------------------------- #
+# Public API
+# --------------------------------------------------------------------------- #
+
+def enable():
+    _registry.enabled = True
+
+
+def disable():
+    _registry.enabled = False
+
+
+def is_enabled() -> bool:
+    return _registry.enabled
+
+
+def start_run(run_id: Optional[str] = None) -> str:
+    """Begin a fresh trace (histograms and counters keep accumulating)."""
+    with _registry.lock:
+        _registry.run_id = run_id or uuid.uuid4().hex[:12]
+        _registry.events = deque(maxlen=TRACE_EVENTS)
+        _registry.epoch = time.perf_counter()
+    return _registry.run_id
+
+
+def reset():
+    """Drop everything recorded so far (traces, histograms, counters)."""
+    with _registry.lock:
+        _registry.histograms.clear()
+        _registry.counters.clear()
+        _registry.events = deque(maxlen=TRACE_EVENTS)
+        _registry.epoch = time.perf_counter()
+
+
+def span(name: str, **attrs):
+    """Time a block as stage ``name``. No-op when metrics are disabled."""
+    if not _registry.enabled:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def timed(name: str):
+    """Decorator form of `span`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _registry.enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def incr(name: str, value: float = 1, **labels):
+    """Add ``value`` to counter ``name`` (e.g. cache hits, retries, tokens)."""
+    if not _registry.enabled:
+        return
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _registry.lock:
+        _registry.counters[key] = _registry.counters.get(key, 0) + value
+
+
+def record_llm_usage(response, stage: str):
+    """Count input/output tokens from a LangChain chat response, if it reports them."""
+    if not _registry.enabled:
+        return
+    usage = getattr(response, "usage_metadata", None) or {}
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            incr("llm_tokens", usage[kind], stage=stage, kind=kind.split("_")[0])
+    incr("llm_calls", 1, stage=stage)
+
+
+def snapshot() -> Dict:
+    """Histograms summaries + counters as plain dicts."""
+    with _registry.lock:
+        return {
+            "run_id": _registry.run_id,
+            "stages": {name: hist.summary() for name, hist in sorted(_registry.histograms.items())},
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(_registry.counters.items())
+            ],
+        }
+
+
+def _prom_name(name: str) -> str:
+    return "finquant_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _prom_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def export_prometheus() -> str:
+    """Prometheus text exposition format (histograms per stage + counters)."""
+    lines = [
+        "# HELP finquant_stage_duration_seconds Duration of instrumented pipeline stages.",
+        "# TYPE finquant_stage_duration_seconds histogram",
+    ]
+    with _registry.lock:
+        for stage, hist in sorted(_registry.histograms.items()):
+            running = 0
+            for bound, n in zip(hist.buckets, hist.counts):
+                running += n
+                lines.append(f'finquant_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {running}')
+            lines.append(f'finquant_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+            lines.append(f'finquant_stage_duration_seconds_sum{{stage="{stage}"}} {hist.total:.6f}')
+            lines.append(f'finquant_stage_duration_seconds_count{{stage="{stage}"}} {hist.count}')
+
+        seen = set()
+        for (name, labels), value in sorted(_registry.counters.items()):
+            metric = _prom_name(name) + "_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{_prom_labels(dict(labels))} {float(value)!r}")
+    return "\n".join(lines) + "\n"
+
+
+def export_trace() -> Dict:
+    """Current run as a Chrome trace-event document."""
+    with _registry.lock:
+        return {
+            "traceEvents": list(_registry.events),
+            "displayTimeUnit": "ms",
+            "otherData": {"run_id": _registry.run_id},
+        }
+
+
+def write_exports(folder: str = DEFAULT_METRICS_DIR) -> Dict[str, str]:
+    """Write ``trace_<run_id>.json`` and ``metrics.prom``; returns their paths."""
+    if not _registry.enabled:
+        return {}
+    os.makedirs(folder, exist_ok=True)
+    trace_path = os.path.join(folder, f"trace_{_registry.run_id}.json")
+    prom_path = os.path.join(folder, "metrics.prom")
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump(export_trace(), f)
+    with open(prom_path, "w", encoding="utf-8") as f:
+        f.write(export_prometheus())
+    return {"trace": trace_path, "prometheus": prom_path}
@@ -8,6 +8,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from src.config import Config
+from src.metrics import record_llm_usage, span
+from src.replay import wrap_chat_model
 from src.tools import COMPLEX_TOOLS
 from src.state import AgentState
 from logger import logger
@@ -19,13 +21,15 @@ try:
     if model_name in ["gemini-1.5-flash", "gemini-1.5-pro"]:
         model_name = model_name + "-latest"
 
-    llm = ChatGoogleGenerativeAI(
+    llm = wrap_chat_model(ChatGoogleGenerativeAI(
         model=model_name,
         temperature=0.0,
         google_api_key=Config.GOOGLE_API_KEY,
+        base_url=Config.GEMINI_BASE_URL,
         convert_system_message_to_human=True,
-        max_retries=3
-    )
+        max_retries=3,
+        timeout=Config.LLM_TIMEOUT_S,
+    ), "agent")
     logger.info(f"Gemini LLM initialized → {model_name}")
 
     llm_with_tools = llm.bind_tools(COMPLEX_TOOLS)
@@ -50,7 +54,9 @@ After getting tool data, analyze it and give specific buy/hold/sell advice with
     enhanced_messages = [system_message] + state["messages"]
     
     try:
-        response = llm_with_tools.invoke(enhanced_messages)
+        with span("llm.agent", messages=len(enhanced_messages)):
+            response = llm_with_tools.invoke(enhanced_messages)
+        record_llm_usage(response, "agent")
         logger.info("Gemini responded")
         
         if hasattr(response, "tool_calls") and response.tool_calls:
@@ -0,0 +1,284 @@
+# src/peers.py
+"""
+Peer-group relative valuation.
+
+Screener's "Peer comparison" table (`ScreenerScraper._extract_peers`)
+lists the industry's companies with CMP, P/E, market cap, dividend yield,
+latest-quarter profit / sales and their YoY change, and ROCE. This turns
+it into a peers x metrics matrix and adds each peer's 1-month return and
+volatility from the shared price cache, fetched concurrently. It then
+ranks the company against its peers in one vectorized pass: percentile,
+z-score and peer median for every metric.
+
+    block = peer_block(data, "TCS.NS", fetch_prices)   # payload["peers"]
+    print(render_peer_block(block))                     # the prompt section
+
+The table is cached per peer group (Screener's industry link) with a
+ticker → group index. Every stock in the group reuses it, including a
+payload whose fundamentals came from the yfinance hedge (no peer table).
+"""
+import hashlib
+import math
+import os
+import re
+import sys
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from src.cache import peers_cache
+from src.config import Config
+from src.metrics import incr, timed
+
+logger = project_logger.getChild("peers")
+
+# metric → (Screener column aliases, label, higher is better; None = neither)
+TABLE_METRICS = {
+    "pe": (("P/E",), "P/E", False),
+    "roce": (("ROCE %", "ROCE"), "ROCE %", True),
+    "profit_growth": (("Qtr Profit Var %",), "Qtr profit YoY %", True),
+    "sales_growth": (("Qtr Sales Var %",), "Qtr sales YoY %", True),
+    "div_yield": (("Div Yld %",), "Div yield %", True),
+    "market_cap": (("Mar Cap Rs.Cr.", "Mar Cap Rs. Cr."), "Mkt cap ₹Cr", None),
+}
+PRICE_METRICS = {
+    "return_1m": ("1M return %", True),
+    "volatility": ("Volatility % (ann.)", False),
+}
+METRICS = list(TABLE_METRICS) + list(PRICE_METRICS)
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"[\s.]", "", str(text)).lower()
+
+
+def _slug(url: Optional[str]) -> Optional[str]:
+    match = re.search(r"/company/([^/]+)/", url or "")
+    return match.group(1).upper() if match else None
+
+
+def peer_ticker(url: Optional[str]) -> Optional[str]:
+    """yfinance ticker for a Screener company link (BSE codes → .BO, symbols → .NS)."""
+    slug = _slug(url)
+    if not slug:
+        return None
+    return f"{slug}.BO" if slug.isdigit() else f"{slug}.NS"
+
+
+def _base(ticker: str) -> str:
+    return ticker.upper().rsplit(".", 1)[0]
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def group_key(table: Dict[str, Any]) -> str:
+    """Screener's most specific group link, else a hash of the member list."""
+    links = [g.get("url") for g in table.get("group") or [] if g.get("url")]
+    if links:
+        return "group:" + re.sub(r"^https?://[^/]+", "", links[-1])
+    members = ",".join(sorted(filter(None, (peer_ticker(r.get("url")) for r in table["rows"]))))
+    return "group:" + hashlib.sha1(members.encode("utf-8")).hexdigest()[:16]
+
+
+def _peer_table(data: Dict[str, Any], ticker: str) -> Optional[Dict[str, Any]]:
+    """This scrape's peer table (cached for the group), or the cached one of the ticker's group."""
+    table = data.get("peers") or {}
+    if table.get("rows"):
+        key = group_key(table)
+        peers_cache.set(key, table)
+        members = {peer_ticker(r.get("url")) for r in table["rows"]} | {ticker}
+        for member in filter(None, members):
+            peers_cache.set(f"member:{member}", key)
+        return table
+    key = peers_cache.get(f"member:{ticker}")
+    table = peers_cache.get(key) if key else None
+    if table:
+        incr("peer_group_reused")
+    return table
+
+
+def _price_stats(histories: List[Optional[Dict[str, Any]]]) -> np.ndarray:
+    """(n, 2) matrix of 1-month return % and annualised volatility %, NaN where no prices."""
+    length = max((len(h["price"]) for h in histories if h), default=0)
+    prices = np.full((len(histories), max(length, 2)), np.nan)
+    for i, history in enumerate(histories):
+        if history and history.get("price"):
+            series = np.asarray(history["price"], dtype="float64")
+            prices[i, -len(series):] = series  # right-aligned: last column is the latest close
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        first = np.take_along_axis(prices, np.argmax(~np.isnan(prices), axis=1)[:, None], axis=1)[:, 0]
+        returns = (prices[:, -1] / first - 1) * 100
+        log_returns = np.diff(np.log(prices), axis=1)
+        volatility = np.nanstd(log_returns, axis=1, ddof=1) * math.sqrt(252) * 100
+    return np.column_stack([returns, volatility])
+
+
+def fetch_peer_prices(tickers: List[Optional[str]], fetch_prices: Callable[[str], Dict],
+                      workers: int = Config.PEER_WORKERS) -> List[Optional[Dict]]:
+    """Price history per ticker (None if unknown or failed), fetched concurrently."""
+    def one(ticker):
+        if not ticker:
+            return None
+        try:
+            return fetch_prices(ticker)
+        except Exception as exc:
+            logger.warning(f"Peer prices unavailable for {ticker}: {exc}")
+            return None
+
+    if not tickers:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers))), thread_name_prefix="finquant-peers") as pool:
+        futures = [pool.submit(copy_context().run, one, t) for t in tickers]
+        return [f.result() for f in futures]
+
+
+def relative_metrics(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Every peer against the rest of the group, per column, in one pass:
+    ``percentile`` (0-100, share of other peers with a lower value, ties
+    half), ``z`` (vs group mean and std) and the group ``median``.
+    """
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        valid = ~np.isnan(matrix)
+        others = valid.sum(axis=0) - 1
+        below = (matrix[None, :, :] < matrix[:, None, :]).sum(axis=1)
+        ties = (matrix[None, :, :] == matrix[:, None, :]).sum(axis=1) - 1
+        percentile = np.where(valid & (others > 0), (below + 0.5 * ties) / np.maximum(others, 1) * 100, np.nan)
+        mean = np.nanmean(matrix, axis=0)
+        std = np.nanstd(matrix, axis=0)
+        z = (matrix - mean) / np.where(std > 0, std, np.nan)
+        median = np.nanmedian(matrix, axis=0)
+    return {"percentile": percentile, "z": z, "median": median}
+
+
+def _round(value: float, digits: int = 2) -> Optional[float]:
+    return None if value is None or math.isnan(value) else round(float(value), digits)
+
+
+def _target_row(rows: List[Dict], ticker: str, data: Dict[str, Any]) -> Optional[int]:
+    own_slug = _slug((data.get("metadata") or {}).get("url"))
+    company = _compact((data.get("metadata") or {}).get("company", ""))
+    company = re.sub(r"(ltd|limited)$", "", company)
+    for i, row in enumerate(rows):
+        slug = _slug(row.get("url"))
+        if slug and (slug == _base(ticker) or slug == own_slug):
+            return i
+    for i, row in enumerate(rows):
+        if company and _compact(row.get("name", "")) == company:
+            return i
+    return None
+
+
+@timed("peers.block")
+def peer_block(data: Dict[str, Any], ticker: str, fetch_prices: Callable[[str], Dict],
+               price_json: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+    """The company's standing in its peer group (None without a peer table for it)."""
+    ticker = ticker.strip().upper()
+    table = _peer_table(data, ticker)
+    if not table:
+        return None
+    rows = table["rows"]
+    target = _target_row(rows, ticker, data)
+    tickers = [peer_ticker(r.get("url")) for r in rows]
+    if target is None:
+        # The company isn't listed: rank it with the metrics its own prices give
+        rows = rows + [{"name": (data.get("metadata") or {}).get("company") or ticker, "url": None, "values": {}}]
+        tickers.append(ticker)
+        target = len(rows) - 1
+    else:
+        tickers[target] = ticker
+
+    histories = fetch_peer_prices([None if i == target else t for i, t in enumerate(tickers)], fetch_prices)
+    histories[target] = price_json or fetch_peer_prices([ticker], fetch_prices)[0]
+
+    columns = {_compact(c): c for r in rows for c in r.get("values", {})}
+    matrix = np.full((len(rows), len(METRICS)), np.nan)
+    for j, (aliases, _, _) in enumerate(TABLE_METRICS.values()):
+        column = next((columns[_compact(a)] for a in aliases if _compact(a) in columns), None)
+        if column is not None:
+            matrix[:, j] = [_number(r.get("values", {}).get(column)) for r in rows]
+    matrix[:, len(TABLE_METRICS):] = _price_stats(histories)
+
+    stats = relative_metrics(matrix)
+    directions = {**{k: v[2] for k, v in TABLE_METRICS.items()}, **{k: v[1] for k, v in PRICE_METRICS.items()}}
+    metrics = {}
+    for j, key in enumerate(METRICS):
+        if np.isnan(matrix[target, j]) and np.isnan(stats["median"][j]):
+            continue
+        metrics[key] = {
+            "value": _round(matrix[target, j]),
+            "median": _round(stats["median"][j]),
+            "percentile": _round(stats["percentile"][target, j], 0),
+            "z": _round(stats["z"][target, j]),
+            "higher_is_better": directions[key],
+        }
+
+    order = np.argsort(-np.nan_to_num(matrix[:, METRICS.index("market_cap")], nan=-1.0), kind="stable")
+    listed = [i for i in order if i != target][:Config.PEERS_IN_PROMPT]
+    incr("peer_blocks")
+    return {
+        "group": [g.get("name") for g in table.get("group") or []],
+        "company": rows[target].get("name"),
+        "ticker": ticker,
+        "listed": target < len(table["rows"]),
+        "size": len(rows),
+        "metrics": metrics,
+        "peers": [
+            {"name": rows[i].get("name"), "ticker": tickers[i],
+             **{key: _round(matrix[i, j]) for j, key in enumerate(METRICS) if not np.isnan(matrix[i, j])}}
+            for i in listed
+        ],
+    }
+
+
+def _label(key: str) -> str:
+    return TABLE_METRICS[key][1] if key in TABLE_METRICS else PRICE_METRICS[key][0]
+
+
+def render_peer_block(block: Dict[str, Any]) -> str:
+    """Compact prompt section: one line per metric, then the largest peers."""
+    group = " › ".join(block.get("group") or []) or "peer group"
+    lines = [f"{block['company']} vs {block['size'] - 1} peers ({group}):"]
+    for key, m in block["metrics"].items():
+        value = "n/a" if m["value"] is None else f"{m['value']:,.2f}"
+        median = "n/a" if m["median"] is None else f"{m['median']:,.2f}"
+        rank = "" if m["percentile"] is None else f" | {m['percentile']:.0f}th pct"
+        z = "" if m["z"] is None else f" | z {m['z']:+.2f}"
+        hint = {True: " (higher is better)", False: " (lower is better)"}.get(m["higher_is_better"], "")
+        lines.append(f"- {_label(key)}: {value} vs median {median}{rank}{z}{hint}")
+    for peer in block.get("peers") or []:
+        pe = "n/a" if peer.get("pe") is None else f"{peer['pe']:.1f}"
+        roce = "n/a" if peer.get("roce") is None else f"{peer['roce']:.1f}%"
+        ret = "n/a" if peer.get("return_1m") is None else f"{peer['return_1m']:+.1f}%"
+        lines.append(f"  · {peer['name']}: P/E {pe}, ROCE {roce}, 1M {ret}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import time
+
+    # A 40-company group: the ranking is one broadcast over the peers x metrics matrix
+    rng = np.random.default_rng(7)
+    demo = rng.normal([30, 20, 10, 8, 1.5, 1e5, 2, 25], [8, 6, 15, 10, 1, 8e4, 5, 6], size=(40, len(METRICS)))
+    demo[rng.random(demo.shape) < 0.05] = np.nan
+    started = time.perf_counter()
+    for _ in range(1000):
+        stats = relative_metrics(demo)
+    print(f"40 peers x {len(METRICS)} metrics: {(time.perf_counter() - started):.3f} ms per ranking")
+    print("first company percentiles:", np.round(stats["percentile"][0]).tolist())
+    print("first company z-scores:   ", np.round(stats["z"][0], 2).tolist())
@@ -0,0 +1,339 @@
+# src/portfolio.py
+"""
+Portfolio mode: triage every holding with plain arithmetic first, then ask
+Gemini only about the positions that need attention.
+
+    python main.py portfolio holdings.csv --loss-pct 10 --drawdown-pct 12
+
+Holdings file (CSV or JSON list of objects):
+
+    ticker,qty,avg_price[,screener_name][,stop][,buy_date]
+    IRFC.NS,1200,135.5
+    TCS,10,3620,,3300,2024-03-15
+
+Prices come from `_fetch_market_data_raw` (so the shared price cache and
+cassettes apply), fetched concurrently. Peaks for the drawdown come from
+`fetch_peaks`: the highest daily close since ``buy_date`` (the whole
+FINQUANT_PORTFOLIO_PEAK_PERIOD when the file has none), read from the price
+archive or the OHLCV cache. All metrics are then computed in one pass over a
+(positions x days) close matrix:
+
+    value, cost, pnl, pnl_pct       current value vs average buy price
+    drawdown_pct                    last close vs the peak close since buy_date
+    stop, stop_distance_pct         explicit stop, else avg_price x (1 - stop_pct)
+    weight_pct                      share of portfolio value
+
+A position is flagged when any trigger fires; only flagged positions get a
+verdict payload and a recommendation (rule-based pre-score or Gemini).
+
+`portfolio_risk` adds historical and Monte Carlo VaR / CVaR for the whole
+book and each position's share of it (src/risk.py).
+"""
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from src.config import Config
+from src.metrics import incr, timed
+
+logger = project_logger.getChild("portfolio")
+
+# All thresholds are percentages (positive numbers)
+DEFAULT_TRIGGERS = {
+    "loss_pct": 10.0,        # P&L at or below -loss_pct
+    "gain_pct": 30.0,        # P&L at or above +gain_pct (review for profit booking)
+    "drawdown_pct": 12.0,    # last close at least drawdown_pct below the peak since buy_date
+    "stop_buffer_pct": 3.0,  # last close within stop_buffer_pct of the stop (or below it)
+    "max_weight_pct": 25.0,  # single position above max_weight_pct of portfolio value
+}
+DEFAULT_STOP_PCT = 8.0  # implied stop below average price when the file has none
+
+_COLUMN_ALIASES = {
+    "symbol": "ticker",
+    "yfinance_ticker": "ticker",
+    "quantity": "qty",
+    "shares": "qty",
+    "buy_price": "avg_price",
+    "avg_buy_price": "avg_price",
+    "average_price": "avg_price",
+    "stop_loss": "stop",
+    "name": "screener_name",
+    "date": "buy_date",
+    "bought_on": "buy_date",
+    "purchase_date": "buy_date",
+}
+
+
+def load_holdings(path: str) -> pd.DataFrame:
+    """Holdings as a DataFrame with ticker, qty, avg_price, screener_name, stop, buy_date."""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            frame = pd.DataFrame(json.load(f))
+    else:
+        frame = pd.read_csv(path, skipinitialspace=True)
+
+    frame.columns = [str(c).strip().lower().replace(" ", "_") for c in frame.columns]
+    frame = frame.rename(columns={k: v for k, v in _COLUMN_ALIASES.items() if v not in frame.columns})
+    missing = {"ticker", "qty", "avg_price"} - set(frame.columns)
+    if missing:
+        raise ValueError(f"Holdings file {path} is missing column(s): {', '.join(sorted(missing))}")
+
+    from src.tools import _ensure_suffix
+
+    frame["ticker"] = frame["ticker"].astype(str).str.strip().map(_ensure_suffix)
+    frame["qty"] = pd.to_numeric(frame["qty"], errors="coerce")
+    frame["avg_price"] = pd.to_numeric(frame["avg_price"], errors="coerce")
+    bad = frame["qty"].isna() | frame["avg_price"].isna() | (frame["qty"] <= 0) | (frame["avg_price"] <= 0)
+    if bad.any():
+        raise ValueError(f"Holdings with invalid qty/avg_price: {', '.join(frame.loc[bad, 'ticker'])}")
+
+    if "screener_name" not in frame.columns:
+        frame["screener_name"] = None
+    blank = frame["screener_name"].isna() | (frame["screener_name"].astype(str).str.strip() == "")
+    frame.loc[blank, "screener_name"] = frame.loc[blank, "ticker"].str.rsplit(".", n=1).str[0]
+    frame["stop"] = pd.to_numeric(frame["stop"], errors="coerce") if "stop" in frame.columns else np.nan
+    frame["buy_date"] = pd.to_datetime(frame["buy_date"], errors="coerce", format="mixed").dt.normalize() \
+        if "buy_date" in frame.columns else pd.NaT
+
+    # Same ticker twice (e.g. two lots) → one position at the weighted average price
+    if frame["ticker"].duplicated().any():
+        frame["cost"] = frame["qty"] * frame["avg_price"]
+        frame = frame.groupby("ticker", as_index=False, sort=False).agg(
+            qty=("qty", "sum"), cost=("cost", "sum"), screener_name=("screener_name", "first"), stop=("stop", "max"),
+            buy_date=("buy_date", "min"),  # drawdown from the peak since the first lot
+        )
+        frame["avg_price"] = frame["cost"] / frame["qty"]
+        frame = frame.drop(columns="cost")
+    return frame[["ticker", "screener_name", "qty", "avg_price", "stop", "buy_date"]].reset_index(drop=True)
+
+
+@timed("portfolio.prices")
+def fetch_closes(tickers: List[str], workers: int = 8) -> Dict[str, object]:
+    """ticker → list of closes (oldest first) or the Exception that stopped the fetch."""
+    from src.tools import _fetch_market_data_raw
+
+    def one(ticker):
+        try:
+            return ticker, _fetch_market_data_raw(ticker)["price"]
+        except Exception as exc:
+            return ticker, exc
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers) or 1)), thread_name_prefix="finquant-prices") as pool:
+        return dict(pool.map(one, tickers))
+
+
+@timed("portfolio.peaks")
+def fetch_peaks(holdings: pd.DataFrame, period: str = Config.PORTFOLIO_PEAK_PERIOD, workers: int = 8) -> Dict[str, object]:
+    """
+    ticker → highest daily close since its ``buy_date`` (within ``period``; the
+    whole period without one) or the Exception that stopped the fetch. Read
+    from the local price archive when it has the ticker, else `fetch_ohlcv`.
+    """
+    from src.archive import open_archive
+    from src.backtest import fetch_ohlcv
+
+    archive = open_archive()
+    since = holdings.groupby("ticker")["buy_date"].min() if "buy_date" in holdings.columns \
+        else pd.Series(pd.NaT, index=holdings["ticker"].unique())
+
+    def one(item):
+        ticker, bought = item
+        try:
+            if archive is not None and ticker in archive.index:
+                bars = archive.bars(ticker)
+                dates, close = bars["date"], bars["close"]
+            else:
+                raw = fetch_ohlcv(ticker, period)
+                dates = np.asarray(raw["date"], dtype="datetime64[D]")
+                close = np.asarray(raw["close"], dtype="float64")
+            if not pd.isna(bought):
+                close = close[dates >= np.datetime64(bought.date(), "D")]
+            if not np.isfinite(close).any():
+                raise ValueError(f"No closes for {ticker} since {bought.date() if not pd.isna(bought) else period}")
+            return ticker, float(np.nanmax(close))
+        except Exception as exc:
+            return ticker, exc
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(since) or 1)), thread_name_prefix="finquant-peaks") as pool:
+        return dict(pool.map(one, since.items()))
+
+
+def _close_matrix(tickers: List[str], closes: Dict[str, object]) -> np.ndarray:
+    """(positions x days) float matrix, right-aligned on the latest close, NaN-padded."""
+    series = [closes.get(t) if isinstance(closes.get(t), list) else [] for t in tickers]
+    width = max((len(s) for s in series), default=0) or 1
+    matrix = np.full((len(tickers), width), np.nan)
+    for i, values in enumerate(series):
+        if values:
+            matrix[i, width - len(values):] = np.asarray(values, dtype=float)
+    return matrix
+
+
+@timed("portfolio.triage")
+def triage(holdings: pd.DataFrame, closes: Dict[str, object], triggers: Optional[Dict[str, float]] = None,
+           stop_pct: float = DEFAULT_STOP_PCT, peaks: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+    """Add value/P&L/drawdown/stop metrics and the list of fired triggers to every holding.
+
+    ``peaks`` (from `fetch_peaks`) extends the peak back to each buy date; without it,
+    or where it failed, the peak is the highest close in ``closes`` (about a month).
+    """
+    t = {**DEFAULT_TRIGGERS, **(triggers or {})}
+    tickers = holdings["ticker"].tolist()
+    matrix = _close_matrix(tickers, closes)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Latest non-NaN close per row (rows are right-aligned, so it is the last column unless empty)
+        has_price = ~np.isnan(matrix).all(axis=1)
+        last = matrix[:, -1]
+        peak = np.where(has_price, np.nanmax(np.where(np.isnan(matrix), -np.inf, matrix), axis=1), np.nan)
+        if peaks:
+            history = np.array([p if isinstance(p, float) else np.nan for p in map(peaks.get, tickers)], dtype=float)
+            peak = np.where(has_price, np.fmax(peak, history), np.nan)
+
+        qty = holdings["qty"].to_numpy(dtype=float)
+        avg = holdings["avg_price"].to_numpy(dtype=float)
+        stop = holdings["stop"].to_numpy(dtype=float)
+        stop = np.where(np.isnan(stop), avg * (1 - stop_pct / 100), stop)
+
+        value = qty * last
+        cost = qty * avg
+        pnl = value - cost
+        pnl_pct = (last / avg - 1) * 100
+        drawdown_pct = (last / peak - 1) * 100
+        stop_distance_pct = (last / stop - 1) * 100
+        total_value = np.nansum(value)
+        weight_pct = value / total_value * 100 if total_value else np.full(len(value), np.nan)
+
+    rules = {
+        "loss": pnl_pct <= -t["loss_pct"],
+        "gain": pnl_pct >= t["gain_pct"],
+        "drawdown": drawdown_pct <= -t["drawdown_pct"],
+        "near_stop": stop_distance_pct <= t["stop_buffer_pct"],
+        "concentration": weight_pct >= t["max_weight_pct"],
+        "no_price": ~has_price,
+    }
+    fired = np.column_stack(list(rules.values()))  # NaN comparisons are False
+    names = np.array(list(rules))
+
+    result = holdings.copy()
+    result["last"] = last
+    result["value"] = value
+    result["cost"] = cost
+    result["pnl"] = pnl
+    result["pnl_pct"] = pnl_pct
+    result["peak"] = peak
+    result["drawdown_pct"] = drawdown_pct
+    result["stop"] = stop
+    result["stop_distance_pct"] = stop_distance_pct
+    result["weight_pct"] = weight_pct
+    result["triggers"] = [names[row].tolist() for row in fired]
+    result["flagged"] = fired.any(axis=1)
+    result["error"] = [str(closes[tk]) if isinstance(closes.get(tk), Exception) else None for tk in tickers]
+    return result
+
+
+def summarize(positions: pd.DataFrame) -> Dict[str, float]:
+    priced = positions[positions["last"].notna()]
+    value = float(priced["value"].sum())
+    cost = float(priced["cost"].sum())
+    return {
+        "positions": int(len(positions)),
+        "priced": int(len(priced)),
+        "flagged": int(positions["flagged"].sum()),
+        "value": round(value, 2),
+        "cost": round(cost, 2),
+        "pnl": round(value - cost, 2),
+        "pnl_pct": round((value / cost - 1) * 100, 2) if cost else 0.0,
+    }
+
+
+@timed("portfolio.risk")
+def portfolio_risk(positions: pd.DataFrame, paths: Optional[int] = None, method: Optional[str] = None) -> Dict:
+    """VaR / CVaR (src/risk.py) of the priced positions, weighted by current value."""
+    from src.risk import load_returns, risk_report
+    from src.tools import _price_key
+
+    priced = positions[positions["value"].notna() & (positions["value"] > 0)]
+    values = priced.groupby(priced["ticker"].map(_price_key))["value"].sum()
+    returns = load_returns(values.index.tolist())
+    covered = values[values.index.isin(returns.columns)]
+    options = {k: v for k, v in (("paths", paths), ("method", method)) if v}
+    report = risk_report(returns, weights=covered.to_dict(), value=float(covered.sum()), **options)
+    report["portfolio"]["coverage_pct"] = round(float(covered.sum() / values.sum() * 100), 2) if values.sum() else 0.0
+    return report
+
+
+def position_record(row: pd.Series) -> Dict:
+    """JSON-ready view of one triaged position (NaN → None, floats rounded)."""
+    record = {"ticker": row["ticker"], "screener_name": row["screener_name"]}
+    for field in ("qty", "avg_price", "last", "value", "cost", "pnl", "pnl_pct", "peak",
+                  "drawdown_pct", "stop", "stop_distance_pct", "weight_pct"):
+        value = row[field]
+        record[field] = None if pd.isna(value) else round(float(value), 2)
+    record["triggers"] = list(row["triggers"])
+    record["flagged"] = bool(row["flagged"])
+    if isinstance(row["error"], str):
+        record["error"] = row["error"]
+    return record
+
+
+def review_flagged(positions: pd.DataFrame, recommend: Callable[[Dict, float], object], workers: int = 1,
+                   on_result: Optional[Callable[[pd.Series, object], None]] = None) -> Dict[str, object]:
+    """
+    Build payloads and call ``recommend(payload, avg_price)`` for flagged,
+    priced positions only.
+
+    Returns ticker → ``(payload, recommend result)`` or the Exception;
+    ``on_result`` is called as each one finishes.
+    """
+    from src.tools import build_stock_verdict_payload
+
+    flagged = [row for _, row in positions.iterrows() if row["flagged"] and not pd.isna(row["last"])]
+    skipped = int(len(positions) - len(flagged))
+    incr("portfolio_llm_skipped", skipped)
+    logger.info(f"Portfolio triage → {len(flagged)} of {len(positions)} positions need a recommendation")
+
+    def one(row):
+        try:
+            payload = build_stock_verdict_payload(row["screener_name"], row["ticker"])
+            result = (payload, recommend(payload, float(row["avg_price"])))
+        except Exception as exc:
+            result = exc
+        if on_result:
+            on_result(row, result)
+        return row["ticker"], result
+
+    if workers <= 1:
+        return dict(one(row) for row in flagged)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="finquant-portfolio") as pool:
+        return dict(pool.map(one, flagged))
+
+
+if __name__ == "__main__":
+    sample = pd.DataFrame({
+        "ticker": ["IRFC.NS", "TCS.NS", "SJVN.NS"],
+        "screener_name": ["IRFC", "TCS", "SJVN"],
+        "qty": [1200, 10, 500],
+        "avg_price": [135.5, 3620.0, 98.0],
+        "stop": [np.nan, 3300.0, np.nan],
+        "buy_date": pd.to_datetime(["2024-01-10", "2024-06-03", None]),
+    })
+    fake_closes = {
+        "IRFC.NS": list(np.linspace(150, 118, 22)),
+        "TCS.NS": list(np.linspace(3500, 3900, 22)),
+        "SJVN.NS": ValueError("No price history found for SJVN.NS"),
+    }
+    triaged = triage(sample, fake_closes, peaks={"IRFC.NS": 229.0, "TCS.NS": 4250.0})
+    for _, position in triaged.iterrows():
+        print(position_record(position))
+    print(summarize(triaged))
@@ -0,0 +1,344 @@
+# src/prewarm.py
+"""
+Post-market cache pre-warming for watchlists.
+
+    python main.py prewarm daemon                 # every weekday after the close
+    python main.py prewarm run --force            # once, now, re-scraping everything
+    python main.py prewarm status
+
+Watchlists are ``watchlists/*.txt|csv|json`` (FINQUANT_WATCHLIST_DIR): one
+stock per line, optionally ``NAME,TICKER`` to skip LLM resolution. The
+optional results calendar (``watchlists/results_calendar.csv``, columns
+``name,date`` with an optional ``HH:MM`` time) triggers an extra forced
+re-scrape of a company once its results are out.
+
+For every name the run goes through the same path as an interactive query
+(resolver cache → `build_stock_verdict_payload`), refreshing prices always
+and fundamentals when their cache entry is stale or results are new. Warmed
+entries are then kept valid until the next market open (+ the normal TTL),
+so the first query of the morning is a cache hit.
+
+Runs use FINQUANT_PREWARM_WORKERS threads with random start jitter so
+Screener sees a trickle, not a burst. Last-run and per-name state is kept
+in ``<FINQUANT_CACHE_DIR>/prewarm/state.json`` for `status`.
+Market holidays are not modelled: weekday runs on a holiday just refresh
+the caches again.
+"""
+import csv
+import glob
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from logger import set_log_context
+from src.cache import fundamentals_cache, price_cache
+from src.config import Config
+from src.metrics import incr, span, start_run
+
+logger = project_logger.getChild("prewarm")
+
+MARKET_TZ = ZoneInfo(Config.MARKET_TZ)
+CALENDAR_FILE = "results_calendar.csv"
+STATE_PATH = os.path.join(Config.CACHE_DIR, "prewarm", "state.json")
+
+_state_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------------- #
+# Inputs + state
+# --------------------------------------------------------------------------- #
+
+def load_watchlists(paths: Optional[Iterable[str]] = None) -> List[Dict[str, str]]:
+    """Entries ``{"name", "ticker", "watchlist"}`` from every watchlist file (deduplicated by name)."""
+    if not paths:
+        paths = [p for ext in ("txt", "csv", "json") for p in glob.glob(os.path.join(Config.WATCHLIST_DIR, f"*.{ext}"))
+                 if os.path.basename(p) != CALENDAR_FILE]
+    entries: Dict[str, Dict[str, str]] = {}
+    for path in sorted(paths):
+        label = os.path.splitext(os.path.basename(path))[0]
+        if path.lower().endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                rows = [r if isinstance(r, dict) else {"name": r} for r in json.load(f)]
+        else:
+            with open(path, encoding="utf-8") as f:
+                lines = [l.strip() for l in f if l.strip() and not l.lstrip().startswith("#")]
+            rows = [dict(zip(("name", "ticker"), (p.strip() for p in l.split(",")))) for l in lines]
+            if rows and rows[0].get("name", "").lower() in ("name", "stock", "screener_name"):
+                rows = rows[1:]  # header line
+        for row in rows:
+            name = str(row.get("name") or row.get("screener_name") or "").strip()
+            if name:
+                entries.setdefault(name.lower(), {
+                    "name": name,
+                    "ticker": (row.get("ticker") or row.get("yfinance_ticker") or "").strip().upper() or None,
+                    "watchlist": label,
+                })
+    return list(entries.values())
+
+
+def load_results_calendar(path: Optional[str] = None) -> Dict[str, datetime]:
+    """name (lower case) → latest results time (market timezone; date-only entries mean the close)."""
+    path = path or os.path.join(Config.WATCHLIST_DIR, CALENDAR_FILE)
+    if not os.path.exists(path):
+        return {}
+    close = datetime.strptime(Config.MARKET_CLOSE, "%H:%M").time()
+    calendar: Dict[str, datetime] = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, skipinitialspace=True):
+            name, raw = (row.get("name") or "").strip(), (row.get("date") or "").strip()
+            try:
+                when = datetime.fromisoformat(raw)
+            except ValueError:
+                logger.warning(f"Results calendar: bad date {raw!r} for {name!r}")
+                continue
+            if len(raw) <= 10:
+                when = datetime.combine(when.date(), close)
+            when = when.replace(tzinfo=MARKET_TZ)
+            key = name.lower()
+            if name and (key not in calendar or when > calendar[key]):
+                calendar[key] = when
+    return calendar
+
+
+def load_state(path: str = STATE_PATH) -> Dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"runs": [], "items": {}}
+
+
+def save_state(state: Dict, path: str = STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# --------------------------------------------------------------------------- #
+# Market clock
+# --------------------------------------------------------------------------- #
+
+def _at(day: datetime, hhmm: str) -> datetime:
+    hour, minute = map(int, hhmm.split(":"))
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def next_market_open(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now(MARKET_TZ)
+    candidate = _at(now, Config.MARKET_OPEN)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def next_scheduled_run(state: Dict, now: Optional[datetime] = None) -> datetime:
+    """Today's post-close slot if it has not run yet (catch-up), else the next weekday's."""
+    now = now or datetime.now(MARKET_TZ)
+    last = max((datetime.fromisoformat(r["started_at"]) for r in state.get("runs", []) if r.get("reason") == "schedule"),
+               default=None)
+    slot = _at(now, Config.PREWARM_AT)
+    if now.weekday() < 5 and slot <= now and (last is None or last < slot):
+        return now
+    if slot <= now:
+        slot += timedelta(days=1)
+    while slot.weekday() >= 5:
+        slot += timedelta(days=1)
+    return slot
+
+
+def results_due(entries: List[Dict], calendar: Dict[str, datetime], state: Dict,
+                now: Optional[datetime] = None) -> List[str]:
+    """Names whose results came out (plus FINQUANT_PREWARM_RESULTS_DELAY) after their last scrape."""
+    now = now or datetime.now(MARKET_TZ)
+    delay = timedelta(minutes=Config.PREWARM_RESULTS_DELAY_MIN)
+    due = []
+    for entry in entries:
+        released = calendar.get(entry["name"].lower())
+        if not released or released + delay > now:
+            continue
+        scraped = (state.get("items", {}).get(entry["name"].lower()) or {}).get("scraped_at")
+        if not scraped or datetime.fromisoformat(scraped) < released + delay:
+            due.append(entry["name"])
+    return due
+
+
+# --------------------------------------------------------------------------- #
+# Runs
+# --------------------------------------------------------------------------- #
+
+def warm_one(entry: Dict[str, str], force_scrape: bool = False, jitter_s: float = 0.0,
+             identity: Optional[object] = None) -> Dict:
+    """Resolve (unless ``identity``, possibly the resolver's Exception, is given) + build the verdict
+    payload for one watchlist entry; returns its state record."""
+    from src.tools import _ensure_suffix, build_stock_verdict_payload, resolve_stock_identity_local
+
+    if jitter_s > 0:
+        time.sleep(random.uniform(0, jitter_s))
+    started = time.perf_counter()
+    record = {"name": entry["name"], "watchlist": entry.get("watchlist"), "at": datetime.now(MARKET_TZ).isoformat()}
+    try:
+        if isinstance(identity, Exception):
+            raise identity
+        if entry.get("ticker"):
+            identity = {"screener_name": entry["name"], "yfinance_ticker": _ensure_suffix(entry["ticker"])}
+        elif identity is None:
+            identity = resolve_stock_identity_local(entry["name"])
+        set_log_context(ticker=identity["yfinance_ticker"])
+        fundamentals_key = identity["screener_name"].strip().lower()
+        scrape = force_scrape or not fundamentals_cache.has(fundamentals_key)
+        if force_scrape:
+            fundamentals_cache.invalidate(fundamentals_key)
+        price_cache.invalidate(identity["yfinance_ticker"])
+
+        with span("prewarm.item", scrape=scrape):
+            build_stock_verdict_payload(identity["screener_name"], identity["yfinance_ticker"])
+
+        # Valid until the next session has been open for a normal TTL
+        until_open = (next_market_open() - datetime.now(MARKET_TZ)).total_seconds()
+        price_cache.extend(identity["yfinance_ticker"], until_open + Config.PRICE_CACHE_TTL)
+        fundamentals_cache.extend(fundamentals_key, until_open + Config.FUNDAMENTALS_CACHE_TTL)
+        record.update(status="ok", identity=identity, scraped=scrape)
+        if scrape:
+            record["scraped_at"] = record["at"]
+        incr("prewarm_items", status="ok")
+    except Exception as exc:
+        record.update(status="error", error=str(exc) or type(exc).__name__)
+        incr("prewarm_items", status="error")
+        logger.warning(f"Pre-warm failed for {entry['name']}: {record['error']}")
+    finally:
+        set_log_context(ticker=None)
+    record["duration_s"] = round(time.perf_counter() - started, 2)
+    return record
+
+
+def run_once(entries: List[Dict], reason: str = "manual", force_names: Iterable[str] = (), force_all: bool = False,
+             workers: int = Config.PREWARM_WORKERS, jitter_s: float = Config.PREWARM_JITTER_S,
+             state_path: str = STATE_PATH, on_item: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Warm every entry with bounded concurrency; persists per-name and run state."""
+    force = {n.lower() for n in force_names}
+    run = {"reason": reason, "started_at": datetime.now(MARKET_TZ).isoformat(), "names": len(entries)}
+    set_log_context(run_id=start_run(), ticker=None)
+    logger.info(f"Pre-warm ({reason}) → {len(entries)} names, {workers} workers")
+
+    from src.tools import resolve_stock_identities
+
+    names = [e["name"] for e in entries if not e.get("ticker")]
+    identities = dict(zip(names, resolve_stock_identities(names))) if names else {}
+
+    def one(entry):
+        record = warm_one(entry, force_all or entry["name"].lower() in force, jitter_s, identities.get(entry["name"]))
+        with _state_lock:
+            state = load_state(state_path)
+            previous = state["items"].get(entry["name"].lower(), {})
+            if record["status"] != "ok":
+                record = {**previous, **record}  # keep the last good identity / scrape time
+            elif "scraped_at" not in record and previous.get("scraped_at"):
+                record["scraped_at"] = previous["scraped_at"]
+            state["items"][entry["name"].lower()] = record
+            save_state(state, state_path)
+        if on_item:
+            on_item(record)
+        return record
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="finquant-prewarm") as pool:
+        records = list(pool.map(one, entries))
+
+    run.update(
+        finished_at=datetime.now(MARKET_TZ).isoformat(),
+        ok=sum(r["status"] == "ok" for r in records),
+        failed=sum(r["status"] != "ok" for r in records),
+        scraped=sum(bool(r.get("scraped")) for r in records if r["status"] == "ok"),
+    )
+    with _state_lock:
+        state = load_state(state_path)
+        state["runs"] = (state.get("runs", []) + [run])[-50:]
+        save_state(state, state_path)
+    logger.info(f"Pre-warm done → {run['ok']} ok, {run['failed']} failed, {run['scraped']} scraped")
+    return run
+
+
+def run_daemon(watchlists: Optional[List[str]] = None, calendar_path: Optional[str] = None,
+               workers: int = Config.PREWARM_WORKERS, jitter_s: float = Config.PREWARM_JITTER_S,
+               state_path: str = STATE_PATH, stop: Optional[threading.Event] = None,
+               on_item: Optional[Callable[[Dict], None]] = None, on_run: Optional[Callable[[Dict], None]] = None):
+    """Post-close runs on weekdays plus results-triggered re-scrapes, until ``stop`` is set (or SIGTERM)."""
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    while not stop.is_set():
+        now = datetime.now(MARKET_TZ)
+        state = load_state(state_path)
+        entries = load_watchlists(watchlists)  # re-read every loop: edits apply without a restart
+        if next_scheduled_run(state, now) <= now:
+            due = results_due(entries, load_results_calendar(calendar_path), state, now)
+            run = run_once(entries, "schedule", due, workers=workers, jitter_s=jitter_s, state_path=state_path,
+                           on_item=on_item)
+        else:
+            due = results_due(entries, load_results_calendar(calendar_path), state, now)
+            run = None
+            if due:
+                names = {n.lower() for n in due}
+                run = run_once([e for e in entries if e["name"].lower() in names], "results", due, workers=workers,
+                               jitter_s=jitter_s, state_path=state_path, on_item=on_item)
+        if run and on_run:
+            on_run(run)
+
+        wake = min(next_scheduled_run(load_state(state_path)), datetime.now(MARKET_TZ)
+                   + timedelta(seconds=Config.PREWARM_POLL_S))
+        logger.info(f"Pre-warm daemon sleeping until {wake.isoformat(timespec='minutes')}")
+        stop.wait(max(1.0, (wake - datetime.now(MARKET_TZ)).total_seconds()))
+
+
+def status(entries: List[Dict], calendar: Optional[Dict[str, datetime]] = None, state_path: str = STATE_PATH) -> Dict:
+    """Last run, next run, per-name health and whether each name is warm right now."""
+    state = load_state(state_path)
+    now = datetime.now(MARKET_TZ)
+    items = []
+    for entry in entries:
+        record = state.get("items", {}).get(entry["name"].lower()) or {}
+        identity = record.get("identity") or {}
+        items.append({
+            "name": entry["name"],
+            "watchlist": entry.get("watchlist"),
+            "status": record.get("status", "never"),
+            "last_at": record.get("at"),
+            "scraped_at": record.get("scraped_at"),
+            "error": record.get("error") if record.get("status") == "error" else None,
+            "warm": bool(identity) and fundamentals_cache.has(identity["screener_name"].strip().lower())
+                    and price_cache.has(identity["yfinance_ticker"]),
+        })
+    return {
+        "last_run": (state.get("runs") or [None])[-1],
+        "next_run": next_scheduled_run(state, now).isoformat(timespec="minutes"),
+        "results_due": results_due(entries, calendar or {}, state, now),
+        "names": len(entries),
+        "warm": sum(i["warm"] for i in items),
+        "failed": sum(i["status"] == "error" for i in items),
+        "items": items,
+    }
+
+
+if __name__ == "__main__":
+    now = datetime.now(MARKET_TZ)
+    print(f"Now {now:%a %d %b %H:%M} | next open {next_market_open(now):%a %d %b %H:%M} | "
+          f"next pre-warm {next_scheduled_run(load_state(), now):%a %d %b %H:%M}")
+    watch = load_watchlists()
+    print(f"{len(watch)} watchlist names in {Config.WATCHLIST_DIR}/: {[w['name'] for w in watch[:10]]}")
@@ -0,0 +1,398 @@
+# src/recommendation.py
+"""
+Fund-manager recommendation: prompt building + the Gemini call.
+
+Shared by the interactive CLI (main.py) and the HTTP service. The chat client
+is created once and reused; identical prompts within
+FINQUANT_RECOMMENDATION_TTL are answered from `recommendation_cache`, and
+`incremental_recommendation` skips the call entirely when nothing material
+changed since the last verdict (src/snapshots.py).
+
+With FINQUANT_STRUCTURED_VERDICTS (default on) Gemini answers with the JSON
+verdict of src/verdict.py; invalid or missing fields are re-asked in the
+same conversation, the report is rendered from the validated object and the
+object is appended to the verdict store.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Generator, Iterator, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from logger import logger
+from src import resilience
+from src.cache import recommendation_cache
+from src.config import Config
+from src.metrics import incr, record_llm_usage, span
+from src.peers import render_peer_block
+from src.replay import ReplayChatModel, wrap_chat_model
+from src.scoring import prescore_summary, render_verdict
+from src.snapshots import annotate, changes_prompt_section, diff, is_material, load_snapshot, save_snapshot, snapshot_key
+from src.verdict import (UNVERIFIED_FIELDS, flag_unverified, format_instructions, from_markdown, parse_json,
+                         render_markdown, repair_prompt, store_verdict, validate)
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_recommendation_llm():
+    """Shared LLM for professional recommendations (None if it cannot be created)"""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            try:
+                Config.require_api_key()
+                _llm = wrap_chat_model(ChatGoogleGenerativeAI(
+                    model=Config.MODEL_NAME,
+                    temperature=0.0,
+                    google_api_key=Config.GOOGLE_API_KEY,
+                    base_url=Config.GEMINI_BASE_URL,
+                    convert_system_message_to_human=True,
+                    max_retries=2,
+                    timeout=Config.LLM_TIMEOUT_S,
+                ), "recommendation")
+            except Exception as e:
+                logger.error(f"LLM init failed: {e}")
+        return _llm
+
+def parse_current_price(technical_report: str) -> float:
+    """Today's open from the technical report (0 if missing)"""
+    price_match = re.search(r"Today['’]?s?\s+Open\**\s*:\s*\**\s*₹?\s*([0-9,]+\.?[0-9]*)", technical_report, re.IGNORECASE)
+    if price_match:
+        return float(price_match.group(1).replace(",", ""))
+    return 0
+
+def build_recommendation_prompt(stock_data: dict, owns_stock: bool, buy_price: float = 0,
+                                with_prescore: bool = False, changes: str = "", structured: bool = False) -> str:
+    """Build the fund manager prompt from a verdict payload (``changes``: a snapshots.changes_prompt_section;
+    ``structured``: ask for the JSON verdict of src/verdict.py instead of the markdown format)"""
+    # Extract data
+    technical_report = stock_data.get('technical_report', '')
+    fundamental = stock_data.get('fundamental_snapshot', '')
+    metadata = stock_data.get('metadata', {})
+    
+    # Parse current price
+    current_price = parse_current_price(technical_report)
+    
+    # Professional prompt for fund manager style
+    if owns_stock and buy_price > 0:
+        pl_percent = ((current_price - buy_price) / buy_price * 100) if current_price > 0 else 0
+        pl_status = "PROFIT" if pl_percent > 0 else "LOSS"
+        
+        context = f"""
+ACT AS A RUTHLESS FUND MANAGER. Analyze this holding and give brutal, no-nonsense advice.
+
+📊 POSITION ANALYSIS:
+- Stock: {metadata.get('company_name', 'N/A')} 
+- Current: ₹{current_price:,.2f} | Your Buy: ₹{buy_price:,.2f}
+- P/L: {pl_percent:+.1f}% ({pl_status})
+- Holding: EXISTING POSITION
+
+📈 TECHNICALS:
+{technical_report}
+
+🏛️  FUNDAMENTALS:
+{fundamental}
+"""
+        answer_format = """
+🎯 REQUIRED FORMAT - BE SPECIFIC:
+
+**PORTFOLIO DECISION** → HOLD | BOOK PROFIT | CUT LOSS | AVERAGE DOWN
+
+**CONFIDENCE** → High (80%+) | Medium (60-80%) | Low (<60%)
+
+**ACTION PLAN**:
+- Immediate Action: [HOLD/EXIT/AVERAGE]
+- Stop Loss: ₹_____ (____% risk)
+- Price Target: ₹_____ (____% upside)
+- Time Horizon: [1-3 months | 3-6 months | 6-12 months]
+
+**QUANTITATIVE RATIONALE**:
+1. [Technical reason with numbers]
+2. [Fundamental reason with metrics] 
+3. [Risk/reward assessment]
+
+**RISK RATING** → Low | Medium | High
+
+**PRIORITY** → High Priority | Medium Priority | Low Priority
+"""
+        closing = "\nUse exact numbers from data. No fluff. Be brutally honest about the position."
+    else:
+        context = f"""
+ACT AS A RUTHLESS FUND MANAGER. Analyze this stock and give brutal, no-nonsense entry advice.
+
+📊 STOCK ANALYSIS:
+- Stock: {metadata.get('company_name', 'N/A')}
+- Current Price: ₹{current_price:,.2f}
+- Position: NEW ENTRY
+
+📈 TECHNICALS:
+{technical_report}
+
+🏛️  FUNDAMENTALS:
+{fundamental}
+"""
+        answer_format = """
+🎯 REQUIRED FORMAT - BE SPECIFIC:
+
+**ENTRY DECISION** → STRONG BUY | BUY | NEUTRAL | AVOID | STRONG SELL
+
+**CONFIDENCE** → High (80%+) | Medium (60-80%) | Low (<60%)
+
+**ENTRY STRATEGY**:
+- Buy Zone: ₹_____ - ₹_____ 
+- Stop Loss: ₹_____ (____% risk)
+- Target: ₹_____ (____% upside)
+- Position Size: [Full | Half | Quarter]
+- Time Horizon: [1-3 months | 3-6 months | 6-12 months]
+
+**QUANTITATIVE RATIONALE**:
+1. [Technical setup with numbers]
+2. [Fundamental strength/weakness with metrics]
+3. [Market timing assessment]
+
+**RISK RATING** → Low | Medium | High
+
+**PRIORITY** → High Priority | Medium Priority | Low Priority
+"""
+        closing = "\nUse exact numbers from data. No fluff. Be brutally honest about the opportunity."
+
+    if structured:
+        answer_format = format_instructions(owns_stock and buy_price > 0)
+    prompt = context + answer_format + closing
+
+    peers = stock_data.get('peers')
+    if peers:
+        prompt += f"""
+
+👥 PEER COMPARISON:
+{render_peer_block(peers)}
+Judge valuation and growth relative to these peers, not in isolation."""
+
+    scorecard = stock_data.get('scorecard')
+    if with_prescore and scorecard:
+        prompt += f"""
+
+🧮 QUANT PRE-SCORE:
+{prescore_summary(scorecard)}
+Confirm or challenge it with specific numbers from the data."""
+    return prompt + changes
+
+def _prompt_key(prompt: str) -> str:
+    return f"{Config.MODEL_NAME}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}"
+
+def generate_structured_recommendation(stock_data: dict, owns_stock: bool, buy_price: float = 0,
+                                       with_prescore: bool = False, changes: str = "") -> Tuple[dict, str, dict]:
+    """(validated verdict, rendered report, {field: problem} still invalid after the repairs).
+
+    When repairs run out the answer is kept rather than discarded: the model's own
+    markdown report if it wrote one, else the partial verdict rendered with the
+    invalid fields flagged. Partial verdicts are neither cached nor stored.
+    """
+    steps = structured_recommendation_steps(stock_data, owns_stock, buy_price, with_prescore, changes)
+    try:
+        while True:
+            next(steps)
+    except StopIteration as finished:
+        return finished.value
+
+def structured_recommendation_steps(stock_data: dict, owns_stock: bool, buy_price: float = 0,
+                                    with_prescore: bool = False,
+                                    changes: str = "") -> Generator[dict, None, Tuple[dict, str, dict]]:
+    """generate_structured_recommendation one model call at a time: yields ``{"attempt": n}`` before
+    each call (plus ``"repair": [fields]`` for the re-asks) and returns the same triple."""
+    llm = get_recommendation_llm()
+    if not llm:
+        raise EnvironmentError("Cannot initialize recommendation engine")
+
+    holding = owns_stock and buy_price > 0
+    prompt = build_recommendation_prompt(stock_data, owns_stock, buy_price, with_prescore, changes, structured=True)
+    current_price = parse_current_price(stock_data.get('technical_report', ''))
+    cached = recommendation_cache.get(_prompt_key(prompt))
+    if cached is not None:
+        verdict = json.loads(cached)
+        return verdict, render_markdown(verdict, current_price), {}
+
+    messages = [HumanMessage(content=prompt)]
+    verdict, errors, markdown_reply = {}, {}, None
+    for attempt in range(Config.VERDICT_REPAIR_ATTEMPTS + 1):
+        yield {"attempt": attempt, "repair": list(errors)} if errors else {"attempt": attempt}
+        with span("llm.recommendation", owns_stock=owns_stock, structured=True, attempt=attempt):
+            response = resilience.call("gemini", llm.invoke, messages)
+        record_llm_usage(response, "recommendation")
+        data = parse_json(response.content)
+        if data is None:
+            incr("verdict_non_json")
+            data = from_markdown(response.content, holding)
+            if attempt == 0:
+                markdown_reply = response.content
+        fixed, errors = validate({**verdict, **data}, holding)
+        verdict.update(fixed)
+        if not errors:
+            break
+        incr("verdict_repairs")
+        logger.warning(f"Verdict fields to repair (attempt {attempt + 1}): {', '.join(errors)}")
+        messages += [AIMessage(content=response.content), HumanMessage(content=repair_prompt(errors, holding))]
+    if errors:
+        incr("verdict_partial")
+        logger.warning(f"Verdict still invalid after {Config.VERDICT_REPAIR_ATTEMPTS} repair(s), keeping it flagged: "
+                       + "; ".join(f"{k} {v}" for k, v in errors.items()))
+        report = flag_unverified(markdown_reply, errors) if markdown_reply else render_markdown(verdict, current_price, errors)
+        return verdict, report, errors
+
+    recommendation_cache.set(_prompt_key(prompt), json.dumps(verdict, ensure_ascii=False))
+    store_verdict(verdict, stock_data.get('yfinance_ticker'), owns_stock, buy_price)
+    return verdict, render_markdown(verdict, current_price), errors
+
+def generate_professional_recommendation(stock_data: dict, owns_stock: bool, buy_price: float = 0,
+                                         with_prescore: bool = False, changes: str = "") -> str:
+    """Generate professional fund manager-style recommendation"""
+    if Config.STRUCTURED_VERDICTS:
+        try:
+            return generate_structured_recommendation(stock_data, owns_stock, buy_price, with_prescore, changes)[1]
+        except Exception as e:
+            return f"Error generating recommendation: {e}"
+
+    llm = get_recommendation_llm()
+    if not llm:
+        return "Error: Cannot initialize recommendation engine"
+    
+    prompt = build_recommendation_prompt(stock_data, owns_stock, buy_price, with_prescore, changes)
+    cached = recommendation_cache.get(_prompt_key(prompt))
+    if cached is not None:
+        return cached
+    
+    try:
+        with span("llm.recommendation", owns_stock=owns_stock):
+            response = resilience.call("gemini", llm.invoke, [HumanMessage(content=prompt)])
+        record_llm_usage(response, "recommendation")
+        recommendation_cache.set(_prompt_key(prompt), response.content)
+        return response.content
+    except Exception as e:
+        return f"Error generating recommendation: {e}"
+
+def prescored_recommendation(stock_data: dict, owns_stock: bool, buy_price: float = 0,
+                             threshold: float = Config.PRESCORE_CONFIDENCE, escalate: bool = False,
+                             changes: str = "") -> Tuple[str, str]:
+    """(source, text): the rule-based verdict when the pre-score clears ``threshold``, else Gemini.
+
+    ``escalate`` always asks Gemini, with the pre-score in the prompt for commentary.
+    """
+    scorecard = stock_data.get('scorecard')
+    if scorecard and not escalate and scorecard["confidence"] >= threshold:
+        incr("prescore_verdicts", verdict=scorecard["verdict"])
+        current_price = parse_current_price(stock_data.get('technical_report', '')) or scorecard.get("last_close") or 0
+        return "rules", render_verdict(scorecard, current_price, owns_stock, buy_price)
+    return "llm", generate_professional_recommendation(stock_data, owns_stock, buy_price, with_prescore=True,
+                                                       changes=changes)
+
+def incremental_recommendation(stock_data: dict, owns_stock: bool, buy_price: float = 0,
+                               threshold: float = Config.PRESCORE_CONFIDENCE, escalate: bool = False) -> Tuple[str, str]:
+    """(source, text) like prescored_recommendation, but "snapshot" when nothing material moved since
+    the last verdict for this ticker: that verdict is returned with the deltas and no LLM is called.
+    """
+    current = stock_data.get('snapshot')
+    key = snapshot_key(stock_data.get('yfinance_ticker'), owns_stock)
+    previous = load_snapshot(key)
+    changes = ""
+    if current and previous:
+        deltas = diff(previous["fingerprint"], current, previous.get("taken_at"),
+                      buy_price_changed=owns_stock and abs(previous.get("buy_price", 0) - buy_price) > 0.005)
+        if not is_material(deltas):
+            incr("snapshot_reuses")
+            logger.info(f"No material change since {previous['taken_at']} → reusing verdict for {key}")
+            return "snapshot", annotate(previous, deltas)
+        changes = changes_prompt_section(previous, deltas)
+        logger.info(f"Material change for {key}: {', '.join(sorted({d['kind'] for d in deltas if d['material']}))}")
+
+    source, text = prescored_recommendation(stock_data, owns_stock, buy_price, threshold, escalate, changes)
+    if current and not text.startswith("Error") and UNVERIFIED_FIELDS not in text:
+        save_snapshot(key, current, source, text, buy_price)
+    return source, text
+
+def stream_professional_recommendation(stock_data: dict, owns_stock: bool,
+                                       buy_price: float = 0) -> Iterator[Tuple[str, Any]]:
+    """Same as generate_professional_recommendation, as ``(event, data)`` pairs while it runs.
+
+    Markdown mode yields ``("chunk", text)`` as the model writes. Structured mode
+    (FINQUANT_STRUCTURED_VERDICTS) yields ``("progress", {"attempt", "repair"})``
+    before each model call, then ``("verdict", {"verdict", "unverified"})`` and the
+    rendered report as one ``("chunk", text)``; the verdict is validated, repaired
+    and stored exactly as in generate_structured_recommendation.
+    Raises instead of returning an "Error ..." string so callers can tell the two apart.
+    """
+    if Config.STRUCTURED_VERDICTS:
+        steps = structured_recommendation_steps(stock_data, owns_stock, buy_price)
+        try:
+            while True:
+                yield "progress", next(steps)
+        except StopIteration as finished:
+            verdict, report, errors = finished.value
+        yield "verdict", {"verdict": verdict, "unverified": errors or None}
+        yield "chunk", report
+        return
+
+    llm = get_recommendation_llm()
+    if not llm:
+        raise EnvironmentError("Cannot initialize recommendation engine")
+
+    prompt = build_recommendation_prompt(stock_data, owns_stock, buy_price)
+    cached = recommendation_cache.get(_prompt_key(prompt))
+    if cached is not None:
+        yield "chunk", cached
+        return
+
+    messages = [HumanMessage(content=prompt)]
+    if not hasattr(llm, "stream") or isinstance(llm, ReplayChatModel):
+        # Cassettes store whole responses; replay/record stays on invoke
+        with span("llm.recommendation", owns_stock=owns_stock, streamed=False):
+            response = resilience.call("gemini", llm.invoke, messages)
+        record_llm_usage(response, "recommendation")
+        recommendation_cache.set(_prompt_key(prompt), response.content)
+        yield "chunk", response.content
+        return
+
+    parts = []
+    final = None
+    with resilience.guarded("gemini"), span("llm.recommendation", owns_stock=owns_stock, streamed=True):
+        for chunk in llm.stream(messages):
+            final = chunk if final is None else final + chunk
+            text = chunk.content if isinstance(chunk.content, str) else "".join(
+                p.get("text", "") if isinstance(p, dict) else str(p) for p in chunk.content
+            )
+            if text:
+                parts.append(text)
+                yield "chunk", text
+    if final is not None:
+        record_llm_usage(final, "recommendation")
+    recommendation_cache.set(_prompt_key(prompt), "".join(parts))
+
+def save_recommendation_report(user_input: str, recommendation: str, owns_stock: bool,
+                               buy_price: float = 0, folder: str = Config.OUTPUT_DIR) -> str:
+    """Write the verdict as outputs/<NAME>_<ANALYSIS|HOLDING>_<timestamp>.md; returns the path"""
+    os.makedirs(folder, exist_ok=True)
+    safe_name = "".join(c if c.isalnum() else "_" for c in user_input.upper())
+    status = "HOLDING" if owns_stock else "ANALYSIS"
+    timestamp = datetime.now().strftime('%d-%b-%Y_%H%M')
+    filename = f"{folder}/{safe_name}_{status}_{timestamp}.md"
+
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(f"# PROFESSIONAL STOCK ANALYSIS: {user_input.upper()}\n")
+        f.write(f"# Analysis Date: {datetime.now().strftime('%d %B %Y %H:%M')}\n")
+        f.write(f"# Position: {'EXISTING HOLDER' if owns_stock else 'NEW ENTRY ANALYSIS'}\n")
+        if owns_stock:
+            f.write(f"# Average Buy Price: ₹{buy_price:,.2f}\n")
+        f.write(f"# Generated by: FinQuant Pro AI Fund Manager\n")
+        f.write("\n" + "=" * 80 + "\n\n")
+        f.write(recommendation)
+    return filename
@@ -0,0 +1,190 @@
+# src/replay.py
+"""
+Record/replay of external calls (Screener scrape, Yahoo prices, Gemini).
+
+    FINQUANT_REPLAY=record python main.py   # hit live services, store every response
+    FINQUANT_REPLAY=replay python main.py   # serve stored responses, no network
+
+Cassettes are content-addressed:
+
+    cassettes/index/<kind>/<sha256(request)>.json  → {request, blob, elapsed_s, recorded_at}
+    cassettes/blobs/<ab>/<sha256(response)>.json   → response body
+
+Identical responses are stored once. Re-recording a request points its index
+entry at the newest response. Volatile fields (timestamps, tool-call ids) are
+dropped before hashing requests so reruns hit the same entries. Replay can
+sleep the recorded latency x FINQUANT_REPLAY_LATENCY to profile realistically.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+from logger import logger
+from src.config import Config
+from src.metrics import incr
+
+MODES = {"off", "record", "replay"}
+
+# Values that change on every run but do not change the answer
+_VOLATILE = re.compile(r'\\?"(generated_at|scraped_at|today_date)\\?"\s*:\s*\\?"[^"\\]*\\?"')
+
+
+class CassetteMiss(KeyError):
+    """Replay mode was asked for a request that was never recorded."""
+
+
+def _canonical(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    def __init__(self, root: str = Config.CASSETTE_DIR, mode: str = Config.REPLAY_MODE,
+                 latency_scale: float = Config.REPLAY_LATENCY_SCALE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown replay mode '{mode}' (expected one of {sorted(MODES)})")
+        self.root = root
+        self.mode = mode
+        self.latency_scale = latency_scale
+
+    @property
+    def active(self) -> bool:
+        return self.mode != "off"
+
+    def request_key(self, request: Dict) -> str:
+        return _sha256(_VOLATILE.sub("", _canonical(request)))
+
+    def _index_path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, "index", kind, f"{key}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.json")
+
+    def has(self, kind: str, request: Dict) -> bool:
+        return os.path.exists(self._index_path(kind, self.request_key(request)))
+
+    def load(self, kind: str, request: Dict) -> Dict:
+        key = self.request_key(request)
+        try:
+            with open(self._index_path(kind, key), encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(self._blob_path(entry["blob"]), encoding="utf-8") as f:
+                entry["response"] = json.load(f)
+        except FileNotFoundError as exc:
+            raise CassetteMiss(f"No {kind} cassette for request {key[:12]} ({_canonical(request)[:120]})") from exc
+        return entry
+
+    def save(self, kind: str, request: Dict, response: Any, elapsed_s: float):
+        # Keep key order: period columns in Screener tables are chronological
+        body = json.dumps(response, ensure_ascii=False, separators=(",", ":"), default=str)
+        digest = _sha256(body)
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            with open(blob_path, "w", encoding="utf-8") as f:
+                f.write(body)
+
+        index_path = self._index_path(kind, self.request_key(request))
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "kind": kind,
+                "request": request,
+                "blob": digest,
+                "elapsed_s": round(elapsed_s, 4),
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            }, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, index_path)
+
+    def call(
+        self,
+        kind: str,
+        request: Dict,
+        live: Callable[[], Any],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda value: value,
+    ) -> Any:
+        """Run ``live()`` through the store according to the current mode."""
+        if self.mode == "off":
+            return live()
+
+        if self.mode == "replay":
+            entry = self.load(kind, request)
+            incr("cassette_hits", kind=kind)
+            if self.latency_scale > 0:
+                time.sleep(entry.get("elapsed_s", 0) * self.latency_scale)
+            return decode(entry["response"])
+
+        start = time.perf_counter()
+        result = live()
+        self.save(kind, request, encode(result), time.perf_counter() - start)
+        incr("cassette_records", kind=kind)
+        return result
+
+
+cassettes = CassetteStore()
+if cassettes.active:
+    logger.info(f"Record/replay → {cassettes.mode} ({os.path.abspath(cassettes.root)})")
+
+
+# --------------------------------------------------------------------------- #
+# Chat model wrapper
+# --------------------------------------------------------------------------- #
+
+def _message_key(message) -> Dict:
+    data = message_to_dict(message)
+    body = dict(data.get("data", {}))
+    for field in ("id", "response_metadata", "usage_metadata", "additional_kwargs", "tool_call_id"):
+        body.pop(field, None)
+    if body.get("tool_calls"):
+        body["tool_calls"] = [{"name": tc["name"], "args": tc["args"]} for tc in body["tool_calls"]]
+    return {"type": data.get("type"), "data": body}
+
+
+class ReplayChatModel:
+    """Routes ``invoke`` of a LangChain chat model through the cassette store."""
+
+    def __init__(self, llm, label: str, store: Optional[CassetteStore] = None, tool_names=()):
+        self.llm = llm
+        self.label = label
+        self.store = store or cassettes
+        self.tool_names = list(tool_names)
+
+    def bind_tools(self, tools, **kwargs):
+        names = [getattr(t, "name", str(t)) for t in tools]
+        return ReplayChatModel(self.llm.bind_tools(tools, **kwargs), self.label, self.store, names)
+
+    def invoke(self, messages, **kwargs):
+        request = {
+            "label": self.label,
+            "model": getattr(self.llm, "model", None) or getattr(getattr(self.llm, "bound", None), "model", None),
+            "tools": self.tool_names,
+            "messages": [_message_key(m) for m in messages],
+        }
+        return self.store.call(
+            "gemini",
+            request,
+            lambda: self.llm.invoke(messages, **kwargs),
+            encode=message_to_dict,
+            decode=lambda data: messages_from_dict([data])[0],
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def wrap_chat_model(llm, label: str):
+    """Return ``llm`` unchanged unless record/replay is on."""
+    if llm is None or not cassettes.active:
+        return llm
+    return ReplayChatModel(llm, label)
@@ -0,0 +1,236 @@
+# src/resilience.py
+"""
+Circuit breakers, request deadlines and stale-cache fallback for the
+external dependencies (Screener, Yahoo Finance, Gemini).
+
+    from src import resilience
+
+    with resilience.deadline(30):                      # whole request, all stages
+        data = resilience.call("yahoo", fetch, ticker)  # breaker + remaining budget
+
+Breakers (one per dependency, per process):
+
+    closed     calls go through; FINQUANT_BREAKER_FAILURES consecutive
+               failures (errors or calls that overran the deadline) → open
+    open       calls fail fast with CircuitOpen for FINQUANT_BREAKER_RESET seconds
+    half-open  one probe call is let through; success closes, failure re-opens
+
+ValueError (bad ticker, unparseable answer) is the caller's problem, not an
+outage, and does not count against the breaker.
+
+The deadline is a context variable, so it follows the request into the
+service's worker threads (they run with a copy of the caller's context).
+`call` runs the dependency on a helper thread when a deadline is set and
+stops waiting when it passes (DeadlineExceeded, a TimeoutError); the
+abandoned call finishes in the background. `budget(default)` caps a
+dependency's own timeout (Selenium waits, yfinance, Gemini) at what is
+left.
+
+`stale_fallback` turns a failure into the last cached value, however old
+(up to FINQUANT_STALE_MAX_AGE), with a marker describing what is stale and
+why; `build_stock_verdict_payload` lists these under ``payload["stale"]``.
+The entry is refreshed by the first call that gets through once the
+dependency recovers (the breaker's half-open probe).
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from src.config import Config
+from src.metrics import incr
+
+logger = project_logger.getChild("resilience")
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("finquant_deadline", default=None)
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="finquant-guard")
+
+
+class CircuitOpen(ConnectionError):
+    def __init__(self, dependency: str, retry_in_s: float):
+        super().__init__(f"{dependency} unavailable (circuit open, retry in {retry_in_s:.0f}s)")
+        self.dependency = dependency
+        self.retry_in_s = retry_in_s
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+# --------------------------------------------------------------------------- #
+# Deadlines
+# --------------------------------------------------------------------------- #
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Run the block under a deadline ``seconds`` from now (an enclosing, earlier one still wins)."""
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    at = time.monotonic() + seconds
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None without one)."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check(stage: str):
+    left = remaining()
+    if left is not None and left <= 0:
+        incr("deadline_exceeded", stage=stage)
+        raise DeadlineExceeded(f"deadline exceeded before {stage}")
+
+
+def budget(default: float, floor: float = 1.0) -> float:
+    """``default`` capped at the time left (never below ``floor``, so a timeout is still meaningful)."""
+    left = remaining()
+    return default if left is None else max(floor, min(default, left))
+
+
+# --------------------------------------------------------------------------- #
+# Circuit breakers
+# --------------------------------------------------------------------------- #
+
+class CircuitBreaker:
+    def __init__(self, name: str, failures: int = Config.BREAKER_FAILURES, reset_s: float = Config.BREAKER_RESET_S):
+        self.name = name
+        self.threshold = failures
+        self.reset_s = reset_s
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_s else "open"
+
+    def before(self):
+        """Raise CircuitOpen unless a call may go through now."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_s or self.probing:
+                incr("breaker_rejected", dependency=self.name)
+                raise CircuitOpen(self.name, max(0.0, self.reset_s - waited))
+            self.probing = True  # half-open: this caller is the probe
+
+    def success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit {self.name} closed")
+            self.failures, self.opened_at, self.probing = 0, None, False
+
+    def failure(self, exc: BaseException):
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit {self.name} open after {self.failures} failures (last: {exc})")
+                    incr("breaker_opened", dependency=self.name)
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        with self._lock:
+            self.probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "threshold": self.threshold, "reset_s": self.reset_s}
+
+
+BREAKERS = {name: CircuitBreaker(name) for name in ("screener", "yahoo", "gemini")}
+
+
+@contextmanager
+def guarded(dependency: str):
+    """Breaker accounting around a block that talks to ``dependency`` (e.g. a streamed LLM answer)."""
+    breaker = BREAKERS[dependency]
+    check(dependency)
+    breaker.before()
+    try:
+        yield
+    except ValueError:
+        breaker.success()  # the dependency answered; the answer was unusable
+        raise
+    except Exception as exc:
+        breaker.failure(exc)
+        raise
+    except BaseException:
+        breaker.release()  # consumer went away (GeneratorExit, Ctrl+C): no verdict on the dependency
+        raise
+    else:
+        breaker.success()
+
+
+def call(dependency: str, fn: Callable, *args, **kwargs) -> Any:
+    """``fn(*args, **kwargs)`` behind ``dependency``'s breaker, bounded by the current deadline."""
+    with guarded(dependency):
+        left = remaining()
+        if left is None:
+            return fn(*args, **kwargs)
+        future = _executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        try:
+            return future.result(timeout=max(0.0, left))
+        except FutureTimeout:
+            incr("deadline_exceeded", stage=dependency)
+            raise DeadlineExceeded(f"deadline exceeded waiting for {dependency}") from None
+
+
+# --------------------------------------------------------------------------- #
+# Stale fallback
+# --------------------------------------------------------------------------- #
+
+def stale_fallback(cache, key: str, exc: Exception, stage: str,
+                   max_age_s: float = Config.STALE_MAX_AGE_S) -> Tuple[Any, Dict[str, Any]]:
+    """(last cached value, stale marker) for a failed stage, or re-raise ``exc`` if nothing usable is cached."""
+    if isinstance(exc, ValueError):
+        raise exc  # a bad request, not an outage: old data would hide the real error
+    value, age_s = cache.get_stale(key)
+    if value is None or age_s > max_age_s:
+        raise exc
+    incr("stale_served", stage=stage)
+    logger.warning(f"Serving stale {stage} for '{key}' ({age_s / 3600:.1f} h old): {exc}")
+    return value, {"stage": stage, "age_s": round(age_s), "reason": str(exc) or type(exc).__name__}
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: b.stats() for name, b in BREAKERS.items()}
+
+
+if __name__ == "__main__":
+    # A dependency that hangs: the first calls are cut at the deadline, then the breaker fails fast
+    def hangs():
+        time.sleep(2)
+
+    BREAKERS["yahoo"] = CircuitBreaker("yahoo", failures=3, reset_s=1.0)
+    for attempt in range(6):
+        started = time.perf_counter()
+        try:
+            with deadline(0.2):
+                call("yahoo", hangs)
+        except (DeadlineExceeded, CircuitOpen) as exc:
+            print(f"attempt {attempt}: {type(exc).__name__} after {time.perf_counter() - started:.2f}s "
+                  f"({BREAKERS['yahoo'].state})")
+    time.sleep(1.0)
+    print("after reset:", BREAKERS["yahoo"].state, call("yahoo", lambda: "probe ok"), BREAKERS["yahoo"].state)
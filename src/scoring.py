@@ -0,0 +1,226 @@
+# src/scoring.py
+"""
+Deterministic quantitative pre-score.
+
+Turns the Screener tables (via src.scraper.normalize) and the 30-day price
+history into five factor scores in [-1, 1]:
+
+    growth          YoY quarterly sales / profit growth, 3-year sales CAGR
+    profitability   latest OPM, ROE, loss-making quarters in the last four
+    leverage        debt / equity, interest coverage, promoter pledge
+    momentum        30-day return, last close vs 30-day average
+    volatility      annualised volatility of daily returns (lower is better)
+
+Each factor averages its available sub-scores; a sub-score is a raw metric
+mapped linearly onto [-1, 1] between a "bad" and a "good" anchor. The
+composite is the weighted mean of the available factors. Confidence grows
+with the composite's magnitude, the share of factors agreeing with its sign
+and data coverage, so mixed or thin data never clears the threshold.
+
+When confidence >= FINQUANT_PRESCORE_CONFIDENCE the CLI answers with
+`render_verdict` instead of calling Gemini.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.scraper.normalize import growth_rates, normalize_all, safe_ratio
+
+FACTOR_WEIGHTS = {
+    "growth": 0.25,
+    "profitability": 0.25,
+    "leverage": 0.20,
+    "momentum": 0.15,
+    "volatility": 0.15,
+}
+
+# metric → (bad anchor → -1, good anchor → +1)
+ANCHORS = {
+    "sales_yoy": (-0.10, 0.20),
+    "profit_yoy": (-0.20, 0.25),
+    "sales_cagr_3y": (0.0, 0.15),
+    "opm": (0.05, 0.25),
+    "roe": (0.05, 0.20),
+    "loss_quarters": (0.75, 0.0),
+    "debt_equity": (2.0, 0.2),
+    "interest_coverage": (1.5, 8.0),
+    "pledge": (0.30, 0.0),
+    "return_30d": (-0.10, 0.10),
+    "vs_average": (-0.05, 0.05),
+    "volatility_annual": (0.60, 0.20),
+}
+
+FACTOR_METRICS = {
+    "growth": ("sales_yoy", "profit_yoy", "sales_cagr_3y"),
+    "profitability": ("opm", "roe", "loss_quarters"),
+    "leverage": ("debt_equity", "interest_coverage", "pledge"),
+    "momentum": ("return_30d", "vs_average"),
+    "volatility": ("volatility_annual",),
+}
+
+# composite lower bounds, best first
+VERDICT_BANDS = ((0.45, "STRONG BUY"), (0.15, "BUY"), (-0.15, "NEUTRAL"), (-0.45, "AVOID"), (-np.inf, "STRONG SELL"))
+
+
+def _last_valid(row: np.ndarray) -> float:
+    valid = np.flatnonzero(~np.isnan(row))
+    return float(row[valid[-1]]) if valid.size else float("nan")
+
+
+def _aligned_ratio(num: np.ndarray, num_dates: np.ndarray, den: np.ndarray, den_dates: np.ndarray) -> float:
+    """Latest num/den over periods both tables share (e.g. FY profit vs FY-end net worth)."""
+    _, i, j = np.intersect1d(num_dates, den_dates, return_indices=True)
+    return _last_valid(safe_ratio(num[i], den[j])) if i.size else float("nan")
+
+
+def extract_metrics(data: Dict[str, Any], price_data: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Raw factor inputs (NaN when the tables do not carry them)."""
+    sections = normalize_all(data)
+    quarters, annual = sections["quarters"], sections["profit_loss"]
+    balance, holding = sections["balance_sheet"], sections["shareholding_quarterly"]
+
+    q_sales = quarters.row("Sales", "Revenue")
+    q_profit = quarters.row("Net Profit")
+    a_sales = annual.row("Sales", "Revenue")
+    a_profit = annual.row("Net Profit")
+
+    net_worth = balance.row("Equity Capital") + balance.row("Reserves")
+    recent_profit = q_profit[~np.isnan(q_profit)][-4:]
+    cagr = float("nan")
+    valid_sales = a_sales[~np.isnan(a_sales)]
+    if valid_sales.size >= 4 and valid_sales[-4] > 0 and valid_sales[-1] > 0:
+        cagr = (valid_sales[-1] / valid_sales[-4]) ** (1 / 3) - 1
+
+    metrics = {
+        "sales_yoy": _last_valid(growth_rates(q_sales, 4)),
+        "profit_yoy": _last_valid(growth_rates(q_profit, 4)),
+        "sales_cagr_3y": cagr,
+        "opm": quarters.latest("OPM %", "Financing Margin %"),
+        "roe": _aligned_ratio(a_profit, annual.dates[~annual.is_ttm], net_worth, balance.dates[~balance.is_ttm]),
+        "loss_quarters": float(np.mean(recent_profit < 0)) if recent_profit.size else float("nan"),
+        "debt_equity": _last_valid(safe_ratio(balance.row("Borrowings"), net_worth)),
+        "interest_coverage": _last_valid(safe_ratio(annual.row("Operating Profit", "Financing Profit"),
+                                                    annual.row("Interest"))),
+        "pledge": holding.latest("Pledged", "Pledged percentage", "Pledge"),
+    }
+    if abs(metrics["opm"]) > 1.5:  # "OPM %" scraped as 18 rather than 0.18
+        metrics["opm"] /= 100
+
+    closes = np.asarray((price_data or {}).get("price") or [], dtype="float64")
+    closes = closes[~np.isnan(closes)]
+    if closes.size >= 2:
+        returns = np.diff(np.log(closes))
+        metrics["last_close"] = float(closes[-1])
+        metrics["return_30d"] = float(closes[-1] / closes[0] - 1)
+        metrics["vs_average"] = float(closes[-1] / closes.mean() - 1)
+        metrics["volatility_annual"] = float(returns.std(ddof=1) * np.sqrt(252)) if returns.size > 1 else float("nan")
+    else:
+        metrics["return_30d"] = metrics["vs_average"] = metrics["volatility_annual"] = float("nan")
+    return metrics
+
+
+def score_metrics(metrics: Dict[str, float]) -> Dict[str, float]:
+    """Map every metric onto [-1, 1] in one vectorized pass (NaN stays NaN)."""
+    names = list(ANCHORS)
+    raw = np.array([metrics.get(n, np.nan) for n in names], dtype="float64")
+    bad = np.array([ANCHORS[n][0] for n in names])
+    good = np.array([ANCHORS[n][1] for n in names])
+    scaled = np.clip(2 * (raw - bad) / (good - bad) - 1, -1.0, 1.0)
+    return dict(zip(names, scaled.tolist()))
+
+
+def score_stock(data: Dict[str, Any], price_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Scorecard: raw metrics, factor scores, composite, preliminary verdict and confidence."""
+    metrics = extract_metrics(data, price_data)
+    sub_scores = score_metrics(metrics)
+
+    factors = {}
+    for factor, names in FACTOR_METRICS.items():
+        values = np.array([sub_scores[n] for n in names])
+        values = values[~np.isnan(values)]
+        factors[factor] = float(values.mean()) if values.size else float("nan")
+
+    weights = np.array([FACTOR_WEIGHTS[f] for f in factors])
+    scores = np.array(list(factors.values()))
+    available = ~np.isnan(scores)
+    coverage = float(weights[available].sum() / weights.sum())
+    if available.any():
+        composite = float(np.dot(weights[available], scores[available]) / weights[available].sum())
+        direction = np.sign(composite) if composite else 0.0
+        agreement = float(np.mean(np.sign(scores[available]) == direction)) if direction else 0.0
+    else:
+        composite, agreement = 0.0, 0.0
+
+    confidence = float(np.clip(0.5 * min(abs(composite) / 0.6, 1.0) + 0.3 * agreement + 0.2 * coverage, 0, 1))
+    if coverage < 0.5:
+        confidence = min(confidence, 0.5)  # too little data to skip the analyst
+
+    verdict = next(label for bound, label in VERDICT_BANDS if composite >= bound)
+    return {
+        "verdict": verdict,
+        "confidence": round(confidence, 3),
+        "composite": round(composite, 3),
+        "coverage": round(coverage, 3),
+        "agreement": round(agreement, 3),
+        "last_close": metrics.pop("last_close", None),
+        "factors": {k: None if np.isnan(v) else round(v, 3) for k, v in factors.items()},
+        "metrics": {k: None if np.isnan(v) else round(float(v), 4) for k, v in metrics.items()},
+    }
+
+
+def _position_decision(scorecard: Dict[str, Any], pnl_pct: float) -> str:
+    composite = scorecard["composite"]
+    if composite <= -0.15:
+        return "BOOK PROFIT" if pnl_pct > 0 else "CUT LOSS"
+    if composite >= 0.45 and pnl_pct < -5:
+        return "AVERAGE DOWN"
+    return "HOLD"
+
+
+def _fmt_pct(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value * 100:+.1f}%"
+
+
+def render_verdict(scorecard: Dict[str, Any], current_price: float = 0, owns_stock: bool = False,
+                   buy_price: float = 0) -> str:
+    """Rule-based verdict in the same headline format as the Gemini recommendation."""
+    m, f = scorecard["metrics"], scorecard["factors"]
+    confidence = scorecard["confidence"]
+    band = "High (80%+)" if confidence >= 0.8 else "Medium (60-80%)" if confidence >= 0.6 else "Low (<60%)"
+    vol = m.get("volatility_annual")
+    risk = "Low" if vol is not None and vol < 0.25 else "High" if vol is None or vol > 0.45 else "Medium"
+
+    if owns_stock and buy_price > 0 and current_price > 0:
+        pnl_pct = (current_price / buy_price - 1) * 100
+        headline = f"**PORTFOLIO DECISION** → {_position_decision(scorecard, pnl_pct)}"
+        position = f"- Position: ₹{buy_price:,.2f} → ₹{current_price:,.2f} ({pnl_pct:+.1f}%)\n"
+    else:
+        headline = f"**ENTRY DECISION** → {scorecard['verdict']}"
+        position = f"- Last price: ₹{current_price:,.2f}\n" if current_price > 0 else ""
+
+    factor_lines = "\n".join(
+        f"- {name.title()}: {'n/a' if score is None else f'{score:+.2f}'}" for name, score in f.items()
+    )
+    return f"""{headline}
+
+**CONFIDENCE** → {band} (rule engine {confidence:.0%})
+
+**QUANTITATIVE RATIONALE** (composite {scorecard['composite']:+.2f}, data coverage {scorecard['coverage']:.0%}):
+{position}- Sales YoY {_fmt_pct(m.get('sales_yoy'))} | Profit YoY {_fmt_pct(m.get('profit_yoy'))} | 3Y sales CAGR {_fmt_pct(m.get('sales_cagr_3y'))}
+- OPM {_fmt_pct(m.get('opm'))} | ROE {_fmt_pct(m.get('roe'))} | Loss quarters (last 4) {_fmt_pct(m.get('loss_quarters'))}
+- Debt/Equity {'n/a' if m.get('debt_equity') is None else f"{m['debt_equity']:.2f}"} | Interest cover {'n/a' if m.get('interest_coverage') is None else f"{m['interest_coverage']:.1f}x"} | Pledge {_fmt_pct(m.get('pledge'))}
+- 30D return {_fmt_pct(m.get('return_30d'))} | vs 30D avg {_fmt_pct(m.get('vs_average'))} | Volatility {_fmt_pct(vol)} annualised
+
+**FACTOR SCORES** (-1 … +1):
+{factor_lines}
+
+**RISK RATING** → {risk}
+
+_Rule-based pre-score; no LLM commentary was requested._"""
+
+
+def prescore_summary(scorecard: Dict[str, Any]) -> str:
+    """Short block appended to the LLM prompt when escalating a pre-scored stock."""
+    factors = ", ".join(f"{k} {'n/a' if v is None else f'{v:+.2f}'}" for k, v in scorecard["factors"].items())
+    return (f"Rule engine verdict: {scorecard['verdict']} (confidence {scorecard['confidence']:.0%}, "
+            f"composite {scorecard['composite']:+.2f}). Factor scores: {factors}.")
@@ -0,0 +1,431 @@
+# src/scraper/farm.py
+"""
+Scraping farm: refresh fundamentals for a large universe with a pool of
+ScreenerScraper worker processes.
+
+- Jobs live in a SQLite file, so a crashed or interrupted run resumes where
+  it stopped (rows left in ``running`` are re-queued on the next start).
+- Every worker process owns one browser and pulls jobs until the queue drains.
+  The parent watches them: when one dies (browser/driver crash, OOM kill)
+  the job it held counts as a failed attempt and, while jobs are
+  outstanding, a replacement worker (``worker-3.r1``) starts.
+- Requests to a host are spaced by a shared, cross-process rate limiter.
+- Failures are retried with exponential backoff + jitter up to ``max_attempts``.
+- Output goes through the existing ``ScreenerScraper.save_data`` path or into
+  a bulk ``fundamentals`` table in the same SQLite file.
+
+Usage:
+    python -m src.scraper.farm enqueue universe.txt
+    python -m src.scraper.farm run --workers 4 --min-interval 2.0
+    python -m src.scraper.farm status
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from logger import set_log_context
+from src.metrics import incr
+from src.scraper.screener_scrapper import DEFAULT_BASE_URL, DEFAULT_DRIVER_PATH, ScreenerScraper
+
+logger = project_logger.getChild("scraper.farm")
+
+DEFAULT_DB_PATH = os.path.join("info_json", "farm.sqlite")
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    name            TEXT PRIMARY KEY,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    worker          TEXT,
+    last_error      TEXT,
+    started_at      REAL,
+    finished_at     REAL,
+    output          TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS host_slots (
+    host         TEXT PRIMARY KEY,
+    next_allowed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS worker_stats (
+    worker       TEXT PRIMARY KEY,
+    pid          INTEGER,
+    done         INTEGER NOT NULL DEFAULT 0,
+    failed       INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0,
+    started_at   REAL,
+    updated_at   REAL
+);
+CREATE TABLE IF NOT EXISTS fundamentals (
+    name       TEXT PRIMARY KEY,
+    company    TEXT,
+    scraped_at TEXT,
+    data       TEXT NOT NULL
+);
+"""
+
+
+class JobQueue:
+    """Persistent job queue + rate-limiter state shared by all worker processes."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def _write_txn(self):
+        # IMMEDIATE takes the write lock up front so claim/acquire are atomic across processes
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # ------------------------------------------------------------------ jobs
+    def enqueue(self, names: Iterable[str], requeue_done: bool = False) -> int:
+        names = [n.strip() for n in names if n and n.strip()]
+        with self._write_txn() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO jobs (name) VALUES (?)", [(n,) for n in names])
+            if requeue_done:
+                conn.executemany(
+                    "UPDATE jobs SET status='pending', attempts=0, next_attempt_at=0 WHERE name=?",
+                    [(n,) for n in names],
+                )
+            return conn.total_changes - before
+
+    def recover(self) -> int:
+        """Re-queue jobs a crashed run left in ``running``."""
+        with self._write_txn() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status='pending', worker=NULL WHERE status=?", (RUNNING,)
+            )
+            return cur.rowcount
+
+    def release(self, worker: str, max_attempts: int, backoff_base: float) -> List[str]:
+        """Fail the jobs a dead ``worker`` left in ``running`` (retried like any failure); returns their names."""
+        names = [row[0] for row in self.conn.execute(
+            "SELECT name FROM jobs WHERE status=? AND worker=?", (RUNNING, worker)
+        ).fetchall()]
+        for name in names:
+            self.fail(name, "worker process died", max_attempts, backoff_base)
+        return names
+
+    def claim(self, worker: str) -> Optional[str]:
+        now = time.time()
+        with self._write_txn() as conn:
+            row = conn.execute(
+                "SELECT name FROM jobs WHERE status=? AND next_attempt_at<=? ORDER BY rowid LIMIT 1",
+                (PENDING, now),
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status=?, worker=?, started_at=? WHERE name=?",
+                (RUNNING, worker, now, row[0]),
+            )
+            return row[0]
+
+    def complete(self, name: str, output: List[str]):
+        with self._write_txn() as conn:
+            conn.execute(
+                "UPDATE jobs SET status=?, finished_at=?, last_error=NULL, output=? WHERE name=?",
+                (DONE, time.time(), json.dumps(output), name),
+            )
+
+    def fail(self, name: str, error: str, max_attempts: int, backoff_base: float) -> bool:
+        """Record a failure; returns True if the job will be retried."""
+        with self._write_txn() as conn:
+            (attempts,) = conn.execute("SELECT attempts FROM jobs WHERE name=?", (name,)).fetchone()
+            attempts += 1
+            retry = attempts < max_attempts
+            delay = backoff_base * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            conn.execute(
+                "UPDATE jobs SET status=?, attempts=?, next_attempt_at=?, last_error=?, finished_at=? WHERE name=?",
+                (PENDING if retry else FAILED, attempts, time.time() + delay, error[:500], time.time(), name),
+            )
+            return retry
+
+    def outstanding(self) -> int:
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (PENDING, RUNNING)
+        ).fetchone()
+        return count
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    # ------------------------------------------------------------ rate limit
+    def acquire_slot(self, host: str, min_interval: float) -> float:
+        """Reserve the next request slot for ``host``; sleeps until it arrives. Returns wait time."""
+        with self._write_txn() as conn:
+            now = time.time()
+            row = conn.execute("SELECT next_allowed FROM host_slots WHERE host=?", (host,)).fetchone()
+            slot = max(now, row[0] if row else 0.0)
+            conn.execute(
+                "INSERT INTO host_slots (host, next_allowed) VALUES (?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET next_allowed=excluded.next_allowed",
+                (host, slot + min_interval),
+            )
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    # --------------------------------------------------------------- output
+    def store_fundamentals(self, name: str, data: Dict):
+        meta = data.get("metadata", {})
+        with self._write_txn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fundamentals (name, company, scraped_at, data) VALUES (?, ?, ?, ?)",
+                (name, meta.get("company"), meta.get("scraped_at"), json.dumps(data, ensure_ascii=False)),
+            )
+
+    # -------------------------------------------------------------- metrics
+    def update_worker_stats(self, worker: str, done: int, failed: int, busy_seconds: float, started_at: float):
+        with self._write_txn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO worker_stats (worker, pid, done, failed, busy_seconds, started_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (worker, os.getpid(), done, failed, busy_seconds, started_at, time.time()),
+            )
+
+    def worker_stats(self) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT worker, pid, done, failed, busy_seconds, started_at, updated_at FROM worker_stats ORDER BY worker"
+        ).fetchall()
+        stats = []
+        for worker, pid, done, failed, busy, started, updated in rows:
+            elapsed = max((updated or 0) - (started or 0), 1e-9)
+            stats.append({
+                "worker": worker,
+                "pid": pid,
+                "done": done,
+                "failed": failed,
+                "jobs_per_min": round(60 * done / elapsed, 2),
+                "avg_job_s": round(busy / done, 2) if done else None,
+                "utilisation": round(busy / elapsed, 2),
+            })
+        return stats
+
+
+def _worker_main(worker: str, db_path: str, options: Dict):
+    """Entry point of one farm process: one browser, jobs until the queue drains."""
+    set_log_context(worker=worker)
+    queue = JobQueue(db_path)
+    host = urlparse(options["base_url"]).netloc
+    started_at = time.time()
+    done = failed = 0
+    busy = 0.0
+    scraper = None
+
+    try:
+        while True:
+            name = queue.claim(worker)
+            if name is None:
+                if queue.outstanding() == 0:
+                    break
+                time.sleep(options["idle_poll_s"])  # remaining jobs are backing off
+                continue
+
+            set_log_context(ticker=name)
+            job_start = time.perf_counter()
+            try:
+                if scraper is None:
+                    scraper = ScreenerScraper(
+                        chromedriver_path=options["chromedriver_path"],
+                        headless=True,
+                        base_url=options["base_url"],
+                    )
+                    scraper.start()
+                queue.acquire_slot(host, options["min_interval"])
+                scraper.search_company(name)
+                data = scraper.extract_all()
+                if options["output"] == "sqlite":
+                    queue.store_fundamentals(name, data)
+                    output = [f"sqlite:{name}"]
+                else:
+                    output = scraper.save_data(data, folder=options["folder"])
+                queue.complete(name, output)
+                done += 1
+                logger.info(f"{name} → done ({time.perf_counter() - job_start:.1f}s)")
+            except Exception as exc:
+                failed += 1
+                retry = queue.fail(name, f"{type(exc).__name__}: {exc}", options["max_attempts"], options["backoff_base"])
+                incr("scrape_retries" if retry else "scrape_failures", worker=worker)
+                logger.warning(f"{name} → failed ({exc}); {'will retry' if retry else 'giving up'}")
+                # A broken driver poisons every later job, so start fresh next time
+                if scraper is not None:
+                    try:
+                        scraper.quit()
+                    except Exception:
+                        pass
+                    scraper = None
+            finally:
+                busy += time.perf_counter() - job_start
+                queue.update_worker_stats(worker, done, failed, busy, started_at)
+    finally:
+        if scraper is not None:
+            try:
+                scraper.quit()
+            except Exception:
+                pass
+        queue.close()
+
+
+def run_farm(
+    db_path: str = DEFAULT_DB_PATH,
+    workers: int = 4,
+    min_interval: float = 2.0,
+    max_attempts: int = 4,
+    backoff_base: float = 30.0,
+    output: str = "files",
+    folder: str = "info_json",
+    base_url: str = DEFAULT_BASE_URL,
+    chromedriver_path: str = DEFAULT_DRIVER_PATH,
+    max_respawns: Optional[int] = None,
+) -> Dict:
+    """
+    Drain the job queue with ``workers`` processes; returns final counts + worker metrics.
+    A worker that dies is replaced while jobs are outstanding, up to ``max_respawns``
+    times per run (default ``workers * max_attempts``) so a worker that cannot even
+    start does not respawn forever.
+    """
+    queue = JobQueue(db_path)
+    recovered = queue.recover()
+    if recovered:
+        logger.info(f"Resuming: {recovered} interrupted jobs re-queued")
+    logger.info(f"Farm start → {queue.counts()} | {workers} workers | {min_interval}s per request per host")
+
+    options = {
+        "min_interval": min_interval,
+        "max_attempts": max_attempts,
+        "backoff_base": backoff_base,
+        "output": output,
+        "folder": folder,
+        "base_url": base_url,
+        "chromedriver_path": chromedriver_path,
+        "idle_poll_s": 1.0,
+    }
+    # spawn: each worker gets a clean interpreter (and a clean browser), on every OS
+    ctx = mp.get_context("spawn")
+
+    def spawn(worker: str):
+        proc = ctx.Process(target=_worker_main, args=(worker, db_path, options), daemon=False)
+        proc.start()
+        return proc
+
+    procs = {f"worker-{i}": spawn(f"worker-{i}") for i in range(workers)}
+    respawns_left = max_respawns if max_respawns is not None else workers * max_attempts
+    try:
+        while procs:
+            for worker, proc in list(procs.items()):
+                proc.join(timeout=options["idle_poll_s"] / len(procs))
+                if proc.is_alive():
+                    continue
+                del procs[worker]
+                if proc.exitcode == 0:
+                    continue
+                # Its "running" rows would keep every other worker polling (and this join) forever
+                lost = queue.release(worker, max_attempts, backoff_base)
+                incr("farm_worker_deaths", worker=worker)
+                logger.error(f"{worker} died (exit code {proc.exitcode}) → re-queued {', '.join(lost) or 'no jobs'}")
+                if queue.outstanding() and respawns_left > 0:
+                    respawns_left -= 1
+                    # A fresh name keeps the dead worker's row in worker_stats
+                    slot, _, generation = worker.partition(".r")
+                    replacement = f"{slot}.r{int(generation or 0) + 1}"
+                    procs[replacement] = spawn(replacement)
+    except KeyboardInterrupt:
+        logger.warning("Interrupted — progress is checkpointed, re-run to resume")
+        for proc in procs.values():
+            proc.terminate()
+        raise
+
+    outstanding = queue.outstanding()
+    summary = {"counts": queue.counts(), "outstanding": outstanding, "workers": queue.worker_stats()}
+    queue.close()
+    if outstanding:
+        logger.error(f"Farm stopped with {outstanding} jobs outstanding (workers kept dying) → {summary['counts']}, "
+                     f"re-run to resume")
+    else:
+        logger.info(f"Farm finished → {summary['counts']}")
+    return summary
+
+
+def _read_universe(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.split("#", 1)[0].strip() for line in f if line.split("#", 1)[0].strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Multi-process Screener scraping farm")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite queue/checkpoint file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_enqueue = sub.add_parser("enqueue", help="add company names (one per line) to the queue")
+    p_enqueue.add_argument("universe")
+    p_enqueue.add_argument("--refresh", action="store_true", help="re-queue names already done")
+
+    p_run = sub.add_parser("run", help="process the queue (resumes automatically)")
+    p_run.add_argument("--workers", type=int, default=4)
+    p_run.add_argument("--min-interval", type=float, default=2.0, help="seconds between requests per host")
+    p_run.add_argument("--max-attempts", type=int, default=4)
+    p_run.add_argument("--backoff", type=float, default=30.0, help="base retry delay in seconds")
+    p_run.add_argument("--output", choices=["files", "sqlite"], default="files")
+    p_run.add_argument("--folder", default="info_json")
+
+    sub.add_parser("status", help="show queue counts and per-worker throughput")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        queue = JobQueue(args.db)
+        added = queue.enqueue(_read_universe(args.universe), requeue_done=args.refresh)
+        print(f"Queued {added} jobs → {queue.counts()}")
+        queue.close()
+    elif args.command == "run":
+        summary = run_farm(
+            db_path=args.db,
+            workers=args.workers,
+            min_interval=args.min_interval,
+            max_attempts=args.max_attempts,
+            backoff_base=args.backoff,
+            output=args.output,
+            folder=args.folder,
+        )
+        print(json.dumps(summary, indent=2))
+    else:
+        queue = JobQueue(args.db)
+        print(json.dumps({"counts": queue.counts(), "workers": queue.worker_stats()}, indent=2))
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# src/scraper/normalize.py
+"""
+Columnar normalization of Screener tables.
+
+`ScreenerScraper._extract_table` returns nested dicts of
+``metric -> {period_header: value}`` where every value went through
+`extract_numeric_value` on its own. This module turns a whole section into a
+single float64 matrix (metrics x periods, NaN for missing) with parsed period
+dates, so analytics can work on arrays instead of re-walking the dicts.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+TTM_LABELS = {"TTM", "TTM*"}
+
+# Sections of `ScreenerScraper.extract_all` that are plain metric tables
+TABLE_SECTIONS = ("quarters", "profit_loss", "balance_sheet")
+
+
+def clean_metric_name(name: str) -> str:
+    """'Sales +' -> 'Sales', 'Net Profit\xa0+' -> 'Net Profit'."""
+    return " ".join(str(name).replace("\xa0", " ").rstrip("+ ").split())
+
+
+def parse_numeric_array(values: Iterable[Any]) -> np.ndarray:
+    """
+    Parse a flat sequence of Screener cells into float64 in one vectorized pass.
+
+    Handles values already converted by `extract_numeric_value` (int/float,
+    percent fractions) as well as raw cell text: thousands separators, "₹",
+    "Cr"/"Cr.", unicode minus, "(123)" negatives and "12%" percentages
+    (returned as fractions, matching `extract_numeric_value`). Anything that
+    is not a number becomes NaN.
+    """
+    values = list(values)
+    try:
+        # Fast path: extract_all output is already numbers/None (None -> NaN)
+        return np.array(values, dtype="float64")
+    except (TypeError, ValueError):
+        pass
+
+    s = pd.Series(values, dtype="object").astype("string").str.strip()
+
+    negative = s.str.match(r"^\(.*\)$").fillna(False).to_numpy(dtype=bool)
+    percent = s.str.endswith("%").fillna(False).to_numpy(dtype=bool)
+
+    cleaned = (
+        s.str.replace(r"[()₹,%\s]|Rs\.?|Cr\.?", "", regex=True)
+        .str.replace("−", "-", regex=False)
+    )
+    out = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    out[negative] = -np.abs(out[negative])
+    out[percent] /= 100.0
+    return out
+
+
+def parse_period_dates(headers: List[str]) -> tuple:
+    """
+    Parse period headers ("Mar 2024", "Sep 2023") into month-end dates.
+
+    Returns ``(dates, is_ttm)`` where ``dates`` is datetime64[ns] with NaT for
+    TTM or unparseable headers, and ``is_ttm`` flags trailing-twelve-month
+    columns.
+    """
+    dates, is_ttm = _parse_period_dates_cached(tuple(headers))
+    return dates.copy(), is_ttm.copy()
+
+
+@lru_cache(maxsize=1024)
+def _parse_period_dates_cached(headers: Tuple[str, ...]) -> tuple:
+    # Every company shares the same handful of header rows, so parse each once
+    labels = pd.Series(list(headers), dtype="string").str.strip()
+    is_ttm = labels.str.upper().isin(TTM_LABELS).to_numpy(dtype=bool)
+    first_two = labels.str.extract(r"^([A-Za-z]{3})[a-z]*\s+(\d{4})")
+    parsed = pd.to_datetime(first_two[0] + " " + first_two[1], format="%b %Y", errors="coerce")
+    dates = (parsed + pd.offsets.MonthEnd(0)).to_numpy(dtype="datetime64[ns]")
+    return dates, is_ttm
+
+
+class SectionMatrix:
+    """Float64 view of one Screener table: rows are metrics, columns are periods."""
+
+    __slots__ = ("name", "metrics", "periods", "dates", "is_ttm", "values", "_index")
+
+    def __init__(self, name: str, metrics: List[str], periods: List[str], values: np.ndarray):
+        self.name = name
+        self.metrics = metrics
+        self.periods = periods
+        self.values = values
+        self.dates, self.is_ttm = parse_period_dates(periods)
+        self._index = {m.lower(): i for i, m in enumerate(metrics)}
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    @property
+    def empty(self) -> bool:
+        return self.values.size == 0
+
+    def has(self, metric: str) -> bool:
+        return clean_metric_name(metric).lower() in self._index
+
+    def row(self, *names: str, include_ttm: bool = False) -> np.ndarray:
+        """First matching metric row (aliases tried in order); all-NaN if none match."""
+        cols = slice(None) if include_ttm else ~self.is_ttm
+        for name in names:
+            idx = self._index.get(clean_metric_name(name).lower())
+            if idx is not None:
+                return self.values[idx, cols]
+        width = self.values.shape[1] if include_ttm else int((~self.is_ttm).sum())
+        return np.full(width, np.nan)
+
+    def latest(self, *names: str) -> float:
+        """Most recent non-NaN, non-TTM value for a metric."""
+        row = self.row(*names)
+        valid = np.flatnonzero(~np.isnan(row))
+        return float(row[valid[-1]]) if valid.size else float("nan")
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=self.metrics, columns=self.periods)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "metrics": self.metrics,
+            "periods": self.periods,
+            "dates": [None if np.isnat(d) else str(d)[:10] for d in self.dates],
+            "is_ttm": self.is_ttm.tolist(),
+            "values": [[None if np.isnan(v) else float(v) for v in row] for row in self.values],
+        }
+
+    def __repr__(self) -> str:
+        return f"SectionMatrix({self.name!r}, shape={self.shape})"
+
+
+def normalize_section(name: str, table: Dict[str, Dict[str, Any]]) -> SectionMatrix:
+    """Convert ``metric -> {period: value}`` into a `SectionMatrix`."""
+    metrics: List[str] = []
+    periods: List[str] = []
+    col_pos: Dict[str, int] = {}
+    rows, cols, cells = [], [], []
+
+    for raw_metric, by_period in (table or {}).items():
+        if not isinstance(by_period, dict):
+            continue
+        r = len(metrics)
+        metrics.append(clean_metric_name(raw_metric))
+        for period, value in by_period.items():
+            c = col_pos.get(period)
+            if c is None:
+                c = col_pos[period] = len(periods)
+                periods.append(period)
+            rows.append(r)
+            cols.append(c)
+            cells.append(value)
+
+    values = np.full((len(metrics), len(periods)), np.nan, dtype="float64")
+    if cells:
+        values[np.asarray(rows), np.asarray(cols)] = parse_numeric_array(cells)
+    return SectionMatrix(name, metrics, periods, values)
+
+
+def normalize_all(data: Dict[str, Any]) -> Dict[str, SectionMatrix]:
+    """
+    Normalize every tabular section of a `ScreenerScraper.extract_all` result.
+
+    Keys: ``quarters``, ``profit_loss``, ``balance_sheet``,
+    ``shareholding_quarterly`` and ``shareholding_yearly``.
+    """
+    sections = {name: normalize_section(name, data.get(name) or {}) for name in TABLE_SECTIONS}
+    shareholding = data.get("shareholding") or {}
+    for period in ("quarterly", "yearly"):
+        key = f"shareholding_{period}"
+        sections[key] = normalize_section(key, shareholding.get(period) or {})
+    return sections
+
+
+def growth_rates(row: np.ndarray, lag: int = 1) -> np.ndarray:
+    """Period-over-period growth of a metric row (NaN where undefined)."""
+    row = np.asarray(row, dtype="float64")
+    out = np.full(row.shape, np.nan)
+    if row.size > lag:
+        prev = row[:-lag]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[lag:] = np.where(prev != 0, (row[lag:] - prev) / np.abs(prev), np.nan)
+    return out
+
+
+def safe_ratio(num: Any, den: Any) -> np.ndarray:
+    """Elementwise num / den with NaN instead of inf for zero denominators."""
+    num = np.asarray(num, dtype="float64")
+    den = np.asarray(den, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den != 0, num / den, np.nan)
@@ -3,7 +3,6 @@ import os
 import json
 import time
 import re
-import logging
 from typing import Dict, Any
 
 from selenium import webdriver
@@ -12,9 +11,12 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 
-logging.basicConfig(level=logging.INFO, format="%(message)s")
-logger = logging.getLogger(__name__)
+from logger import logger as project_logger
+from src.metrics import timed
+
+logger = project_logger.getChild("scraper")
 
 
 def extract_numeric_value(text):
@@ -33,19 +35,64 @@ def extract_numeric_value(text):
 
 
 DEFAULT_DRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "chromedriver-win64/chromedriver.exe")
+DEFAULT_BASE_URL = os.getenv("SCREENER_BASE_URL", "https://www.screener.in/")
+DEFAULT_CACHE_DIR = os.getenv("SCREENER_CACHE_DIR", os.path.join(".cache", "chrome"))
+# The peer table is filled in by a separate request after the page is ready (only waited for when #peers exists)
+PEERS_WAIT_S = float(os.getenv("SCREENER_PEERS_WAIT", "3"))
+
+# Requests the fast-load profile drops via CDP: nothing here is read by extract_all
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*googleadservices.com*", "*adservice.google.*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*mixpanel.com*",
+]
+
+# The company page is "ready" once the core sections exist; without them the scrape is useless
+HOME_SEARCH_SELECTOR = ".home-search input[aria-label='Search for a company']"
+CORE_SELECTORS = ("#profit-loss table", "#analysis")
+# The rest of what extract_all reads; may legitimately be absent (recent listings, banks)
+OPTIONAL_SELECTORS = (
+    "h1",
+    "#quarters table",
+    "#balance-sheet table",
+    "#quarterly-shp table",
+    "#yearly-shp table",
+)
+# Extra wait for optional sections once the core ones are in, so a page without them costs seconds, not the timeout
+SECTIONS_GRACE_S = float(os.getenv("SCREENER_SECTIONS_GRACE", "1.5"))
+
+
+def _all_present(selectors):
+    """Wait condition: every CSS selector matches at least one element."""
+    def _check(driver):
+        return all(driver.find_elements(By.CSS_SELECTOR, sel) for sel in selectors)
+    return _check
 
 
 class ScreenerScraper:
-    def __init__(self, chromedriver_path: str = DEFAULT_DRIVER_PATH, headless: bool = True):
+    def __init__(
+        self,
+        chromedriver_path: str = DEFAULT_DRIVER_PATH,
+        headless: bool = True,
+        fast_load: bool = True,
+        base_url: str = DEFAULT_BASE_URL,
+        cache_dir: str | None = DEFAULT_CACHE_DIR,
+        wait_timeout: float = 20,
+    ):
         self.driver = None
         self.wait = None
         self.chromedriver_path = chromedriver_path
         self.headless = headless
+        self.fast_load = fast_load
+        self.base_url = base_url.rstrip("/") + "/"
+        self.cache_dir = cache_dir
+        self.wait_timeout = wait_timeout
         self.query_used = None  # Store original user query
+        self.last_page_ready_s = None  # Seconds from home page request to company page ready
 
-    def start(self):
-        logger.info("Starting headless Chrome...")
-        service = Service(self.chromedriver_path)
+    def _build_options(self) -> webdriver.ChromeOptions:
         options = webdriver.ChromeOptions()
         if self.headless:
             options.add_argument("--headless=new")
@@ -55,32 +102,73 @@ class ScreenerScraper:
         options.add_argument("--window-size=1920,1080")
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
 
+        if self.fast_load:
+            # Return control at DOMContentLoaded; section waits below cover the rest
+            options.page_load_strategy = "eager"
+            options.add_argument("--disable-extensions")
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+            if self.cache_dir:
+                cache_path = os.path.abspath(self.cache_dir)
+                os.makedirs(cache_path, exist_ok=True)
+                options.add_argument(f"--disk-cache-dir={cache_path}")
+        return options
+
+    def _block_heavy_resources(self):
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as exc:
+            logger.warning(f"CDP resource blocking unavailable: {exc}")
+
+    @timed("scraper.start")
+    def start(self):
+        logger.info(f"Starting headless Chrome ({'fast' if self.fast_load else 'full'} load profile)...")
+        service = Service(self.chromedriver_path)
+        options = self._build_options()
+
         try:
             self.driver = webdriver.Chrome(service=service, options=options)
-            self.wait = WebDriverWait(self.driver, 20)
+            self.driver.set_page_load_timeout(self.wait_timeout)
+            self.wait = WebDriverWait(self.driver, self.wait_timeout)
         except Exception as exc:
             logger.error(f"Unable to start ChromeDriver at {self.chromedriver_path}: {exc}")
             raise
 
+        if self.fast_load:
+            self._block_heavy_resources()
+
+    @timed("scraper.search_company")
     def search_company(self, query: str):
         self.query_used = query.strip()  # Save original query
         logger.info(f"Searching: {query}")
         if not self.driver:
             raise RuntimeError("Driver not started. Call start() before search.")
 
-        self.driver.get("https://www.screener.in/")
-        self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "home-search")))
-        home_search = self.driver.find_element(By.CLASS_NAME, "home-search")
-        search_box = home_search.find_element(By.CSS_SELECTOR, "input[aria-label='Search for a company']")
+        started = time.perf_counter()
+        self.driver.get(self.base_url)
+        search_box = self.wait.until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, HOME_SEARCH_SELECTOR))
+        )
+        # All waits share one wait_timeout budget instead of getting the full timeout each
+        left = max(0.5, self.wait_timeout - (time.perf_counter() - started))
 
         self.driver.execute_script("arguments[0].focus();", search_box)
         self.driver.execute_script("arguments[0].value = arguments[1];", search_box, query)
         self.driver.execute_script("arguments[0].dispatchEvent(new Event('input', {bubbles: true}));", search_box)
         search_box.send_keys(Keys.RETURN)
 
-        self.wait.until(EC.presence_of_element_located((By.ID, "profit-loss")))
-        self.wait.until(EC.presence_of_element_located((By.ID, "analysis")))
-        logger.info("Company page loaded")
+        WebDriverWait(self.driver, left).until(_all_present(CORE_SELECTORS))
+        grace = min(SECTIONS_GRACE_S, max(0.0, self.wait_timeout - (time.perf_counter() - started)))
+        try:
+            WebDriverWait(self.driver, grace, poll_frequency=0.1).until(_all_present(OPTIONAL_SELECTORS))
+        except TimeoutException:
+            missing = [sel for sel in OPTIONAL_SELECTORS if not self.driver.find_elements(By.CSS_SELECTOR, sel)]
+            logger.warning(f"Not on the page after {grace:.1f}s grace: {', '.join(missing)}; extracting what loaded")
+        self.last_page_ready_s = time.perf_counter() - started
+        logger.info(f"Company page loaded in {self.last_page_ready_s:.2f}s")
 
     def get_company_name(self) -> str:
         try:
@@ -139,6 +227,38 @@ class ScreenerScraper:
         except:
             return {"quarterly": {}, "yearly": {}}
 
+    def _extract_peers(self) -> Dict:
+        """Peer comparison: the group's breadcrumb links and one row per peer (column → value)."""
+        if not self.driver.find_elements(By.CSS_SELECTOR, "#peers"):
+            return {"group": [], "rows": []}  # no peer section on this page: nothing to wait for
+        try:
+            if not self.driver.find_elements(By.CSS_SELECTOR, "#peers table"):
+                WebDriverWait(self.driver, PEERS_WAIT_S).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "#peers table"))
+                )
+            group = [
+                {"name": a.text.strip(), "url": a.get_attribute("href")}
+                for a in self.driver.find_elements(By.CSS_SELECTOR, "#peers .sub a")
+            ]
+            table = self.driver.find_element(By.CSS_SELECTOR, "#peers table")
+            headers = [" ".join(th.text.split()) for th in table.find_elements(By.TAG_NAME, "th")]
+            rows = []
+            for row in table.find_elements(By.CSS_SELECTOR, "tbody tr"):
+                cells = row.find_elements(By.TAG_NAME, "td")
+                links = row.find_elements(By.TAG_NAME, "a")
+                if len(cells) != len(headers) or not links:
+                    continue
+                values = dict(zip(headers, cells))
+                rows.append({
+                    "name": links[0].text.strip(),
+                    "url": links[0].get_attribute("href"),
+                    "values": {h: extract_numeric_value(c.text) for h, c in values.items() if h not in ("S.No.", "Name")},
+                })
+            return {"group": group, "rows": rows}
+        except Exception:
+            logger.warning("peers → skipped")
+            return {"group": [], "rows": []}
+
     def _extract_analysis(self) -> Dict:
         try:
             pros = [li.text.strip() for li in self.driver.find_elements(By.CSS_SELECTOR, "#analysis .pros li")]
@@ -147,6 +267,7 @@ class ScreenerScraper:
         except:
             return {"pros": [], "cons": []}
 
+    @timed("scraper.extract_all")
     def extract_all(self) -> Dict[str, Any]:
         logger.info("Extracting all data...")
         return {
@@ -160,16 +281,20 @@ class ScreenerScraper:
             "profit_loss": self._extract_table("profit-loss"),
             "balance_sheet": self._extract_table("balance-sheet"),
             "shareholding": self._extract_shareholding(),
-            "analysis": self._extract_analysis()
+            "analysis": self._extract_analysis(),
+            "peers": self._extract_peers(),
         }
 
+    @timed("scraper.save_data")
     def save_data(self, data: Dict, folder: str = "info_json") -> list:
         os.makedirs(folder, exist_ok=True)
         base_name = self.get_safe_filename()  # ← Clean, predictable name
 
         saved = []
-        sections = ["quarters", "profit_loss", "balance_sheet", "shareholding", "analysis"]
+        sections = ["quarters", "profit_loss", "balance_sheet", "shareholding", "analysis", "peers"]
         for sec in sections:
+            if sec not in data:
+                continue  # e.g. no peer table from the yfinance fallback
             path = os.path.join(folder, f"{base_name}_{sec}.json")
             with open(path, "w", encoding="utf-8") as f:
                 json.dump(data[sec], f, indent=2, ensure_ascii=False)
@@ -0,0 +1,184 @@
+# src/scraper/yahoo_fundamentals.py
+"""
+Secondary fundamentals provider: yfinance statements in the Screener schema.
+
+`ScreenerScraper.extract_all` is the primary source; this maps a
+``yf.Ticker`` onto the same ``quarters`` / ``profit_loss`` /
+``balance_sheet`` / ``shareholding`` / ``analysis`` dict so everything
+downstream (normalize, scoring, snapshots, the prompt) works unchanged.
+src/tools.py launches it as a hedge when the scrape is slow.
+
+    import yfinance as yf
+    data = extract_all(yf.Ticker("TCS.NS"), "TCS")
+
+Units follow Screener: amounts in ₹ crore, percentages as fractions (what
+`extract_numeric_value` makes of "12%"), EPS in rupees, columns oldest
+first with "Mar 2024"-style headers. Yahoo has no pros/cons and only a
+current holder split, so ``analysis`` is empty and ``shareholding`` has a
+single column with Promoters (insiders), Institutions (FIIs + DIIs, not
+split) and Public.
+"""
+import math
+import time
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+CRORE = 1e7
+
+# Screener metric → yfinance statement rows, first present wins
+INCOME_ROWS = {
+    "Sales": ("Total Revenue", "Operating Revenue"),
+    "Operating Profit": ("EBITDA", "Normalized EBITDA", "Operating Income"),
+    "Other Income": ("Other Non Operating Income Expenses", "Other Income Expense"),
+    "Interest": ("Interest Expense", "Interest Expense Non Operating"),
+    "Depreciation": ("Reconciled Depreciation", "Depreciation And Amortization In Income Statement"),
+    "Profit before tax": ("Pretax Income",),
+    "Net Profit": ("Net Income", "Net Income Common Stockholders"),
+}
+BALANCE_ROWS = {
+    "Equity Capital": ("Common Stock", "Capital Stock"),
+    "Borrowings": ("Total Debt",),
+    "Total Liabilities": ("Total Assets",),  # Screener's "Total Liabilities" includes equity
+    "Fixed Assets": ("Net PPE",),
+    "CWIP": ("Construction In Progress",),
+    "Investments": ("Investments And Advances", "Investmentin Financial Assets"),
+    "Total Assets": ("Total Assets",),
+}
+
+
+def _rows(frame: Optional[pd.DataFrame], names: tuple) -> Optional[pd.Series]:
+    for name in names:
+        if frame is not None and name in frame.index:
+            return frame.loc[name]
+    return None
+
+
+def _cell(value: Any, scale: float = 1.0, digits: int = 2) -> Optional[float]:
+    try:
+        value = float(value) / scale
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else round(value, digits)
+
+
+def _ratio(num: Optional[pd.Series], den: Optional[pd.Series]) -> Optional[pd.Series]:
+    if num is None or den is None:
+        return None
+    return num / den.where(den != 0)
+
+
+def _table(columns: Dict[str, Optional[pd.Series]], scaled: Dict[str, bool]) -> Dict[str, Dict[str, Any]]:
+    """``metric → {"Mar 2024": value}`` with periods oldest first, metrics in Screener's order."""
+    table = {}
+    for metric, series in columns.items():
+        if series is None:
+            continue
+        series = series.sort_index()
+        digits = 2 if scaled[metric] else 4
+        cells = {ts.strftime("%b %Y"): _cell(v, CRORE if scaled[metric] else 1.0, digits) for ts, v in series.items()}
+        if any(v is not None for v in cells.values()):
+            table[metric] = cells
+    return table
+
+
+def income_table(frame: Optional[pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+    """Screener-style quarters / profit & loss table from a yfinance income statement."""
+    if frame is None or frame.empty:
+        return {}
+    raw = {metric: _rows(frame, names) for metric, names in INCOME_ROWS.items()}
+    sales, operating, pbt = raw["Sales"], raw["Operating Profit"], raw["Profit before tax"]
+    columns = {
+        "Sales": sales,
+        "Expenses": None if sales is None or operating is None else sales - operating,
+        "Operating Profit": operating,
+        "OPM %": _ratio(operating, sales),
+        "Other Income": raw["Other Income"],
+        "Interest": raw["Interest"],
+        "Depreciation": raw["Depreciation"],
+        "Profit before tax": pbt,
+        "Tax %": _ratio(_rows(frame, ("Tax Provision",)), pbt),
+        "Net Profit": raw["Net Profit"],
+        "EPS in Rs": _rows(frame, ("Diluted EPS", "Basic EPS")),
+    }
+    scaled = {m: m not in ("OPM %", "Tax %", "EPS in Rs") for m in columns}
+    return _table(columns, scaled)
+
+
+def balance_table(frame: Optional[pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+    """Screener-style balance sheet from a yfinance annual balance sheet."""
+    if frame is None or frame.empty:
+        return {}
+    raw = {metric: _rows(frame, names) for metric, names in BALANCE_ROWS.items()}
+    equity = _rows(frame, ("Stockholders Equity", "Common Stock Equity"))
+    liabilities = _rows(frame, ("Total Liabilities Net Minority Interest",))
+    capital, debt, total = raw["Equity Capital"], raw["Borrowings"], raw["Total Assets"]
+    known_assets = [raw[m] for m in ("Fixed Assets", "CWIP", "Investments") if raw[m] is not None]
+    columns = {
+        "Equity Capital": capital,
+        "Reserves": None if equity is None or capital is None else equity - capital,
+        "Borrowings": debt,
+        "Other Liabilities": None if liabilities is None else liabilities - (0 if debt is None else debt.fillna(0)),
+        "Total Liabilities": raw["Total Liabilities"],
+        "Fixed Assets": raw["Fixed Assets"],
+        "CWIP": raw["CWIP"],
+        "Investments": raw["Investments"],
+        "Other Assets": None if total is None else total - sum(s.fillna(0) for s in known_assets),
+        "Total Assets": total,
+    }
+    return _table(columns, {m: True for m in columns})
+
+
+def shareholding_table(holders: Optional[pd.DataFrame], as_of: Optional[str] = None) -> Dict[str, Dict]:
+    """Screener-style shareholding from ``major_holders`` (one column: today's split)."""
+    empty = {"quarterly": {}, "yearly": {}}
+    if holders is None or holders.empty:
+        return empty
+    values = holders.iloc[:, 0] if holders.shape[1] else pd.Series(dtype=float)
+    insiders = _cell(values.get("insidersPercentHeld"), digits=4)
+    institutions = _cell(values.get("institutionsPercentHeld"), digits=4)
+    if insiders is None and institutions is None:
+        return empty
+    period = as_of or time.strftime("%b %Y")
+    rows = {"Promoters": insiders, "Institutions": institutions,
+            "Public": round(max(0.0, 1 - (insiders or 0) - (institutions or 0)), 4)}
+    quarterly = {metric: {period: value} for metric, value in rows.items() if value is not None}
+    return {"quarterly": quarterly, "yearly": {}}
+
+
+def extract_all(stock, query: str) -> Dict[str, Any]:
+    """Screener-schema fundamentals for a ``yf.Ticker`` (each statement is one Yahoo request)."""
+    data = {
+        "metadata": {
+            "company": query.strip(),
+            "user_query": query.strip(),
+            "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "url": f"https://finance.yahoo.com/quote/{stock.ticker}",
+        },
+        "quarters": income_table(stock.quarterly_income_stmt),
+        "profit_loss": income_table(stock.income_stmt),
+        "balance_sheet": balance_table(stock.balance_sheet),
+        "shareholding": shareholding_table(stock.major_holders),
+        "analysis": {"pros": [], "cons": []},
+    }
+    if not data["profit_loss"] and not data["quarters"]:
+        raise ValueError(f"No financial statements on Yahoo Finance for {stock.ticker}")
+    return data
+
+
+def is_complete(data: Dict[str, Any]) -> bool:
+    """Enough for a verdict: annual results plus either quarterly results or a balance sheet."""
+    return bool(data.get("profit_loss")) and bool(data.get("quarters") or data.get("balance_sheet"))
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    import yfinance as yf
+
+    ticker = sys.argv[1] if len(sys.argv) > 1 else "TCS.NS"
+    started = time.perf_counter()
+    result = extract_all(yf.Ticker(ticker), ticker.split(".")[0])
+    print(json.dumps(result, indent=2, ensure_ascii=False)[:3000])
+    print(f"{ticker}: complete={is_complete(result)} in {time.perf_counter() - started:.2f}s")
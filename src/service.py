@@ -0,0 +1,438 @@
+# src/service.py
+"""
+HTTP service for FinQuant (plain ASGI, no web framework).
+
+    uvicorn src.service:app --host 127.0.0.1 --port 8000
+    python src/service.py                      # same, if uvicorn is installed
+
+Endpoints (JSON in, JSON out):
+
+  GET  /health          pool depth + cache sizes
+  POST /resolve         {"query": "hdfc bank"}                       → identity
+  POST /fetch-payload   {"screener_name", "yfinance_ticker"} | {"query"} → verdict payload
+  POST /recommend       same identity fields or {"payload": {...}},
+                        plus "owns_stock", "buy_price"; with
+                        ``Accept: text/event-stream`` or ``"stream": true``
+                        the verdict streams as Server-Sent Events
+                        (progress per model call, the validated verdict,
+                        then the report);
+                        ``"incremental": true`` reuses the last verdict
+                        when nothing material changed (JSON only)
+  POST /agent/chat      {"message", "history": [{"role", "content"}, ...]}
+
+Blocking work runs on two bounded thread pools: "scrape" (Selenium, one
+Chrome per worker) and "io" (yfinance + Gemini). Each pool admits
+``workers + FINQUANT_MAX_QUEUED`` jobs; past that the request gets 429 with
+Retry-After. Every request has a deadline (FINQUANT_REQUEST_TIMEOUT, or a
+smaller ``timeout_s`` in the body) → 504. A job that times out keeps its
+worker until the blocking call returns, so it still counts against the pool.
+The deadline also bounds each scrape / price / LLM call inside the job
+(src/resilience.py); a dependency whose circuit breaker is open answers
+503 with Retry-After, unless a cached copy can be served instead (flagged
+in the response's ``"stale"``).
+
+Resolver, scrape, price and recommendation results come from the shared
+caches in src/cache.py: concurrent requests for one stock scrape it once.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger, set_log_context
+from src import resilience
+from src.cache import CACHES, fundamentals_cache
+from src.config import Config
+from src.metrics import incr, span
+from src.recommendation import (
+    generate_professional_recommendation,
+    incremental_recommendation,
+    stream_professional_recommendation,
+)
+from src.tools import build_stock_verdict_payload, resolve_stock_identity_local
+
+logger = project_logger.getChild("service")
+
+MAX_BODY_BYTES = 1_000_000
+_DONE = object()
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[List] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+class Overloaded(HTTPError):
+    def __init__(self, pool: str):
+        super().__init__(429, f"{pool} pool is full, retry later", [(b"retry-after", b"5")])
+
+
+class BoundedPool:
+    """Thread pool that refuses work instead of queueing without limit."""
+
+    def __init__(self, name: str, workers: int, max_queued: int):
+        self.name = name
+        self.workers = workers
+        self.capacity = workers + max_queued
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"finquant-{name}")
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    def submit(self, fn: Callable, *args) -> asyncio.Future:
+        """Queue ``fn(*args)`` (with the caller's log/metrics context) or raise Overloaded."""
+        with self._lock:
+            if self.pending >= self.capacity:
+                incr("service_rejected", pool=self.name)
+                raise Overloaded(self.name)
+            self.pending += 1
+        ctx = contextvars.copy_context()
+        future = self._executor.submit(ctx.run, fn, *args)
+        # Released when the thread finishes, not when the request gives up on it
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        return await self.submit(fn, *args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"workers": self.workers, "capacity": self.capacity, "pending": self.pending}
+
+
+SCRAPE_POOL = BoundedPool("scrape", Config.SCRAPE_WORKERS, Config.MAX_QUEUED)
+IO_POOL = BoundedPool("io", Config.IO_WORKERS, Config.MAX_QUEUED)
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def _get_graph():
+    # Imported lazily: src.nodes builds the Gemini client at import time
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            from src.workflow import build_graph
+            _graph = build_graph()
+        return _graph
+
+
+# --------------------------------------------------------------------------- #
+# Request helpers
+# --------------------------------------------------------------------------- #
+
+def _require_str(body: Dict, field: str) -> str:
+    value = body.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPError(400, f"'{field}' must be a non-empty string")
+    return value.strip()
+
+
+def _deadline(body: Dict) -> float:
+    try:
+        requested = float(body.get("timeout_s") or Config.REQUEST_TIMEOUT_S)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "'timeout_s' must be a number")
+    return min(max(requested, 1.0), Config.REQUEST_TIMEOUT_S)
+
+
+async def _read_body(receive) -> Dict:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HTTPError(499, "client disconnected")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            break
+    raw = b"".join(chunks)
+    if not raw:
+        return {}
+    try:
+        body = json.loads(raw)
+    except ValueError:
+        raise HTTPError(400, "body must be JSON")
+    if not isinstance(body, dict):
+        raise HTTPError(400, "body must be a JSON object")
+    return body
+
+
+async def _send_json(send, status: int, payload: Any, headers: Optional[List] = None):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode())] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+# --------------------------------------------------------------------------- #
+# Handlers
+# --------------------------------------------------------------------------- #
+
+async def _identity(body: Dict) -> Dict[str, str]:
+    if body.get("screener_name") and body.get("yfinance_ticker"):
+        return {"screener_name": _require_str(body, "screener_name"),
+                "yfinance_ticker": _require_str(body, "yfinance_ticker").upper()}
+    return await IO_POOL.run(resolve_stock_identity_local, _require_str(body, "query"))
+
+
+async def _payload(body: Dict) -> Dict:
+    if isinstance(body.get("payload"), dict):
+        return body["payload"]
+    identity = await _identity(body)
+    set_log_context(ticker=identity["yfinance_ticker"])
+    # Only a cold scrape needs a browser slot
+    cached = fundamentals_cache.has(identity["screener_name"].strip().lower())
+    pool = IO_POOL if cached else SCRAPE_POOL
+    return await pool.run(build_stock_verdict_payload, identity["screener_name"], identity["yfinance_ticker"])
+
+
+def _position(body: Dict):
+    try:
+        return bool(body.get("owns_stock")), float(body.get("buy_price") or 0)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "'buy_price' must be a number")
+
+
+async def handle_resolve(body: Dict) -> Dict:
+    return await IO_POOL.run(resolve_stock_identity_local, _require_str(body, "query"))
+
+
+async def handle_fetch_payload(body: Dict) -> Dict:
+    return await _payload(body)
+
+
+async def handle_recommend(body: Dict) -> Dict:
+    owns_stock, buy_price = _position(body)
+    payload = await _payload(body)
+    source = "llm"
+    if body.get("incremental", Config.INCREMENTAL):
+        source, text = await IO_POOL.run(incremental_recommendation, payload, owns_stock, buy_price, float("inf"))
+    else:
+        text = await IO_POOL.run(generate_professional_recommendation, payload, owns_stock, buy_price)
+    if text.startswith("Error"):
+        raise HTTPError(502, text)
+    return {
+        "screener_name": payload.get("screener_name"),
+        "yfinance_ticker": payload.get("yfinance_ticker"),
+        "owns_stock": owns_stock,
+        "buy_price": buy_price,
+        "source": source,
+        "recommendation": text,
+        "stale": payload.get("stale") or None,
+    }
+
+
+async def handle_agent_chat(body: Dict) -> Dict:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    message = _require_str(body, "message")
+    history = body.get("history") or []
+    if not isinstance(history, list):
+        raise HTTPError(400, "'history' must be a list")
+    messages = [
+        (AIMessage if turn.get("role") == "assistant" else HumanMessage)(content=str(turn.get("content", "")))
+        for turn in history if isinstance(turn, dict)
+    ]
+    messages.append(HumanMessage(content=message))
+
+    def run_agent():
+        return _get_graph().invoke({"messages": messages})
+
+    # The agent may call ultimate_stock_verdict, which can start a browser
+    result = await SCRAPE_POOL.run(run_agent)
+    new_messages = result["messages"][len(messages):]
+    tool_calls = [tc["name"] for m in new_messages for tc in (getattr(m, "tool_calls", None) or [])]
+    answer = result["messages"][-1].content
+    return {"answer": answer if isinstance(answer, str) else str(answer), "tool_calls": tool_calls}
+
+
+async def stream_recommend(body: Dict, send, deadline: float):
+    """SSE: ``payload``, then the recommendation's events (``progress`` / ``verdict`` / ``chunk``,
+    see stream_professional_recommendation), then ``done`` (or ``error``)."""
+    loop = asyncio.get_running_loop()
+    owns_stock, buy_price = _position(body)
+    payload = await asyncio.wait_for(_payload(body), deadline - loop.time())
+
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def pump():
+        try:
+            for event in stream_professional_recommendation(payload, owns_stock, buy_price):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+        except Exception as exc:
+            loop.call_soon_threadsafe(queue.put_nowait, exc)
+
+    worker = IO_POOL.submit(pump)  # raises Overloaded before any bytes are sent
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")],
+    })
+    await send({"type": "http.response.body", "body": _sse("payload", {
+        "screener_name": payload.get("screener_name"),
+        "yfinance_ticker": payload.get("yfinance_ticker"),
+    }), "more_body": True})
+
+    parts, unverified = [], None
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                incr("service_timeouts", endpoint="/recommend")
+                incr("service_requests", endpoint="/recommend", status="504")
+                await send({"type": "http.response.body", "body": _sse("error", {"status": 504, "error": "deadline exceeded"})})
+                return
+            if item is _DONE:
+                incr("service_requests", endpoint="/recommend", status="200")
+                await send({"type": "http.response.body", "body": _sse("done", {
+                    "recommendation": "".join(parts), "unverified": unverified})})
+                return
+            if isinstance(item, Exception):
+                logger.error(f"POST /recommend stream failed: {item}")
+                incr("service_requests", endpoint="/recommend", status="502")
+                await send({"type": "http.response.body", "body": _sse("error", {"status": 502, "error": str(item)})})
+                return
+            event, data = item
+            if event == "chunk":
+                parts.append(data)
+                data = {"text": data}
+            elif event == "verdict":
+                unverified = data["unverified"]
+            await send({"type": "http.response.body", "body": _sse(event, data), "more_body": True})
+    finally:
+        stop.set()
+        worker.cancel()
+
+
+ROUTES = {
+    ("POST", "/resolve"): handle_resolve,
+    ("POST", "/fetch-payload"): handle_fetch_payload,
+    ("POST", "/recommend"): handle_recommend,
+    ("POST", "/agent/chat"): handle_agent_chat,
+}
+
+
+def health() -> Dict:
+    return {
+        "status": "ok",
+        "pools": {p.name: p.stats() for p in (SCRAPE_POOL, IO_POOL)},
+        "caches": {name: c.stats() for name, c in CACHES.items()},
+        "breakers": resilience.stats(),
+    }
+
+
+# --------------------------------------------------------------------------- #
+# ASGI entry point
+# --------------------------------------------------------------------------- #
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            logger.info(f"Service ready → scrape workers {SCRAPE_POOL.workers}, io workers {IO_POOL.workers}")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            SCRAPE_POOL.shutdown()
+            IO_POOL.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"].rstrip("/") or "/"
+    request_id = uuid.uuid4().hex[:12]
+    set_log_context(request_id=request_id, ticker=None)
+
+    if method == "GET" and path == "/health":
+        return await _send_json(send, 200, health())
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        status = 405 if any(p == path for _, p in ROUTES) else 404
+        return await _send_json(send, status, {"error": f"{method} {path} not found"})
+
+    headers = dict(scope.get("headers") or [])
+    try:
+        body = await _read_body(receive)
+        deadline = _deadline(body)
+        streaming = path == "/recommend" and (
+            body.get("stream") is True or b"text/event-stream" in headers.get(b"accept", b"")
+        )
+        with span(f"http{path.replace('/', '.')}", request_id=request_id), resilience.deadline(deadline):
+            if streaming:
+                loop = asyncio.get_running_loop()
+                return await stream_recommend(body, send, loop.time() + deadline)
+            result = await asyncio.wait_for(handler(body), deadline)
+        incr("service_requests", endpoint=path, status="200")
+        await _send_json(send, 200, result, [(b"x-request-id", request_id.encode())])
+    except HTTPError as exc:
+        incr("service_requests", endpoint=path, status=str(exc.status))
+        await _send_json(send, exc.status, {"error": exc.message, "request_id": request_id}, exc.headers)
+    except asyncio.TimeoutError:
+        incr("service_requests", endpoint=path, status="504")
+        await _send_json(send, 504, {"error": "deadline exceeded", "request_id": request_id})
+    except resilience.CircuitOpen as exc:
+        incr("service_requests", endpoint=path, status="503")
+        await _send_json(send, 503, {"error": str(exc), "request_id": request_id},
+                         [(b"retry-after", str(max(1, round(exc.retry_in_s))).encode())])
+    except EnvironmentError as exc:
+        incr("service_requests", endpoint=path, status="503")
+        await _send_json(send, 503, {"error": str(exc), "request_id": request_id})
+    except ValueError as exc:  # unknown / unresolvable stock, no data for it: the request, not an upstream
+        incr("service_requests", endpoint=path, status="422")
+        await _send_json(send, 422, {"error": str(exc), "request_id": request_id})
+    except Exception as exc:
+        logger.error(f"{method} {path} failed: {exc}")
+        incr("service_requests", endpoint=path, status="502")
+        await _send_json(send, 502, {"error": str(exc), "request_id": request_id})
+
+
+def serve(host: str = Config.SERVICE_HOST, port: int = Config.SERVICE_PORT):
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is not installed: pip install uvicorn (or run under any ASGI server)")
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    serve()
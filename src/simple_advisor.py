@@ -11,6 +11,8 @@ if PROJECT_ROOT not in sys.path:
 
 from logger import logger
 from src.config import Config
+from src.metrics import record_llm_usage, span
+from src.replay import wrap_chat_model
 from src.tools import resolve_stock_identity_local, ultimate_stock_verdict
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -55,10 +57,11 @@ def get_recommendation_llm():
             model=Config.MODEL_NAME,
             temperature=0.0,
             google_api_key=Config.GOOGLE_API_KEY,
+            base_url=Config.GEMINI_BASE_URL,
             convert_system_message_to_human=True,
             max_retries=2
         )
-        return llm
+        return wrap_chat_model(llm, "advisor")
     except Exception as e:
         logger.error(f"LLM init failed: {e}")
         return None
@@ -153,7 +156,9 @@ GIVE SPECIFIC RECOMMENDATION IN THIS EXACT FORMAT:
 Be brutally honest. Use numbers from the data."""
     
     try:
-        response = llm.invoke([HumanMessage(content=prompt)])
+        with span("llm.recommendation", owns_stock=owns_stock):
+            response = llm.invoke([HumanMessage(content=prompt)])
+        record_llm_usage(response, "recommendation")
         return response.content
     except Exception as e:
         return f"Error generating recommendation: {e}"
@@ -0,0 +1,210 @@
+# src/snapshots.py
+"""
+Change detection between analyses of the same stock.
+
+Every verdict is stored with a small fingerprint of the payload it was
+based on (``snapshots/<TICKER>_<ANALYSIS|HOLDING>.json``). On the next
+request the new fingerprint is diffed against it:
+
+    new_quarter / new_annual   a results column the last verdict never saw
+    shareholding               holder category moved >= FINQUANT_SNAPSHOT_HOLDING_PP points
+    price                      last close moved >= FINQUANT_SNAPSHOT_ATR_MULT x ATR
+    analysis                   new pros / cons on the Screener page
+    stale                      last verdict older than FINQUANT_SNAPSHOT_MAX_AGE_DAYS
+
+If nothing is material the previous verdict is returned, annotated with
+the deltas, and no LLM call is made. Otherwise the prompt gets a "what
+changed" section so the model concentrates on the news.
+"""
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from src.config import Config
+from src.scraper.normalize import normalize_all
+
+logger = project_logger.getChild("snapshots")
+
+ATR_PERIOD = 14
+_HEADLINE = re.compile(r"\*\*(?:ENTRY|PORTFOLIO) DECISION\*\*\s*→\s*[^\n]+")
+_write_lock = threading.Lock()
+
+
+def _latest_column(section) -> Dict[str, Any]:
+    """Newest non-TTM period of a section with its metric values."""
+    cols = np.flatnonzero(~section.is_ttm)
+    if not cols.size:
+        return {"period": None, "values": {}}
+    c = cols[-1]
+    return {
+        "period": section.periods[c],
+        "values": {m: float(v) for m, v in zip(section.metrics, section.values[:, c]) if not np.isnan(v)},
+    }
+
+
+def fingerprint(data: Dict[str, Any], price_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """What a verdict depended on, small enough to store per ticker."""
+    sections = normalize_all(data)
+    quarter = _latest_column(sections["quarters"])
+    holding = _latest_column(sections["shareholding_quarterly"])
+    analysis = data.get("analysis") or {}
+
+    closes = np.asarray((price_data or {}).get("price") or [], dtype="float64")
+    closes = closes[~np.isnan(closes)]
+    # Close-to-close ATR: the payload only carries daily closes
+    atr = float(np.abs(np.diff(closes[-(ATR_PERIOD + 1):])).mean()) if closes.size >= 2 else None
+    return {
+        "quarter": quarter["period"],
+        "quarter_values": {k: quarter["values"][k] for k in ("Sales", "Revenue", "Net Profit")
+                           if k in quarter["values"]},
+        "annual": _latest_column(sections["profit_loss"])["period"],
+        "holding_period": holding["period"],
+        "holding": {k: round(v * 100, 2) for k, v in holding["values"].items()},
+        "pros": list(analysis.get("pros") or []),
+        "cons": list(analysis.get("cons") or []),
+        "last_close": float(closes[-1]) if closes.size else None,
+        "price_date": (price_data or {}).get("today_date"),
+        "atr": atr,
+    }
+
+
+def snapshot_key(ticker: str, owns_stock: bool) -> str:
+    safe = "".join(c if c.isalnum() else "_" for c in (ticker or "UNKNOWN").upper())
+    return f"{safe}_{'HOLDING' if owns_stock else 'ANALYSIS'}"
+
+
+def _path(key: str, folder: str) -> str:
+    return os.path.join(folder, f"{key}.json")
+
+
+def load_snapshot(key: str, folder: str = Config.SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path(key, folder), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(key: str, fp: Dict[str, Any], source: str, text: str, buy_price: float = 0,
+                  folder: str = Config.SNAPSHOT_DIR) -> str:
+    os.makedirs(folder, exist_ok=True)
+    path = _path(key, folder)
+    record = {
+        "key": key,
+        "taken_at": datetime.now().isoformat(timespec="seconds"),
+        "buy_price": buy_price,
+        "fingerprint": fp,
+        "source": source,
+        "recommendation": text,
+    }
+    with _write_lock:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    return path
+
+
+def diff(previous: Dict[str, Any], current: Dict[str, Any], taken_at: Optional[str] = None,
+         buy_price_changed: bool = False) -> List[Dict[str, Any]]:
+    """Changes between two fingerprints, each ``{"kind", "detail", "material"}``."""
+    changes = []
+
+    def add(kind, detail, material):
+        changes.append({"kind": kind, "detail": detail, "material": bool(material)})
+
+    if current["quarter"] and current["quarter"] != previous.get("quarter"):
+        figures = ", ".join(f"{k} {v:,.2f}" for k, v in current["quarter_values"].items())
+        add("new_quarter", f"New quarterly results {previous.get('quarter') or 'n/a'} → {current['quarter']}"
+                           f"{f' ({figures})' if figures else ''}", True)
+    if current["annual"] and current["annual"] != previous.get("annual"):
+        add("new_annual", f"New annual results {previous.get('annual') or 'n/a'} → {current['annual']}", True)
+
+    old_holding = previous.get("holding") or {}
+    for holder, pct in current["holding"].items():
+        if holder in old_holding and pct != old_holding[holder]:
+            delta = pct - old_holding[holder]
+            add("shareholding", f"{holder} {old_holding[holder]:.2f}% → {pct:.2f}% ({delta:+.2f} pts)",
+                abs(delta) >= Config.SNAPSHOT_HOLDING_PP)
+
+    old_close, new_close = previous.get("last_close"), current["last_close"]
+    if old_close and new_close and new_close != old_close:
+        move = new_close - old_close
+        atr = current["atr"] or previous.get("atr")
+        in_atr = abs(move) / atr if atr else float("inf")
+        add("price", f"Last close ₹{old_close:,.2f} → ₹{new_close:,.2f} ({move / old_close * 100:+.2f}%, "
+                     f"{in_atr:.1f}x ATR)", in_atr >= Config.SNAPSHOT_ATR_MULT)
+
+    for side in ("pros", "cons"):
+        before = set(previous.get(side) or [])
+        added = [item for item in current[side] if item not in before]
+        removed = [item for item in previous.get(side) or [] if item not in set(current[side])]
+        if added:
+            add("analysis", f"New {side[:-1]}: " + "; ".join(added), True)
+        if removed:
+            add("analysis", f"Dropped {side[:-1]}: " + "; ".join(removed), False)
+
+    if buy_price_changed:
+        add("position", "Average buy price changed", True)
+    if taken_at:
+        age = (datetime.now() - datetime.fromisoformat(taken_at)).days
+        if age >= Config.SNAPSHOT_MAX_AGE_DAYS:
+            add("stale", f"Last verdict is {age} days old", True)
+    return changes
+
+
+def is_material(changes: List[Dict[str, Any]]) -> bool:
+    return any(c["material"] for c in changes)
+
+
+def _bullets(changes: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"- {c['detail']}" for c in changes) or "- No changes in results, holdings, price or analysis"
+
+
+def annotate(snapshot: Dict[str, Any], changes: List[Dict[str, Any]]) -> str:
+    """Previous verdict with a header listing the (immaterial) deltas since."""
+    return (f"**UNCHANGED SINCE {snapshot['taken_at'].replace('T', ' ')}** → no material change, "
+            f"previous verdict stands (no new analysis was run)\n\n"
+            f"**DELTAS SINCE LAST ANALYSIS**:\n{_bullets(changes)}\n\n"
+            f"{'─' * 40}\n\n{snapshot['recommendation']}")
+
+
+def changes_prompt_section(snapshot: Dict[str, Any], changes: List[Dict[str, Any]]) -> str:
+    """Prompt block: the previous verdict's headline and what moved since."""
+    headline = _HEADLINE.search(snapshot.get("recommendation") or "")
+    material = [c for c in changes if c["material"]]
+    minor = [c for c in changes if not c["material"]]
+    section = f"""
+
+🔔 WHAT CHANGED SINCE THE LAST ANALYSIS ({snapshot['taken_at'][:10]}):
+Previous verdict: {headline.group(0) if headline else 'n/a'}
+Material changes:
+{_bullets(material)}"""
+    if minor:
+        section += f"\nMinor changes:\n{_bullets(minor)}"
+    return section + "\nFocus the analysis on these changes and say explicitly whether they alter the previous verdict."
+
+
+if __name__ == "__main__":
+    before = {
+        "quarter": "Jun 2024", "quarter_values": {}, "annual": "Mar 2024", "holding_period": "Jun 2024",
+        "holding": {"Promoters": 86.36, "FIIs": 1.05}, "pros": ["Low debt"], "cons": [],
+        "last_close": 150.0, "price_date": "01-11-2024", "atr": 2.5,
+    }
+    after = {**before, "holding": {"Promoters": 86.36, "FIIs": 1.3}, "last_close": 151.2, "price_date": "02-11-2024"}
+    quiet = diff(before, after)
+    print(is_material(quiet), quiet)
+    after = {**after, "quarter": "Sep 2024", "quarter_values": {"Sales": 6900.0}, "last_close": 140.0}
+    loud = diff(before, after)
+    print(is_material(loud), [c["detail"] for c in loud])
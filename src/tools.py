@@ -3,9 +3,12 @@
 import os
 import sys
 import json
+import threading
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional
 import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
 from textwrap import dedent
 
 # Project root fix
@@ -13,6 +16,7 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
+from src.scraper import yahoo_fundamentals
 from src.scraper.screener_scrapper import ScreenerScraper
 
 import pandas as pd
@@ -21,19 +25,30 @@ from langchain_core.tools import tool
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from logger import logger
+from src.cache import fundamentals_cache, price_cache, resolver_cache
 from src.config import Config
+from src.metrics import incr, record_llm_usage, span, timed
+from src import resilience
+from src.replay import cassettes, wrap_chat_model
+from src.peers import peer_block
+from src.risk import render_risk, stock_risk
+from src.scoring import score_stock
+from src.snapshots import fingerprint
 
 DEFAULT_SUFFIX = ".NS"
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="finquant-hedge")
 
 try:
     Config.require_api_key()
-    resolver_model = ChatGoogleGenerativeAI(
+    resolver_model = wrap_chat_model(ChatGoogleGenerativeAI(
         model=Config.MODEL_NAME,
         temperature=0.0,
         google_api_key=Config.GOOGLE_API_KEY,
+        base_url=Config.GEMINI_BASE_URL,
         convert_system_message_to_human=True,
         max_retries=2,
-    )
+        timeout=Config.LLM_TIMEOUT_S,
+    ), "resolver")
     logger.info("Stock identity resolver model ready")
 except Exception as resolver_exc:
     resolver_model = None
@@ -65,40 +80,153 @@ def _content_to_text(content) -> str:
     return str(content)
 
 
+def _resolver_key(user_input: str) -> str:
+    return " ".join(user_input.lower().split())
+
+
+_symbols = {"path": None, "mtime": None, "index": {}}
+_symbols_lock = threading.Lock()
+
+
+def _normalize_company(name: str) -> str:
+    name = re.sub(r"[^a-z0-9& ]+", " ", name.lower())
+    return " ".join(re.sub(r"\b(limited|ltd|the)\b", " ", name).split())
+
+
+def _symbol_index(path: str = Config.SYMBOLS_FILE) -> Dict[str, Dict[str, str]]:
+    """Optional local symbol list (NSE EQUITY_L.csv columns, or ticker / name / screener_name),
+    keyed by lower-case symbol and normalised company name; reloaded when the file changes."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _symbols_lock:
+        if _symbols["path"] == path and _symbols["mtime"] == mtime:
+            return _symbols["index"]
+        frame = pd.read_csv(path, dtype=str, skipinitialspace=True).fillna("")
+        frame.columns = [c.strip().lower().replace(" ", "_") for c in frame.columns]
+        symbol_col = next((c for c in ("ticker", "yfinance_ticker", "symbol") if c in frame.columns), None)
+        name_col = next((c for c in ("name", "name_of_company", "company_name") if c in frame.columns), None)
+        index = {}
+        if symbol_col:
+            for row in frame.to_dict("records"):
+                symbol = row[symbol_col].strip().upper()
+                if not symbol:
+                    continue
+                identity = {"screener_name": (row.get("screener_name") or "").strip() or symbol.split(".")[0],
+                            "yfinance_ticker": _ensure_suffix(symbol)}
+                index.setdefault(symbol.split(".")[0].lower(), identity)
+                if name_col and row[name_col].strip():
+                    index.setdefault(_normalize_company(row[name_col]), identity)
+        _symbols.update(path=path, mtime=mtime, index=index)
+        logger.info(f"Symbol list {path}: {len(index)} keys")
+        return index
+
+
+def _local_identity(key: str) -> Optional[Dict[str, str]]:
+    index = _symbol_index()
+    return index.get(key) or index.get(_normalize_company(key)) if index else None
+
+
+@timed("resolve.identity")
 def resolve_stock_identity_local(user_input: str) -> Dict[str, str]:
-    """LLM-powered resolver used by CLI + LangChain tool."""
+    """LLM-powered resolver used by CLI + LangChain tool (a batch of one)."""
     if not user_input or not user_input.strip():
         raise ValueError("Empty stock name provided.")
-    if not resolver_model:
-        raise EnvironmentError("Stock resolver model is not initialized.")
-
+    result = resolve_stock_identities([user_input])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+@timed("resolve.batch")
+def resolve_stock_identities(user_inputs: List[str], batch_size: int = Config.RESOLVER_BATCH_SIZE,
+                             retries: int = Config.RESOLVER_RETRIES) -> List[object]:
+    """
+    Identity dict (or the Exception) per input, in order. Cached names and
+    the local symbol list answer first; the rest go to Gemini ``batch_size``
+    per prompt, and only entries that came back missing or invalid are re-asked.
+    """
+    results: Dict[str, object] = {}
+    pending: List[str] = []
+    for user_input in user_inputs:
+        key = _resolver_key(user_input or "")
+        if key in results or key in pending:
+            continue
+        if not key:
+            results[key] = ValueError("Empty stock name provided.")
+            continue
+        identity = resolver_cache.get(key)
+        if identity is None:
+            identity = _local_identity(key)
+            if identity:
+                incr("resolver_symbol_hits")
+                resolver_cache.set(key, identity)
+        if identity:
+            results[key] = identity
+        else:
+            pending.append(key)
+
+    if pending and not resolver_model:
+        error = EnvironmentError("Stock resolver model is not initialized.")
+        results.update((key, error) for key in pending)
+        pending = []
+    originals = {_resolver_key(u): u.strip() for u in user_inputs if u and u.strip()}
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        failed: Dict[str, Exception] = {}
+        for start in range(0, len(pending), max(1, batch_size)):
+            batch = pending[start:start + max(1, batch_size)]
+            try:
+                answers = _resolve_batch_with_llm([originals[k] for k in batch])
+            except Exception as exc:
+                answers = [exc] * len(batch)
+            for key, answer in zip(batch, answers):
+                if isinstance(answer, Exception):
+                    failed[key] = answer
+                else:
+                    resolver_cache.set(key, answer)
+                    results[key] = answer
+        results.update(failed)
+        # An open breaker or a spent deadline won't clear between retries
+        pending = [k for k, exc in failed.items()
+                   if not isinstance(exc, (resilience.CircuitOpen, resilience.DeadlineExceeded))]
+        if pending and attempt < retries:
+            incr("resolver_retries", len(pending))
+            logger.warning(f"Resolver retry {attempt + 1} for {len(pending)} name(s): {', '.join(pending)}")
+    return [results[_resolver_key(u or "")] for u in user_inputs]
+
+
+def _resolve_batch_with_llm(user_inputs: List[str]) -> List[object]:
+    """One Gemini call for several inputs; an identity dict or ValueError per input."""
+    numbered = "\n".join(f"{i}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(user_inputs, 1))
     prompt = dedent(
-        f"""
-        You convert any user-provided Indian stock reference into the exact Screener.in company
+        """
+        You convert user-provided Indian stock references into the exact Screener.in company
         slug/name and the correct Yahoo Finance ticker.
 
         Requirements:
-        - Respond with VALID JSON only, no commentary.
-        - Keys: "screener_name", "yfinance_ticker".
+        - Respond with a VALID JSON array only, no commentary: one object per input, in input order.
+        - Keys: "id" (the input's number), "screener_name", "yfinance_ticker".
         - Screener name should be how users search on https://www.screener.in/ (e.g., "IRCON INTERNATIONAL").
         - yfinance ticker MUST include the proper suffix: ".NS" for NSE, ".BO" for BSE.
         - Prefer NSE tickers when both exist.
-        - If you are unsure, make the best professional guess and still return JSON.
+        - If you are unsure, make the best professional guess and still return an object for that input.
 
-        Examples:
-        {{
-          "screener_name": "IRFC",
-          "yfinance_ticker": "IRFC.NS"
-        }}
+        Example:
+        [
+          {"id": 1, "screener_name": "IRFC", "yfinance_ticker": "IRFC.NS"}
+        ]
 
-        User input: "{user_input.strip()}"
+        Inputs:
         """
-    ).strip()
-
-    response = resolver_model.invoke([HumanMessage(content=prompt)])
-    text = _content_to_text(response.content)
+    ).strip() + "\n" + numbered
 
-    text = text.strip()
+    with span("llm.resolver", batch=len(user_inputs)):
+        response = resilience.call("gemini", resolver_model.invoke, [HumanMessage(content=prompt)])
+    record_llm_usage(response, "resolver")
+    text = _content_to_text(response.content).strip()
     if text.startswith("```"):
         text = text.strip("`")
         text = re.sub(r"^json", "", text, flags=re.IGNORECASE).strip()
@@ -107,47 +235,97 @@ def resolve_stock_identity_local(user_input: str) -> Dict[str, str]:
         data = json.loads(text)
     except json.JSONDecodeError as exc:
         raise ValueError(f"Resolver returned invalid JSON: {exc}") from exc
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise ValueError("Resolver response is not a JSON array.")
+
+    by_id = {}
+    for position, entry in enumerate(data, 1):
+        if isinstance(entry, dict):
+            try:
+                by_id.setdefault(int(entry.get("id", position)), entry)
+            except (TypeError, ValueError):
+                continue
+
+    answers = []
+    for i in range(1, len(user_inputs) + 1):
+        entry = by_id.get(i) or {}
+        screener_name = str(entry.get("screener_name") or "").strip()
+        ticker = str(entry.get("yfinance_ticker") or "").strip().upper()
+        if not screener_name or not ticker:
+            answers.append(ValueError("Resolver response missing screener_name or yfinance_ticker."))
+        else:
+            answers.append({"screener_name": screener_name, "yfinance_ticker": _ensure_suffix(ticker)})
+    return answers
+
+
+def _price_key(ticker: str) -> str:
+    ticker = ticker.strip().upper()
+    return ticker if ticker.endswith((".NS", ".BO")) else _ensure_suffix(ticker)
 
-    screener_name = (data.get("screener_name") or "").strip()
-    ticker = (data.get("yfinance_ticker") or "").strip().upper()
-    if not screener_name or not ticker:
-        raise ValueError("Resolver response missing screener_name or yfinance_ticker.")
 
-    ticker = _ensure_suffix(ticker)
-    return {"screener_name": screener_name, "yfinance_ticker": ticker}
+def _stale_note(marker: Dict[str, object]) -> str:
+    return (f"⚠️ STALE {marker['stage'].upper()}: last cached copy, {marker['age_s'] / 3600:.1f} h old "
+            f"(live fetch failed: {marker['reason']})")
 
 
+@timed("market.fetch")
 def _fetch_market_data_raw(ticker: str) -> Dict[str, object]:
-    ticker = ticker.strip().upper()
-    if not ticker.endswith((".NS", ".BO")):
-        ticker = _ensure_suffix(ticker)
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period="1mo", interval="1d")
-    if hist.empty:
-        raise ValueError(f"No price history found for {ticker}")
-    clean_dates = hist.index.strftime("%d-%m-%Y").tolist()
-    today = hist.iloc[-1]
-    data = {
-        "ticker": ticker,
-        "date": clean_dates,
-        "price": hist["Close"].round(2).tolist(),
-        "today_open": round(float(today["Open"]), 2),
-        "today_date": today.name.strftime("%d-%m-%Y"),
-        "currency": "INR",
-    }
+    ticker = _price_key(ticker)
+
+    def live() -> Dict[str, object]:
+        stock = yf.Ticker(ticker)
+        hist = stock.history(period="1mo", interval="1d", timeout=resilience.budget(Config.YAHOO_TIMEOUT_S))
+        if hist.empty:
+            raise ValueError(f"No price history found for {ticker}")
+        clean_dates = hist.index.strftime("%d-%m-%Y").tolist()
+        today = hist.iloc[-1]
+        return {
+            "ticker": ticker,
+            "date": clean_dates,
+            "price": hist["Close"].round(2).tolist(),
+            "today_open": round(float(today["Open"]), 2),
+            "today_date": today.name.strftime("%d-%m-%Y"),
+            "currency": "INR",
+        }
+
+    data = price_cache.get_or_compute(
+        ticker,
+        lambda: cassettes.call(
+            "yahoo", {"ticker": ticker, "period": "1mo", "interval": "1d"},
+            lambda: resilience.call("yahoo", live),
+        ),
+    )
     logger.info(f"Market data → {ticker}")
     return data
 
 
+@timed("indicators.volatility")
 def _calculate_volatility_report(price_data: Dict[str, object]) -> str:
-    prices = pd.Series(price_data["price"])
+    """Daily history, or an intraday snapshot (src/intraday.py) whose precomputed stats are used as-is."""
+    stats = price_data.get("stats")
+    if stats:
+        label = f"{stats['window']}-Bar"
+        mean, std, high, low = stats["mean"], stats["std"] or 0.0, stats["high"], stats["low"]
+    else:
+        prices = pd.Series(price_data["price"])
+        label = "30-Day"
+        mean, std, high, low = prices.mean(), prices.std(), prices.max(), prices.min()
     report = f"""
 # Technical & Volatility Analysis
 
 **Ticker**: {price_data['ticker']} | **Date**: {price_data['today_date']}
-**30-Day Avg**: ₹{prices.mean():,.2f} | **Std Dev**: ±₹{prices.std():,.2f}
-**High**: ₹{prices.max():,.2f} | **Low**: ₹{prices.min():,.2f}
+**{label} Avg**: ₹{mean:,.2f} | **Std Dev**: ±₹{std:,.2f}
+**High**: ₹{high:,.2f} | **Low**: ₹{low:,.2f}
 **Today's Open**: ₹{price_data['today_open']:,.2f}
+"""
+    indicators = price_data.get("indicators")
+    if indicators:
+        def fmt(key, prefix="₹"):
+            return "n/a" if indicators.get(key) is None else f"{prefix}{indicators[key]:,.2f}"
+        report += f"""**Last**: ₹{price_data['last']:,.2f} (as of {price_data['as_of']}) | **VWAP**: {fmt('vwap')}
+**EMA 12/26**: {fmt('ema_fast')} / {fmt('ema_slow')} | **RSI 14**: {fmt('rsi', '')} | **ATR 14**: {fmt('atr')}
 """
     logger.info("Volatility report ready")
     return report.strip()
@@ -161,27 +339,134 @@ def _save_report(path: str, content: str) -> str:
     return path
 
 
-def build_stock_verdict_payload(screener_name: str, yfinance_ticker: str) -> Dict[str, object]:
-    scraper = None
-    try:
-        logger.info(f"Verdict → Screener: '{screener_name}' | Ticker: '{yfinance_ticker}'")
-        scraper = ScreenerScraper(headless=True)
-        scraper.start()
-        scraper.search_company(screener_name)
-        data = scraper.extract_all()
-        saved_files = scraper.save_data(data)
-        base_name = scraper.get_safe_filename()
-    finally:
-        if scraper:
+def _scrape_fundamentals(screener_name: str) -> Dict[str, object]:
+    """One Screener scrape (browser start → search → extract → quit)."""
+    def live() -> Dict[str, object]:
+        scraper = ScreenerScraper(headless=True, wait_timeout=resilience.budget(20))
+        try:
+            scraper.start()
+            scraper.search_company(screener_name)
+            return scraper.extract_all()
+        finally:
             try:
                 scraper.quit()
             except Exception:
                 pass
 
+    return cassettes.call(
+        "screener", {"query": screener_name.strip().lower()}, lambda: resilience.call("screener", live)
+    )
+
+
+def _yahoo_fundamentals(screener_name: str, yfinance_ticker: str) -> Dict[str, object]:
+    """Fundamentals from yfinance statements, in the scraper's schema (the hedge)."""
+    ticker = _price_key(yfinance_ticker)
+
+    def live() -> Dict[str, object]:
+        return yahoo_fundamentals.extract_all(yf.Ticker(ticker), screener_name)
+
+    return cassettes.call(
+        "yahoo_fundamentals", {"ticker": ticker}, lambda: resilience.call("yahoo", live)
+    )
+
+
+def _fetch_fundamentals(screener_name: str, yfinance_ticker: str, cache_key: str) -> Dict[str, object]:
+    """
+    Screener scrape, hedged: if it hasn't finished within FINQUANT_FUNDAMENTALS_HEDGE
+    seconds (or fails first), yfinance fundamentals are requested too and the first
+    complete result wins. ``metadata["source"]`` records which one.
+
+    The winner is written to the fundamentals cache here (callers use
+    ``get_or_compute(..., store=False)``). A scrape that loses the race still lands
+    in the cache when it finishes, but only over a yfinance entry, never a newer scrape.
+    """
+    def tagged(fn, source):
+        data = fn()
+        data["metadata"] = {**data.get("metadata", {}), "source": source}
+        return data
+
+    def cache_late_scrape(future):
+        if future.exception() is not None:
+            return
+        current = fundamentals_cache.get(cache_key)
+        if current is None or (current.get("metadata") or {}).get("source") == "yfinance":
+            fundamentals_cache.set(cache_key, future.result())
+
+    def won(data):
+        fundamentals_cache.set(cache_key, data)
+        return data
+
+    if Config.FUNDAMENTALS_HEDGE_S <= 0:
+        return won(tagged(lambda: _scrape_fundamentals(screener_name), "screener"))
+    primary = _hedge_pool.submit(copy_context().run, tagged, lambda: _scrape_fundamentals(screener_name), "screener")
+    wait([primary], timeout=resilience.budget(Config.FUNDAMENTALS_HEDGE_S, floor=0.0))
+    if primary.done() and primary.exception() is None:
+        incr("fundamentals_source", source="screener")
+        return won(primary.result())
+
+    incr("fundamentals_hedged", reason="failed" if primary.done() else "slow")
+    logger.info(f"Screener {'failed' if primary.done() else 'slow'} for '{screener_name}' → hedging with yfinance")
+    secondary = _hedge_pool.submit(
+        copy_context().run, tagged, lambda: _yahoo_fundamentals(screener_name, yfinance_ticker), "yfinance"
+    )
+    pending, errors = {primary, secondary}, {}
+    while pending:
+        done, pending = wait(pending, timeout=resilience.remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in sorted(done, key=lambda f: f is not primary):  # both finished → the scrape wins
+            source = "screener" if future is primary else "yfinance"
+            if future.exception() is not None:
+                errors[source] = future.exception()
+                continue
+            result = future.result()
+            if source == "yfinance" and not yahoo_fundamentals.is_complete(result) and primary in pending:
+                errors[source] = ValueError("incomplete yfinance fundamentals")
+                continue
+            incr("fundamentals_source", source=source)
+            won(result)
+            if source == "yfinance" and primary in pending:
+                primary.add_done_callback(cache_late_scrape)  # runs now if the scrape just finished
+            return result
+    if not errors:
+        raise resilience.DeadlineExceeded("deadline exceeded waiting for fundamentals")
+    raise errors.get("screener") or errors["yfinance"]
+
+
+@timed("payload.build")
+def build_stock_verdict_payload(screener_name: str, yfinance_ticker: str) -> Dict[str, object]:
+    logger.info(f"Verdict → Screener: '{screener_name}' | Ticker: '{yfinance_ticker}'")
+    stale = []
+    key = screener_name.strip().lower()
+    try:
+        data = fundamentals_cache.get_or_compute(key, lambda: _fetch_fundamentals(screener_name, yfinance_ticker, key),
+                                                 store=False)
+    except Exception as exc:
+        data, marker = resilience.stale_fallback(fundamentals_cache, key, exc, "fundamentals")
+        stale.append(marker)
+    # Only names the output files; no browser is started
+    saver = ScreenerScraper(headless=True)
+    saver.query_used = screener_name.strip()
+    saved_files = saver.save_data(data)
+    base_name = saver.get_safe_filename()
+
     technical_report = "Technical data unavailable."
+    price_json = None
+    risk = None
     try:
-        price_json = _fetch_market_data_raw(yfinance_ticker)
+        try:
+            price_json = _fetch_market_data_raw(yfinance_ticker)
+        except Exception as exc:
+            price_json, marker = resilience.stale_fallback(price_cache, _price_key(yfinance_ticker), exc, "prices")
+            stale.append(marker)
         technical_report = _calculate_volatility_report(price_json)
+        if stale and stale[-1]["stage"] == "prices":
+            technical_report = _stale_note(stale[-1]) + "\n\n" + technical_report
+        try:
+            risk = stock_risk(_price_key(yfinance_ticker))
+            technical_report += "\n\n" + render_risk(risk, _price_key(yfinance_ticker))
+        except Exception as exc:
+            logger.warning(f"VaR/CVaR unavailable for {yfinance_ticker}: {exc}")
         _save_report(
             os.path.join("outputs", f"{base_name}_Technical.md"),
             technical_report,
@@ -190,13 +475,37 @@ def build_stock_verdict_payload(screener_name: str, yfinance_ticker: str) -> Dic
         logger.warning(f"yfinance error: {exc}")
         technical_report = f"Price data not available for {yfinance_ticker}: {exc}"
 
-    fundamental_text = json.dumps(data, indent=2, ensure_ascii=False)[:12000]
+    try:
+        peers = peer_block(data, yfinance_ticker, _fetch_market_data_raw, price_json)
+    except Exception as exc:
+        logger.warning(f"Peer comparison failed: {exc}")
+        peers = None
+    try:
+        scorecard = score_stock(data, price_json)
+    except Exception as exc:
+        logger.warning(f"Pre-score failed: {exc}")
+        scorecard = None
+    try:
+        snapshot = fingerprint(data, price_json)
+    except Exception as exc:
+        logger.warning(f"Snapshot fingerprint failed: {exc}")
+        snapshot = None
+
+    # The peer table reaches the prompt as the compact peer block instead
+    fundamental_text = json.dumps({k: v for k, v in data.items() if k != "peers"}, indent=2, ensure_ascii=False)[:12000]
+    if stale and stale[0]["stage"] == "fundamentals":
+        fundamental_text = _stale_note(stale[0]) + "\n" + fundamental_text
     return {
         "metadata": data["metadata"],
         "screener_name": screener_name,
         "yfinance_ticker": yfinance_ticker,
         "technical_report": technical_report,
         "fundamental_snapshot": fundamental_text,
+        "scorecard": scorecard,
+        "snapshot": snapshot,
+        "peers": peers,
+        "risk": risk,
+        "stale": stale,
         "saved_files": saved_files,
         "generated_at": datetime.now().isoformat(timespec="seconds"),
     }
@@ -0,0 +1,360 @@
+# src/verdict.py
+"""
+Structured recommendation verdicts: schema, validation, repair and rendering.
+
+The recommendation prompt (``build_recommendation_prompt(structured=True)``)
+asks Gemini for one JSON object:
+
+    decision          ENTRY_DECISIONS (new entry) | PORTFOLIO_DECISIONS (holding)
+    confidence        High | Medium | Low, plus confidence_pct (0-100)
+    buy_zone          {"low", "high"} in ₹ (new entry only)
+    stop_loss/target  ₹ levels, stop < target (and stop < buy zone < target)
+    position_size     Full | Half | Quarter (new entry only)
+    immediate_action  HOLD | EXIT | AVERAGE (holding only)
+    horizon           1-3 months | 3-6 months | 6-12 months
+    rationale         2-5 short reasons with numbers
+    risk_rating       Low | Medium | High
+    priority          High | Medium | Low
+
+`validate` returns the cleaned verdict and ``{field: problem}``; the caller
+re-asks for just those fields (`repair_prompt`) and merges the answer.
+Replies that are not JSON (older cassettes, a model ignoring the format)
+are read with `from_markdown`, so only what is actually missing is re-asked.
+
+`render_markdown` produces the familiar report format, so reports,
+snapshots and the regex readers keep working (fields still invalid after
+the repairs are flagged rather than dropping the whole answer); `store_verdict` appends the
+object to ``FINQUANT_VERDICT_DIR/verdicts.ndjson`` as a ``"verdict"``
+record that `backtest` and `alerts import` read without any parsing.
+"""
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from logger import logger as project_logger
+from src.config import Config
+
+logger = project_logger.getChild("verdict")
+
+ENTRY_DECISIONS = ("STRONG BUY", "BUY", "NEUTRAL", "AVOID", "STRONG SELL")
+PORTFOLIO_DECISIONS = ("HOLD", "BOOK PROFIT", "CUT LOSS", "AVERAGE DOWN")
+BANDS = ("High", "Medium", "Low")
+HORIZONS = {"1-3 months": 91, "3-6 months": 182, "6-12 months": 365}
+STORE_PATH = os.path.join(Config.VERDICT_DIR, "verdicts.ndjson")
+UNVERIFIED_FIELDS = "⚠️ UNVERIFIED FIELDS"  # marks a report rendered from a partially valid verdict
+
+_COMMON = {
+    "decision": {"type": "enum", "description": "verdict"},
+    "confidence": {"type": "enum", "values": BANDS, "description": "High (80%+), Medium (60-80%) or Low (<60%)"},
+    "confidence_pct": {"type": "number", "min": 0, "max": 100, "description": "confidence as a percentage"},
+    "stop_loss": {"type": "price", "description": "stop loss in ₹"},
+    "target": {"type": "price", "description": "price target in ₹"},
+    "horizon": {"type": "enum", "values": tuple(HORIZONS), "description": "time horizon"},
+    "rationale": {"type": "list", "min": 2, "max": 5,
+                  "description": "2-5 reasons: technical with numbers, fundamental with metrics, risk/reward"},
+    "risk_rating": {"type": "enum", "values": BANDS[::-1], "description": "risk rating"},
+    "priority": {"type": "enum", "values": BANDS, "description": "priority"},
+}
+
+
+def schema(holding: bool) -> Dict[str, Dict[str, Any]]:
+    """Field → spec for a new-entry verdict or a holding (``holding``) verdict."""
+    fields = {k: dict(v) for k, v in _COMMON.items()}
+    fields["decision"]["values"] = PORTFOLIO_DECISIONS if holding else ENTRY_DECISIONS
+    if holding:
+        fields["immediate_action"] = {"type": "enum", "values": ("HOLD", "EXIT", "AVERAGE"),
+                                      "description": "what to do right now"}
+    else:
+        fields["buy_zone"] = {"type": "zone", "description": 'buy zone in ₹ as {"low": ..., "high": ...}'}
+        fields["position_size"] = {"type": "enum", "values": ("Full", "Half", "Quarter"),
+                                   "description": "position size"}
+    return fields
+
+
+def _example(spec: Dict[str, Any]) -> str:
+    kind = spec["type"]
+    if kind == "enum":
+        return " | ".join(f'"{v}"' for v in spec["values"])
+    if kind == "zone":
+        return '{"low": <number>, "high": <number>}'
+    if kind == "list":
+        return '["<reason>", "<reason>", "<reason>"]'
+    return "<number>"
+
+
+def format_instructions(holding: bool) -> str:
+    """Prompt block replacing the markdown format: the JSON keys, allowed values and rules."""
+    lines = [f'  "{name}": {_example(spec)},  // {spec["description"]}' for name, spec in schema(holding).items()]
+    order = "stop_loss < buy_zone.low <= buy_zone.high < target" if not holding else "stop_loss < target"
+    return f"""
+🎯 REQUIRED FORMAT - reply with ONE JSON object and nothing else (no markdown, no code fences):
+{{
+{chr(10).join(lines)}
+}}
+Every key is required. Prices are plain numbers in ₹ (no symbols or commas); {order}.
+"""
+
+
+# --------------------------------------------------------------------------- #
+# Parsing and validation
+# --------------------------------------------------------------------------- #
+
+def parse_json(text: str) -> Optional[Dict[str, Any]]:
+    """The JSON object in a reply (code fences and surrounding prose tolerated), or None."""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = re.sub(r"^json", "", text.strip("`"), flags=re.IGNORECASE).strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _price(value) -> Optional[float]:
+    if isinstance(value, str):
+        value = value.replace("₹", "").replace(",", "").strip()
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 and number == number and number != float("inf") else None
+
+
+def _enum(value, allowed) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    text = re.sub(r"\s+", " ", value).strip()
+    for option in allowed:
+        if text.lower() == option.lower() or text.lower().startswith(option.lower() + " "):
+            return option
+    return None
+
+
+def validate(data: Dict[str, Any], holding: bool) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """(clean verdict, {field: problem}); the clean verdict only holds valid fields."""
+    clean: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name, spec in schema(holding).items():
+        value = data.get(name)
+        if value is None or value == "" or value == []:
+            errors[name] = "missing"
+            continue
+        kind = spec["type"]
+        if kind == "enum":
+            option = _enum(value, spec["values"])
+            if option is None:
+                errors[name] = f"must be one of {', '.join(spec['values'])}"
+            else:
+                clean[name] = option
+        elif kind == "price":
+            price = _price(value)
+            if price is None:
+                errors[name] = "must be a positive number in ₹"
+            else:
+                clean[name] = round(price, 2)
+        elif kind == "number":
+            number = _price(value) if value != 0 else 0.0
+            if number is None or not spec["min"] <= number <= spec["max"]:
+                errors[name] = f"must be a number from {spec['min']} to {spec['max']}"
+            else:
+                clean[name] = number
+        elif kind == "zone":
+            low = _price(value.get("low")) if isinstance(value, dict) else None
+            high = _price(value.get("high")) if isinstance(value, dict) else None
+            if low is None or high is None:
+                errors[name] = 'must be {"low": <number>, "high": <number>}'
+            else:
+                clean[name] = {"low": round(min(low, high), 2), "high": round(max(low, high), 2)}
+        elif kind == "list":
+            items = [str(v).strip() for v in value if str(v).strip()] if isinstance(value, list) else []
+            if not spec["min"] <= len(items) <= spec["max"]:
+                errors[name] = f"must be a list of {spec['min']}-{spec['max']} reasons"
+            else:
+                clean[name] = items
+
+    stop, target, zone = clean.get("stop_loss"), clean.get("target"), clean.get("buy_zone")
+    if stop and target and stop >= target:
+        errors["stop_loss"] = errors["target"] = "stop_loss must be below target"
+    elif zone and stop and stop >= zone["low"]:
+        errors["stop_loss"] = "stop_loss must be below buy_zone.low"
+    elif zone and target and target <= zone["high"]:
+        errors["target"] = "target must be above buy_zone.high"
+    for name in errors:
+        clean.pop(name, None)
+    return clean, errors
+
+
+def repair_prompt(errors: Dict[str, str], holding: bool) -> str:
+    """Follow-up asking only for the fields that were missing or invalid."""
+    fields = schema(holding)
+    problems = "\n".join(f'- "{name}": {problem} (expected {_example(fields[name])})' for name, problem in errors.items())
+    return f"""Some fields of your verdict were missing or invalid:
+{problems}
+
+Reply with ONE JSON object containing only these keys ({', '.join(f'"{n}"' for n in errors)}), corrected.
+No other keys, no markdown, no code fences."""
+
+
+_RATIONALE = re.compile(r"\*\*QUANTITATIVE RATIONALE\*\*[^\n]*\n(.*?)(?:\n\s*\n\*\*|\Z)", re.S)
+_RISK = re.compile(r"\*\*RISK RATING\*\*\s*→\s*(\w+)")
+_PRIORITY = re.compile(r"\*\*PRIORITY\*\*\s*→\s*(\w+)")
+_SIZE = re.compile(r"Position Size\**:\s*\[?\s*(\w+)")
+_ACTION = re.compile(r"Immediate Action\**:\s*\[?\s*(\w+)")
+_CONFIDENCE_LINE = re.compile(r"\*\*CONFIDENCE\*\*\s*→([^\n]*)")
+_PERCENT = re.compile(r"(?<![-<\d])(\d{1,3})\s*%")  # not the band's "60-80%" / "<60%"
+
+
+def from_markdown(text: str, holding: bool) -> Dict[str, Any]:
+    """Best-effort verdict fields from a markdown-format reply (unparsed fields are left out)."""
+    from src.backtest import parse_levels
+
+    levels = parse_levels(text)
+    data: Dict[str, Any] = {
+        "decision": levels["verdict"] if levels["verdict"] != "UNKNOWN" else None,
+        "confidence": levels["confidence"] if levels["confidence"] != "n/a" else None,
+        "stop_loss": levels["stop"] if levels["stop"] == levels["stop"] else None,
+        "target": levels["target"] if levels["target"] == levels["target"] else None,
+        "horizon": levels["horizon"],
+    }
+    if levels["entry_low"] == levels["entry_low"]:
+        data["buy_zone"] = {"low": levels["entry_low"], "high": levels["entry_high"]}
+    line = _CONFIDENCE_LINE.search(text)
+    percents = _PERCENT.findall(line.group(1)) if line else []
+    if percents:
+        data["confidence_pct"] = float(percents[-1])
+    elif data["confidence"]:
+        data["confidence_pct"] = {"High": 85.0, "Medium": 70.0, "Low": 50.0}[data["confidence"]]
+    rationale = _RATIONALE.search(text)
+    if rationale:
+        data["rationale"] = [re.sub(r"^\s*(?:\d+[.)]|[-*])\s*", "", line).strip()
+                             for line in rationale.group(1).splitlines() if line.strip()]
+    for key, pattern in (("risk_rating", _RISK), ("priority", _PRIORITY), ("position_size", _SIZE),
+                         ("immediate_action", _ACTION)):
+        match = pattern.search(text)
+        if match:
+            data[key] = match.group(1)
+    return {k: v for k, v in data.items() if v is not None}
+
+
+# --------------------------------------------------------------------------- #
+# Rendering and storage
+# --------------------------------------------------------------------------- #
+
+def _pct(value: float, reference: float) -> str:
+    return f"{abs(value / reference - 1) * 100:.1f}%" if reference else "n/a"
+
+
+def render_markdown(verdict: Dict[str, Any], current_price: float = 0,
+                    errors: Optional[Dict[str, str]] = None) -> str:
+    """The report in the markdown format the prompt used to ask for.
+
+    Fields listed in ``errors`` (still invalid after the repairs) are shown as
+    ``⚠️ <problem>`` and summarised in an UNVERIFIED_FIELDS line at the end.
+    """
+    errors = errors or {}
+    holding = "immediate_action" in verdict or "immediate_action" in errors
+    zone = verdict.get("buy_zone")
+    reference = current_price or (sum(zone.values()) / 2 if zone else 0)
+
+    def field(name: str) -> str:
+        return str(verdict[name]) if name in verdict else f"⚠️ {errors.get(name, 'missing')}"
+
+    def level(name: str, label: str) -> str:
+        price = verdict.get(name)
+        return f"₹{price:,.2f} ({_pct(price, reference)} {label})" if price else field(name)
+
+    if "confidence" in verdict:
+        band = {"High": "High (80%+)", "Medium": "Medium (60-80%)", "Low": "Low (<60%)"}[verdict["confidence"]]
+        confidence = f"{band} ({verdict['confidence_pct']:.0f}%)" if "confidence_pct" in verdict else band
+    else:
+        confidence = field("confidence")
+    reasons = "\n".join(f"{i}. {reason}" for i, reason in enumerate(verdict["rationale"], 1)) \
+        if "rationale" in verdict else field("rationale")
+    if holding:
+        headline, plan = "**PORTFOLIO DECISION**", f"""**ACTION PLAN**:
+- Immediate Action: {field('immediate_action')}
+- Stop Loss: {level('stop_loss', 'risk')}
+- Price Target: {level('target', 'upside')}
+- Time Horizon: {field('horizon')}"""
+    else:
+        buy_zone = f"₹{zone['low']:,.2f} - ₹{zone['high']:,.2f}" if zone else field("buy_zone")
+        headline, plan = "**ENTRY DECISION**", f"""**ENTRY STRATEGY**:
+- Buy Zone: {buy_zone}
+- Stop Loss: {level('stop_loss', 'risk')}
+- Target: {level('target', 'upside')}
+- Position Size: {field('position_size')}
+- Time Horizon: {field('horizon')}"""
+    report = f"""{headline} → {field('decision')}
+
+**CONFIDENCE** → {confidence}
+
+{plan}
+
+**QUANTITATIVE RATIONALE**:
+{reasons}
+
+**RISK RATING** → {field('risk_rating')}
+
+**PRIORITY** → {field('priority')} Priority"""
+    return flag_unverified(report, errors)
+
+
+def flag_unverified(report: str, errors: Dict[str, str]) -> str:
+    """``report`` plus an UNVERIFIED_FIELDS line naming each invalid field (unchanged without errors)."""
+    if not errors:
+        return report
+    return f"{report.rstrip()}\n\n{UNVERIFIED_FIELDS}: " + "; ".join(f"{k} {v}" for k, v in errors.items())
+
+
+_store_lock = threading.Lock()
+
+
+def store_verdict(verdict: Dict[str, Any], ticker: str, owns_stock: bool, buy_price: float = 0, source: str = "llm",
+                  path: str = STORE_PATH) -> Dict[str, Any]:
+    """Append a ``"verdict"`` record (backtest / alerts columns + the full object); returns the record."""
+    zone = verdict.get("buy_zone") or {}
+    record = {
+        "type": "verdict",
+        "ticker": ticker,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "verdict": verdict["decision"],
+        "confidence": verdict["confidence"],
+        "entry_low": zone.get("low"),
+        "entry_high": zone.get("high"),
+        "stop": verdict["stop_loss"],
+        "target": verdict["target"],
+        "horizon_days": HORIZONS[verdict["horizon"]],
+        "source": source,
+        "owns_stock": owns_stock,
+        "buy_price": buy_price,
+        "structured": verdict,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _store_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return record
+
+
+if __name__ == "__main__":
+    reply = """```json
+{"decision": "buy", "confidence": "Medium", "confidence_pct": 70, "buy_zone": {"low": "₹1,450", "high": 1500},
+ "stop_loss": 1520, "target": 1800, "position_size": "Half", "horizon": "3-6 months",
+ "rationale": ["Price above 30-day average", "Sales +12% YoY, OPM stable"], "risk_rating": "Medium"}
+```"""
+    verdict, errors = validate(parse_json(reply), holding=False)
+    print(errors)
+    print(repair_prompt(errors, holding=False))
+    verdict.update(validate({**verdict, "stop_loss": 1390, "priority": "High"}, holding=False)[0])
+    print(render_markdown(verdict, current_price=1480))
@@ -0,0 +1,13 @@
+# tests/conftest.py
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# src/ too: modules import the shared logger as `from logger import logger`
+for path in (os.path.join(PROJECT_ROOT, "src"), PROJECT_ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Never reach Gemini or the on-disk caches from a unit test
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("FINQUANT_CACHE", "0")
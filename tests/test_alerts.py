@@ -0,0 +1,102 @@
+# tests/test_alerts.py
+import numpy as np
+import pytest
+
+from src.alerts import AlertEngine, load_rules, make_rule, rules_from_verdicts, save_rules
+
+
+def engine(*rules, **kwargs):
+    return AlertEngine(list(rules), **kwargs)
+
+
+def crossed(eng, prev, high, low, ticker="TCS.NS"):
+    return sorted((d, eng.rules[i]["level"]) for d, i in eng._crossed(ticker, prev, high, low))
+
+
+def test_crossed_interval_boundaries():
+    eng = engine(*(make_rule("TCS.NS", lvl, d) for lvl in (95, 100, 105) for d in ("above", "below")))
+    # above fires on (prev, high], below on [low, prev)
+    assert crossed(eng, 100, 105, 100) == [("above", 105)]
+    assert crossed(eng, 100, 100, 95) == [("below", 95)]
+    assert crossed(eng, 95, 104.9, 95) == [("above", 100)]
+    assert crossed(eng, 100, 100, 100) == []
+    assert crossed(eng, 100, 106, 94) == [("above", 105), ("below", 95)]
+
+
+def test_crossed_matches_a_linear_scan():
+    rng = np.random.default_rng(5)
+    rules = [make_rule("TCS.NS", lvl, d) for lvl, d in
+             zip(rng.uniform(80, 120, 300).round(1), rng.choice(["above", "below"], 300))]
+    eng = engine(*rules)
+    for _ in range(200):
+        prev = rng.uniform(80, 120)
+        high, low = prev + rng.uniform(0, 8), prev - rng.uniform(0, 8)
+        expected = sorted((r["direction"], r["level"]) for r in rules
+                          if (r["direction"] == "above" and prev < r["level"] <= high)
+                          or (r["direction"] == "below" and low <= r["level"] < prev))
+        assert crossed(eng, prev, high, low) == expected
+
+
+def test_unknown_ticker_crosses_nothing():
+    assert engine(make_rule("TCS.NS", 100, "above"))._crossed("INFY.NS", 90, 110, 80) == []
+
+
+def test_first_bar_only_sets_the_reference_and_stale_bars_are_ignored():
+    eng = engine(make_rule("TCS.NS", 100, "above"))
+    assert eng.on_price("TCS.NS", "2024-05-02T10:00:00", 110) == []
+    assert eng.on_price("TCS.NS", "2024-05-02T09:55:00", 90) == []  # older than the last bar
+    assert eng.state["last"]["TCS.NS"] == ["2024-05-02T10:00:00", 110.0]
+
+
+def test_gap_through_the_open_fires():
+    sink = []
+    eng = engine(make_rule("TCS.NS", 90, "below", kind="stop"), sinks=[sink.append])
+    eng.on_price("TCS.NS", "2024-05-02", 100)
+    alerts = eng.on_bar("TCS.NS", "2024-05-03", 85, 89, 84, 88)
+    assert [(a["direction"], a["level"], a["price"]) for a in alerts] == [("below", 90, 84)]
+    assert sink == alerts
+
+
+def test_same_level_rules_merge_and_cooldown_suppresses_refires():
+    stop = make_rule("TCS.NS", 90, "below", kind="stop", source="a.md", note="BUY on 2024-04-01")
+    entry = make_rule("TCS.NS", 90, "below", kind="entry", source="b.md", note="BUY on 2024-04-20")
+    eng = engine(stop, entry, cooldown_s=3600)
+    eng.on_price("TCS.NS", "2024-05-02T10:00:00", 95)
+    [alert] = eng.on_price("TCS.NS", "2024-05-02T10:05:00", 89)
+    assert alert["kinds"] == ["stop", "entry"] and alert["rule_ids"] == [stop["id"], entry["id"]]
+    eng.on_price("TCS.NS", "2024-05-02T10:10:00", 95)
+    assert eng.on_price("TCS.NS", "2024-05-02T10:15:00", 89) == []  # within the cooldown
+    eng.on_price("TCS.NS", "2024-05-02T11:10:00", 95)
+    assert len(eng.on_price("TCS.NS", "2024-05-02T11:15:00", 89)) == 1
+
+
+def test_expired_rules_do_not_fire():
+    eng = engine(make_rule("TCS.NS", 100, "above", expires="2024-05-01"))
+    eng.on_price("TCS.NS", "2024-05-02", 95)
+    assert eng.on_price("TCS.NS", "2024-05-03", 105) == []
+
+
+def test_make_rule_validates_and_has_stable_ids():
+    assert make_rule("TCS.NS", 100, "above")["id"] == make_rule("TCS.NS", 100.0, "above")["id"]
+    with pytest.raises(ValueError, match="direction"):
+        make_rule("TCS.NS", 100, "sideways")
+    with pytest.raises(ValueError, match="Invalid alert level"):
+        make_rule("TCS.NS", float("nan"), "above")
+
+
+def test_rules_from_verdicts_and_pruning(tmp_path):
+    csv = tmp_path / "verdicts.csv"
+    csv.write_text("ticker,date,verdict,entry_low,entry_high,stop,target,horizon_days\n"
+                   "TCS,2024-05-01,BUY,3800,3900,3600,4400,60\n"
+                   "INFY,2024-05-01,AVOID,,,1300,,30\n")
+    rules = rules_from_verdicts([str(csv)])
+    assert sorted((r["ticker"], r["kind"], r["direction"], r["level"]) for r in rules) == [
+        ("INFY.NS", "stop", "below", 1300),
+        ("TCS.NS", "entry", "below", 3900), ("TCS.NS", "stop", "below", 3600), ("TCS.NS", "target", "above", 4400),
+    ]
+    assert {r["expires"] for r in rules} == {"2024-06-30", "2024-05-31"}
+
+    path = str(tmp_path / "rules.json")
+    kept = save_rules(rules + rules, path, today="2024-06-01")
+    assert len(kept) == 3 and all(r["ticker"] == "TCS.NS" for r in kept)
+    assert load_rules(path) == kept
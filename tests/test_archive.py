@@ -0,0 +1,112 @@
+# tests/test_archive.py
+import numpy as np
+import pytest
+
+from src.archive import DATE_GROWTH, TICKER_GROWTH, PriceArchive, open_archive
+
+
+def bar(close: float) -> dict:
+    return {"open": close - 1, "high": close + 2, "low": close - 2, "close": close, "volume": 1000 * close}
+
+
+def day(values: dict) -> dict:
+    """append_day input from ``{ticker: close}``."""
+    bars = {t: bar(c) for t, c in values.items()}
+    return {field: {t: b[field] for t, b in bars.items()} for field in ("open", "high", "low", "close", "volume")}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return PriceArchive.create(["TCS.NS", "INFY.NS"], root=str(tmp_path), date_capacity=2, ticker_capacity=2)
+
+
+def test_append_day_round_trips_through_a_reader(archive):
+    archive.append_day("2024-01-01", day({"TCS.NS": 100.0, "INFY.NS": 50.0}))
+    archive.append_day("2024-01-02", day({"TCS.NS": 101.0, "UNKNOWN.NS": 7.0}))
+
+    reader = open_archive(archive.root)
+    assert not reader.writable
+    assert reader.dates.astype(str).tolist() == ["2024-01-01", "2024-01-02"]
+    assert reader.series("TCS.NS").tolist() == [100.0, 101.0]
+    assert np.isnan(reader.series("INFY.NS")[1])  # no bar
+    assert reader.cross_section("2024-01-01").tolist() == [100.0, 50.0]
+    assert reader.field("volume").shape == (2, 2)
+
+    bars = reader.bars("INFY.NS")
+    assert bars["date"].tolist() == [np.datetime64("2024-01-01", "D")]
+    assert bars["high"].tolist() == [52.0]
+    with pytest.raises(KeyError, match="2024-01-03"):
+        reader.cross_section("2024-01-03")
+    with pytest.raises(PermissionError):
+        reader.append_day("2024-01-03", day({"TCS.NS": 1.0}))
+
+
+def test_append_day_same_date_overwrites_and_earlier_date_is_rejected(archive):
+    archive.append_day("2024-01-01", day({"TCS.NS": 100.0, "INFY.NS": 50.0}))
+    archive.append_day("2024-01-01", day({"TCS.NS": 105.0}))
+    assert archive.rows == 1
+    assert archive.cross_section("2024-01-01").tolist() == [105.0, 50.0]  # INFY untouched by the rewrite
+
+    archive.append_day("2024-01-03", day({"TCS.NS": 106.0}))
+    with pytest.raises(ValueError, match="2024-01-02 is before the last archived date"):
+        archive.append_day("2024-01-02", day({"TCS.NS": 1.0}))
+    assert archive.rows == 2
+
+
+def test_append_day_grows_the_date_capacity(archive):
+    closes = [100.0, 101.0, 102.0, 103.0, 104.0]
+    for i, close in enumerate(closes):
+        archive.append_day(np.datetime64("2024-01-01") + i, day({"TCS.NS": close, "INFY.NS": close / 2}))
+    assert archive.meta["date_capacity"] == 2 + DATE_GROWTH
+    assert archive.series("TCS.NS").tolist() == closes
+    assert archive.series("INFY.NS", start="2024-01-02", end="2024-01-04").tolist() == [50.5, 51.0, 51.5]
+
+    reader = PriceArchive(archive.root)
+    assert reader.info()["last_date"] == "2024-01-05"
+    assert reader.info()["capacity"] == [2 + DATE_GROWTH, 2]
+    assert reader.field("low")[:, 1].tolist() == [c / 2 - 2 for c in closes]
+
+
+def test_add_tickers_past_the_ticker_capacity(archive):
+    archive.append_day("2024-01-01", day({"TCS.NS": 100.0, "INFY.NS": 50.0}))
+    assert archive.add_tickers(["TCS.NS", "SBIN.NS", "SBIN.NS", "IRFC.NS"]) == ["SBIN.NS", "IRFC.NS"]
+    assert archive.meta["ticker_capacity"] == TICKER_GROWTH
+    assert archive.tickers == ["TCS.NS", "INFY.NS", "SBIN.NS", "IRFC.NS"]
+    assert archive.add_tickers(["IRFC.NS"]) == []
+
+    # Existing columns survive the relayout; the new ones start empty
+    row = archive.cross_section("2024-01-01")
+    assert row[:2].tolist() == [100.0, 50.0] and np.isnan(row[2:]).all()
+    archive.append_day("2024-01-02", day({"SBIN.NS": 600.0, "TCS.NS": 101.0}))
+
+    reader = open_archive(archive.root)
+    assert reader.field().shape == (2, 4)
+    assert reader.series("SBIN.NS").tolist()[1] == 600.0
+    assert reader.series("TCS.NS").tolist() == [100.0, 101.0]
+
+
+def test_write_history_aligns_on_archived_dates(archive):
+    archive.set_dates(["2024-01-03", "2024-01-01", "2024-01-02", "2024-01-01"])
+    assert archive.rows == 3
+    with pytest.raises(ValueError, match="already has dates"):
+        archive.set_dates(["2024-01-04"])
+
+    written = archive.write_history("INFY.NS", {
+        "date": ["2023-12-29", "2024-01-02", "2024-01-03", "2024-01-08"],
+        "close": [1.0, 52.0, 53.0, 2.0],
+        "volume": [1.0, 5200.0, 5300.0, 2.0],
+    })
+    assert written == 2
+    assert np.isnan(archive.series("INFY.NS")[0])
+    assert archive.series("INFY.NS").tolist()[1:] == [52.0, 53.0]
+    assert archive.series("INFY.NS", "volume").tolist()[1:] == [5200.0, 5300.0]
+    assert np.isnan(archive.series("INFY.NS", "open")).all()  # fields missing from the history stay NaN
+    assert np.isnan(archive.series("TCS.NS")).all()
+
+
+def test_write_history_on_an_empty_archive_writes_nothing(archive):
+    assert archive.write_history("TCS.NS", {"date": ["2024-01-01"], "close": [1.0]}) == 0
+
+
+def test_open_archive_without_a_build(tmp_path):
+    assert open_archive(str(tmp_path)) is None
@@ -0,0 +1,135 @@
+# tests/test_backtest.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest import VERDICT_COLUMNS, confidence_band, load_verdicts, parse_levels, run_backtest, summarize
+
+DAY0 = np.datetime64("2024-01-01")
+
+
+def bars(ohlc):
+    """Daily bars from (open, high, low, close) tuples, one per day from 2024-01-01."""
+    o, h, l, c = (np.array(col, dtype="float64") for col in zip(*ohlc))
+    return {"date": DAY0 + np.arange(len(ohlc)), "open": o, "high": h, "low": l, "close": c}
+
+
+def flat(n=10, price=100.0):
+    return [(price, price + 1, price - 1, price)] * n
+
+
+def verdict(ticker="ABC.NS", date="2023-12-31", verdict="BUY", zone=(np.nan, np.nan), stop=np.nan,
+            target=np.nan, horizon_days=30):
+    row = dict(ticker=ticker, date=pd.Timestamp(date), verdict=verdict, confidence="High",
+               entry_low=zone[0], entry_high=zone[1], stop=stop, target=target,
+               horizon_days=horizon_days, source="test")
+    return pd.DataFrame([row], columns=list(VERDICT_COLUMNS))
+
+
+def run(ohlc, **kwargs):
+    return run_backtest(verdict(**kwargs), {"ABC.NS": bars(ohlc)}).iloc[0]
+
+
+def test_target_exit_fills_at_zone_top_and_target():
+    ohlc = [(104, 105, 103, 104), (102, 103, 99, 100), (101, 106, 100, 105), (106, 112, 105, 111)] + flat(4)
+    row = run(ohlc, zone=(98, 102), stop=90, target=110)
+    assert row["outcome"] == "target"
+    assert row["entry_date"] == pd.Timestamp("2024-01-02")  # first bar trading into the zone
+    assert row["entry_price"] == 102  # min(open, zone top)
+    assert row["exit_price"] == 110
+    assert row["return_pct"] == pytest.approx(110 / 102 * 100 - 100)
+    assert row["mae_pct"] == pytest.approx(99 / 102 * 100 - 100)
+    assert row["bars_held"] == 3
+
+
+def test_stop_and_target_on_one_bar_counts_as_stop():
+    row = run([(100, 100.5, 99.5, 100), (100, 115, 85, 100)] + flat(4), stop=90, target=110)
+    assert row["outcome"] == "stop"
+    assert row["exit_price"] == 90
+
+
+def test_gap_through_stop_fills_at_the_open():
+    row = run([(100, 101, 99, 100), (80, 82, 78, 81)] + flat(4), stop=90, target=110)
+    assert row["outcome"] == "stop"
+    assert row["exit_price"] == 80
+
+
+def test_no_same_day_fill():
+    row = run(flat(5), date="2024-01-01")
+    assert row["entry_date"] == pd.Timestamp("2024-01-02")
+
+
+def test_untouched_zone_is_no_fill():
+    row = run(flat(10), zone=(50, 60), stop=40, target=200)
+    assert row["outcome"] == "no_fill"
+    assert np.isnan(row["entry_price"])
+
+
+def test_expired_and_open_positions_exit_at_last_close():
+    expired = run(flat(10), stop=50, target=200, horizon_days=5)
+    assert expired["outcome"] == "expired"
+    assert expired["exit_date"] == pd.Timestamp("2024-01-05")
+    assert run(flat(10), stop=50, target=200, horizon_days=60)["outcome"] == "open"
+
+
+def test_no_trade_verdicts_only_get_the_forward_return():
+    ohlc = [(100, 101, 99, 100)] + flat(3) + [(120, 121, 119, 120)]
+    row = run(ohlc, verdict="AVOID", horizon_days=5)
+    assert row["outcome"] == "no_trade"
+    assert np.isnan(row["entry_price"])
+    assert row["forward_return_pct"] == pytest.approx(20.0)
+
+
+def test_tickers_without_bars_are_no_data():
+    frame = pd.concat([verdict(), verdict(ticker="MISSING.NS")], ignore_index=True)
+    frame["horizon_days"] = 3
+    result = run_backtest(frame, {"ABC.NS": bars(flat(5)), "MISSING.NS": ValueError("no history")})
+    assert result["outcome"].tolist() == ["expired", "no_data"]
+
+
+def test_parse_levels_from_recommendation_text():
+    text = (
+        "**ENTRY DECISION** → BUY\n**CONFIDENCE** → Medium (60-80%)\n"
+        "- **Buy Zone**: ₹1,250 - ₹1,200\n- **Stop Loss**: ₹1,100\n"
+        "- **Price Target**: ₹1,500\n- **Time Horizon**: 3-6 months\n"
+    )
+    levels = parse_levels(text)
+    assert levels["verdict"] == "BUY" and levels["confidence"] == "Medium"
+    assert (levels["entry_low"], levels["entry_high"]) == (1200, 1250)
+    assert (levels["stop"], levels["target"]) == (1100, 1500)
+    assert levels["horizon"] == "3-6 months" and levels["horizon_days"] == round(6 * 30.4)
+    assert parse_levels("no levels")["verdict"] == "UNKNOWN"
+
+
+@pytest.mark.parametrize("value, band", [(0.85, "High"), ("72%", "Medium"), (40, "Low"),
+                                         ("Medium (60-80%)", "Medium"), (None, "n/a"), ("??", "n/a")])
+def test_confidence_band(value, band):
+    assert confidence_band(value) == band
+
+
+def test_load_verdicts_from_ndjson(tmp_path):
+    path = tmp_path / "verdicts.ndjson"
+    records = [
+        {"ticker": "tcs", "date": "2024-01-05", "verdict": "buy", "confidence": 0.9},
+        {"type": "error", "message": "skipped"},
+        {"ticker": "INFY.NS", "date": None, "verdict": "BUY"},
+    ]
+    path.write_text("\n".join(json.dumps(r) for r in records))
+    frame = load_verdicts([str(path)])
+    assert frame["ticker"].tolist() == ["TCS.NS"]
+    assert frame.loc[0, "verdict"] == "BUY" and frame.loc[0, "confidence"] == "High"
+    assert frame.loc[0, "horizon_days"] == 90
+
+
+def test_summarize_hit_rate_and_all_row():
+    frame = pd.concat([verdict(stop=90, target=110), verdict(stop=90, target=110)], ignore_index=True)
+    frame.loc[1, "ticker"] = "XYZ.NS"
+    winners = [(100, 101, 99, 100), (105, 111, 104, 110)] + flat(3)
+    losers = [(100, 101, 99, 100), (95, 96, 89, 90)] + flat(3)
+    results = run_backtest(frame, {"ABC.NS": bars(winners), "XYZ.NS": bars(losers)})
+    summary = summarize(results, by=["verdict"])
+    assert summary["verdict"].tolist() == ["BUY", "ALL"]
+    assert summary.iloc[0]["hit_rate_pct"] == 50.0
+    assert summary.iloc[0]["avg_return_pct"] == pytest.approx(0.0)
@@ -0,0 +1,128 @@
+# tests/test_fundamentals_hedge.py
+import threading
+import time
+
+import pytest
+
+import src.tools as tools
+from src import resilience
+from src.cache import TTLCache
+
+KEY = "tcs"
+COMPLETE = {"profit_loss": {"Sales": {"Mar 2024": 1.0}}, "quarters": {"Sales": {"Jun 2024": 1.0}}}
+THIN = {"profit_loss": {"Sales": {"Mar 2024": 1.0}}}
+
+
+class Scrape:
+    """Controllable Screener scrape: blocks until released, then returns or raises."""
+
+    def __init__(self, fail=None, block=True):
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+        self.fail = fail
+
+    def __call__(self, screener_name):
+        assert self.release.wait(5)
+        if self.fail:
+            raise self.fail
+        return {**COMPLETE, "metadata": {"company": screener_name}}
+
+
+@pytest.fixture
+def hedge(monkeypatch):
+    cache = TTLCache("fundamentals-test", 3600, persist=False)
+    monkeypatch.setattr(tools, "fundamentals_cache", cache)
+    monkeypatch.setattr(tools.Config, "FUNDAMENTALS_HEDGE_S", 0.05)
+    monkeypatch.setitem(resilience.BREAKERS, "screener", resilience.CircuitBreaker("screener"))
+
+    def install(scrape, yahoo=COMPLETE, yahoo_fail=None):
+        monkeypatch.setattr(tools, "_scrape_fundamentals", scrape)
+
+        def fake_yahoo(screener_name, ticker):
+            if yahoo_fail:
+                raise yahoo_fail
+            return {**yahoo, "metadata": {"company": screener_name}}
+        monkeypatch.setattr(tools, "_yahoo_fundamentals", fake_yahoo)
+        return cache
+    return install
+
+
+def fetch():
+    return tools._fetch_fundamentals("TCS", "TCS.NS", KEY)
+
+
+def cached_source(cache):
+    entry = cache.get(KEY)
+    return entry and entry["metadata"]["source"]
+
+
+def wait_for_source(cache, source, timeout=2.0):
+    until = time.monotonic() + timeout
+    while cached_source(cache) != source and time.monotonic() < until:
+        time.sleep(0.01)
+    return cached_source(cache)
+
+
+def test_fast_scrape_wins_without_hedging(hedge):
+    cache = hedge(Scrape(block=False), yahoo_fail=AssertionError("yfinance must not be called"))
+    assert fetch()["metadata"]["source"] == "screener"
+    assert cached_source(cache) == "screener"
+
+
+def test_slow_scrape_is_hedged_and_replaces_the_yfinance_entry_later(hedge):
+    scrape = Scrape()
+    cache = hedge(scrape)
+    assert fetch()["metadata"]["source"] == "yfinance"
+    assert cached_source(cache) == "yfinance"
+    scrape.release.set()
+    assert wait_for_source(cache, "screener") == "screener"
+
+
+def test_late_scrape_finishing_before_get_or_compute_returns_is_kept(hedge):
+    scrape = Scrape()
+    cache = hedge(scrape)
+
+    def compute():
+        result = fetch()  # yfinance wins
+        scrape.release.set()  # scrape lands while get_or_compute still holds the key
+        wait_for_source(cache, "screener")
+        return result
+
+    assert cache.get_or_compute(KEY, compute, store=False)["metadata"]["source"] == "yfinance"
+    assert cached_source(cache) == "screener"
+
+
+def test_late_scrape_never_overwrites_a_screener_entry(hedge):
+    scrape = Scrape()
+    cache = hedge(scrape)
+    fetch()
+    newer = {**COMPLETE, "metadata": {"source": "screener", "scraped_at": "newer"}}
+    cache.set(KEY, newer)
+    scrape.release.set()
+    time.sleep(0.1)
+    assert cache.get(KEY) == newer
+
+
+def test_failed_scrape_falls_back_to_yfinance(hedge):
+    hedge(Scrape(fail=ConnectionError("browser crashed"), block=False))
+    assert fetch()["metadata"]["source"] == "yfinance"
+
+
+def test_incomplete_yfinance_waits_for_the_scrape(hedge):
+    scrape = Scrape()
+    hedge(scrape, yahoo=THIN)
+    threading.Timer(0.2, scrape.release.set).start()
+    assert fetch()["metadata"]["source"] == "screener"
+
+
+def test_incomplete_yfinance_is_used_when_the_scrape_failed(hedge):
+    hedge(Scrape(fail=ConnectionError("browser crashed"), block=False), yahoo=THIN)
+    result = fetch()
+    assert result["metadata"]["source"] == "yfinance" and "quarters" not in result
+
+
+def test_both_failing_raises_the_scrape_error(hedge):
+    hedge(Scrape(fail=ConnectionError("browser crashed"), block=False), yahoo_fail=ValueError("no statements"))
+    with pytest.raises(ConnectionError, match="browser crashed"):
+        fetch()
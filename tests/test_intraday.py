@@ -0,0 +1,137 @@
+# tests/test_intraday.py
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.intraday import ATR_PERIOD, EMA_FAST, EMA_SLOW, RSI_PERIOD, IntradayStream, RollingIndicators
+
+WINDOW = 20
+
+
+def stream(sessions=2, bars_per_session=75, seed=3):
+    """Synthetic 5-minute bars over consecutive trading days, as a DataFrame indexed by timestamp."""
+    rng = np.random.default_rng(seed)
+    n = sessions * bars_per_session
+    stamps = [datetime(2024, 3, 4 + day, 9, 15) + timedelta(minutes=5 * i)
+              for day in range(sessions) for i in range(bars_per_session)]
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate(([1000.0], close[:-1])) * (1 + rng.normal(0, 0.0005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.001, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.001, n)))
+    volume = rng.integers(1_000, 50_000, n).astype(float)
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume},
+                        index=pd.DatetimeIndex(stamps))
+
+
+def wilder(values: pd.Series, period: int) -> pd.Series:
+    """Wilder smoothing seeded with the simple mean of the first ``period`` values."""
+    seeded = values.iloc[period - 1:].copy()
+    seeded.iloc[0] = values.iloc[:period].mean()
+    return seeded.ewm(alpha=1 / period, adjust=False).mean()
+
+
+def batch(bars: pd.DataFrame) -> pd.DataFrame:
+    close = bars["close"]
+    change = close.diff().iloc[1:]
+    avg_gain = wilder(change.clip(lower=0), RSI_PERIOD)
+    avg_loss = wilder(-change.clip(upper=0), RSI_PERIOD)
+    prev_close = close.shift()
+    true_range = pd.concat([bars["high"] - bars["low"], (bars["high"] - prev_close).abs(),
+                            (bars["low"] - prev_close).abs()], axis=1).max(axis=1)
+    session = bars.index.date
+    pv = ((bars["high"] + bars["low"] + close) / 3 * bars["volume"]).groupby(session).cumsum()
+    return pd.DataFrame({
+        "mean": close.rolling(WINDOW, min_periods=1).mean(),
+        "std": close.rolling(WINDOW, min_periods=2).std(),
+        "high": bars["high"].rolling(WINDOW, min_periods=1).max(),
+        "low": bars["low"].rolling(WINDOW, min_periods=1).min(),
+        "ema_fast": close.ewm(span=EMA_FAST, adjust=False).mean(),
+        "ema_slow": close.ewm(span=EMA_SLOW, adjust=False).mean(),
+        "rsi": 100 - 100 / (1 + avg_gain / avg_loss),
+        "atr": wilder(true_range, ATR_PERIOD),
+        "vwap": pv / bars["volume"].groupby(session).cumsum(),
+    })
+
+
+def test_incremental_indicators_match_batch_computation():
+    bars = stream()
+    expected = batch(bars)
+    state = RollingIndicators("TEST.NS", window=WINDOW)
+    for i, (ts, bar) in enumerate(bars.iterrows()):
+        assert state.update(ts, bar["open"], bar["high"], bar["low"], bar["close"], bar["volume"])
+        row = expected.iloc[i]
+        assert state._mean == pytest.approx(row["mean"], rel=1e-12)
+        if i:
+            assert state.std == pytest.approx(row["std"], rel=1e-8)
+        assert state._max_q[0][1] == row["high"] and state._min_q[0][1] == row["low"]
+        assert state.ema_fast == pytest.approx(row["ema_fast"], rel=1e-12)
+        assert state.ema_slow == pytest.approx(row["ema_slow"], rel=1e-12)
+        assert state.rsi == (None if np.isnan(row["rsi"]) else pytest.approx(row["rsi"], rel=1e-9))
+        assert state.atr == (None if np.isnan(row["atr"]) else pytest.approx(row["atr"], rel=1e-9))
+        assert state._pv / state._volume == pytest.approx(row["vwap"], rel=1e-12)
+    assert state.bars == len(bars)
+
+
+def test_rsi_and_atr_start_after_their_seed_periods():
+    bars = stream(sessions=1)
+    state = RollingIndicators("TEST.NS")
+    for i, (ts, bar) in enumerate(bars.iloc[:RSI_PERIOD + 1].iterrows()):
+        state.update(ts, *bar)
+        assert (state.atr is not None) == (i + 1 >= ATR_PERIOD)
+        assert (state.rsi is not None) == (i >= RSI_PERIOD)  # needs RSI_PERIOD changes
+
+
+def test_session_values_reset_when_the_date_changes():
+    bars = stream(sessions=2, bars_per_session=10)
+    state = RollingIndicators("TEST.NS", window=WINDOW)
+    for ts, bar in bars.iterrows():
+        state.update(ts, *bar)
+    day2 = bars.iloc[10:]
+    snap = state.snapshot()
+    assert snap["today_open"] == round(day2["open"].iloc[0], 4)
+    assert snap["today_date"] == "05-03-2024"
+    assert snap["indicators"]["session_high"] == round(day2["high"].max(), 4)
+    assert snap["indicators"]["session_low"] == round(day2["low"].min(), 4)
+    typical = (day2["high"] + day2["low"] + day2["close"]) / 3
+    assert snap["indicators"]["vwap"] == pytest.approx((typical * day2["volume"]).sum() / day2["volume"].sum(),
+                                                       abs=1e-4)
+    assert snap["stats"]["window"] == WINDOW  # rolling stats span sessions
+
+
+def test_duplicate_and_out_of_order_bars_are_rejected():
+    bars = stream(sessions=1, bars_per_session=30)
+    state = RollingIndicators("TEST.NS")
+    for ts, bar in bars.iloc[:20].iterrows():
+        state.update(ts, *bar)
+    before = state.snapshot()
+    last_ts, last_bar = bars.index[19], bars.iloc[19]
+    assert not state.update(last_ts, *last_bar)
+    assert not state.update(bars.index[5], *bars.iloc[5])
+    assert not state.update(last_ts, 1.0, 2.0, 0.5, 1.5, 10.0)  # same stamp, different prices
+    assert state.snapshot() == before
+
+
+def test_stream_skips_the_forming_bar_and_feeds_only_new_ones():
+    bars = stream(sessions=1, bars_per_session=12)
+    rows = [(ts, *bar) for ts, bar in zip(bars.index, bars.itertuples(index=False))]
+    served = {"n": 6}
+
+    def fetch(ticker, interval):
+        if ticker == "BAD.NS":
+            raise ValueError("no intraday data")
+        return rows[:served["n"]]
+
+    feed = IntradayStream(["tcs", "BAD.NS"], interval="5m", fetch=fetch)
+    first = {s["ticker"]: s for s in feed.poll_once()}
+    assert first["TCS.NS"]["bars"] == 5
+    assert first["BAD.NS"] == {"ticker": "BAD.NS", "error": "no intraday data"}
+    assert [s["ticker"] for s in feed.poll_once()] == ["BAD.NS"]  # nothing new for TCS
+    served["n"] = 12
+    assert {s["ticker"]: s["bars"] for s in feed.poll_once() if "bars" in s} == {"TCS.NS": 11}
+
+
+def test_unsupported_interval_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported interval"):
+        IntradayStream(["TCS"], interval="1h")
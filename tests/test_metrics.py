@@ -0,0 +1,31 @@
+# tests/test_metrics.py
+import pytest
+
+from src import metrics
+
+
+@pytest.fixture
+def registry():
+    was_enabled = metrics.is_enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+def test_prometheus_counters_keep_every_digit(registry):
+    metrics.incr("llm_tokens", 12_345_678, stage="recommendation", kind="input")
+    metrics.incr("llm_tokens", 1, stage="recommendation", kind="input")
+    metrics.incr("alerts_fired", 0.5)
+    text = metrics.export_prometheus()
+    assert 'finquant_llm_tokens_total{kind="input",stage="recommendation"} 12345679.0' in text
+    assert "finquant_alerts_fired_total 0.5" in text
+    assert "e+" not in text
+
+
+def test_disabled_registry_records_nothing(registry):
+    metrics.disable()
+    metrics.incr("llm_calls")
+    assert "llm_calls" not in metrics.export_prometheus()
@@ -0,0 +1,83 @@
+# tests/test_normalize.py
+import numpy as np
+import pytest
+
+from src.scraper.normalize import (
+    growth_rates, normalize_all, normalize_section, parse_numeric_array, parse_period_dates, safe_ratio,
+)
+from src.scraper.screener_scrapper import extract_numeric_value
+
+
+def test_parse_numeric_array_fast_path_keeps_numbers_and_none():
+    out = parse_numeric_array([1, 2.5, None, 0.12])
+    np.testing.assert_array_equal(out[[0, 1, 3]], [1.0, 2.5, 0.12])
+    assert np.isnan(out[2])
+
+
+@pytest.mark.parametrize("cell", ["1,234", "12%", "-3.5", "0", "1,00,000.25", "7.5%"])
+def test_parse_numeric_array_matches_extract_numeric_value(cell):
+    assert parse_numeric_array([cell, "x"])[0] == pytest.approx(extract_numeric_value(cell))
+
+
+def test_parse_numeric_array_raw_cell_text():
+    out = parse_numeric_array(["₹ 1,234 Cr", "(45)", "−12", "Rs. 9", "", "-", "NA", "abc"])
+    np.testing.assert_array_equal(out[:4], [1234.0, -45.0, -12.0, 9.0])
+    assert np.isnan(out[4:]).all()
+
+
+def test_parse_period_dates_month_end_and_ttm():
+    dates, is_ttm = parse_period_dates(["Mar 2023", "Sep 2023", "TTM", "junk"])
+    assert str(dates[0])[:10] == "2023-03-31"
+    assert str(dates[1])[:10] == "2023-09-30"
+    assert np.isnat(dates[2]) and np.isnat(dates[3])
+    assert is_ttm.tolist() == [False, False, True, False]
+
+
+def test_parse_period_dates_returns_copies_of_the_cached_arrays():
+    dates, is_ttm = parse_period_dates(["Mar 2024"])
+    is_ttm[0] = True
+    assert not parse_period_dates(["Mar 2024"])[1][0]
+
+
+def test_normalize_section_aligns_ragged_rows():
+    table = {
+        "Sales\xa0+": {"Mar 2023": 100, "Mar 2024": 120, "TTM": 125},
+        "Net Profit +": {"Mar 2024": 12},
+        "Raw": "not a row",
+    }
+    section = normalize_section("profit_loss", table)
+    assert section.metrics == ["Sales", "Net Profit"]
+    assert section.periods == ["Mar 2023", "Mar 2024", "TTM"]
+    np.testing.assert_array_equal(section.row("sales"), [100.0, 120.0])
+    np.testing.assert_array_equal(section.row("Sales", include_ttm=True), [100.0, 120.0, 125.0])
+    assert np.isnan(section.row("Net Profit")[0])
+    assert section.latest("Net Profit") == 12.0
+    assert section.latest("Revenue", "Sales") == 120.0
+    assert np.isnan(section.row("Missing")).all() and section.row("Missing").size == 2
+
+
+def test_normalize_section_empty_table():
+    section = normalize_section("quarters", {})
+    assert section.empty and section.shape == (0, 0)
+    assert np.isnan(section.latest("Sales"))
+
+
+def test_normalize_all_sections_and_round_trip():
+    data = {
+        "quarters": {"Sales": {"Jun 2024": "1,000"}},
+        "shareholding": {"quarterly": {"Promoters": {"Jun 2024": 0.5}}},
+    }
+    sections = normalize_all(data)
+    assert set(sections) == {"quarters", "profit_loss", "balance_sheet", "shareholding_quarterly", "shareholding_yearly"}
+    assert sections["quarters"].latest("Sales") == 1000.0
+    assert sections["shareholding_quarterly"].to_dict()["values"] == [[0.5]]
+    assert sections["profit_loss"].empty
+
+
+def test_growth_rates_and_safe_ratio():
+    rates = growth_rates([100, 110, 0, 50])
+    assert np.isnan(rates[0]) and np.isnan(rates[3])  # nothing before the first period / after a zero
+    assert rates[1] == pytest.approx(0.1) and rates[2] == pytest.approx(-1.0)
+    np.testing.assert_allclose(growth_rates([-100, -50]), [np.nan, 0.5])
+    np.testing.assert_array_equal(np.isnan(safe_ratio([1, 2], [0, 4])), [True, False])
+    assert safe_ratio(2, 4) == 0.5
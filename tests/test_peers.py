@@ -0,0 +1,109 @@
+# tests/test_peers.py
+import numpy as np
+import pytest
+
+from src.peers import METRICS, peer_block, peer_ticker, relative_metrics, render_peer_block
+
+NAN = float("nan")
+
+
+def brute_force(matrix):
+    """Per-cell loop version of relative_metrics (the reference for the broadcast)."""
+    n, m = matrix.shape
+    percentile = np.full((n, m), np.nan)
+    z = np.full((n, m), np.nan)
+    for j in range(m):
+        column = matrix[:, j]
+        values = column[~np.isnan(column)]
+        mean, std = (values.mean(), values.std()) if values.size else (NAN, NAN)
+        for i in range(n):
+            if np.isnan(column[i]):
+                continue
+            others = [v for k, v in enumerate(column) if k != i and not np.isnan(v)]
+            if others:
+                below = sum(v < column[i] for v in others)
+                ties = sum(v == column[i] for v in others)
+                percentile[i, j] = (below + 0.5 * ties) / len(others) * 100
+            if std > 0:
+                z[i, j] = (column[i] - mean) / std
+    return percentile, z
+
+
+def test_relative_metrics_matches_a_per_cell_loop():
+    rng = np.random.default_rng(11)
+    matrix = rng.normal(20, 5, (25, len(METRICS))).round(0)  # rounding leaves ties
+    matrix[rng.random(matrix.shape) < 0.15] = np.nan
+    stats = relative_metrics(matrix)
+    percentile, z = brute_force(matrix)
+    np.testing.assert_allclose(stats["percentile"], percentile, equal_nan=True)
+    np.testing.assert_allclose(stats["z"], z, equal_nan=True)
+    np.testing.assert_allclose(stats["median"], [np.median(c[~np.isnan(c)]) for c in matrix.T])
+
+
+def test_relative_metrics_small_and_degenerate_columns():
+    matrix = np.array([[10.0, 5.0, NAN], [20.0, 5.0, NAN], [30.0, 5.0, 7.0]])
+    stats = relative_metrics(matrix)
+    np.testing.assert_allclose(stats["percentile"][:, 0], [0, 50, 100])
+    np.testing.assert_allclose(stats["percentile"][:, 1], [50, 50, 50])  # all tied
+    assert np.isnan(stats["z"][:, 1]).all()  # no spread
+    assert np.isnan(stats["percentile"][:, 2]).all()  # one value has no peers to rank against
+    assert stats["median"][2] == 7.0
+
+
+@pytest.mark.parametrize("url, ticker", [
+    ("https://www.screener.in/company/TCS/consolidated/", "TCS.NS"),
+    ("/company/500325/", "500325.BO"),
+    (None, None), ("/market/IN06/", None),
+])
+def test_peer_ticker(url, ticker):
+    assert peer_ticker(url) == ticker
+
+
+def row(name, slug, pe, roce, mcap):
+    return {"name": name, "url": f"/company/{slug}/consolidated/",
+            "values": {"P/E": pe, "ROCE %": roce, "Mar Cap Rs.Cr.": mcap}}
+
+
+TABLE = {
+    "group": [{"name": "IT", "url": "/market/IN07/"}, {"name": "IT Services", "url": "/market/IN07/IN0701/"}],
+    "rows": [row("TCS", "TCS", 30.0, 60.0, 1_400_000), row("Infosys", "INFY", 25.0, 40.0, 700_000),
+             row("Wipro", "WIPRO", 20.0, 20.0, 250_000), row("Tiny Tech", "TINY", None, 10.0, 1_000)],
+}
+
+
+def prices(ticker):
+    if ticker == "TINY.NS":
+        raise ConnectionError("no data")
+    step = {"TCS.NS": 1.01, "INFY.NS": 1.0, "WIPRO.NS": 0.99}[ticker]
+    return {"price": [100 * step ** k for k in range(21)]}
+
+
+def test_peer_block_ranks_the_company_in_its_group():
+    block = peer_block({"peers": TABLE, "metadata": {"company": "Infosys Ltd"}}, "infy.ns", prices)
+    assert (block["company"], block["ticker"], block["listed"], block["size"]) == ("Infosys", "INFY.NS", True, 4)
+    assert block["group"] == ["IT", "IT Services"]
+    pe = block["metrics"]["pe"]
+    assert (pe["value"], pe["median"], pe["percentile"], pe["higher_is_better"]) == (25.0, 25.0, 50.0, False)
+    assert block["metrics"]["roce"]["percentile"] == pytest.approx(200 / 3, abs=0.5)
+    assert block["metrics"]["return_1m"]["value"] == 0.0
+    assert block["metrics"]["volatility"]["value"] == pytest.approx(0.0, abs=1e-9)
+    assert [p["name"] for p in block["peers"]] == ["TCS", "Wipro", "Tiny Tech"]  # by market cap
+    assert "return_1m" not in block["peers"][2]  # its prices failed
+
+    text = render_peer_block(block)
+    assert text.splitlines()[0] == "Infosys vs 3 peers (IT › IT Services):"
+    assert "- P/E: 25.00 vs median 25.00 | 50th pct | z +0.00 (lower is better)" in text
+    assert "  · TCS: P/E 30.0, ROCE 60.0%, 1M " in text
+
+
+def test_unlisted_company_is_added_with_its_own_prices():
+    own = {"price": [100 * 1.02 ** k for k in range(21)]}
+    block = peer_block({"peers": TABLE, "metadata": {"company": "Newco"}}, "NEWCO.NS", prices, price_json=own)
+    assert (block["company"], block["listed"], block["size"]) == ("Newco", False, 5)
+    assert block["metrics"]["pe"]["value"] is None and block["metrics"]["pe"]["median"] == 25.0
+    assert block["metrics"]["return_1m"]["percentile"] == 100.0
+    assert block["metrics"]["return_1m"]["value"] == pytest.approx((1.02 ** 20 - 1) * 100, abs=0.01)
+
+
+def test_no_peer_table_gives_no_block():
+    assert peer_block({"metadata": {}}, "TCS.NS", prices) is None
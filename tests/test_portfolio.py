@@ -0,0 +1,155 @@
+# tests/test_portfolio.py
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.archive
+import src.backtest
+from src.portfolio import fetch_peaks, load_holdings, summarize, triage
+
+DATES = np.arange("2024-01-01", "2024-01-11", dtype="datetime64[D]")
+
+
+def holdings(*rows):
+    """Holdings frame from (ticker, qty, avg_price[, stop]) tuples."""
+    frame = pd.DataFrame([(r + (np.nan,))[:4] for r in rows], columns=["ticker", "qty", "avg_price", "stop"])
+    frame["screener_name"] = frame["ticker"].str.split(".").str[0]
+    frame["buy_date"] = pd.NaT
+    return frame
+
+
+def fired(positions, ticker):
+    return positions.set_index("ticker").loc[ticker, "triggers"]
+
+
+def test_triage_triggers():
+    book = holdings(
+        ("LOSS.NS", 10, 100.0, 80.0),
+        ("GAIN.NS", 10, 100.0),
+        ("DRAW.NS", 10, 100.0),
+        ("STOP.NS", 10, 100.0, 99.0),
+        ("BIG.NS", 1000, 100.0),
+        ("NONE.NS", 10, 100.0),
+    )
+    closes = {
+        "LOSS.NS": [95.0, 90.0, 89.0],          # -11% P&L, 6.3% off its peak
+        "GAIN.NS": [120.0, 131.0],
+        "DRAW.NS": [130.0, 125.0, 112.0],       # +12% P&L but -13.8% from the peak
+        "STOP.NS": [101.0, 101.5],               # 2.5% above the explicit stop
+        "BIG.NS": [100.0, 100.0],
+        "NONE.NS": ValueError("No price history found for NONE.NS"),
+    }
+    positions = triage(book, closes)
+    assert fired(positions, "LOSS.NS") == ["loss"]
+    assert fired(positions, "GAIN.NS") == ["gain"]
+    assert fired(positions, "DRAW.NS") == ["drawdown"]
+    assert fired(positions, "STOP.NS") == ["near_stop"]
+    assert fired(positions, "BIG.NS") == ["concentration"]
+    assert fired(positions, "NONE.NS") == ["no_price"]
+    assert positions["flagged"].all()
+
+    row = positions.set_index("ticker").loc["DRAW.NS"]
+    assert row["peak"] == 130.0
+    assert row["drawdown_pct"] == pytest.approx((112 / 130 - 1) * 100)
+    assert row["pnl"] == pytest.approx(120.0)
+    assert positions.set_index("ticker").loc["NONE.NS", "error"] == "No price history found for NONE.NS"
+
+
+def test_triage_thresholds_implied_stop_and_quiet_positions():
+    book = holdings(*[(f"{c}.NS", 10, 100.0) for c in "ABCDE"])
+    closes = {t: [100.0, 95.0] for t in book["ticker"]}
+    positions = triage(book, closes)
+    assert not positions["flagged"].any()
+    assert positions["stop"].tolist() == pytest.approx([92.0] * 5)  # DEFAULT_STOP_PCT below avg_price
+    assert positions["weight_pct"].tolist() == pytest.approx([20.0] * 5)
+
+    tight = triage(book, closes, triggers={"loss_pct": 5, "max_weight_pct": 15}, stop_pct=4)
+    assert fired(tight, "A.NS") == ["loss", "near_stop", "concentration"]
+    assert tight["stop"].tolist() == pytest.approx([96.0] * 5)
+
+
+def test_triage_right_aligns_uneven_histories_and_uses_history_peaks():
+    book = holdings(("NEW.NS", 1, 100.0), ("OLD.NS", 1, 100.0))
+    closes = {"NEW.NS": [104.0], "OLD.NS": [90.0, 100.0, 102.0, 103.0]}
+    positions = triage(book, closes, triggers={"max_weight_pct": 100},
+                       peaks={"NEW.NS": 130.0, "OLD.NS": ValueError("no bars")})
+    assert positions["last"].tolist() == [104.0, 103.0]
+    assert positions["peak"].tolist() == [130.0, 103.0]  # failed peak falls back to the recent closes
+    assert fired(positions, "NEW.NS") == ["drawdown"]
+    assert summarize(positions) == {"positions": 2, "priced": 2, "flagged": 1, "value": 207.0, "cost": 200.0,
+                                    "pnl": 7.0, "pnl_pct": 3.5}
+
+
+def test_load_holdings_aliases_and_suffixes(tmp_path):
+    path = tmp_path / "holdings.csv"
+    path.write_text("Symbol, Quantity, Buy Price, Stop Loss, Bought On\n"
+                    "irfc,1200,135.5,,2024-01-10\n"
+                    "500325,5,2400,2200,\n")
+    frame = load_holdings(str(path))
+    assert frame.columns.tolist() == ["ticker", "screener_name", "qty", "avg_price", "stop", "buy_date"]
+    assert frame["ticker"].tolist() == ["IRFC.NS", "500325.BO"]
+    assert frame["screener_name"].tolist() == ["IRFC", "500325"]
+    assert frame.loc[1, "stop"] == 2200.0 and np.isnan(frame.loc[0, "stop"])
+    assert frame.loc[0, "buy_date"] == pd.Timestamp("2024-01-10") and pd.isna(frame.loc[1, "buy_date"])
+
+
+def test_load_holdings_merges_lots_at_weighted_average(tmp_path):
+    path = tmp_path / "holdings.json"
+    path.write_text(json.dumps([
+        {"ticker": "TCS", "qty": 10, "avg_price": 3000, "stop": 2800, "buy_date": "2024-05-01"},
+        {"ticker": "TCS.NS", "qty": 30, "avg_price": 3400, "stop": 3100, "buy_date": "2024-02-15", "name": "TCS"},
+        {"ticker": "INFY", "qty": 5, "avg_price": 1500},
+    ]))
+    frame = load_holdings(str(path)).set_index("ticker")
+    assert frame.index.tolist() == ["TCS.NS", "INFY.NS"]
+    assert frame.loc["TCS.NS", "qty"] == 40
+    assert frame.loc["TCS.NS", "avg_price"] == pytest.approx((10 * 3000 + 30 * 3400) / 40)
+    assert frame.loc["TCS.NS", "stop"] == 3100.0
+    assert frame.loc["TCS.NS", "buy_date"] == pd.Timestamp("2024-02-15")
+
+
+@pytest.mark.parametrize("body, message", [
+    ("ticker,qty\nTCS,1\n", "missing column"),
+    ("ticker,qty,avg_price\nTCS,0,100\nINFY,2,x\n", "TCS.NS, INFY.NS"),
+])
+def test_load_holdings_rejects_bad_files(tmp_path, body, message):
+    path = tmp_path / "holdings.csv"
+    path.write_text(body)
+    with pytest.raises(ValueError, match=message):
+        load_holdings(str(path))
+
+
+class Archive:
+    def __init__(self, bars):
+        self._bars = bars
+        self.index = set(bars)
+
+    def bars(self, ticker):
+        return self._bars[ticker]
+
+
+def test_fetch_peaks_from_buy_date(monkeypatch):
+    close = np.array([150.0, 140, 120, 110, 118, 125, 119, 117, 116, 115])
+    monkeypatch.setattr(src.archive, "open_archive", lambda: Archive({"IRFC.NS": {"date": DATES, "close": close}}))
+
+    def fetch_ohlcv(ticker, period):
+        if ticker != "TCS.NS":
+            raise ValueError(f"no data for {ticker}")
+        return {"date": [str(d) for d in DATES], "close": (close * 10).tolist()}
+
+    monkeypatch.setattr(src.backtest, "fetch_ohlcv", fetch_ohlcv)
+
+    book = holdings(("IRFC.NS", 1, 100.0), ("TCS.NS", 1, 1000.0), ("TCS.NS", 1, 1000.0), ("GONE.NS", 1, 1.0))
+    book["buy_date"] = pd.to_datetime(["2024-01-04", "2024-01-08", "2024-01-03", "2024-01-01"])
+    peaks = fetch_peaks(book)
+    assert peaks["IRFC.NS"] == 125.0        # archive bars since Jan 4, not the 150 before the purchase
+    assert peaks["TCS.NS"] == 1250.0        # OHLCV bars since the earliest lot (Jan 3)
+    assert isinstance(peaks["GONE.NS"], ValueError)
+
+    book["buy_date"] = pd.NaT
+    assert fetch_peaks(book)["IRFC.NS"] == 150.0
+
+    book["buy_date"] = pd.Timestamp("2024-02-01")
+    assert "No closes for IRFC.NS since 2024-02-01" in str(fetch_peaks(book)["IRFC.NS"])
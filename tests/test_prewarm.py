@@ -0,0 +1,110 @@
+# tests/test_prewarm.py
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.config import Config
+from src.prewarm import MARKET_TZ, load_results_calendar, load_watchlists, next_market_open, next_scheduled_run, \
+    results_due
+
+
+def at(text: str) -> datetime:
+    return datetime.fromisoformat(text).replace(tzinfo=MARKET_TZ)
+
+
+def ran(*started):
+    return {"runs": [{"reason": "schedule", "started_at": at(s).isoformat()} for s in started], "items": {}}
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    monkeypatch.setattr(Config, "MARKET_OPEN", "09:15")
+    monkeypatch.setattr(Config, "MARKET_CLOSE", "15:30")
+    monkeypatch.setattr(Config, "PREWARM_AT", "16:15")
+    monkeypatch.setattr(Config, "PREWARM_RESULTS_DELAY_MIN", 60)
+
+
+# 2024-06-14 is a Friday
+@pytest.mark.parametrize("now, state, expected", [
+    ("2024-06-13 10:00", ran(), "2024-06-13 16:15"),                      # before today's slot
+    ("2024-06-13 18:00", ran(), "2024-06-13 18:00"),                      # never ran → catch up now
+    ("2024-06-13 18:00", ran("2024-06-12 16:15"), "2024-06-13 18:00"),    # missed today's slot
+    ("2024-06-13 18:00", ran("2024-06-13 16:15"), "2024-06-14 16:15"),    # already ran today
+    ("2024-06-14 17:00", ran("2024-06-14 16:16"), "2024-06-17 16:15"),    # Friday done → Monday
+    ("2024-06-15 17:00", ran("2024-06-14 16:16"), "2024-06-17 16:15"),    # Saturday: no catch-up
+    ("2024-06-16 09:00", ran(), "2024-06-17 16:15"),                      # Sunday morning
+])
+def test_next_scheduled_run(now, state, expected):
+    assert next_scheduled_run(state, at(now)) == at(expected)
+
+
+def test_next_scheduled_run_ignores_manual_and_results_runs():
+    state = {"runs": [{"reason": "manual", "started_at": at("2024-06-13 16:20").isoformat()},
+                      {"reason": "results", "started_at": at("2024-06-13 17:00").isoformat()}]}
+    assert next_scheduled_run(state, at("2024-06-13 18:00")) == at("2024-06-13 18:00")
+
+
+@pytest.mark.parametrize("now, expected", [
+    ("2024-06-13 08:00", "2024-06-13 09:15"),
+    ("2024-06-13 09:15", "2024-06-14 09:15"),
+    ("2024-06-14 16:00", "2024-06-17 09:15"),
+])
+def test_next_market_open(now, expected):
+    assert next_market_open(at(now)) == at(expected)
+
+
+def test_results_due():
+    entries = [{"name": n} for n in ("TCS", "Infosys", "Wipro", "HDFC Bank", "SBIN")]
+    calendar = {
+        "tcs": at("2024-07-11 15:30"),       # scraped before the results → due
+        "infosys": at("2024-07-11 15:30"),   # scraped after results + delay → done
+        "wipro": at("2024-07-11 15:30"),     # never scraped → due
+        "hdfc bank": at("2024-07-11 17:30"),  # released, but the delay has not passed yet
+    }
+    state = {"items": {
+        "tcs": {"scraped_at": at("2024-07-11 10:00").isoformat()},
+        "infosys": {"scraped_at": at("2024-07-11 16:45").isoformat()},
+        "wipro": {"status": "error"},
+    }}
+    assert results_due(entries, calendar, state, at("2024-07-11 18:00")) == ["TCS", "Wipro"]
+    assert results_due(entries, calendar, state, at("2024-07-11 16:00")) == []  # nothing past the delay yet
+    assert results_due(entries, calendar, state, at("2024-07-11 18:30")) == ["TCS", "Wipro", "HDFC Bank"]
+
+
+def test_results_due_scrape_inside_the_delay_still_counts_as_stale():
+    calendar = {"tcs": at("2024-07-11 15:30")}
+    state = {"items": {"tcs": {"scraped_at": (at("2024-07-11 15:30") + timedelta(minutes=30)).isoformat()}}}
+    assert results_due([{"name": "TCS"}], calendar, state, at("2024-07-11 18:00")) == ["TCS"]
+
+
+def test_load_watchlists_headers_pairs_and_dedupe(tmp_path):
+    (tmp_path / "banks.csv").write_text("Name, Ticker\nHDFC Bank, hdfcbank\n# comment\n\nSBIN\n")
+    (tmp_path / "it.txt").write_text("TCS,tcs.ns\nInfosys\nhdfc bank,HDFCBANK.BO\n")
+    (tmp_path / "extra.json").write_text(json.dumps(["Wipro", {"screener_name": "ITC", "yfinance_ticker": "itc"}]))
+    entries = load_watchlists([str(tmp_path / f) for f in ("it.txt", "banks.csv", "extra.json")])
+    assert entries == [
+        {"name": "HDFC Bank", "ticker": "HDFCBANK", "watchlist": "banks"},  # files are read in sorted order
+        {"name": "SBIN", "ticker": None, "watchlist": "banks"},
+        {"name": "Wipro", "ticker": None, "watchlist": "extra"},
+        {"name": "ITC", "ticker": "ITC", "watchlist": "extra"},
+        {"name": "TCS", "ticker": "TCS.NS", "watchlist": "it"},
+        {"name": "Infosys", "ticker": None, "watchlist": "it"},
+    ]
+
+
+def test_load_watchlists_default_dir_skips_the_results_calendar(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "WATCHLIST_DIR", str(tmp_path))
+    (tmp_path / "core.txt").write_text("stock\nTCS\n")
+    (tmp_path / "results_calendar.csv").write_text("name,date\nTCS,2024-07-11\n")
+    assert [e["name"] for e in load_watchlists()] == ["TCS"]
+
+
+def test_load_results_calendar_keeps_the_latest_release(tmp_path):
+    path = tmp_path / "results_calendar.csv"
+    path.write_text("name, date\nTCS, 2024-04-12\nTCS, 2024-07-11 19:05\nInfosys, 2024-07-18\nWipro, soon\n")
+    assert load_results_calendar(str(path)) == {
+        "tcs": at("2024-07-11 19:05"),
+        "infosys": at("2024-07-18 15:30"),  # date only → the close
+    }
+    assert load_results_calendar(str(tmp_path / "missing.csv")) == {}
@@ -0,0 +1,117 @@
+# tests/test_resilience.py
+import time
+
+import pytest
+
+from src import resilience
+from src.resilience import CircuitBreaker, CircuitOpen, DeadlineExceeded
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    fresh = CircuitBreaker("yahoo", failures=2, reset_s=0.2)
+    monkeypatch.setitem(resilience.BREAKERS, "yahoo", fresh)
+    return fresh
+
+
+def boom():
+    raise ConnectionError("down")
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast(breaker):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        boom()
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            resilience.call("yahoo", flaky)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen, match="yahoo unavailable"):
+        resilience.call("yahoo", flaky)
+    assert len(calls) == 2
+
+
+def test_success_resets_the_failure_count(breaker):
+    with pytest.raises(ConnectionError):
+        resilience.call("yahoo", boom)
+    assert resilience.call("yahoo", lambda: "ok") == "ok"
+    with pytest.raises(ConnectionError):
+        resilience.call("yahoo", boom)
+    assert breaker.state == "closed"
+
+
+def test_value_errors_do_not_count(breaker):
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            resilience.call("yahoo", lambda: int("not a number"))
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_half_open_probe_closes_or_reopens(breaker):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            resilience.call("yahoo", boom)
+    time.sleep(0.25)
+    assert breaker.state == "half-open"
+    with pytest.raises(ConnectionError):
+        resilience.call("yahoo", boom)  # failed probe
+    assert breaker.state == "open"
+    time.sleep(0.25)
+    assert resilience.call("yahoo", lambda: "probe ok") == "probe ok"
+    assert breaker.state == "closed"
+
+
+def test_only_one_probe_at_a_time(breaker):
+    breaker.failure(ConnectionError("down"))
+    breaker.failure(ConnectionError("down"))
+    time.sleep(0.25)
+    breaker.before()  # this caller is the probe
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+    breaker.release()
+    breaker.before()
+
+
+def test_deadline_cuts_a_hanging_call_and_counts_as_failure(breaker):
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        with resilience.deadline(0.05):
+            resilience.call("yahoo", time.sleep, 1)
+    assert time.perf_counter() - started < 0.5
+    assert breaker.failures == 1
+
+
+def test_spent_deadline_fails_before_calling(breaker):
+    with resilience.deadline(-1):
+        with pytest.raises(DeadlineExceeded, match="before yahoo"):
+            resilience.call("yahoo", lambda: pytest.fail("should not be called"))
+
+
+def test_nested_deadlines_keep_the_earlier_one():
+    with resilience.deadline(10):
+        with resilience.deadline(60):
+            assert resilience.remaining() <= 10
+        assert resilience.budget(30) <= 10
+    assert resilience.remaining() is None and resilience.budget(30) == 30
+
+
+class FakeCache:
+    def __init__(self, value, age_s):
+        self.value, self.age_s = value, age_s
+
+    def get_stale(self, key):
+        return self.value, self.age_s
+
+
+def test_stale_fallback_serves_old_values_for_outages_only():
+    value, marker = resilience.stale_fallback(FakeCache({"p": 1}, 7200), "TCS", ConnectionError("down"), "price")
+    assert value == {"p": 1} and marker == {"stage": "price", "age_s": 7200, "reason": "down"}
+    with pytest.raises(ValueError):
+        resilience.stale_fallback(FakeCache({"p": 1}, 10), "TCS", ValueError("bad ticker"), "price")
+    with pytest.raises(ConnectionError):
+        resilience.stale_fallback(FakeCache({"p": 1}, 10 ** 9), "TCS", ConnectionError("down"), "price")
+    with pytest.raises(ConnectionError):
+        resilience.stale_fallback(FakeCache(None, 0), "TCS", ConnectionError("down"), "price")
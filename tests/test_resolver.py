@@ -0,0 +1,102 @@
+# tests/test_resolver.py
+import functools
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import src.tools as tools
+from src import resilience
+
+KNOWN = {"tcs": ("TCS", "TCS"), "infosys": ("INFOSYS", "INFY.NS"), "ircon": ("IRCON INTERNATIONAL", "IRCON"),
+         "bse 500325": ("RELIANCE", "500325")}
+
+
+class ResolverModel:
+    """Answers the numbered inputs of a resolver prompt from KNOWN; ``drop`` names are left out."""
+
+    def __init__(self, drop=(), fail=None):
+        self.drop = set(drop)
+        self.fail = fail
+        self.batches = []
+
+    def invoke(self, messages):
+        inputs = [json.loads(m) for m in re.findall(r"^\d+\. (\".*\")$", messages[-1].content, re.M)]
+        self.batches.append(inputs)
+        if self.fail:
+            raise self.fail
+        answer = [{"id": i, "screener_name": KNOWN[text.lower()][0], "yfinance_ticker": KNOWN[text.lower()][1]}
+                  for i, text in enumerate(inputs, 1) if text.lower() in KNOWN and text.lower() not in self.drop]
+        self.drop.clear()  # a retry gets a full answer
+        return SimpleNamespace(content=f"```json\n{json.dumps(answer)}\n```")
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.setattr(tools, "_symbol_index", functools.partial(tools._symbol_index, str(tmp_path / "none.csv")))
+    monkeypatch.setitem(resilience.BREAKERS, "gemini", resilience.CircuitBreaker("gemini", failures=3, reset_s=60))
+
+
+def install(monkeypatch, model):
+    monkeypatch.setattr(tools, "resolver_model", model)
+    return model
+
+
+def test_batches_in_input_order_with_suffixes(monkeypatch):
+    model = install(monkeypatch, ResolverModel())
+    results = tools.resolve_stock_identities(["Infosys", "ircon", "TCS", "BSE 500325"], batch_size=3)
+    assert [r["yfinance_ticker"] for r in results] == ["INFY.NS", "IRCON.NS", "TCS.NS", "500325.BO"]
+    assert model.batches == [["Infosys", "ircon", "TCS"], ["BSE 500325"]]
+
+
+def test_duplicates_and_blank_inputs(monkeypatch):
+    model = install(monkeypatch, ResolverModel())
+    results = tools.resolve_stock_identities(["TCS", "  tcs ", ""])
+    assert results[0] == results[1] == {"screener_name": "TCS", "yfinance_ticker": "TCS.NS"}
+    assert isinstance(results[2], ValueError)
+    assert [len(batch) for batch in model.batches] == [1]  # one LLM entry for both spellings
+
+
+def test_only_missing_answers_are_re_asked(monkeypatch):
+    model = install(monkeypatch, ResolverModel(drop={"ircon"}))
+    results = tools.resolve_stock_identities(["Infosys", "IRCON"], retries=1)
+    assert [r["yfinance_ticker"] for r in results] == ["INFY.NS", "IRCON.NS"]
+    assert model.batches == [["Infosys", "IRCON"], ["IRCON"]]
+
+
+def test_unknown_names_fail_after_the_retries(monkeypatch):
+    model = install(monkeypatch, ResolverModel())
+    results = tools.resolve_stock_identities(["TCS", "No Such Co"], retries=2)
+    assert results[0]["yfinance_ticker"] == "TCS.NS"
+    assert isinstance(results[1], ValueError) and "missing" in str(results[1])
+    assert model.batches == [["TCS", "No Such Co"], ["No Such Co"], ["No Such Co"]]
+
+
+def test_open_breaker_is_not_retried(monkeypatch):
+    model = install(monkeypatch, ResolverModel(fail=resilience.CircuitOpen("gemini", 30)))
+    results = tools.resolve_stock_identities(["TCS", "Infosys"], retries=3)
+    assert all(isinstance(r, resilience.CircuitOpen) for r in results)
+    assert len(model.batches) == 1
+
+
+def test_invalid_json_fails_the_whole_batch(monkeypatch):
+    install(monkeypatch, SimpleNamespace(invoke=lambda messages: SimpleNamespace(content="sorry, no idea")))
+    results = tools.resolve_stock_identities(["TCS", "Infosys"], retries=0)
+    assert all(isinstance(r, ValueError) and "invalid JSON" in str(r) for r in results)
+
+
+def test_symbol_list_answers_without_the_model(monkeypatch, tmp_path):
+    csv = tmp_path / "EQUITY_L.csv"
+    csv.write_text("SYMBOL,NAME OF COMPANY\nHDFCBANK,HDFC Bank Limited\n")
+    monkeypatch.setattr(tools, "_symbol_index", functools.partial(tools._symbol_index.func, str(csv)))
+    model = install(monkeypatch, ResolverModel())
+    results = tools.resolve_stock_identities(["hdfcbank", "HDFC Bank Ltd.", "TCS"])
+    assert results[0] == results[1] == {"screener_name": "HDFCBANK", "yfinance_ticker": "HDFCBANK.NS"}
+    assert model.batches == [["TCS"]]
+
+
+def test_missing_model_is_an_environment_error(monkeypatch):
+    install(monkeypatch, None)
+    [result] = tools.resolve_stock_identities(["TCS"])
+    assert isinstance(result, EnvironmentError)
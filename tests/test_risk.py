@@ -0,0 +1,79 @@
+# tests/test_risk.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.risk import METHODS, historical_returns, risk_report, simulate, tail_risk
+
+Z = {0.95: -1.6448536269514722, 0.99: -2.3263478740408408}  # standard normal lower quantiles
+
+
+def frame(log_returns: np.ndarray, prefix: str = "S") -> pd.DataFrame:
+    log_returns = np.atleast_2d(log_returns.T).T
+    return pd.DataFrame(log_returns, index=pd.bdate_range(end="2024-11-29", periods=len(log_returns)),
+                        columns=[f"{prefix}{j}.NS" for j in range(log_returns.shape[1])])
+
+
+def correlated(days: int = 400, assets: int = 3, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    market = rng.standard_normal((days, 1)) * 0.01
+    return 0.0004 + 0.7 * market + rng.standard_normal((days, assets)) * 0.012
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_simulate_is_reproducible_for_a_seed(method):
+    log_returns = correlated()
+    first = simulate(log_returns, 10, paths=3000, method=method, seed=11)
+    assert first.shape == (3000, 3)
+    assert np.array_equal(first, simulate(log_returns, 10, paths=3000, method=method, seed=11))
+    assert not np.array_equal(first, simulate(log_returns, 10, paths=3000, method=method, seed=12))
+
+
+def test_simulate_rejects_unknown_method():
+    with pytest.raises(ValueError, match="bootstrap"):
+        simulate(correlated(), 1, paths=10, method="garch")
+
+
+def test_historical_var_matches_direct_quantile():
+    # One-day losses of exactly 0.0%, 0.1%, ..., 19.9% in shuffled order
+    losses = np.random.default_rng(3).permutation(np.arange(200) / 1000)
+    log_returns = np.log1p(-losses)[:, None]
+    assert np.allclose(-historical_returns(log_returns, 1)[:, 0], losses)
+
+    figures = risk_report(frame(log_returns), paths=1000)["assets"]["S0.NS"]["1d"]["historical"]
+    for confidence in (0.95, 0.99):
+        tag = f"{confidence * 100:.0f}"
+        var = np.quantile(losses, confidence, method="higher")
+        assert figures[f"var_{tag}"] == pytest.approx(var * 100)
+        assert figures[f"cvar_{tag}"] == pytest.approx(losses[losses >= var].mean() * 100, abs=0.01)
+
+
+def test_historical_returns_compound_overlapping_windows():
+    log_returns = np.log(np.array([[1.1], [0.9], [1.2], [1.0]]))
+    assert historical_returns(log_returns, 2)[:, 0] == pytest.approx([0.99 - 1, 1.08 - 1, 1.2 - 1])
+
+
+@pytest.mark.parametrize("horizon", [1, 10])
+def test_normal_var_close_to_analytic(horizon):
+    log_returns = np.random.default_rng(5).normal(0.0005, 0.015, (500, 1))
+    mean, std = log_returns.mean(), log_returns.std(ddof=1)
+    simulated = simulate(log_returns, horizon, paths=200_000, method="normal", seed=1)
+    var, cvar = tail_risk(np.sort(-simulated, axis=0), 0.99)
+    assert var[0] == pytest.approx(-np.expm1(horizon * mean + np.sqrt(horizon) * std * Z[0.99]), rel=0.02)
+    assert cvar[0] > var[0]
+
+
+def test_portfolio_cvar_shares_sum_to_100():
+    weights = {"S0.NS": 0.5, "S1.NS": 0.3, "S2.NS": 0.2, "MISSING.NS": 1.0}
+    report = risk_report(frame(correlated()), weights=weights, value=1e6, paths=5000)
+    assert sum(report["portfolio"]["weights"].values()) == pytest.approx(1.0, abs=1e-3)
+    for key in ("1d", "10d"):
+        shares = [asset["cvar_99_share_pct"][key] for asset in report["assets"].values()]
+        assert sum(shares) == pytest.approx(100.0, abs=0.2)
+        block = report["portfolio"][key]["monte_carlo"]
+        assert block["cvar_99_inr"] == pytest.approx(block["cvar_99"] / 100 * 1e6, abs=100)
+
+
+def test_risk_report_needs_more_than_the_longest_horizon():
+    with pytest.raises(ValueError, match="Not enough"):
+        risk_report(frame(correlated(days=10)))
@@ -0,0 +1,103 @@
+# tests/test_scoring.py
+import numpy as np
+import pytest
+
+from src.backtest import parse_levels
+from src.scoring import ANCHORS, extract_metrics, render_verdict, score_metrics, score_stock
+
+QUARTERS = ["Jun 2023", "Sep 2023", "Dec 2023", "Mar 2024", "Jun 2024"]
+YEARS = ["Mar 2021", "Mar 2022", "Mar 2023", "Mar 2024"]
+
+
+def company(sales_growth: float = 0.25, profit: float = 30.0, borrowings: float = 20.0):
+    """Synthetic extract_all result: quarterly sales up ``sales_growth`` YoY, FY sales doubling over 3 years."""
+    return {
+        "quarters": {
+            "Sales": dict(zip(QUARTERS, [100, 104, 108, 112, 100 * (1 + sales_growth)])),
+            "Net Profit": dict(zip(QUARTERS, [10, 10, 11, 12, profit / 2])),
+            "OPM %": dict(zip(QUARTERS, [0.2] * 5)),
+        },
+        "profit_loss": {
+            "Sales": dict(zip(YEARS, [200, 260, 330, 400])),
+            "Net Profit": dict(zip(YEARS, [20, 25, 30, profit])),
+            "Operating Profit": dict(zip(YEARS, [40, 50, 60, 80])),
+            "Interest": dict(zip(YEARS, [5, 5, 5, 8])),
+        },
+        "balance_sheet": {
+            "Equity Capital": dict(zip(YEARS, [10, 10, 10, 10])),
+            "Reserves": dict(zip(YEARS, [100, 120, 140, 190])),
+            "Borrowings": dict(zip(YEARS, [40, 30, 25, borrowings])),
+        },
+        "shareholding": {"quarterly": {"Pledged": {"Jun 2024": 0.0}}},
+    }
+
+
+def rising_prices(days: int = 22, start: float = 100.0, step: float = 0.01):
+    return {"price": [start * (1 + step) ** i for i in range(days)]}
+
+
+def test_extract_metrics_from_tables_and_prices():
+    metrics = extract_metrics(company(), rising_prices())
+    assert metrics["sales_yoy"] == pytest.approx(0.25)
+    assert metrics["profit_yoy"] == pytest.approx(0.5)
+    assert metrics["sales_cagr_3y"] == pytest.approx(2 ** (1 / 3) - 1)
+    assert metrics["opm"] == pytest.approx(0.2)
+    assert metrics["roe"] == pytest.approx(30 / 200)
+    assert metrics["debt_equity"] == pytest.approx(0.1)
+    assert metrics["interest_coverage"] == pytest.approx(10.0)
+    assert metrics["loss_quarters"] == 0.0
+    assert metrics["return_30d"] == pytest.approx(1.01 ** 21 - 1)
+    assert metrics["volatility_annual"] == pytest.approx(0.0, abs=1e-9)
+
+
+def test_extract_metrics_opm_in_percent_is_rescaled():
+    data = company()
+    data["quarters"]["OPM %"] = dict(zip(QUARTERS, [18] * 5))
+    assert extract_metrics(data)["opm"] == pytest.approx(0.18)
+
+
+def test_extract_metrics_without_data_is_nan():
+    metrics = extract_metrics({}, None)
+    assert all(np.isnan(v) for v in metrics.values())
+
+
+def test_score_metrics_maps_anchors_and_clips():
+    bad, good = ANCHORS["debt_equity"]
+    scores = score_metrics({"debt_equity": bad, "opm": 10.0, "roe": -5.0})
+    assert scores["debt_equity"] == pytest.approx(-1.0)
+    assert score_metrics({"debt_equity": good})["debt_equity"] == pytest.approx(1.0)
+    assert score_metrics({"debt_equity": (bad + good) / 2})["debt_equity"] == pytest.approx(0.0)
+    assert scores["opm"] == 1.0 and scores["roe"] == -1.0
+    assert np.isnan(scores["pledge"])
+
+
+def test_score_stock_strong_company_is_confident_buy():
+    card = score_stock(company(), rising_prices())
+    assert card["verdict"] in {"BUY", "STRONG BUY"}
+    assert card["coverage"] == 1.0
+    assert card["confidence"] >= 0.8
+
+
+def test_score_stock_weak_company_scores_negative():
+    data = company(sales_growth=-0.3, profit=-40, borrowings=500)
+    data["quarters"]["OPM %"] = dict(zip(QUARTERS, [0.02] * 5))
+    data["profit_loss"]["Sales"] = dict(zip(YEARS, [400, 380, 360, 300]))
+    data["profit_loss"]["Interest"] = dict(zip(YEARS, [5, 5, 5, 80]))
+    card = score_stock(data, rising_prices(step=-0.03))
+    assert card["composite"] < -0.15
+    assert card["verdict"] in {"AVOID", "STRONG SELL"}
+    assert card["metrics"]["loss_quarters"] == 0.25
+
+
+def test_thin_data_never_clears_the_threshold():
+    card = score_stock({}, rising_prices())  # momentum + volatility only
+    assert card["coverage"] < 0.5
+    assert card["confidence"] <= 0.5
+
+
+def test_render_verdict_is_readable_by_the_level_parser():
+    card = score_stock(company(), rising_prices())
+    text = render_verdict(card, current_price=123.0)
+    assert parse_levels(text)["verdict"] == card["verdict"]
+    holding = render_verdict(card, current_price=80.0, owns_stock=True, buy_price=100.0)
+    assert "**PORTFOLIO DECISION**" in holding and "-20.0%" in holding
@@ -0,0 +1,111 @@
+# tests/test_screening.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.screening import METRIC_COLUMNS, ScreenQueryError, company_metrics, compile_query, run_screen, table_from_rows
+
+NAN = float("nan")
+
+
+def table(**columns):
+    """Screening table with the given metric columns (others NaN), one company per value."""
+    n = len(next(iter(columns.values())))
+    frame = pd.DataFrame({c: np.full(n, np.nan) for c in METRIC_COLUMNS})
+    for name, values in columns.items():
+        frame[name] = np.asarray(values, dtype="float64")
+    frame.insert(0, "company", [f"CO{i}" for i in range(n)])
+    return frame
+
+
+def mask(query, frame):
+    return compile_query(query).mask(frame).tolist()
+
+
+def test_aliases_commas_and_percent_signs():
+    frame = table(roce=[25, 25, 10], debt_equity=[0.2, 0.9, 0.1])
+    assert mask("ROCE > 20%, debt/equity < 0.5", frame) == [True, False, False]
+    assert mask("roce > 20 and d/e < 0.5", frame) == [True, False, False]
+
+
+def test_precedence_and_groups():
+    frame = table(roce=[25, 5, 5], opm=[0, 20, 0], sales_cagr_3y=[0, 0, 20])
+    assert mask("roce > 20 or opm > 10 and sales_cagr_3y > 10", frame) == [True, False, False]
+    assert mask("(roce > 20 or opm > 10) and sales_cagr_3y < 10", frame) == [True, True, False]
+
+
+def test_arithmetic_between_metrics():
+    frame = table(net_profit=[20, 5], sales=[100, 100], roce=[30, 10], roe=[10, 10])
+    assert mask("net_profit / sales > 0.1", frame) == [True, False]
+    assert mask("(roce - roe) > 5", frame) == [True, False]
+    assert mask("-roe < 0", frame) == [True, True]
+
+
+def test_trend_phrases_and_number_words():
+    frame = table(promoter_holding_up_qtrs=[3, 1, 0], sales_down_qtrs=[0, 3, 2])
+    assert mask("promoter holding up two quarters", frame) == [True, False, False]
+    assert mask("promoter holding rising", frame) == [True, True, False]
+    assert mask("sales down 3 qtrs", frame) == [False, True, False]
+
+
+def test_missing_values_match_neither_a_comparison_nor_its_negation():
+    frame = table(pledge=[10, 0, NAN])
+    assert mask("pledge > 5", frame) == [True, False, False]
+    assert mask("not pledge > 5", frame) == [False, True, False]
+    assert mask("not not pledge > 5", frame) == [True, False, False]
+    assert mask("pledge != 5", frame) == [True, True, False]
+
+
+def test_missing_values_follow_three_valued_logic():
+    frame = table(roce=[NAN, NAN, 25], pledge=[10, 0, NAN])
+    # NaN or True → True; NaN and False → False, so its negation is True
+    assert mask("roce > 20 or pledge > 5", frame) == [True, False, True]
+    assert mask("not (roce > 20 and pledge > 5)", frame) == [False, True, False]
+    assert mask("not (roce > 20 or pledge > 5)", frame) == [False, False, False]
+
+
+@pytest.mark.parametrize("query, message", [
+    ("roce >", "Expected a metric"),
+    ("roce 20", "Expected a comparison"),
+    ("roce > 20 )", "Unexpected"),
+    ("rocee > 20", "Unknown metric 'rocee'"),
+    ("roce > 20 $", "Unexpected input"),
+    ("   ", "Empty screen query"),
+])
+def test_bad_queries_raise(query, message):
+    with pytest.raises(ScreenQueryError, match=message):
+        compile_query(query)
+
+
+def test_compiled_screen_records_used_columns():
+    assert compile_query("roce > 20, debt/equity < roce / 10").columns == ["roce", "debt_equity"]
+
+
+def test_run_screen_sorts_with_nan_last_and_limits():
+    frame = table(roce=[22, 30, 25, 40], opm=[NAN, 10, 20, 5])
+    hits = run_screen(frame, "roce > 20", sort="-opm", limit=3)
+    assert hits["company"].tolist() == ["CO2", "CO1", "CO3"]
+    with pytest.raises(ScreenQueryError, match="sort"):
+        run_screen(frame, "roce > 20", sort="nope")
+
+
+def test_table_from_rows_keeps_newest_scrape_per_company():
+    rows = [
+        {"company": "TCS", "scraped_at": "2024-01-01", "metrics": {c: 1.0 for c in METRIC_COLUMNS}},
+        {"company": "TCS", "scraped_at": "2024-06-01", "metrics": {c: 2.0 for c in METRIC_COLUMNS}},
+        {"company": "INFY", "scraped_at": "2024-03-01", "metrics": {c: 3.0 for c in METRIC_COLUMNS}},
+    ]
+    frame = table_from_rows(rows)
+    assert frame.index.tolist() == ["INFY", "TCS"]
+    assert frame.loc["TCS", "roce"] == 2.0
+
+
+@pytest.mark.parametrize("profits, expected", [
+    ([5, -2], 1.0),                      # only two quarters reported
+    ([4, -1, 3, -2, -6, 7], 2.0),        # last four of six
+    ([], NAN),
+])
+def test_company_metrics_counts_loss_quarters(profits, expected):
+    quarters = ["Mar 2023", "Jun 2023", "Sep 2023", "Dec 2023", "Mar 2024", "Jun 2024"][:len(profits)]
+    row = company_metrics({"quarters": {"Net Profit": dict(zip(quarters, profits))}})
+    assert row["loss_quarters"] == pytest.approx(expected, nan_ok=True)
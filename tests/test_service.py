@@ -0,0 +1,114 @@
+# tests/test_service.py
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import src.recommendation as recommendation
+import src.service as service
+from src import resilience
+from test_verdict import ENTRY, ScriptedModel
+
+
+def request(path, body, headers=()):
+    """Run one request through the ASGI app; returns (status, raw body bytes)."""
+    sent = []
+    incoming = [{"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}]
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": list(headers)}
+    asyncio.run(service.app(scope, receive, send))
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+def events(raw):
+    out = []
+    for block in raw.decode().strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        out.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return out
+
+
+@pytest.fixture
+def model(monkeypatch):
+    stored = []
+    monkeypatch.setattr(recommendation, "store_verdict", lambda verdict, *a, **k: stored.append(verdict))
+
+    def install(*replies):
+        llm = ScriptedModel(*replies)
+        llm.stored = stored
+        monkeypatch.setattr(recommendation, "get_recommendation_llm", lambda: llm)
+        return llm
+    return install
+
+
+PAYLOAD = {"screener_name": "TCS", "yfinance_ticker": "TCS.NS"}
+
+
+def test_sse_recommend_validates_repairs_and_stores(model):
+    llm = model(json.dumps({**ENTRY, "priority": "urgent"}), json.dumps({"priority": "High"}))
+    status, raw = request("/recommend", {"payload": PAYLOAD, "stream": True})
+    assert status == 200
+    stream = events(raw)
+    assert [name for name, _ in stream] == ["payload", "progress", "progress", "verdict", "chunk", "done"]
+    assert stream[2][1] == {"attempt": 1, "repair": ["priority"]}
+    assert stream[3][1]["verdict"]["priority"] == "High" and stream[3][1]["unverified"] is None
+    assert stream[-1][1]["recommendation"].startswith("**ENTRY DECISION** → BUY")
+    assert llm.stored == [stream[3][1]["verdict"]]
+
+
+def test_sse_recommend_flags_a_partial_verdict(model):
+    broken = json.dumps({**ENTRY, "priority": "urgent"})
+    llm = model(*[broken] * (recommendation.Config.VERDICT_REPAIR_ATTEMPTS + 1))
+    _, raw = request("/recommend", {"payload": PAYLOAD}, headers=[(b"accept", b"text/event-stream")])
+    done = events(raw)[-1]
+    assert done[0] == "done" and set(done[1]["unverified"]) == {"priority"}
+    assert "⚠️ UNVERIFIED FIELDS: priority" in done[1]["recommendation"]
+    assert llm.stored == []
+
+
+def test_sse_recommend_reports_model_errors(model, monkeypatch):
+    monkeypatch.setitem(resilience.BREAKERS, "gemini", resilience.CircuitBreaker("gemini"))
+    monkeypatch.setattr(recommendation, "get_recommendation_llm",
+                        lambda: SimpleNamespace(invoke=lambda messages: (_ for _ in ()).throw(RuntimeError("boom"))))
+    _, raw = request("/recommend", {"payload": PAYLOAD, "stream": True})
+    assert events(raw)[-1] == ("error", {"status": 502, "error": "boom"})
+
+
+@pytest.fixture
+def requests_counted(monkeypatch):
+    counted = []
+    real = service.incr
+
+    def incr(name, *args, **labels):
+        if name == "service_requests":
+            counted.append(labels["status"])
+        real(name, *args, **labels)
+    monkeypatch.setattr(service, "incr", incr)
+    return counted
+
+
+def test_unresolvable_query_is_a_client_error(monkeypatch, requests_counted):
+    def unknown(query):
+        raise ValueError(f"Could not resolve '{query}'")
+    monkeypatch.setattr(service, "resolve_stock_identity_local", unknown)
+    status, raw = request("/resolve", {"query": "no such company"})
+    assert status == 422 and json.loads(raw)["error"] == "Could not resolve 'no such company'"
+    assert requests_counted == ["422"]
+
+
+def test_sse_outcomes_are_counted(model, monkeypatch, requests_counted):
+    model(json.dumps({**ENTRY}))
+    request("/recommend", {"payload": PAYLOAD, "stream": True})
+    monkeypatch.setitem(resilience.BREAKERS, "gemini", resilience.CircuitBreaker("gemini"))
+    monkeypatch.setattr(recommendation, "get_recommendation_llm",
+                        lambda: SimpleNamespace(invoke=lambda messages: (_ for _ in ()).throw(RuntimeError("boom"))))
+    request("/recommend", {"payload": PAYLOAD, "stream": True})
+    assert requests_counted == ["200", "502"]
@@ -0,0 +1,89 @@
+# tests/test_snapshots.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.snapshots import (
+    annotate, changes_prompt_section, diff, fingerprint, is_material, load_snapshot, save_snapshot, snapshot_key,
+)
+
+BEFORE = {
+    "quarter": "Jun 2024", "quarter_values": {}, "annual": "Mar 2024", "holding_period": "Jun 2024",
+    "holding": {"Promoters": 86.36, "FIIs": 1.05}, "pros": ["Low debt"], "cons": [],
+    "last_close": 150.0, "price_date": "01-11-2024", "atr": 2.5,
+}
+
+
+def kinds(changes):
+    return [(c["kind"], c["material"]) for c in changes]
+
+
+def test_identical_fingerprints_have_no_changes():
+    assert diff(BEFORE, dict(BEFORE)) == []
+
+
+def test_small_moves_are_immaterial():
+    after = {**BEFORE, "holding": {"Promoters": 86.36, "FIIs": 1.3}, "last_close": 151.2}
+    changes = diff(BEFORE, after)
+    assert kinds(changes) == [("shareholding", False), ("price", False)]
+    assert not is_material(changes)
+    assert "0.5x ATR" in changes[1]["detail"]
+
+
+def test_new_results_and_large_moves_are_material():
+    after = {**BEFORE, "quarter": "Sep 2024", "quarter_values": {"Sales": 6900.0}, "annual": "Mar 2025",
+             "holding": {"Promoters": 84.0, "FIIs": 1.05}, "last_close": 140.0}
+    changes = diff(BEFORE, after)
+    assert kinds(changes) == [("new_quarter", True), ("new_annual", True), ("shareholding", True), ("price", True)]
+    assert "Jun 2024 → Sep 2024 (Sales 6,900.00)" in changes[0]["detail"]
+    assert "-2.36 pts" in changes[2]["detail"]
+
+
+def test_new_pros_are_material_but_dropped_ones_are_not():
+    assert kinds(diff(BEFORE, {**BEFORE, "cons": ["High pledge"]})) == [("analysis", True)]
+    assert kinds(diff(BEFORE, {**BEFORE, "pros": []})) == [("analysis", False)]
+
+
+def test_stale_verdict_and_changed_buy_price_force_a_refresh():
+    old = (datetime.now() - timedelta(days=45)).isoformat(timespec="seconds")
+    recent = datetime.now().isoformat(timespec="seconds")
+    assert kinds(diff(BEFORE, BEFORE, taken_at=old)) == [("stale", True)]
+    assert diff(BEFORE, BEFORE, taken_at=recent) == []
+    assert kinds(diff(BEFORE, BEFORE, buy_price_changed=True)) == [("position", True)]
+
+
+def test_price_move_without_atr_is_material():
+    previous = {**BEFORE, "atr": None}
+    assert kinds(diff(previous, {**previous, "last_close": 150.5})) == [("price", True)]
+
+
+def test_fingerprint_from_payload():
+    data = {
+        "quarters": {"Sales": {"Jun 2024": 100, "Sep 2024": 120}, "Net Profit": {"Jun 2024": 10, "Sep 2024": 12}},
+        "profit_loss": {"Sales": {"Mar 2023": 400, "Mar 2024": 450, "TTM": 470}},
+        "shareholding": {"quarterly": {"Promoters": {"Jun 2024": 0.5, "Sep 2024": 0.52}}},
+        "analysis": {"pros": ["Debt free"], "cons": []},
+    }
+    fp = fingerprint(data, {"price": [100, 102, 101, 104], "today_date": "04-11-2024"})
+    assert fp["quarter"] == "Sep 2024" and fp["annual"] == "Mar 2024"
+    assert fp["quarter_values"] == {"Sales": 120.0, "Net Profit": 12.0}
+    assert fp["holding"] == {"Promoters": 52.0}
+    assert fp["last_close"] == 104.0
+    assert fp["atr"] == pytest.approx(2.0)  # mean |Δclose| of 2, 1, 3
+    assert fingerprint({}, None)["atr"] is None
+
+
+def test_snapshot_roundtrip_and_annotation(tmp_path):
+    key = snapshot_key("tcs.ns", owns_stock=True)
+    assert key == "TCS_NS_HOLDING"
+    assert load_snapshot(key, folder=str(tmp_path)) is None
+    save_snapshot(key, BEFORE, "screener", "**PORTFOLIO DECISION** → HOLD\nrest", folder=str(tmp_path))
+    snapshot = load_snapshot(key, folder=str(tmp_path))
+    assert snapshot["fingerprint"] == BEFORE
+
+    changes = diff(BEFORE, {**BEFORE, "last_close": 151.0})
+    text = annotate(snapshot, changes)
+    assert text.startswith("**UNCHANGED SINCE") and text.endswith("**PORTFOLIO DECISION** → HOLD\nrest")
+    section = changes_prompt_section(snapshot, changes)
+    assert "Previous verdict: **PORTFOLIO DECISION** → HOLD" in section
+    assert "Material changes:\n- No changes" in section and "Minor changes:\n- Last close" in section
@@ -0,0 +1,158 @@
+# tests/test_verdict.py
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import src.recommendation as recommendation
+from src.backtest import parse_levels
+from src.verdict import (
+    UNVERIFIED_FIELDS, format_instructions, from_markdown, parse_json, render_markdown, repair_prompt,
+    store_verdict, validate,
+)
+
+ENTRY = {
+    "decision": "buy", "confidence": "Medium", "confidence_pct": 70,
+    "buy_zone": {"low": "₹1,500", "high": 1450}, "stop_loss": 1390, "target": "1,800",
+    "position_size": "Half", "horizon": "3-6 months",
+    "rationale": ["Price above 30-day average", "Sales +12% YoY, OPM stable"],
+    "risk_rating": "Medium", "priority": "High",
+}
+HOLDING = {
+    "decision": "BOOK PROFIT", "confidence": "High (80%+)", "confidence_pct": 85, "immediate_action": "EXIT",
+    "stop_loss": 1400, "target": 1650, "horizon": "1-3 months",
+    "rationale": ["Up 35% from the buy price", "RSI 78, stretched"], "risk_rating": "High", "priority": "High",
+}
+
+
+def test_parse_json_tolerates_fences_and_prose():
+    assert parse_json('```json\n{"a": 1}\n```') == {"a": 1}
+    assert parse_json('Here you go: {"a": 1} hope that helps') == {"a": 1}
+    assert parse_json("**ENTRY DECISION** → BUY") is None
+    assert parse_json("[1, 2]") is None
+    assert parse_json('{"a": }') is None
+
+
+def test_validate_cleans_a_valid_entry_verdict():
+    clean, errors = validate(ENTRY, holding=False)
+    assert errors == {}
+    assert clean["decision"] == "BUY"
+    assert clean["buy_zone"] == {"low": 1450.0, "high": 1500.0}
+    assert clean["target"] == 1800.0
+
+
+def test_validate_reports_each_problem():
+    bad = {**ENTRY, "decision": "MAYBE", "confidence_pct": 140, "rationale": ["one"], "priority": None}
+    clean, errors = validate(bad, holding=False)
+    assert set(errors) == {"decision", "confidence_pct", "rationale", "priority"}
+    assert errors["priority"] == "missing"
+    assert not set(errors) & set(clean)
+
+
+@pytest.mark.parametrize("levels, invalid", [
+    ({"stop_loss": 1900}, {"stop_loss", "target"}),
+    ({"stop_loss": 1460}, {"stop_loss"}),
+    ({"target": 1480}, {"target"}),
+])
+def test_validate_checks_level_order(levels, invalid):
+    assert set(validate({**ENTRY, **levels}, holding=False)[1]) == invalid
+
+
+def test_holding_schema_has_its_own_fields():
+    clean, errors = validate(HOLDING, holding=True)
+    assert errors == {} and clean["confidence"] == "High" and clean["immediate_action"] == "EXIT"
+    assert set(validate(HOLDING, holding=False)[1]) >= {"decision", "buy_zone", "position_size"}
+    assert '"immediate_action"' in format_instructions(True) and '"buy_zone"' not in format_instructions(True)
+
+
+def test_repair_prompt_asks_only_for_the_broken_fields():
+    prompt = repair_prompt({"stop_loss": "stop_loss must be below target", "priority": "missing"}, holding=False)
+    assert 'containing only these keys ("stop_loss", "priority")' in prompt
+    assert '- "priority": missing (expected "High" | "Medium" | "Low")' in prompt
+
+
+def test_render_markdown_roundtrips_through_the_readers():
+    verdict = validate(ENTRY, holding=False)[0]
+    text = render_markdown(verdict, current_price=1480)
+    levels = parse_levels(text)
+    assert (levels["verdict"], levels["confidence"], levels["horizon"]) == ("BUY", "Medium", "3-6 months")
+    assert (levels["entry_low"], levels["entry_high"], levels["stop"], levels["target"]) == (1450, 1500, 1390, 1800)
+    assert validate(from_markdown(text, holding=False), holding=False) == (verdict, {})
+    assert UNVERIFIED_FIELDS not in text
+
+
+def test_from_markdown_reads_holding_reports():
+    verdict = validate(HOLDING, holding=True)[0]
+    parsed, errors = validate(from_markdown(render_markdown(verdict, current_price=1500), holding=True), holding=True)
+    assert errors == {} and parsed == verdict
+
+
+def test_render_markdown_flags_fields_still_invalid():
+    verdict, errors = validate({**ENTRY, "stop_loss": 1900}, holding=False)
+    text = render_markdown(verdict, current_price=1480, errors=errors)
+    assert "Stop Loss: ⚠️ stop_loss must be below target" in text
+    assert text.endswith(f"{UNVERIFIED_FIELDS}: stop_loss stop_loss must be below target; "
+                         "target stop_loss must be below target")
+
+
+def test_store_verdict_writes_a_backtest_record(tmp_path):
+    path = tmp_path / "verdicts.ndjson"
+    store_verdict(validate(ENTRY, holding=False)[0], "TCS.NS", owns_stock=False, path=str(path))
+    record = json.loads(path.read_text())
+    assert record["type"] == "verdict" and record["horizon_days"] == 182
+    assert (record["entry_low"], record["stop"], record["target"]) == (1450.0, 1390.0, 1800.0)
+
+
+# --------------------------------------------------------------------------- #
+# Repair loop in recommendation.generate_structured_recommendation
+# --------------------------------------------------------------------------- #
+
+class ScriptedModel:
+    """Returns the scripted replies in order and records the prompts it was sent."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def invoke(self, messages):
+        self.prompts.append(messages[-1].content)
+        return SimpleNamespace(content=self.replies.pop(0))
+
+
+@pytest.fixture
+def model(monkeypatch):
+    stored = []
+    monkeypatch.setattr(recommendation, "store_verdict", lambda verdict, *a, **k: stored.append(verdict))
+
+    def install(*replies):
+        llm = ScriptedModel(*replies)
+        llm.stored = stored
+        monkeypatch.setattr(recommendation, "get_recommendation_llm", lambda: llm)
+        return llm
+    return install
+
+
+def test_repair_round_asks_again_and_merges(model):
+    llm = model(json.dumps({**ENTRY, "priority": "urgent"}), json.dumps({"priority": "High"}))
+    verdict, report, errors = recommendation.generate_structured_recommendation({}, owns_stock=False)
+    assert errors == {} and verdict["priority"] == "High" and verdict["decision"] == "BUY"
+    assert 'containing only these keys ("priority")' in llm.prompts[1]
+    assert llm.stored == [verdict]
+    assert report.startswith("**ENTRY DECISION** → BUY")
+
+
+def test_exhausted_repairs_keep_the_partial_verdict_flagged(model):
+    broken = json.dumps({**ENTRY, "priority": "urgent"})
+    llm = model(*[broken] * (recommendation.Config.VERDICT_REPAIR_ATTEMPTS + 1))
+    verdict, report, errors = recommendation.generate_structured_recommendation({}, owns_stock=False)
+    assert set(errors) == {"priority"} and "priority" not in verdict
+    assert f"{UNVERIFIED_FIELDS}: priority" in report and "**PRIORITY** → ⚠️" in report
+    assert llm.stored == []
+
+
+def test_exhausted_repairs_keep_a_markdown_reply_as_written(model):
+    markdown = render_markdown(validate(ENTRY, holding=False)[0]).replace("**PRIORITY** → High Priority", "")
+    model(*[markdown] * (recommendation.Config.VERDICT_REPAIR_ATTEMPTS + 1))
+    verdict, report, errors = recommendation.generate_structured_recommendation({}, owns_stock=False)
+    assert set(errors) == {"priority"} and verdict["decision"] == "BUY"
+    assert report.startswith(markdown.rstrip()) and report.endswith(f"{UNVERIFIED_FIELDS}: priority missing")
@@ -0,0 +1,90 @@
+# tests/test_yahoo_fundamentals.py
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scraper import yahoo_fundamentals as yahoo
+from src.scraper.normalize import normalize_all
+
+CRORE = 1e7
+YEARS = pd.to_datetime(["2024-03-31", "2023-03-31"])  # yfinance: newest column first
+
+
+def statement(rows, columns=YEARS):
+    return pd.DataFrame(rows, index=columns).T
+
+
+def fake_ticker(**overrides):
+    income = statement({
+        "Total Revenue": [1200 * CRORE, 1000 * CRORE],
+        "EBITDA": [300 * CRORE, 240 * CRORE],
+        "Interest Expense": [10 * CRORE, 12 * CRORE],
+        "Pretax Income": [250 * CRORE, 200 * CRORE],
+        "Tax Provision": [62.5 * CRORE, 50 * CRORE],
+        "Net Income": [187.5 * CRORE, 150 * CRORE],
+        "Diluted EPS": [18.75, 15.0],
+    })
+    balance = statement({
+        "Common Stock": [10 * CRORE, 10 * CRORE],
+        "Stockholders Equity": [900 * CRORE, 800 * CRORE],
+        "Total Debt": [100 * CRORE, np.nan],
+        "Total Liabilities Net Minority Interest": [400 * CRORE, 380 * CRORE],
+        "Total Assets": [1300 * CRORE, 1180 * CRORE],
+        "Net PPE": [500 * CRORE, 450 * CRORE],
+    })
+    holders = pd.DataFrame({"Value": [0.55, 0.30]}, index=["insidersPercentHeld", "institutionsPercentHeld"])
+    quarters = statement({"Total Revenue": [320 * CRORE, 300 * CRORE], "Net Income": [50 * CRORE, 45 * CRORE]},
+                         pd.to_datetime(["2024-06-30", "2024-03-31"]))
+    fields = dict(ticker="TCS.NS", income_stmt=income, quarterly_income_stmt=quarters, balance_sheet=balance,
+                  major_holders=holders)
+    return SimpleNamespace(**{**fields, **overrides})
+
+
+def test_income_table_in_screener_units_oldest_first():
+    table = yahoo.income_table(fake_ticker().income_stmt)
+    assert list(table["Sales"]) == ["Mar 2023", "Mar 2024"]
+    assert table["Sales"]["Mar 2024"] == 1200.0
+    assert table["Expenses"]["Mar 2024"] == 900.0
+    assert table["OPM %"]["Mar 2024"] == 0.25
+    assert table["Tax %"]["Mar 2024"] == 0.25
+    assert table["EPS in Rs"]["Mar 2024"] == 18.75
+    assert "Other Income" not in table  # no such row on Yahoo → left out, not all-None
+
+
+def test_balance_table_derives_reserves_and_other_rows():
+    table = yahoo.balance_table(fake_ticker().balance_sheet)
+    assert table["Reserves"]["Mar 2024"] == 890.0
+    assert table["Borrowings"] == {"Mar 2023": None, "Mar 2024": 100.0}
+    assert table["Other Liabilities"]["Mar 2024"] == 300.0
+    assert table["Other Liabilities"]["Mar 2023"] == 380.0  # missing debt counts as none
+    assert table["Other Assets"]["Mar 2024"] == 800.0
+
+
+def test_shareholding_single_column():
+    holding = yahoo.shareholding_table(fake_ticker().major_holders, as_of="Jun 2024")
+    assert holding["quarterly"] == {"Promoters": {"Jun 2024": 0.55}, "Institutions": {"Jun 2024": 0.3},
+                                    "Public": {"Jun 2024": 0.15}}
+    assert yahoo.shareholding_table(None) == {"quarterly": {}, "yearly": {}}
+
+
+def test_extract_all_feeds_the_normalizer():
+    data = yahoo.extract_all(fake_ticker(), " TCS ")
+    assert data["metadata"]["company"] == "TCS" and data["metadata"]["url"].endswith("/TCS.NS")
+    assert yahoo.is_complete(data)
+    sections = normalize_all(data)
+    assert sections["profit_loss"].latest("Sales") == 1200.0
+    assert sections["quarters"].latest("Net Profit") == 50.0
+
+
+def test_extract_all_without_statements_raises():
+    empty = fake_ticker(income_stmt=pd.DataFrame(), quarterly_income_stmt=None)
+    with pytest.raises(ValueError, match="No financial statements"):
+        yahoo.extract_all(empty, "TCS")
+
+
+def test_is_complete_needs_annual_plus_quarters_or_balance_sheet():
+    assert not yahoo.is_complete({"profit_loss": {"Sales": {}}})
+    assert yahoo.is_complete({"profit_loss": {"Sales": {}}, "balance_sheet": {"Borrowings": {}}})
+    assert not yahoo.is_complete({"quarters": {"Sales": {}}, "balance_sheet": {"Borrowings": {}}})